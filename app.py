@@ -4,16 +4,24 @@ import os
 import aws_cdk as cdk
 from dotenv import load_dotenv
 
-from src.component import MinecraftOnDemandInfraCommonCdkStack
+from src.component import MinecraftOnDemandInfraCommonCdkStack, ServerOptions
+from src.stacks import layered_stacks
 
 load_dotenv()
 
 app = cdk.App()
 
-MinecraftOnDemandInfraCommonCdkStack(
-    app,
-    "MinecraftOnDemandInfraCommonCdkStack",
-    env=cdk.Environment(account=os.getenv("ACCOUNT"), region=os.getenv("REGION")),
-)
+env = cdk.Environment(account=os.getenv("ACCOUNT"), region=os.getenv("REGION"))
+
+if os.getenv("LAYERED_STACKS", "").lower() == "true":
+    # Foundation, data, compute and runtime as separate stacks, so code
+    # changes only deploy the runtime stack.
+    layered_stacks(app, "MinecraftOnDemand", options=ServerOptions(), env=env)
+else:
+    MinecraftOnDemandInfraCommonCdkStack(
+        app,
+        "MinecraftOnDemandInfraCommonCdkStack",
+        env=env,
+    )
 
 app.synth()
@@ -9,5 +9,13 @@ MC_SERVER_CONTAINER_NAME: str = "minecraft-server"
 DOMAIN_NAME: str = "pz-craft.online"
 DOMAIN_STACK_REGION: str = "us-east-1"
 ECS_VOLUME_NAME: str = "data"
+EPHEMERAL_STORAGE_GIB: int = 50
+# How long a fresh server waits for its first player before stopping itself.
+AUTOSTOP_TIMEOUT_INIT_SECONDS: int = 300
 JAVA_EDITION_DOCKER_IMAGE: str = "itzg/minecraft-server"
+MINECRAFT_VERSION: str = "1.20.1"
+SERVER_TYPE: str = "FABRIC"
+FABRIC_LOADER_VERSION: str = "0.16.0"
 BEDROCK_EDITION_DOCKER_IMAGE: str = "itzg/minecraft-bedrock-server"
+# ECR only accepts Docker Hub credentials from secrets under this prefix.
+DOCKER_HUB_CREDENTIAL_SECRET_NAME: str = "ecr-pullthroughcache/docker-hub"
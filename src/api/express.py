@@ -0,0 +1,429 @@
+from aws_cdk import ArnFormat, Duration, Fn, Stack
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_stepfunctions as sfn
+from aws_cdk import aws_stepfunctions_tasks as tasks
+from constructs import Construct
+
+from constants import AUTOSTOP_TIMEOUT_INIT_SECONDS
+from src.common.runtime.python import lifecycle, timeline
+
+
+class ExpressWorkflows(Construct):
+    """Express state machines that start and stop the server without a Lambda.
+
+    API Gateway calls these synchronously, so the lifecycle claim and the
+    server execution start happen in Step Functions' own service integrations
+    instead of behind a Python cold start. The writes are built by
+    ``lifecycle.py``, so they are the ones the Lambda handlers make.
+
+    Both machines expect ``{"now": "<epoch seconds>", "now_ms": "<epoch
+    milliseconds>"}``, the request time, as input and return
+    ``{"statusCode": ..., "body": "<JSON>"}``, the body shaped as the Lambda
+    handlers' (``replies.respond``).
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        table: dynamodb.ITable,
+        state_machine: sfn.IStateMachine,
+        graceful_stop_state_machine: sfn.IStateMachine,
+        lease_seconds: int,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        key = {"id": tasks.DynamoAttributeValue.from_string(lifecycle.SERVER_ID)}
+        executions_arn = Stack.of(self).format_arn(
+            service="states",
+            resource="execution",
+            # Executions are named <state machine name>:<execution name>.
+            resource_name=f"{Fn.select(6, Fn.split(':', state_machine.state_machine_arn))}:*",
+            arn_format=ArnFormat.COLON_RESOURCE_NAME,
+        )
+        now = _Number("$.now")
+
+        """
+        ******************************
+        *        Start Server        *
+        ******************************
+        """
+
+        # The claim takes the lease end as a value, as in start_function.
+        lease = sfn.Pass(
+            self,
+            "Lease",
+            parameters={
+                "expires_at.$": (
+                    f"States.Format('{{}}', States.MathAdd(States.StringToJson($.now), "
+                    f"{lease_seconds}))"
+                ),
+            },
+            result_path="$.lease",
+        )
+
+        claim = _update_item(
+            self,
+            "Claim",
+            table=table,
+            key=key,
+            request=lifecycle.claim_start_request(_Number("$.lease.expires_at"), now=now),
+            return_values=tasks.DynamoReturnValues.ALL_NEW,
+            result_selector={"version.$": "$.Attributes.version.N"},
+            result_path="$.claim",
+        )
+
+        # Handed to the server and kept on the state item, so a stop can shut
+        # the server down cleanly over RCON.
+        session_secret = sfn.Pass(
+            self,
+            "SessionSecret",
+            parameters={
+                "rcon_password.$": "States.UUID()",
+                "autostop_timeout_init": str(AUTOSTOP_TIMEOUT_INIT_SECONDS),
+            },
+            result_path="$.session",
+        )
+
+        start_execution = tasks.StepFunctionsStartExecution(
+            self,
+            "StartServer",
+            state_machine=state_machine,
+            integration_pattern=sfn.IntegrationPattern.REQUEST_RESPONSE,
+            # Same naming as start_function, so both paths deduplicate each other.
+            name=sfn.JsonPath.format(
+                lifecycle.execution_name(lifecycle.SERVER_ID, "{}"),
+                sfn.JsonPath.string_at("$.claim.version"),
+            ),
+            input=sfn.TaskInput.from_object(
+                {
+                    # Direct integrations only serve the primary server.
+                    "server_id": lifecycle.SERVER_ID,
+                    "rcon_password": sfn.JsonPath.string_at("$.session.rcon_password"),
+                    "autostop_timeout_init": sfn.JsonPath.string_at(
+                        "$.session.autostop_timeout_init"
+                    ),
+                }
+            ),
+            result_selector={"execution_arn.$": "$.ExecutionArn"},
+            result_path="$.execution",
+        )
+
+        claimed_version = _Number("$.claim.version")
+
+        record_execution = _update_item(
+            self,
+            "RecordExecution",
+            table=table,
+            key=key,
+            request=lifecycle.record_execution_request(
+                claimed_version,
+                sfn.JsonPath.string_at("$.execution.execution_arn"),
+                attributes={"rcon_password": sfn.JsonPath.string_at("$.session.rcon_password")},
+            ),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        release = _update_item(
+            self,
+            "Release",
+            table=table,
+            key=key,
+            request=lifecycle.release_request(claimed_version, now=now),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        abandon_execution = tasks.CallAwsService(
+            self,
+            "AbandonExecution",
+            service="sfn",
+            action="stopExecution",
+            parameters={
+                "ExecutionArn": sfn.JsonPath.string_at("$.execution.execution_arn"),
+            },
+            iam_resources=[executions_arn],
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        # As start_function records it, but only the request time: Step
+        # Functions has no clock to read the claim and start times from.
+        session = sfn.JsonPath.format(
+            lifecycle.execution_name(lifecycle.SERVER_ID, "{}"),
+            sfn.JsonPath.string_at("$.claim.version"),
+        )
+        record_session = _update_item(
+            self,
+            "RecordSession",
+            table=table,
+            key={
+                "id": tasks.DynamoAttributeValue.from_string(
+                    sfn.JsonPath.format(
+                        timeline.session_key(lifecycle.execution_name(lifecycle.SERVER_ID, "{}")),
+                        sfn.JsonPath.string_at("$.claim.version"),
+                    )
+                )
+            },
+            request=timeline.record_request(session, {"requested": _Number("$.now_ms")}),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        # Someone asked for the server while a session was already up; this
+        # is what tells a used pre-warmed session from an unused one.
+        read_current = tasks.DynamoGetItem(
+            self,
+            "ReadCurrent",
+            table=table,
+            key=key,
+            consistent_read=True,
+            result_path="$.current",
+        )
+        current_session = sfn.JsonPath.array_get_item(
+            sfn.JsonPath.string_split(
+                sfn.JsonPath.string_at("$.current.Item.execution_arn.S"), ":"
+            ),
+            7,
+        )
+        record_demand = _update_item(
+            self,
+            "RecordDemand",
+            table=table,
+            key={
+                "id": tasks.DynamoAttributeValue.from_string(
+                    sfn.JsonPath.format(timeline.session_key("{}"), current_session)
+                )
+            },
+            request=timeline.annotate_request(
+                current_session, {"demanded_at_ms": _Number("$.now_ms")}
+            ),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        # A start that lost its claim to a newer one answers with that one's
+        # state, as in start_function.
+        read_winner = tasks.DynamoGetItem(
+            self,
+            "ReadWinner",
+            table=table,
+            key=key,
+            consistent_read=True,
+            result_path="$.current",
+        )
+
+        # Only a server that is up or on its way up counts as started; one
+        # that is stopping or under maintenance did not start.
+        conflict_state = sfn.JsonPath.string_at("$.conflict.state")
+        current_state = sfn.Choice(self, "CurrentState")
+        current_state.when(
+            sfn.Condition.is_present("$.current.Item.state"),
+            sfn.Pass(
+                self,
+                "KnownState",
+                parameters={"state.$": "$.current.Item.state.S"},
+                result_path="$.conflict",
+            ),
+        ).otherwise(
+            # Items from before states were recorded only conflict while a
+            # start is in progress.
+            sfn.Pass(
+                self,
+                "LegacyState",
+                parameters={"state": lifecycle.STARTING},
+                result_path="$.conflict",
+            )
+        ).afterwards().next(
+            sfn.Choice(self, "IsActive")
+            .when(
+                sfn.Condition.or_(
+                    *(
+                        sfn.Condition.string_equals("$.conflict.state", state)
+                        for state in lifecycle.ACTIVE_STATES
+                    )
+                ),
+                _respond(self, "AlreadyRunning", 409, True, server_status=conflict_state),
+            )
+            .otherwise(_respond(self, "NotStarted", 409, False, server_status=conflict_state))
+        )
+
+        started = _respond(self, "Started", 200, True, server_status=lifecycle.STARTING)
+        start_failed = _respond(
+            self, "StartFailed", 500, False, error=sfn.JsonPath.string_at("$.error.Cause")
+        )
+
+        conflict = ["DynamoDB.ConditionalCheckFailedException"]
+
+        claim.add_catch(read_current, errors=conflict, result_path=sfn.JsonPath.DISCARD)
+        read_current.add_catch(start_failed, errors=["States.ALL"], result_path="$.error")
+        read_current.next(
+            sfn.Choice(self, "HasSession")
+            .when(sfn.Condition.is_present("$.current.Item.execution_arn"), record_demand)
+            .otherwise(current_state)
+        )
+        # Not worth failing the request over, as in start_function.
+        record_demand.add_catch(
+            current_state, errors=["States.ALL"], result_path=sfn.JsonPath.DISCARD
+        )
+        record_demand.next(current_state)
+        record_session.add_catch(started, errors=["States.ALL"], result_path=sfn.JsonPath.DISCARD)
+        start_execution.add_catch(release, errors=["States.ALL"], result_path="$.error")
+        release.add_catch(start_failed, errors=["States.ALL"], result_path=sfn.JsonPath.DISCARD)
+        release.next(start_failed)
+        record_execution.add_catch(
+            abandon_execution, errors=conflict, result_path=sfn.JsonPath.DISCARD
+        )
+        abandon_execution.next(read_winner)
+        read_winner.add_catch(start_failed, errors=["States.ALL"], result_path="$.error")
+        read_winner.next(current_state)
+
+        self.start_state_machine = sfn.StateMachine(
+            self,
+            "StartStateMachine",
+            state_machine_type=sfn.StateMachineType.EXPRESS,
+            definition_body=sfn.DefinitionBody.from_chainable(
+                lease.next(claim)
+                .next(session_secret)
+                .next(start_execution)
+                .next(record_execution)
+                .next(record_session)
+                .next(started)
+            ),
+            timeout=Duration.seconds(30),
+        )
+
+        """
+        ******************************
+        *         Stop Server        *
+        ******************************
+        """
+
+        read = tasks.DynamoGetItem(
+            self,
+            "Read",
+            table=table,
+            key=key,
+            consistent_read=True,
+            result_path="$.read",
+        )
+
+        begin_stop = _update_item(
+            self,
+            "BeginStop",
+            table=table,
+            key=key,
+            request=lifecycle.begin_stop_request(_Number("$.read.Item.version.N"), now=now),
+            return_values=tasks.DynamoReturnValues.UPDATED_NEW,
+            result_selector={"version.$": "$.Attributes.version.N"},
+            result_path="$.stopping",
+        )
+
+        # Same naming as stop_function, so both paths share one graceful stop
+        # per session.
+        execution_name = sfn.JsonPath.array_get_item(
+            sfn.JsonPath.string_split(sfn.JsonPath.string_at("$.read.Item.execution_arn.S"), ":"),
+            7,
+        )
+
+        graceful_stop = tasks.StepFunctionsStartExecution(
+            self,
+            "StartGracefulStop",
+            state_machine=graceful_stop_state_machine,
+            integration_pattern=sfn.IntegrationPattern.REQUEST_RESPONSE,
+            name=sfn.JsonPath.format("stop-{}", execution_name),
+            input=sfn.TaskInput.from_object(
+                {
+                    "execution_arn": sfn.JsonPath.string_at("$.read.Item.execution_arn.S"),
+                    "server_id": lifecycle.SERVER_ID,
+                }
+            ),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        stopped = _respond(self, "Stopped", 200, True, server_status=lifecycle.STOPPING)
+        stop_conflict = _respond(self, "StopConflict", 409, False, error="Server is not running")
+
+        begin_stop.add_catch(stop_conflict, errors=conflict, result_path=sfn.JsonPath.DISCARD)
+        graceful_stop.add_catch(
+            stopped,
+            errors=["StepFunctions.ExecutionAlreadyExistsException"],
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        stop_running = begin_stop.next(graceful_stop)
+        graceful_stop.next(stopped)
+
+        self.stop_state_machine = sfn.StateMachine(
+            self,
+            "StopStateMachine",
+            state_machine_type=sfn.StateMachineType.EXPRESS,
+            definition_body=sfn.DefinitionBody.from_chainable(
+                read.next(
+                    sfn.Choice(self, "HasExecution")
+                    .when(
+                        sfn.Condition.is_not_present("$.read.Item.execution_arn"),
+                        stop_conflict,
+                    )
+                    # A stop that failed half-way is retried from STOPPING.
+                    .when(
+                        sfn.Condition.string_equals("$.read.Item.state.S", lifecycle.STOPPING),
+                        graceful_stop,
+                    )
+                    .otherwise(stop_running)
+                )
+            ),
+            timeout=Duration.seconds(30),
+        )
+
+
+class _Number:
+    """A number in the state input, held as a string like DynamoDB's ``N``."""
+
+    def __init__(self, path):
+        self.path = path
+
+
+def _attribute_value(value):
+    if isinstance(value, _Number):
+        return tasks.DynamoAttributeValue.number_from_string(sfn.JsonPath.string_at(value.path))
+    if isinstance(value, bool):
+        return tasks.DynamoAttributeValue.from_boolean(value)
+    if isinstance(value, int):
+        return tasks.DynamoAttributeValue.from_number(value)
+
+    return tasks.DynamoAttributeValue.from_string(value)
+
+
+def _update_item(scope, construct_id, *, table, key, request, **kwargs):
+    """An ``UpdateItem`` task sending ``request``, as built by ``lifecycle``."""
+    return tasks.DynamoUpdateItem(
+        scope,
+        construct_id,
+        table=table,
+        key=key,
+        update_expression=request["UpdateExpression"],
+        condition_expression=request.get("ConditionExpression"),
+        expression_attribute_names=request["ExpressionAttributeNames"],
+        expression_attribute_values={
+            name: _attribute_value(value)
+            for name, value in request["ExpressionAttributeValues"].items()
+        },
+        **kwargs,
+    )
+
+
+def _respond(scope, construct_id, status_code, success, **body):
+    """Answer ``status_code`` with ``body`` in the shape of ``replies.respond``."""
+    return sfn.Pass(
+        scope,
+        f"{construct_id}Body",
+        parameters={"success": "true" if success else "false", **body},
+        result_path="$.body",
+    ).next(
+        sfn.Pass(
+            scope,
+            construct_id,
+            parameters={
+                "statusCode": status_code,
+                "body.$": "States.JsonToString($.body)",
+            },
+        )
+    )
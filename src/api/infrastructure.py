@@ -1,8 +1,24 @@
+import json
+
 from aws_cdk import Duration
 from aws_cdk import aws_apigateway as apigw
+from aws_cdk import aws_certificatemanager as acm
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_route53 as route53
+from aws_cdk import aws_route53_targets as targets
+from aws_cdk import aws_stepfunctions as sfn
 from constructs import Construct
 
+from constants import AUTOSTOP_TIMEOUT_INIT_SECONDS, DOMAIN_NAME
+from src.api.express import ExpressWorkflows
+from src.common.infrastructure import HandlerOptions
+
+# A claim outlives the Lambda timeout so it is only ever reclaimed once the
+# claiming invocation is gone.
+LEASE_SECONDS = 90
+
 
 class API(Construct):
 
@@ -13,35 +29,84 @@ class API(Construct):
         *,
         dynamodb_table_name: str,
         state_machine_arn: str,
+        graceful_stop_state_machine: sfn.IStateMachine,
+        certificate: acm.ICertificate,
+        hosted_zone: route53.IHostedZone,
+        runtime_layer: lambda_.ILayerVersion,
+        direct_integrations: bool = False,
+        maintenance_state_machine: sfn.IStateMachine = None,
+        profiler_state_machine: sfn.IStateMachine = None,
+        servers: dict = None,
+        max_running_servers: int = None,
+        handlers: HandlerOptions = HandlerOptions(),
     ) -> None:
         super().__init__(scope, construct_id)
 
+        # Server id -> task definition ARN, the primary server included as
+        # "0". Unset for a single server.
+        server_environment = {"SERVERS": json.dumps(servers)} if servers else {}
+
         self.launcher_lambda = lambda_.Function(
             self,
             "launcher-lambda",
-            runtime=lambda_.Runtime.PYTHON_3_12,
+            **handlers.function_props(),
             handler="start_function.lambda_handler",
             code=lambda_.Code.from_asset("src/api/runtime"),
+            layers=[runtime_layer],
             timeout=Duration.seconds(30),
             environment={
                 "TABLE_NAME": dynamodb_table_name,
                 "STATE_MACHINE_ARN": state_machine_arn,
+                "LEASE_SECONDS": str(LEASE_SECONDS),
+                "AUTOSTOP_TIMEOUT_INIT": str(AUTOSTOP_TIMEOUT_INIT_SECONDS),
+                **server_environment,
+                **(
+                    {"MAX_RUNNING_SERVERS": str(max_running_servers)}
+                    if max_running_servers
+                    else {}
+                ),
             },
         )
 
         self.stop_lambda = lambda_.Function(
             self,
             "stop-lambda",
-            runtime=lambda_.Runtime.PYTHON_3_12,
+            **handlers.function_props(),
             handler="stop_function.lambda_handler",
             code=lambda_.Code.from_asset("src/api/runtime"),
+            layers=[runtime_layer],
             timeout=Duration.seconds(30),
             environment={
                 "TABLE_NAME": dynamodb_table_name,
+                "GRACEFUL_STOP_ARN": graceful_stop_state_machine.state_machine_arn,
+                **server_environment,
+            },
+        )
+
+        graceful_stop_state_machine.grant_start_execution(self.stop_lambda)
+
+        self.status_lambda = lambda_.Function(
+            self,
+            "status-lambda",
+            **handlers.function_props(),
+            handler="status_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/api/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(10),
+            environment={
+                "TABLE_NAME": dynamodb_table_name,
+                "CACHE_TTL_SECONDS": "5",
+                **server_environment,
             },
         )
 
-        api = apigw.RestApi(
+        # What API Gateway and other callers invoke; the functions' ``live``
+        # aliases with SnapStart.
+        self.launcher_entry = handlers.entry_point(self.launcher_lambda)
+        self.stop_entry = handlers.entry_point(self.stop_lambda)
+        self.status_entry = handlers.entry_point(self.status_lambda)
+
+        self.rest_api = api = apigw.RestApi(
             self,
             "pzcraft-api",
             rest_api_name="PZ Craft API",
@@ -49,6 +114,18 @@ class API(Construct):
                 "allow_origins": apigw.Cors.ALL_ORIGINS,
                 "allow_methods": apigw.Cors.ALL_METHODS,
             },
+            domain_name=apigw.DomainNameOptions(
+                domain_name=f"api.{DOMAIN_NAME}",
+                certificate=certificate,
+            ),
+        )
+
+        route53.ARecord(
+            self,
+            "ApiAliasRecord",
+            zone=hosted_zone,
+            record_name="api",
+            target=route53.RecordTarget.from_alias(targets.ApiGateway(api)),
         )
 
         v1_resource = api.root.add_resource("v1")
@@ -56,9 +133,188 @@ class API(Construct):
         server_resource = v1_resource.add_resource("server")
         start_resource = server_resource.add_resource("start")
         stop_resource = server_resource.add_resource("stop")
+        status_resource = server_resource.add_resource("status")
+
+        status_lambda_integration = apigw.LambdaIntegration(self.status_entry)
+
+        # The Lambda handlers stay deployed either way, so switching back from
+        # direct integrations is a one-flag change.
+        if direct_integrations:
+            self.express_workflows = ExpressWorkflows(
+                self,
+                "ExpressWorkflows",
+                table=dynamodb.Table.from_table_name(self, "StateTable", dynamodb_table_name),
+                state_machine=sfn.StateMachine.from_state_machine_arn(
+                    self, "ServerStateMachine", state_machine_arn
+                ),
+                graceful_stop_state_machine=graceful_stop_state_machine,
+                lease_seconds=LEASE_SECONDS,
+            )
 
-        launcher_lambda_integration = apigw.LambdaIntegration(self.launcher_lambda)
-        stop_lambda_integration = apigw.LambdaIntegration(self.stop_lambda)
-        
-        start_resource.add_method("GET", launcher_lambda_integration)
-        stop_resource.add_method("GET", stop_lambda_integration)
+            launcher_integration = _express_integration(
+                self.express_workflows.start_state_machine
+            )
+            stop_integration = _express_integration(
+                self.express_workflows.stop_state_machine
+            )
+        else:
+            launcher_integration = apigw.LambdaIntegration(self.launcher_entry)
+            stop_integration = apigw.LambdaIntegration(self.stop_entry)
+
+        start_resource.add_method("GET", launcher_integration)
+        stop_resource.add_method("GET", stop_integration)
+        status_resource.add_method("GET", status_lambda_integration)
+
+        if servers:
+            # The same handlers, told the server by the {id} path parameter.
+            servers_resource = v1_resource.add_resource("servers")
+            servers_resource.add_method("GET", status_lambda_integration)
+
+            server_id_resource = servers_resource.add_resource("{id}")
+            server_id_resource.add_resource("start").add_method(
+                "GET", apigw.LambdaIntegration(self.launcher_entry)
+            )
+            server_id_resource.add_resource("stop").add_method(
+                "GET", apigw.LambdaIntegration(self.stop_entry)
+            )
+            server_id_resource.add_resource("status").add_method(
+                "GET", status_lambda_integration
+            )
+
+        if maintenance_state_machine:
+            # Runs in the background; the state machine refuses unless the
+            # server is stopped, and /status shows MAINTENANCE while it runs.
+            pregen_role = iam.Role(
+                self,
+                "PregenApiRole",
+                assumed_by=iam.ServicePrincipal("apigateway.amazonaws.com"),
+            )
+            maintenance_state_machine.grant_start_execution(pregen_role)
+
+            server_resource.add_resource("pregen").add_method(
+                "GET",
+                _start_background_integration(
+                    maintenance_state_machine, {"task": "pregen"}, pregen_role
+                ),
+                method_responses=_BACKGROUND_METHOD_RESPONSES,
+            )
+
+        if profiler_state_machine:
+            # Captures run for a minute by default; the result is linked from
+            # the session item once it is in S3.
+            profile_role = iam.Role(
+                self,
+                "ProfileApiRole",
+                assumed_by=iam.ServicePrincipal("apigateway.amazonaws.com"),
+            )
+            profiler_state_machine.grant_start_execution(profile_role)
+
+            server_resource.add_resource("profile").add_method(
+                "GET",
+                _start_background_integration(
+                    profiler_state_machine, {"trigger": "api"}, profile_role
+                ),
+                method_responses=_BACKGROUND_METHOD_RESPONSES,
+            )
+
+
+_BACKGROUND_METHOD_RESPONSES = [
+    apigw.MethodResponse(status_code=status_code) for status_code in ("202", "400", "500")
+]
+
+
+def _express_integration(state_machine: sfn.IStateMachine) -> apigw.Integration:
+    """Run an express state machine synchronously and relay its response.
+
+    The request time, in seconds and in milliseconds, is the only input; the
+    machine's ``statusCode`` output becomes the HTTP status and its ``body``
+    the response body.
+    """
+    return apigw.StepFunctionsIntegration.start_execution(
+        state_machine,
+        request_templates={
+            "application/json": "\n".join(
+                [
+                    "#set($now = $context.requestTimeEpoch / 1000)",
+                    "{",
+                    f'  "stateMachineArn": "{state_machine.state_machine_arn}",',
+                    '  "input": "{\\"now\\": \\"$now\\", '
+                    '\\"now_ms\\": \\"$context.requestTimeEpoch\\"}"',
+                    "}",
+                ]
+            ),
+        },
+        integration_responses=[
+            apigw.IntegrationResponse(
+                status_code="200",
+                response_templates={
+                    "application/json": "\n".join(
+                        [
+                            "#set($output = $util.parseJson($input.path('$.output')))",
+                            "#if($input.path('$.status').toString().equals(\"SUCCEEDED\"))",
+                            "#set($context.responseOverride.status = $output.statusCode)",
+                            "$output.body",
+                            "#else",
+                            "#set($context.responseOverride.status = 500)",
+                            '{"success": "false", "error": "$util.escapeJavaScript($input.path(\'$.cause\'))"}',
+                            "#end",
+                        ]
+                    ),
+                },
+            ),
+        ],
+    )
+
+
+def _start_background_integration(
+    state_machine: sfn.IStateMachine, execution_input: dict, role: iam.IRole
+) -> apigw.Integration:
+    """Start a state machine asynchronously; answers 202 with the execution.
+
+    A refused start answers 400 or 500, following the status Step Functions
+    refused it with, and carries its message.
+    """
+    escaped_input = json.dumps(execution_input).replace('"', '\\"')
+
+    return apigw.AwsIntegration(
+        service="states",
+        action="StartExecution",
+        options=apigw.IntegrationOptions(
+            credentials_role=role,
+            request_templates={
+                "application/json": "\n".join(
+                    [
+                        "{",
+                        f'  "stateMachineArn": "{state_machine.state_machine_arn}",',
+                        f'  "input": "{escaped_input}"',
+                        "}",
+                    ]
+                ),
+            },
+            integration_responses=[
+                apigw.IntegrationResponse(
+                    status_code="202",
+                    response_templates={
+                        "application/json": (
+                            '{"success": "true", "execution_arn": "$input.path(\'$.executionArn\')"}'
+                        ),
+                    },
+                ),
+                # Without these a refused StartExecution (throttling, an
+                # execution limit, a missing role) would still answer 202.
+                *(
+                    apigw.IntegrationResponse(
+                        selection_pattern=selection_pattern,
+                        status_code=status_code,
+                        response_templates={
+                            "application/json": (
+                                '{"success": "false", '
+                                '"error": "$util.escapeJavaScript($input.path(\'$.message\'))"}'
+                            ),
+                        },
+                    )
+                    for selection_pattern, status_code in (("4\\d{2}", "400"), ("5\\d{2}", "500"))
+                ),
+            ],
+        ),
+    )
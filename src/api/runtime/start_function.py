@@ -1,65 +1,196 @@
 import json
 import os
+import secrets
 
-import boto3
+import clients
+import lifecycle
+import timeline
+from replies import error, log, respond
 
 TABLE_NAME = os.environ.get("TABLE_NAME")
 STATE_MACHINE_ARN = os.environ.get("STATE_MACHINE_ARN")
+LEASE_SECONDS = int(os.environ.get("LEASE_SECONDS", "90"))
+AUTOSTOP_TIMEOUT_INIT = int(os.environ.get("AUTOSTOP_TIMEOUT_INIT", "300"))
+# Server id -> task definition ARN, when the stack runs more than one server.
+SERVERS = json.loads(os.environ.get("SERVERS", "{}"))
+# Across all servers; 0 means no limit.
+MAX_RUNNING_SERVERS = int(os.environ.get("MAX_RUNNING_SERVERS", "0"))
 
 if not TABLE_NAME or not STATE_MACHINE_ARN:
     raise ValueError("Missing required environment variables")
 
-sfn = boto3.client("stepfunctions")
-dynamodb = boto3.resource("dynamodb")
+sfn = clients.LazyClient("stepfunctions")
+table = clients.Table(TABLE_NAME)
+
+
+def record_demand(table, at_ms, item):
+    """Note that someone asked for the server while a session was already up.
+
+    This is what tells a used pre-warmed session from an unused one.
+    """
+    if "execution_arn" in item:
+        timeline.annotate(
+            table, timeline.session_id(item["execution_arn"]), {"demanded_at_ms": at_ms}
+        )
+
+
+def conflict(item):
+    """Answer a start that found the server claimed, with its actual state.
+
+    Only a server that is up or on its way up counts as started; one that
+    is stopping or under maintenance did not start.
+    """
+    return respond(409, item["state"] in lifecycle.ACTIVE_STATES, server_status=item["state"])
+
+
+def running_elsewhere(table, server_id):
+    """Ids of the other servers that are up or on their way up.
+
+    Each server is read directly rather than through the status index, so a
+    start that has already claimed its server is seen. Two starts claiming
+    at the same moment can still both get the last slot; the limit is
+    best-effort.
+    """
+    return [
+        other
+        for other in SERVERS
+        if other != server_id and lifecycle.read(table, other)["state"] in lifecycle.ACTIVE_STATES
+    ]
 
 
 def lambda_handler(event, context):
-    table = dynamodb.Table(TABLE_NAME)
+    requested_at_ms = timeline.now_ms()
+    server_id = (event.get("pathParameters") or {}).get("id", lifecycle.SERVER_ID)
+
+    if SERVERS and server_id not in SERVERS:
+        return error(404, f"Unknown server {server_id}")
+
+    # The pre-warm scheduler invokes this function directly with
+    # {"prewarm": {"for_ms": ..., "autostop_timeout_init": ...}}; API Gateway
+    # requests never carry the key.
+    prewarm = event.get("prewarm")
 
     try:
+        if MAX_RUNNING_SERVERS and len(running_elsewhere(table, server_id)) >= MAX_RUNNING_SERVERS:
+            return error(429, f"At most {MAX_RUNNING_SERVERS} servers may run at once")
 
-        response = sfn.start_execution(stateMachineArn=STATE_MACHINE_ARN)
-        execution_arn = response["executionArn"]
+        claim = lifecycle.claim_start(table, LEASE_SECONDS, server_id=server_id)
+        claimed_at_ms = timeline.now_ms()
 
-        table.update_item(
-            Key={"id": "0"},
-            UpdateExpression="SET execution_arn = :execution_arn, in_progress = :new_val",
-            ConditionExpression="attribute_not_exists(in_progress) OR in_progress = :false_val",
-            ExpressionAttributeValues={":new_val": True, ":false_val": False, ":execution_arn": execution_arn},
-            ReturnValues="UPDATED_NEW",
-        )
+    except lifecycle.TransitionConflict:
+        try:
+            item = lifecycle.read(table, server_id)
+        except Exception as e:
+            log("Failed to read the claimed server", level="ERROR", server_id=server_id, error=e)
+            return error(500, e)
 
-        return {
-            "statusCode": 200,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(
-                {
-                    "success": "true",
-                    "server_status": "STARTING",
-                }
-            ),
-        }
+        if not prewarm:
+            try:
+                record_demand(table, requested_at_ms, item)
+            except Exception as e:
+                log("Failed to record demand", level="WARNING", server_id=server_id, error=e)
+
+        return conflict(item)
+
+    except Exception as e:
+        log("Failed to claim the server", level="ERROR", server_id=server_id, error=e)
+        return error(500, e)
+
+    # Handed to the server and kept on the state item, so a stop can shut
+    # the server down cleanly over RCON.
+    rcon_password = secrets.token_urlsafe(24)
+    autostop_timeout_init = (
+        int(prewarm["autostop_timeout_init"]) if prewarm else AUTOSTOP_TIMEOUT_INIT
+    )
 
-    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
-        return {
-            "statusCode": 409,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(
+    try:
+        # The execution name is derived from the claim, so a retried start for
+        # the same claim is deduplicated by Step Functions instead of launching
+        # a second task.
+        response = sfn.start_execution(
+            stateMachineArn=STATE_MACHINE_ARN,
+            name=lifecycle.execution_name(server_id, claim["version"]),
+            input=json.dumps(
                 {
-                    "success": "true",
-                    "server_status": "ONLINE",
+                    "server_id": server_id,
+                    "rcon_password": rcon_password,
+                    "autostop_timeout_init": str(autostop_timeout_init),
+                    # Only with several servers; otherwise the workflow's own.
+                    **({"task_definition": SERVERS[server_id]} if SERVERS else {}),
                 }
             ),
-        }
+        )
+        execution_arn = response["executionArn"]
+        execution_started_at_ms = timeline.now_ms()
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(
+        try:
+            lifecycle.release(table, claim["version"], server_id=server_id)
+        except lifecycle.TransitionConflict:
+            # Someone else already owns a newer claim; leave it alone.
+            pass
+
+        log("Failed to start the server workflow", level="ERROR", server_id=server_id, error=e)
+        return error(500, e)
+
+    try:
+        lifecycle.record_execution(
+            table,
+            claim["version"],
+            execution_arn,
+            attributes={"rcon_password": rcon_password},
+            server_id=server_id,
+        )
+
+    except lifecycle.TransitionConflict as e:
+        # Our lease expired and another caller reclaimed it while we were
+        # starting; the newer claim wins, so do not leave a second task behind.
+        try:
+            sfn.stop_execution(executionArn=execution_arn)
+        except Exception as e:
+            log(
+                "Failed to stop the superseded execution",
+                level="ERROR",
+                server_id=server_id,
+                execution_arn=execution_arn,
+                error=e,
+            )
+
+        try:
+            return conflict(lifecycle.read(table, server_id))
+        except Exception as e:
+            log("Failed to read the claimed server", level="ERROR", server_id=server_id, error=e)
+            return error(500, e)
+
+    try:
+        timeline.record(
+            table,
+            timeline.session_id(execution_arn),
+            {
+                "requested": requested_at_ms,
+                "claimed": claimed_at_ms,
+                "execution_started": execution_started_at_ms,
+            },
+        )
+
+        attributes = {"server_id": server_id}
+        if prewarm:
+            attributes.update(
                 {
-                    "success": "false",
-                    "error": str(e),
+                    "prewarmed": True,
+                    "prewarm_for_ms": int(prewarm["for_ms"]),
+                    "autostop_timeout_init": autostop_timeout_init,
                 }
-            ),
-        }
+            )
+        timeline.annotate(table, timeline.session_id(execution_arn), attributes)
+    except Exception as e:
+        # The server is starting either way; a missing timeline entry is not
+        # worth failing the request over.
+        log(
+            "Failed to record session timeline",
+            level="WARNING",
+            server_id=server_id,
+            error=e,
+        )
+
+    return respond(200, True, server_status=lifecycle.STARTING)
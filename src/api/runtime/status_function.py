@@ -0,0 +1,107 @@
+import json
+import os
+import time
+
+import clients
+import lifecycle
+from replies import error, respond
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "5"))
+DEFAULT_START_SECONDS = int(os.environ.get("DEFAULT_START_SECONDS", "180"))
+# Server id -> task definition ARN, when the stack runs more than one server.
+SERVERS = json.loads(os.environ.get("SERVERS", "{}"))
+
+if not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+
+# Kept across invocations of a warm container, so polling clients cost one
+# table read per TTL window rather than one per request. Keyed by server id.
+_cache = {}
+
+
+def describe(item):
+    """Status of one server, as reported by the API."""
+    recent = sorted(int(seconds) for seconds in item.get("recent_start_seconds", []))
+    status = {
+        "server_status": item["state"],
+        "version": item["version"],
+        "state_changed_at": int(item.get("state_changed_at", 0)),
+        "starting_at": int(item.get("starting_at", 0)),
+        "expected_start_seconds": recent[len(recent) // 2] if recent else DEFAULT_START_SECONDS,
+    }
+
+    if item["state"] == lifecycle.PLAYABLE and "public_ip" in item:
+        status["address"] = item["public_ip"]
+
+    return status
+
+
+def get_status(table, server_id=lifecycle.SERVER_ID):
+    now = time.monotonic()
+    cached = _cache.get(server_id)
+
+    if cached is None or now >= cached["expires_at"]:
+        cached = _cache[server_id] = {
+            "status": describe(lifecycle.read(table, server_id, consistent=False)),
+            "expires_at": now + CACHE_TTL_SECONDS,
+        }
+
+    return cached["status"]
+
+
+def list_servers(table):
+    """Status of every configured server, from a single index query."""
+    items = lifecycle.servers(table)
+
+    return {
+        server_id: describe(
+            # Never started yet.
+            items.get(server_id, {"id": server_id, "state": lifecycle.STOPPED, "version": 0})
+        )
+        for server_id in SERVERS
+    }
+
+
+def lambda_handler(event, context):
+    server_id = (event.get("pathParameters") or {}).get("id", lifecycle.SERVER_ID)
+
+    if event.get("resource") == "/v1/servers":
+        try:
+            servers = list_servers(table)
+        except Exception as e:
+            return error(500, e)
+
+        return respond(200, True, servers=servers)
+
+    if SERVERS and server_id not in SERVERS:
+        return error(404, f"Unknown server {server_id}")
+
+    try:
+        status = get_status(table, server_id)
+
+    except Exception as e:
+        return error(500, e)
+
+    # The version is bumped on every write to the state item, so it is a
+    # complete validator for what this endpoint returns.
+    etag = f'"{status["version"]}"'
+    headers = {
+        "Cache-Control": f"public, max-age={CACHE_TTL_SECONDS}",
+        "ETag": etag,
+    }
+
+    request_headers = {
+        key.lower(): value for key, value in (event.get("headers") or {}).items()
+    }
+
+    if request_headers.get("if-none-match") == etag:
+        return {
+            "statusCode": 304,
+            "headers": {"Content-Type": "application/json", **headers},
+            "body": "",
+        }
+
+    return respond(200, True, headers=headers, **status)
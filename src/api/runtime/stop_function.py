@@ -1,64 +1,59 @@
 import json
 import os
 
-import boto3
+import clients
+import lifecycle
+import timeline
+from replies import error, log, respond
 
 TABLE_NAME = os.environ.get("TABLE_NAME")
+GRACEFUL_STOP_ARN = os.environ.get("GRACEFUL_STOP_ARN")
+# Server id -> task definition ARN, when the stack runs more than one server.
+SERVERS = json.loads(os.environ.get("SERVERS", "{}"))
 
-if not TABLE_NAME:
+if not TABLE_NAME or not GRACEFUL_STOP_ARN:
     raise ValueError("Missing required environment variables")
 
-sfn = boto3.client("stepfunctions")
-dynamodb = boto3.resource("dynamodb")
+sfn = clients.LazyClient("stepfunctions")
+table = clients.Table(TABLE_NAME)
 
 
 def lambda_handler(event, context):
-    table = dynamodb.Table(TABLE_NAME)
+    server_id = (event.get("pathParameters") or {}).get("id", lifecycle.SERVER_ID)
 
-    try:
-        # Fetch the executionArn from the DynamoDB table
-        response = table.get_item(
-            Key={
-                "id": "0",
-            }
-        )
-
-        if "Item" not in response or "execution_arn" not in response["Item"]:
-            raise ValueError("Execution ARN not found in DynamoDB")
-
-        execution_arn = response["Item"]["execution_arn"]
-        sfn.stop_execution(executionArn=execution_arn)
+    if SERVERS and server_id not in SERVERS:
+        return error(404, f"Unknown server {server_id}")
 
-        # Update the in_progress status and remove executionArn in DynamoDB
-        table.update_item(
-            Key={
-                "id": "0",
-            },
-            UpdateExpression="SET in_progress = :val1 REMOVE execution_arn",
-            ExpressionAttributeValues={
-                ":val1": False,
-            },
-        )
-
-        return {
-            "statusCode": 200,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(
-                {
-                    "success": "true",
-                    "server_status": "STOPPING",
-                }
-            ),
-        }
+    try:
+        item = lifecycle.read(table, server_id)
+
+        # A stop that failed half-way leaves the server in STOPPING; let a
+        # retry pick up from there instead of refusing it.
+        if item["state"] != lifecycle.STOPPING:
+            item = lifecycle.begin_stop(table, item, server_id=server_id)
+
+        if "execution_arn" not in item:
+            raise lifecycle.TransitionConflict("Server has no execution to stop")
+
+        # The graceful stop saves the world over RCON and lets the task exit
+        # on its own; the server workflow marks it STOPPED once it has. The
+        # name is per session, so retries never shut the server down twice.
+        try:
+            sfn.start_execution(
+                stateMachineArn=GRACEFUL_STOP_ARN,
+                name=f"stop-{timeline.session_id(item['execution_arn'])}",
+                input=json.dumps(
+                    {"execution_arn": item["execution_arn"], "server_id": server_id}
+                ),
+            )
+        except sfn.exceptions.ExecutionAlreadyExists:
+            pass
+
+        return respond(200, True, server_status=lifecycle.STOPPING)
+
+    except lifecycle.TransitionConflict as e:
+        return error(409, e)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(
-                {
-                    "success": "false",
-                    "error": str(e),
-                }
-            ),
-        }
+        log("Failed to stop the server", level="ERROR", server_id=server_id, error=e)
+        return error(500, e)
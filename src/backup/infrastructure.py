@@ -0,0 +1,75 @@
+from aws_cdk import Duration, RemovalPolicy
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_s3 as s3
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.network.infrastructure import Network
+from src.storage.infrastructure import Storage
+
+MOUNT_PATH = "/mnt/data"
+
+
+class Backup(Construct):
+    """Deduplicated world snapshots and restores, run against the EFS world.
+
+    Objects are content addressed, so the bucket needs no versioning: an
+    object never changes once written and every snapshot only adds what
+    changed since the previous one.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        network: Network,
+        storage: Storage,
+        runtime_layer: lambda_.ILayerVersion,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.bucket = s3.Bucket(
+            self,
+            "BackupBucket",
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+
+        function_options = dict(
+            **handlers.function_props(memory_mib=1769),
+            code=lambda_.Code.from_asset("src/backup/runtime"),
+            layers=[runtime_layer],
+            # A full first snapshot reads the whole world; later ones only
+            # read what changed.
+            timeout=Duration.minutes(15),
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+            filesystem=lambda_.FileSystem.from_efs_access_point(storage.access_point, MOUNT_PATH),
+            environment={
+                "BUCKET": self.bucket.bucket_name,
+                "WORLD_DIR": f"{MOUNT_PATH}/world",
+            },
+        )
+
+        self.backup_lambda = lambda_.Function(
+            self,
+            "BackupLambda",
+            handler="backup_function.lambda_handler",
+            **function_options,
+        )
+
+        self.restore_lambda = lambda_.Function(
+            self,
+            "RestoreLambda",
+            handler="restore_function.lambda_handler",
+            **function_options,
+        )
+
+        self.bucket.grant_read_write(self.backup_lambda)
+        self.bucket.grant_read(self.restore_lambda)
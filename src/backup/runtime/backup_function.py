@@ -0,0 +1,65 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import clients
+import lifecycle
+import snapshots
+import timeline
+
+BUCKET = os.environ.get("BUCKET")
+TABLE_NAME = os.environ.get("TABLE_NAME")
+WORLD_DIR = os.environ.get("WORLD_DIR", "/mnt/data/world")
+
+if not BUCKET or not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+s3 = clients.LazyClient("s3")
+table = clients.Table(TABLE_NAME)
+
+
+def lambda_handler(event, context):
+    started = time.monotonic()
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+
+    if server_id != lifecycle.SERVER_ID:
+        # The function mounts the primary server's world only.
+        return {"snapshot": None, "skipped": f"Server {server_id} is not backed up"}
+
+    snapshot_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    if event.get("execution_arn"):
+        snapshot_id += f"-{timeline.session_id(event['execution_arn'])}"
+
+    try:
+        # Held for the whole snapshot, so a start cannot write to the world
+        # while it is being read.
+        held = lifecycle.begin_maintenance(table, "backup", server_id=server_id)
+    except lifecycle.TransitionConflict:
+        # Started again since the session ended; the next stop backs it up.
+        return {"snapshot": None, "skipped": lifecycle.read(table, server_id)["state"]}
+
+    try:
+        if not os.path.isdir(WORLD_DIR):
+            # Nothing to back up before the server has generated a world.
+            return {"snapshot": None}
+
+        manifest = snapshots.snapshot(
+            s3,
+            BUCKET,
+            WORLD_DIR,
+            snapshot_id,
+            previous=snapshots.latest_manifest(s3, BUCKET),
+        )
+    finally:
+        lifecycle.end_maintenance(table, held["version"], server_id=server_id)
+
+    result = {
+        "snapshot": snapshot_id,
+        **manifest["stats"],
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    print(json.dumps(result))
+
+    return result
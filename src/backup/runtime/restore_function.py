@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import time
+
+import clients
+import lifecycle
+import snapshots
+
+BUCKET = os.environ.get("BUCKET")
+TABLE_NAME = os.environ.get("TABLE_NAME")
+WORLD_DIR = os.environ.get("WORLD_DIR", "/mnt/data/world")
+
+if not BUCKET or not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+s3 = clients.LazyClient("s3")
+table = clients.Table(TABLE_NAME)
+
+
+def lambda_handler(event, context):
+    """Replace the world with a snapshot; ``{"snapshot": "<id>" | "latest"}``.
+
+    The current world is kept next to it as ``<world>.before-<epoch seconds>``.
+    """
+    snapshot_id = event.get("snapshot", "latest")
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+
+    if server_id != lifecycle.SERVER_ID:
+        # The function mounts the primary server's world only.
+        return {
+            "statusCode": 400,
+            "body": json.dumps(
+                {"success": "false", "error": f"Server {server_id} is not backed up"}
+            ),
+        }
+
+    try:
+        # Held until the new world is in place, so a start cannot boot on a
+        # half-swapped one.
+        held = lifecycle.begin_maintenance(table, "restore", server_id=server_id)
+    except lifecycle.TransitionConflict:
+        state = lifecycle.read(table, server_id)["state"]
+        return {
+            "statusCode": 409,
+            "body": json.dumps({"success": "false", "error": f"Server is {state}"}),
+        }
+
+    try:
+        return restore(snapshot_id)
+    finally:
+        lifecycle.end_maintenance(table, held["version"], server_id=server_id)
+
+
+def restore(snapshot_id):
+    manifest = snapshots.load_manifest(s3, BUCKET, snapshot_id)
+    if manifest is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({"success": "false", "error": "No snapshots yet"}),
+        }
+
+    snapshot_id = manifest["snapshot"]
+    staging = f"{WORLD_DIR}.restore-{snapshot_id}"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    files = snapshots.restore(s3, BUCKET, manifest, staging)
+
+    if os.path.isdir(WORLD_DIR):
+        os.rename(WORLD_DIR, f"{WORLD_DIR}.before-{int(time.time())}")
+    os.rename(staging, WORLD_DIR)
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"success": "true", "snapshot": snapshot_id, "files": files}),
+    }
@@ -0,0 +1,190 @@
+"""Content-addressed world snapshots in S3.
+
+Every chunk of every region file, and every other file as a whole, is stored
+once under ``objects/<sha256>``. A snapshot is a JSON manifest listing, per
+file, the hashes it is made of. A file whose size and mtime match the
+previous snapshot is not even read again. So a snapshot costs time and
+storage in proportion to what changed, not to the size of the world.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import anvil
+
+MANIFEST_PREFIX = "manifests/"
+OBJECT_PREFIX = "objects/"
+LATEST_KEY = f"{MANIFEST_PREFIX}latest"
+
+# Held by the running server and meaningless to anyone else.
+EXCLUDED_NAMES = ("session.lock",)
+
+WORKERS = 16
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def object_key(object_hash):
+    return f"{OBJECT_PREFIX}{object_hash[:2]}/{object_hash}"
+
+
+def manifest_key(snapshot_id):
+    return f"{MANIFEST_PREFIX}{snapshot_id}.json"
+
+
+def is_region(path):
+    return path.endswith(".mca")
+
+
+def manifest_hashes(manifest):
+    hashes = set()
+
+    for entry in manifest["files"].values():
+        if "chunks" in entry:
+            hashes.update(chunk_hash for _, _, chunk_hash in entry["chunks"])
+        else:
+            hashes.add(entry["hash"])
+
+    return hashes
+
+
+def latest_manifest(client, bucket):
+    """Return the newest manifest, or None before the first snapshot."""
+    try:
+        snapshot_id = client.get_object(Bucket=bucket, Key=LATEST_KEY)["Body"].read().decode()
+    except client.exceptions.NoSuchKey:
+        return None
+
+    return load_manifest(client, bucket, snapshot_id)
+
+
+def load_manifest(client, bucket, snapshot_id):
+    if snapshot_id == "latest":
+        return latest_manifest(client, bucket)
+
+    body = client.get_object(Bucket=bucket, Key=manifest_key(snapshot_id))["Body"]
+    return json.loads(body.read())
+
+
+def store_objects(client, bucket, objects, known):
+    """Upload the objects in ``{hash: bytes}`` that S3 does not have yet.
+
+    Returns the number of objects and bytes uploaded.
+    """
+
+    def store(item):
+        object_hash, data = item
+        if object_hash in known:
+            return 0
+
+        try:
+            client.head_object(Bucket=bucket, Key=object_key(object_hash))
+            return 0
+        except client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                raise
+
+        client.put_object(Bucket=bucket, Key=object_key(object_hash), Body=data)
+        return len(data)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        sizes = [size for size in executor.map(store, objects.items()) if size]
+
+    known.update(objects)
+
+    return len(sizes), sum(sizes)
+
+
+def snapshot(client, bucket, root, snapshot_id, previous=None):
+    """Back up every file under ``root`` and return the new manifest."""
+    previous_files = previous["files"] if previous else {}
+    known = manifest_hashes(previous) if previous else set()
+    files = {}
+    stats = {"files": 0, "changed_files": 0, "uploaded_objects": 0, "uploaded_bytes": 0}
+
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            if name in EXCLUDED_NAMES:
+                continue
+
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            stat = os.stat(path)
+            stats["files"] += 1
+
+            unchanged = previous_files.get(relative)
+            if unchanged and (unchanged["size"], unchanged["mtime_ns"]) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                files[relative] = unchanged
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            objects = {}
+
+            if is_region(relative):
+                entry["chunks"] = []
+                for index, timestamp, payload in anvil.read_chunks(data):
+                    chunk_hash = digest(payload)
+                    objects[chunk_hash] = payload
+                    entry["chunks"].append([index, timestamp, chunk_hash])
+            else:
+                entry["hash"] = digest(data)
+                objects[entry["hash"]] = data
+
+            uploaded_objects, uploaded_bytes = store_objects(client, bucket, objects, known)
+            stats["changed_files"] += 1
+            stats["uploaded_objects"] += uploaded_objects
+            stats["uploaded_bytes"] += uploaded_bytes
+            files[relative] = entry
+
+    manifest = {"snapshot": snapshot_id, "files": files, "stats": stats}
+
+    client.put_object(
+        Bucket=bucket,
+        Key=manifest_key(snapshot_id),
+        Body=json.dumps(manifest).encode(),
+        ContentType="application/json",
+    )
+    client.put_object(Bucket=bucket, Key=LATEST_KEY, Body=snapshot_id.encode())
+
+    return manifest
+
+
+def restore(client, bucket, manifest, target, workers=WORKERS):
+    """Write the files of ``manifest`` under ``target``, in parallel.
+
+    Region files are rebuilt from their chunks; see ``anvil.write_region``.
+    """
+
+    def fetch(object_hash):
+        return client.get_object(Bucket=bucket, Key=object_key(object_hash))["Body"].read()
+
+    def write(item):
+        relative, entry = item
+        path = os.path.join(target, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if "chunks" in entry:
+            data = anvil.write_region(
+                [(index, timestamp, fetch(chunk_hash)) for index, timestamp, chunk_hash in entry["chunks"]]
+            )
+        else:
+            data = fetch(entry["hash"])
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() so that the first failed write is raised here.
+        list(executor.map(write, manifest["files"].items()))
+
+    return len(manifest["files"])
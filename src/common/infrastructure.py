@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+from aws_cdk import aws_lambda as lambda_
+from constructs import Construct
+
+
+@dataclass(frozen=True)
+class HandlerOptions:
+    """How the Lambda handlers are deployed.
+
+    ``arm64`` runs every handler on Graviton, which is cheaper per
+    GB-second. ``memory_mib`` also buys CPU, which is what a cold start
+    spends its init on; handlers sized for their own work keep their size.
+    ``snap_start`` applies to the request path only: the API's start, stop
+    and status functions, the DNS upsert and the server workflow's cleanup.
+    It publishes a version with SnapStart and has every caller invoke it
+    through its ``live`` alias, so new execution environments resume from a
+    snapshot taken after init instead of importing the handler again.
+    """
+
+    arm64: bool = False
+    memory_mib: int = None
+    snap_start: bool = False
+
+    def __post_init__(self):
+        if self.memory_mib is not None and not 128 <= self.memory_mib <= 10240:
+            raise ValueError(
+                f"Handler memory must be between 128 and 10240 MiB, got {self.memory_mib}"
+            )
+
+    def function_props(self, *, memory_mib: int = None) -> dict:
+        """Keyword arguments for a handler's ``lambda_.Function``.
+
+        ``memory_mib`` sizes a handler for its own work, whatever the
+        handlers' ``memory_mib``.
+        """
+        props = {"runtime": lambda_.Runtime.PYTHON_3_12}
+
+        if self.arm64:
+            props["architecture"] = lambda_.Architecture.ARM_64
+        if memory_mib or self.memory_mib:
+            props["memory_size"] = memory_mib or self.memory_mib
+
+        return props
+
+    def entry_point(self, function: lambda_.Function) -> lambda_.IFunction:
+        """What callers should invoke: the function, or its ``live`` alias."""
+        if not self.snap_start:
+            return function
+
+        # CDK only accepts ``snap_start`` for Java runtimes, but Lambda
+        # supports it for Python 3.12 too.
+        function.node.default_child.add_property_override(
+            "SnapStart", {"ApplyOn": "PublishedVersions"}
+        )
+
+        return function.add_alias("live")
+
+
+class Common(Construct):
+
+    def __init__(self, scope: Construct, construct_id: str) -> None:
+        super().__init__(scope, construct_id)
+
+        # Modules shared by every runtime, importable as top-level modules
+        # (e.g. ``import lifecycle``) from any function the layer is added to.
+        self.runtime_layer = lambda_.LayerVersion(
+            self,
+            "RuntimeLayer",
+            code=lambda_.Code.from_asset("src/common/runtime"),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_12],
+            # Pure Python, so the same layer serves either architecture.
+            compatible_architectures=[
+                lambda_.Architecture.X86_64,
+                lambda_.Architecture.ARM_64,
+            ],
+            description="Shared Minecraft server runtime modules",
+        )
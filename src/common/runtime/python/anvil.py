@@ -0,0 +1,160 @@
+"""Minimal reader and writer for Anvil region files (``r.<x>.<z>.mca``).
+
+A region file starts with two 4 KiB tables of 1024 entries each. The first
+holds each chunk's offset and length in 4 KiB sectors. The second holds the
+time each chunk was last saved. A chunk's data starts at its offset. It is a
+4-byte big-endian length, then a 1-byte compression type, then the
+compressed NBT. The compressed bytes are kept as they are, so splitting a
+region and writing it back never recompresses anything.
+
+Files are read and written one chunk at a time, so memory use does not grow
+with the size of a region.
+"""
+
+import gzip
+import io
+import struct
+import zlib
+
+SECTOR_BYTES = 4096
+CHUNKS_PER_REGION = 1024
+REGION_WIDTH = 32
+HEADER_BYTES = 2 * SECTOR_BYTES
+
+GZIP = 1
+ZLIB = 2
+UNCOMPRESSED = 3
+# Set on the compression type when the chunk is stored in a separate .mcc file.
+EXTERNAL = 0x80
+
+
+class RegionError(Exception):
+    """The region file is truncated or its header points outside of it."""
+
+
+def region_coordinates(name):
+    """Return ``(x, z)`` of a region from its file name."""
+    _, x, z, _ = name.split(".")
+    return int(x), int(z)
+
+
+def chunk_coordinates(region_x, region_z, index):
+    """Return the absolute chunk ``(x, z)`` of entry ``index`` in a region."""
+    return (
+        region_x * REGION_WIDTH + index % REGION_WIDTH,
+        region_z * REGION_WIDTH + index // REGION_WIDTH,
+    )
+
+
+def iter_chunks(f):
+    """Yield ``(index, timestamp, payload)`` for every chunk in an open region.
+
+    ``payload`` is the compression type byte followed by the compressed
+    chunk, i.e. everything after the length prefix.
+    """
+    header = f.read(HEADER_BYTES)
+    if not header:
+        return
+
+    if len(header) < HEADER_BYTES:
+        raise RegionError(f"Region file is {len(header)} bytes, shorter than its header")
+
+    locations = struct.unpack_from(">1024I", header, 0)
+    timestamps = struct.unpack_from(">1024I", header, SECTOR_BYTES)
+
+    for index, location in enumerate(locations):
+        offset, sectors = location >> 8, location & 0xFF
+        if offset == 0 and sectors == 0:
+            continue
+
+        if offset * SECTOR_BYTES < HEADER_BYTES:
+            raise RegionError(f"Chunk {index} points into the region header")
+
+        f.seek(offset * SECTOR_BYTES)
+        prefix = f.read(4)
+        if len(prefix) < 4:
+            raise RegionError(f"Chunk {index} points outside the region file")
+
+        (length,) = struct.unpack(">I", prefix)
+        payload = f.read(length)
+        if length < 1 or len(payload) < length:
+            raise RegionError(f"Chunk {index} is truncated")
+
+        yield index, timestamps[index], payload
+
+
+def read_chunks(data):
+    """Return ``[(index, timestamp, payload)]`` for a region held in memory."""
+    return list(iter_chunks(io.BytesIO(data)))
+
+
+def decompress(payload):
+    """Return the NBT bytes of a chunk payload.
+
+    Raises ``RegionError`` for chunks stored externally or compressed with
+    something this module does not know.
+    """
+    compression, data = payload[0], payload[1:]
+
+    if compression == ZLIB:
+        return zlib.decompress(data)
+    if compression == GZIP:
+        return gzip.decompress(data)
+    if compression == UNCOMPRESSED:
+        return bytes(data)
+
+    raise RegionError(f"Unsupported chunk compression {compression}")
+
+
+class RegionWriter:
+    """Write a compacted region file chunk by chunk.
+
+    Chunks are laid out back to back in the order they are added, so the
+    result is not byte-identical to the file they were read from but loads
+    the same.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.locations = [0] * CHUNKS_PER_REGION
+        self.timestamps = [0] * CHUNKS_PER_REGION
+        self.sectors = HEADER_BYTES // SECTOR_BYTES
+        self.chunks = 0
+
+        f.write(b"\0" * HEADER_BYTES)
+
+    def add(self, index, timestamp, payload):
+        data = struct.pack(">I", len(payload)) + payload
+        sectors = -(-len(data) // SECTOR_BYTES)
+        if sectors > 0xFF:
+            raise RegionError(f"Chunk {index} needs {sectors} sectors, more than a region allows")
+
+        self.locations[index] = self.sectors << 8 | sectors
+        self.timestamps[index] = timestamp
+        self.f.write(data.ljust(sectors * SECTOR_BYTES, b"\0"))
+        self.sectors += sectors
+        self.chunks += 1
+
+    def close(self):
+        """Write the header; returns the number of chunks written."""
+        self.f.seek(0)
+        self.f.write(struct.pack(">1024I", *self.locations))
+        self.f.write(struct.pack(">1024I", *self.timestamps))
+        self.f.seek(0, io.SEEK_END)
+
+        return self.chunks
+
+
+def write_region(chunks):
+    """Build a region file in memory from ``[(index, timestamp, payload)]``."""
+    chunks = sorted(chunks)
+    if not chunks:
+        return b""
+
+    f = io.BytesIO()
+    writer = RegionWriter(f)
+    for chunk in chunks:
+        writer.add(*chunk)
+    writer.close()
+
+    return f.getvalue()
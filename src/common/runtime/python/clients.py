@@ -0,0 +1,105 @@
+"""Lazily built, tuned AWS clients for the Lambda handlers.
+
+Handlers declare their clients at module level as before, e.g.
+``sfn = clients.LazyClient("stepfunctions")``, but nothing is built until
+the first call that needs one, so an invocation only pays for the clients
+its path uses and importing a handler never loads a service model.
+
+DynamoDB is reached through ``Table``, a thin adapter over the low-level
+client instead of ``boto3.resource("dynamodb")``: it takes and returns plain
+Python values like the resource's tables do, without loading the resource
+models.
+"""
+
+from types import SimpleNamespace
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+
+# Handlers run for seconds, not minutes; fail over to a retry quickly rather
+# than hang on one slow connection until the Lambda times out.
+CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=5,
+    retries={"mode": "standard", "max_attempts": 3},
+    tcp_keepalive=True,
+)
+
+
+def client(service):
+    """Build a low-level client with the shared configuration."""
+    return boto3.client(service, config=CONFIG)
+
+
+class LazyClient:
+    """Stand-in for a client that builds it on first attribute access.
+
+    Attributes set on the stand-in (e.g. by tests) take precedence over the
+    client's own.
+    """
+
+    def __init__(self, service):
+        self._service = service
+        self._client = None
+
+    def __getattr__(self, name):
+        if self._client is None:
+            self._client = client(self._service)
+
+        return getattr(self._client, name)
+
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _serialize(values):
+    return {key: _serializer.serialize(value) for key, value in values.items()}
+
+
+def _deserialize(values):
+    return {key: _deserializer.deserialize(value) for key, value in values.items()}
+
+
+class Table:
+    """The parts of ``boto3``'s ``Table`` the handlers use, on the client.
+
+    Keys, items and expression values go in as plain Python values and come
+    back deserialized (numbers as ``Decimal``), as with ``Table``.
+    """
+
+    def __init__(self, name, dynamodb=None):
+        self.name = name
+        self.dynamodb = dynamodb or LazyClient("dynamodb")
+        # For ``table.meta.client.exceptions``, as on ``Table``.
+        self.meta = SimpleNamespace(client=self.dynamodb)
+
+    def _call(self, operation, kwargs):
+        kwargs = dict(kwargs, TableName=self.name)
+
+        for name in ("Key", "Item", "ExpressionAttributeValues", "ExclusiveStartKey"):
+            if name in kwargs:
+                kwargs[name] = _serialize(kwargs[name])
+
+        response = getattr(self.dynamodb, operation)(**kwargs)
+
+        for name in ("Item", "Attributes", "LastEvaluatedKey"):
+            if name in response:
+                response[name] = _deserialize(response[name])
+        if "Items" in response:
+            response["Items"] = [_deserialize(item) for item in response["Items"]]
+
+        return response
+
+    def get_item(self, **kwargs):
+        return self._call("get_item", kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call("put_item", kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call("update_item", kwargs)
+
+    def query(self, **kwargs):
+        return self._call("query", kwargs)
@@ -0,0 +1,424 @@
+"""Server lifecycle state kept on the state table item.
+
+Every handler that changes what the server is doing goes through this module,
+so the item always carries a single ``state``, a ``version`` that is bumped on
+every write, and a ``<state>_at`` timestamp for each transition. Writes are
+conditional on the state (and usually the version) the caller last saw, so two
+handlers can never both act on the same server.
+"""
+
+import re
+import time
+
+# The primary server; further servers are named by their own ids.
+SERVER_ID = "0"
+
+# Global secondary index over server items: ``kind`` / ``id``.
+STATUS_INDEX = "server-status"
+
+STOPPED = "STOPPED"
+STARTING = "STARTING"
+RUNNING = "RUNNING"
+DNS_READY = "DNS_READY"
+PLAYABLE = "PLAYABLE"
+STOPPING = "STOPPING"
+# Stopped, but held by an offline job (e.g. world trimming) that needs the
+# world to itself; starts are refused until the job ends.
+MAINTENANCE = "MAINTENANCE"
+
+ACTIVE_STATES = (STARTING, RUNNING, DNS_READY, PLAYABLE)
+
+TRANSITIONS = {
+    STOPPED: (STARTING, MAINTENANCE),
+    STARTING: (RUNNING, STOPPING, STOPPED),
+    # Back to STARTING when the session moves to a new task (Spot interruption).
+    RUNNING: (DNS_READY, STOPPING, STOPPED, STARTING),
+    DNS_READY: (PLAYABLE, STOPPING, STOPPED, STARTING),
+    PLAYABLE: (STOPPING, STOPPED, STARTING),
+    STOPPING: (STOPPED,),
+    MAINTENANCE: (STOPPED,),
+}
+
+# Items written before the lifecycle existed only carry ``in_progress``; read
+# those as STOPPED or STARTING so they can still be started and stopped.
+_LEGACY_CONDITIONS = {
+    STOPPED: (
+        "#state = :stopped OR attribute_not_exists(#state) "
+        "AND (attribute_not_exists(in_progress) OR in_progress = :false)"
+    ),
+    STARTING: "#state = :starting OR attribute_not_exists(#state) AND in_progress = :true",
+}
+
+
+class TransitionConflict(Exception):
+    """The state item did not match what the caller expected."""
+
+
+def read(table, server_id=SERVER_ID, *, consistent=True):
+    """Return the state item, defaulting to a stopped server at version 0."""
+    item = table.get_item(Key={"id": server_id}, ConsistentRead=consistent).get("Item", {})
+
+    return {
+        "id": server_id,
+        **item,
+        "state": item.get("state", STARTING if item.get("in_progress") else STOPPED),
+        "version": int(item.get("version", 0)),
+    }
+
+
+def servers(table):
+    """Return every server item that has ever changed state, by id."""
+    items = {}
+    kwargs = {
+        "IndexName": STATUS_INDEX,
+        "KeyConditionExpression": "#kind = :server",
+        "ExpressionAttributeNames": {"#kind": "kind"},
+        "ExpressionAttributeValues": {":server": "server"},
+    }
+
+    while True:
+        response = table.query(**kwargs)
+        for item in response["Items"]:
+            items[item["id"]] = {**item, "version": int(item["version"])}
+
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def execution_name(server_id, version):
+    """Name of the server execution for a claim; unique across servers.
+
+    Sessions are named after their execution, so this keeps session items
+    apart too.
+    """
+    if server_id == SERVER_ID:
+        return f"server-{version}"
+
+    return f"{server_id}-{version}"
+
+
+def task_server_id(detail):
+    """The server an ECS task runs, from the ``SERVER_ID`` it was started with.
+
+    Tasks started by anything but the server workflow run the primary server.
+    """
+    for container in detail.get("overrides", {}).get("containerOverrides", []):
+        for variable in container.get("environment", []):
+            if variable["name"] == "SERVER_ID":
+                return variable["value"]
+
+    return SERVER_ID
+
+
+def transition(
+    table,
+    to_state,
+    *,
+    from_states=None,
+    expected_version=None,
+    execution_arn=None,
+    condition=None,
+    attributes=None,
+    remove=(),
+    now=None,
+    server_id=SERVER_ID,
+):
+    """Move the server to ``to_state`` and return the updated item.
+
+    ``from_states`` defaults to every state allowed to reach ``to_state``.
+    ``expected_version`` and ``execution_arn`` further pin the write to the
+    item the caller read or the execution it belongs to; ``condition`` is
+    OR-ed in as an alternative way to satisfy the state check.
+    """
+    return _update(
+        table,
+        server_id,
+        transition_request(
+            to_state,
+            from_states=from_states,
+            expected_version=expected_version,
+            execution_arn=execution_arn,
+            condition=condition,
+            attributes=attributes,
+            remove=remove,
+            now=now,
+        ),
+    )
+
+
+def transition_request(
+    to_state,
+    *,
+    from_states=None,
+    expected_version=None,
+    execution_arn=None,
+    condition=None,
+    attributes=None,
+    remove=(),
+    now=None,
+):
+    """The ``update_item`` arguments for ``transition``, without the key.
+
+    The express workflows send these too, so the API writes the same item
+    whether or not a Lambda handles the request.
+    """
+    now = int(time.time()) if now is None else now
+
+    if from_states is None:
+        from_states = [state for state, targets in TRANSITIONS.items() if to_state in targets]
+
+    names = {"#state": "state", "#version": "version", "#kind": "kind"}
+    values = {
+        ":to_state": to_state,
+        ":server": "server",
+        ":now": now,
+        ":zero": 0,
+        ":one": 1,
+        ":stopped": STOPPED,
+        ":starting": STARTING,
+        ":true": True,
+        ":false": False,
+    }
+
+    state_conditions = []
+    for index, state in enumerate(from_states):
+        if state in _LEGACY_CONDITIONS:
+            state_conditions.append(_LEGACY_CONDITIONS[state])
+        else:
+            values[f":from_{index}"] = state
+            state_conditions.append(f"#state = :from_{index}")
+
+    if condition:
+        state_conditions.append(condition)
+
+    conditions = [" OR ".join(state_conditions)]
+
+    if expected_version is not None:
+        values[":expected_version"] = expected_version
+        conditions.append("#version = :expected_version")
+
+    if execution_arn is not None:
+        values[":execution_arn"] = execution_arn
+        conditions.append("execution_arn = :execution_arn")
+
+    assignments = [
+        "#state = :to_state",
+        "#version = if_not_exists(#version, :zero) + :one",
+        "state_changed_at = :now",
+        f"{to_state.lower()}_at = :now",
+        # Puts the item in the status index.
+        "#kind = :server",
+    ]
+    for index, (name, value) in enumerate((attributes or {}).items()):
+        names[f"#attribute_{index}"] = name
+        values[f":attribute_{index}"] = value
+        assignments.append(f"#attribute_{index} = :attribute_{index}")
+
+    removals = ["in_progress", *remove]
+
+    # DynamoDB rejects redundant parentheses, so only group the state check
+    # when it is an OR that is AND-ed with something else.
+    if len(conditions) > 1 and " OR " in conditions[0]:
+        conditions[0] = f"({conditions[0]})"
+
+    return _request(
+        update=f"SET {', '.join(assignments)} REMOVE {', '.join(removals)}",
+        condition=" AND ".join(conditions),
+        names=names,
+        values=values,
+    )
+
+
+def update(table, version, attributes, *, remove=(), server_id=SERVER_ID):
+    """Set attributes on the item without changing state, pinned to ``version``."""
+    return _update(table, server_id, update_request(version, attributes, remove=remove))
+
+
+def update_request(version, attributes, *, remove=()):
+    """The ``update_item`` arguments for ``update``, without the key."""
+    names = {"#version": "version"}
+    values = {":expected_version": version, ":one": 1}
+    assignments = ["#version = #version + :one"]
+
+    for index, (name, value) in enumerate(attributes.items()):
+        names[f"#attribute_{index}"] = name
+        values[f":attribute_{index}"] = value
+        assignments.append(f"#attribute_{index} = :attribute_{index}")
+
+    expression = f"SET {', '.join(assignments)}"
+    if remove:
+        expression += f" REMOVE {', '.join(remove)}"
+
+    return _request(
+        update=expression,
+        condition="#version = :expected_version",
+        names=names,
+        values=values,
+    )
+
+
+def claim_start(table, lease_seconds, *, now=None, server_id=SERVER_ID):
+    """Claim a stopped server for starting; returns the claimed item.
+
+    A STARTING claim that never recorded an execution is up for grabs again
+    once its lease has run out, so a crashed claimant cannot wedge the server.
+    """
+    now = int(time.time()) if now is None else now
+
+    return _update(table, server_id, claim_start_request(now + lease_seconds, now=now))
+
+
+def claim_start_request(lease_expires_at, *, now):
+    """The ``update_item`` arguments for ``claim_start``, without the key."""
+    return transition_request(
+        STARTING,
+        from_states=(STOPPED,),
+        condition=(
+            "#state = :starting AND attribute_not_exists(execution_arn) "
+            "AND lease_expires_at < :now"
+        ),
+        attributes={"lease_expires_at": lease_expires_at},
+        remove=("execution_arn",),
+        now=now,
+    )
+
+
+def record_execution(table, version, execution_arn, *, attributes=None, server_id=SERVER_ID):
+    """Attach the started execution to a claim and drop its lease."""
+    return _update(
+        table, server_id, record_execution_request(version, execution_arn, attributes=attributes)
+    )
+
+
+def record_execution_request(version, execution_arn, *, attributes=None):
+    """The ``update_item`` arguments for ``record_execution``, without the key."""
+    return update_request(
+        version,
+        {"execution_arn": execution_arn, **(attributes or {})},
+        remove=("lease_expires_at",),
+    )
+
+
+def release(table, version, *, server_id=SERVER_ID):
+    """Return a claim that never led to an execution to STOPPED."""
+    return _update(table, server_id, release_request(version))
+
+
+def release_request(version, *, now=None):
+    """The ``update_item`` arguments for ``release``, without the key."""
+    return transition_request(
+        STOPPED,
+        from_states=(STARTING,),
+        expected_version=version,
+        remove=("lease_expires_at",),
+        now=now,
+    )
+
+
+def begin_stop(table, item, *, server_id=SERVER_ID):
+    """Move an active server with a recorded execution to STOPPING."""
+    if "execution_arn" not in item:
+        raise TransitionConflict("Server has no execution to stop")
+
+    return _update(table, server_id, begin_stop_request(item["version"]))
+
+
+def begin_stop_request(version, *, now=None):
+    """The ``update_item`` arguments for ``begin_stop``, without the key."""
+    return transition_request(
+        STOPPING,
+        from_states=ACTIVE_STATES,
+        expected_version=version,
+        now=now,
+    )
+
+
+def restart(table, execution_arn, *, server_id=SERVER_ID):
+    """Move a running session back to STARTING while it gets a new task.
+
+    The old task's address is dropped, so nothing talks to it any more.
+    """
+    return transition(
+        table,
+        STARTING,
+        from_states=(RUNNING, DNS_READY, PLAYABLE),
+        execution_arn=execution_arn,
+        remove=("public_ip", "private_ip", "interrupted_task_arn"),
+        server_id=server_id,
+    )
+
+
+def mark_stopped(table, *, version=None, execution_arn=None, server_id=SERVER_ID):
+    """Move the server to STOPPED, pinned to a version or to its execution."""
+    if version is None and execution_arn is None:
+        raise ValueError("mark_stopped needs a version or an execution ARN")
+
+    return transition(
+        table,
+        STOPPED,
+        from_states=(*ACTIVE_STATES, STOPPING),
+        expected_version=version,
+        execution_arn=execution_arn,
+        # RCON access is per session and useless once it is over.
+        remove=(
+            "execution_arn",
+            "lease_expires_at",
+            "rcon_password",
+            "private_ip",
+            "interrupted_task_arn",
+        ),
+        server_id=server_id,
+    )
+
+
+def begin_maintenance(table, task, *, server_id=SERVER_ID):
+    """Hold a stopped server for the offline job ``task``."""
+    return transition(
+        table,
+        MAINTENANCE,
+        from_states=(STOPPED,),
+        attributes={"maintenance": task},
+        server_id=server_id,
+    )
+
+
+def end_maintenance(table, version, *, server_id=SERVER_ID):
+    """Hand a server held for maintenance back as STOPPED."""
+    return transition(
+        table,
+        STOPPED,
+        from_states=(MAINTENANCE,),
+        expected_version=version,
+        remove=("maintenance",),
+        server_id=server_id,
+    )
+
+
+def _request(*, update, condition, names, values):
+    # Only pass the placeholders the expressions actually use; DynamoDB
+    # rejects unused ones.
+    placeholders = set(re.findall(r"[#:]\w+", f"{update} {condition}"))
+
+    return {
+        "UpdateExpression": update,
+        "ConditionExpression": condition,
+        "ExpressionAttributeNames": {
+            key: value for key, value in names.items() if key in placeholders
+        },
+        "ExpressionAttributeValues": {
+            key: value for key, value in values.items() if key in placeholders
+        },
+    }
+
+
+def _update(table, server_id, request):
+    try:
+        response = table.update_item(Key={"id": server_id}, ReturnValues="ALL_NEW", **request)
+    except table.meta.client.exceptions.ConditionalCheckFailedException as e:
+        raise TransitionConflict(str(e)) from e
+
+    item = response["Attributes"]
+    item["version"] = int(item["version"])
+
+    return item
@@ -0,0 +1,123 @@
+"""Read single values out of uncompressed NBT without parsing all of it.
+
+Chunk NBT is mostly block and entity data that maintenance jobs never look
+at, so ``find`` walks the root compound and skips over every tag that is not
+on the requested path.
+"""
+
+import struct
+
+END = 0
+BYTE = 1
+SHORT = 2
+INT = 3
+LONG = 4
+FLOAT = 5
+DOUBLE = 6
+BYTE_ARRAY = 7
+STRING = 8
+LIST = 9
+COMPOUND = 10
+INT_ARRAY = 11
+LONG_ARRAY = 12
+
+_SCALARS = {
+    BYTE: struct.Struct(">b"),
+    SHORT: struct.Struct(">h"),
+    INT: struct.Struct(">i"),
+    LONG: struct.Struct(">q"),
+    FLOAT: struct.Struct(">f"),
+    DOUBLE: struct.Struct(">d"),
+}
+_ARRAY_ITEM_BYTES = {BYTE_ARRAY: 1, INT_ARRAY: 4, LONG_ARRAY: 8}
+
+
+class NbtError(Exception):
+    """The data is not a well-formed NBT compound."""
+
+
+def _read_string(data, pos):
+    (length,) = struct.unpack_from(">H", data, pos)
+    pos += 2
+    return bytes(data[pos:pos + length]).decode("utf-8", "replace"), pos + length
+
+
+def _skip(data, pos, tag):
+    if tag in _SCALARS:
+        return pos + _SCALARS[tag].size
+
+    if tag in _ARRAY_ITEM_BYTES:
+        (length,) = struct.unpack_from(">i", data, pos)
+        return pos + 4 + length * _ARRAY_ITEM_BYTES[tag]
+
+    if tag == STRING:
+        (length,) = struct.unpack_from(">H", data, pos)
+        return pos + 2 + length
+
+    if tag == LIST:
+        item_tag = data[pos]
+        (length,) = struct.unpack_from(">i", data, pos + 1)
+        pos += 5
+        if item_tag in _SCALARS:
+            return pos + length * _SCALARS[item_tag].size
+        for _ in range(length):
+            pos = _skip(data, pos, item_tag)
+        return pos
+
+    if tag == COMPOUND:
+        while True:
+            child = data[pos]
+            pos += 1
+            if child == END:
+                return pos
+            _, pos = _read_string(data, pos)
+            pos = _skip(data, pos, child)
+
+    raise NbtError(f"Unknown tag type {tag}")
+
+
+def _read(data, pos, tag):
+    if tag in _SCALARS:
+        return _SCALARS[tag].unpack_from(data, pos)[0]
+    if tag == STRING:
+        return _read_string(data, pos)[0]
+
+    raise NbtError(f"Only scalar and string tags can be read, not type {tag}")
+
+
+def find(data, *path, default=None):
+    """Return the scalar or string at ``path`` below the root compound.
+
+    ``find(chunk, "Level", "InhabitedTime")`` reads ``root.Level.InhabitedTime``;
+    ``default`` is returned when any part of the path is missing.
+    """
+    data = memoryview(data)
+
+    try:
+        if data[0] != COMPOUND:
+            raise NbtError("NBT root is not a compound")
+
+        _, pos = _read_string(data, 1)
+
+        for depth, name in enumerate(path):
+            while True:
+                tag = data[pos]
+                pos += 1
+                if tag == END:
+                    return default
+
+                key, pos = _read_string(data, pos)
+                if key != name:
+                    pos = _skip(data, pos, tag)
+                    continue
+
+                if depth == len(path) - 1:
+                    return _read(data, pos, tag)
+                if tag != COMPOUND:
+                    return default
+                break
+
+    except (IndexError, struct.error) as e:
+        raise NbtError(f"Truncated NBT: {e}") from e
+
+    return default
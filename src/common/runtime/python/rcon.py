@@ -0,0 +1,97 @@
+"""Minimal Source RCON client, as spoken by the Minecraft server.
+
+Each packet is a little-endian length, request id and type, followed by a
+NUL-terminated ASCII body and one more NUL. The client authenticates once
+and then sends commands. Minecraft answers each command with a single
+response packet.
+"""
+
+import socket
+import struct
+
+AUTH = 3
+AUTH_RESPONSE = 2
+EXEC_COMMAND = 2
+RESPONSE_VALUE = 0
+
+DEFAULT_PORT = 25575
+
+# Minecraft rejects command packets with larger bodies.
+MAX_COMMAND_BYTES = 1446
+
+
+class RconError(Exception):
+    """The server refused the password or sent something unexpected."""
+
+
+def encode(request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\0\0"
+    return struct.pack("<i", len(payload)) + payload
+
+
+def _read_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        part = sock.recv(size - len(data))
+        if not part:
+            raise RconError("Connection closed by the server")
+        data += part
+    return data
+
+
+def read(sock):
+    """Return ``(request_id, type, body)`` of the next packet."""
+    (length,) = struct.unpack("<i", _read_exact(sock, 4))
+    if not 10 <= length <= 4110:
+        raise RconError(f"Invalid packet length {length}")
+
+    payload = _read_exact(sock, length)
+    request_id, packet_type = struct.unpack_from("<ii", payload)
+
+    return request_id, packet_type, payload[8:-2].decode("utf-8", "replace")
+
+
+class Client:
+    """``with Client(host, password) as rcon: rcon.command("list")``."""
+
+    def __init__(self, host, password, *, port=DEFAULT_PORT, timeout=5):
+        self.address = (host, port)
+        self.password = password
+        self.timeout = timeout
+        self.sock = None
+        self.request_id = 0
+
+    def __enter__(self):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+
+        try:
+            request_id = self._send(AUTH, self.password)
+            response_id, packet_type, _ = read(self.sock)
+            if packet_type != AUTH_RESPONSE or response_id != request_id:
+                raise RconError("RCON authentication failed")
+        except BaseException:
+            self.sock.close()
+            raise
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sock.close()
+
+    def _send(self, packet_type, body):
+        self.request_id += 1
+        self.sock.sendall(encode(self.request_id, packet_type, body))
+        return self.request_id
+
+    def command(self, command):
+        """Run a console command and return its output."""
+        if len(command.encode("utf-8")) > MAX_COMMAND_BYTES:
+            raise RconError("Command is too long")
+
+        request_id = self._send(EXEC_COMMAND, command)
+        response_id, packet_type, body = read(self.sock)
+
+        if packet_type != RESPONSE_VALUE or response_id != request_id:
+            raise RconError(f"Unexpected response to {command!r}")
+
+        return body
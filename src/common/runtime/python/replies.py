@@ -0,0 +1,28 @@
+"""API Gateway responses and structured logs for the Lambda handlers.
+
+Responses share the API's body shape, ``{"success": "true" | "false", ...}``.
+Log records are single-line JSON, so CloudWatch Logs Insights can filter on
+their fields (e.g. ``fields server_id | filter level = "ERROR"``).
+"""
+
+import json
+import time
+
+
+def respond(status_code, success, *, headers=None, **body):
+    """API Gateway proxy response with ``body`` merged into the usual shape."""
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps({"success": "true" if success else "false", **body}),
+    }
+
+
+def error(status_code, message):
+    return respond(status_code, False, error=str(message))
+
+
+def log(message, *, level="INFO", **fields):
+    """Write one JSON log record; values JSON has no type for are logged as text."""
+    record = {"level": level, "message": message, "timestamp_ms": int(time.time() * 1000)}
+    print(json.dumps({**record, **fields}, default=str))
@@ -0,0 +1,145 @@
+"""Minimal Minecraft Server List Ping client.
+
+Implements the status half of the Java Edition protocol: a handshake with
+next state 1, a status request answered with the server's status JSON, and a
+ping/pong round trip used to measure latency.
+"""
+
+import json
+import socket
+import struct
+import time
+
+# Status pings conventionally send -1: the server answers whatever its version.
+PROTOCOL_VERSION = -1
+STATUS_STATE = 1
+
+
+class ProtocolError(Exception):
+    """The server answered with something that is not a status response."""
+
+
+def encode_varint(value):
+    value &= 0xFFFFFFFF
+    encoded = bytearray()
+
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+
+def read_varint(data):
+    """Decode the VarInt ``data`` starts with; returns it and its size."""
+    value = 0
+
+    for position, byte in enumerate(data[:5]):
+        value |= (byte & 0x7F) << (7 * position)
+        if not byte & 0x80:
+            return _signed(value), position + 1
+
+    raise ProtocolError("Malformed VarInt")
+
+
+def read_stream_varint(stream):
+    value = 0
+
+    for position in range(5):
+        byte = read_exact(stream, 1)[0]
+        value |= (byte & 0x7F) << (7 * position)
+        if not byte & 0x80:
+            return _signed(value)
+
+    raise ProtocolError("VarInt is too long")
+
+
+def _signed(value):
+    return value - (1 << 32) if value & (1 << 31) else value
+
+
+def read_exact(stream, size):
+    data = stream.read(size)
+
+    if len(data) != size:
+        raise ProtocolError("Connection closed mid-packet")
+
+    return data
+
+
+def encode_string(value):
+    data = value.encode("utf-8")
+    return encode_varint(len(data)) + data
+
+
+def packet(packet_id, payload=b""):
+    body = encode_varint(packet_id) + payload
+    return encode_varint(len(body)) + body
+
+
+def read_packet(stream):
+    length = read_stream_varint(stream)
+    body = read_exact(stream, length)
+    packet_id, offset = read_varint(body)
+
+    return packet_id, body[offset:]
+
+
+def ping(host, port=25565, timeout=3.0):
+    """Return the server's status with the measured round-trip latency.
+
+    Raises ``OSError`` when the server cannot be reached and
+    ``ProtocolError`` when it is not (yet) answering status requests.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.settimeout(timeout)
+        stream = connection.makefile("rb")
+
+        connection.sendall(
+            packet(
+                0x00,
+                encode_varint(PROTOCOL_VERSION)
+                + encode_string(host)
+                + struct.pack(">H", port)
+                + encode_varint(STATUS_STATE),
+            )
+        )
+        connection.sendall(packet(0x00))
+
+        packet_id, payload = read_packet(stream)
+        if packet_id != 0x00:
+            raise ProtocolError(f"Unexpected status packet {packet_id:#x}")
+
+        length, offset = read_varint(payload)
+        try:
+            status = json.loads(payload[offset : offset + length].decode("utf-8"))
+        except ValueError as e:
+            # Truncated or garbled, e.g. while the server is still starting.
+            raise ProtocolError(f"Malformed status: {e}") from e
+        if not isinstance(status, dict):
+            raise ProtocolError("Malformed status")
+
+        token = int(time.time() * 1000)
+        sent = time.monotonic()
+        connection.sendall(packet(0x01, struct.pack(">q", token)))
+
+        packet_id, payload = read_packet(stream)
+        latency_ms = int((time.monotonic() - sent) * 1000)
+        if packet_id != 0x01 or len(payload) != 8 or struct.unpack(">q", payload)[0] != token:
+            raise ProtocolError("Unexpected pong")
+
+    description = status.get("description", "")
+    if isinstance(description, dict):
+        description = description.get("text", "")
+
+    return {
+        "version": status.get("version", {}).get("name"),
+        "protocol": status.get("version", {}).get("protocol"),
+        "players_online": status.get("players", {}).get("online", 0),
+        "players_max": status.get("players", {}).get("max", 0),
+        "motd": description,
+        "latency_ms": latency_ms,
+    }
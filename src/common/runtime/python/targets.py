@@ -0,0 +1,39 @@
+"""Keep the server task as the only target of the static address.
+
+In static-address mode players connect through a network load balancer
+whose target group holds just the task that is currently running the
+server. Registering a task drops any target left over from an earlier one
+(e.g. after a Spot restart), and ending a session drops them all.
+"""
+
+SERVER_PORT = 25565
+
+
+def registered(elbv2, target_group_arn):
+    response = elbv2.describe_target_health(TargetGroupArn=target_group_arn)
+    return [description["Target"] for description in response["TargetHealthDescriptions"]]
+
+
+def register(elbv2, target_group_arn, address, port=SERVER_PORT):
+    """Make ``address`` the only target; returns False if it already was."""
+    current = registered(elbv2, target_group_arn)
+    stale = [target for target in current if target["Id"] != address]
+
+    if stale:
+        elbv2.deregister_targets(TargetGroupArn=target_group_arn, Targets=stale)
+
+    if any(target["Id"] == address for target in current):
+        return False
+
+    elbv2.register_targets(TargetGroupArn=target_group_arn, Targets=[{"Id": address, "Port": port}])
+    return True
+
+
+def deregister_all(elbv2, target_group_arn):
+    """Remove every target; returns the addresses that were removed."""
+    current = registered(elbv2, target_group_arn)
+
+    if current:
+        elbv2.deregister_targets(TargetGroupArn=target_group_arn, Targets=current)
+
+    return [target["Id"] for target in current]
@@ -0,0 +1,184 @@
+"""Per-session start-up timeline kept next to the server state item.
+
+Each start gets a session item (``session#<execution name>``) holding a
+millisecond timestamp per phase as ``<phase>_at_ms``. Every writer records
+the phases it observes and the time spent reaching each one is emitted as a
+CloudWatch Embedded Metric Format record, so phase durations show up as
+metrics without any extra API calls.
+
+Session items stay behind after the server stops and double as start/stop
+history, indexed by request time in ``HISTORY_INDEX``.
+"""
+
+import json
+import time
+from datetime import datetime
+
+NAMESPACE = "MinecraftOnDemand"
+
+# ``lifecycle.SERVER_ID``; sessions recorded without a server id are its.
+PRIMARY_SERVER_ID = "0"
+
+# Global secondary index over session items: ``kind`` / ``requested_at_ms``.
+HISTORY_INDEX = "session-history"
+
+# In the order they happen during a cold start.
+PHASES = (
+    "requested",
+    "claimed",
+    "execution_started",
+    "task_created",
+    "image_pull_started",
+    "image_pull_stopped",
+    "task_running",
+    "dns_ready",
+    "playable",
+)
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def iso_to_ms(value):
+    """Convert an ECS event timestamp (``2024-06-01T12:00:00.123Z``) to ms."""
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+def session_id(execution_arn):
+    """Sessions are named after the execution that runs the server."""
+    return execution_arn.rsplit(":", 1)[-1]
+
+
+def session_key(session):
+    return f"session#{session}"
+
+
+def record(table, session, phases):
+    """Record phase timestamps (first write wins) and emit their durations."""
+    item = table.update_item(
+        Key={"id": session_key(session)},
+        ReturnValues="ALL_NEW",
+        **record_request(session, phases),
+    )["Attributes"]
+
+    emit_metrics(session, item, phases)
+
+    return item
+
+
+def record_request(session, phases):
+    """The ``update_item`` arguments for ``record``, without the key."""
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        raise ValueError(f"Unknown phases: {sorted(unknown)}")
+
+    return annotate_request(session, {f"{phase}_at_ms": at_ms for phase, at_ms in phases.items()})
+
+
+def annotate(table, session, attributes):
+    """Set attributes on a session item; like phases, the first write wins."""
+    return table.update_item(
+        Key={"id": session_key(session)},
+        ReturnValues="ALL_NEW",
+        **annotate_request(session, attributes),
+    )["Attributes"]
+
+
+def annotate_request(session, attributes):
+    """The ``update_item`` arguments for ``annotate``, without the key."""
+    names = {"#kind": "kind"}
+    values = {":kind": "session", ":session_id": session}
+    assignments = ["#kind = :kind", "session_id = :session_id"]
+
+    for index, (name, value) in enumerate(attributes.items()):
+        names[f"#attribute_{index}"] = name
+        values[f":attribute_{index}"] = value
+        # Retried or duplicated events must not move a phase later.
+        assignments.append(
+            f"#attribute_{index} = if_not_exists(#attribute_{index}, :attribute_{index})"
+        )
+
+    return {
+        "UpdateExpression": f"SET {', '.join(assignments)}",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
+
+
+def history(table, since_ms, server_id=None):
+    """Yield session items requested at or after ``since_ms``, oldest first.
+
+    With ``server_id`` only that server's sessions are yielded; sessions
+    recorded without one are the primary server's.
+    """
+    kwargs = {
+        "IndexName": HISTORY_INDEX,
+        "KeyConditionExpression": "#kind = :kind AND requested_at_ms >= :since",
+        "ExpressionAttributeNames": {"#kind": "kind"},
+        "ExpressionAttributeValues": {":kind": "session", ":since": since_ms},
+    }
+
+    while True:
+        response = table.query(**kwargs)
+        for item in response["Items"]:
+            if server_id is None or item.get("server_id", PRIMARY_SERVER_ID) == server_id:
+                yield item
+
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def timestamps(item):
+    """Return ``{phase: ms}`` for the phases recorded on a session item."""
+    return {
+        phase: int(item[f"{phase}_at_ms"]) for phase in PHASES if f"{phase}_at_ms" in item
+    }
+
+
+def durations(item):
+    """Return ``{phase: seconds}`` spent reaching each phase from the previous one."""
+    recorded = timestamps(item)
+    result = {}
+    previous = None
+
+    for phase, at_ms in recorded.items():
+        if previous is not None:
+            result[phase] = (at_ms - previous) / 1000
+        previous = at_ms
+
+    return result
+
+
+def emit_metrics(session, item, phases):
+    recorded = timestamps(item)
+    first = next(iter(recorded.values()), None)
+
+    for phase, seconds in durations(item).items():
+        if phase not in phases:
+            continue
+
+        print(
+            json.dumps(
+                {
+                    "_aws": {
+                        "Timestamp": recorded[phase],
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": NAMESPACE,
+                                "Dimensions": [["Phase"]],
+                                "Metrics": [
+                                    {"Name": "PhaseSeconds", "Unit": "Seconds"},
+                                    {"Name": "ElapsedSeconds", "Unit": "Seconds"},
+                                ],
+                            }
+                        ],
+                    },
+                    "Phase": phase,
+                    "SessionId": session,
+                    "PhaseSeconds": seconds,
+                    "ElapsedSeconds": (recorded[phase] - first) / 1000,
+                }
+            )
+        )
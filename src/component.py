@@ -1,4 +1,6 @@
-from aws_cdk import Stack
+from dataclasses import dataclass
+
+from aws_cdk import Duration, RemovalPolicy, Stack
 from aws_cdk import aws_dynamodb as dynamodb
 from aws_cdk import aws_ecs as ecs
 from aws_cdk import aws_events as events
@@ -11,73 +13,287 @@ from aws_cdk import aws_sns as sns
 from constructs import Construct
 
 from constants import (
+    AUTOSTOP_TIMEOUT_INIT_SECONDS,
     CLUSTER_NAME,
     DOMAIN_NAME,
     ECS_VOLUME_NAME,
+    EPHEMERAL_STORAGE_GIB,
+    FABRIC_LOADER_VERSION,
     JAVA_EDITION_DOCKER_IMAGE,
     MC_SERVER_CONTAINER_NAME,
+    MINECRAFT_VERSION,
     MODPACK,
+    SERVER_TYPE,
     WORLD,
 )
 from src.api.infrastructure import API
+from src.backup.infrastructure import Backup
+from src.common.infrastructure import Common, HandlerOptions
+from src.common.runtime.python import lifecycle
 from src.database.infrastructure import Database
+from src.image.infrastructure import ServerImage
+from src.maintenance.infrastructure import Maintenance
+from src.monitoring.infrastructure import Monitoring
 from src.network.infrastructure import Network
-from src.storage.infrastructure import Storage
+from src.prewarm.infrastructure import Prewarm
+from src.profiler.infrastructure import Profiler
+from src.profiles import PROFILES, ServerProfile
+from src.registry.infrastructure import Registry
+from src.rightsizing.infrastructure import RightSizing
+from src.servers.infrastructure import ServerTask
+from src.storage.infrastructure import Storage, WorldSync
+from src.wake.infrastructure import Wake
+from src.workflow.graceful_stop import GracefulStop
 from src.workflow.infrastructure import Workflow
 
 
-class MinecraftOnDemandInfraCommonCdkStack(Stack):
+@dataclass(frozen=True)
+class ServerOptions:
+    """Optional features of a deployment, shared by all of its layers.
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
-        super().__init__(scope, construct_id, **kwargs)
+    Invalid combinations raise ``ValueError`` when the options are created,
+    i.e. at synth time.
+    """
 
-        network = Network(
-            self,
-            "Network",
-        )
+    direct_api_integrations: bool = False
+    direct_dns_events: bool = False
+    wake_on_connect: bool = False
+    bake_image: bool = False
+    pull_through_cache: bool = False
+    profile: str = "standard"
+    world_storage: str = "efs"
+    pregen_schedule: events.Schedule = None
+    spot: bool = False
+    restart_on_interruption: bool = False
+    static_address: bool = False
+    server_metrics: bool = False
+    profiler: bool = False
+    prewarm_lead_minutes: int = None
+    right_sizing: str = None
+    servers: tuple = ()
+    # Best-effort: checked before a start claims its server, so two servers
+    # starting at the same moment can both get the last slot.
+    max_running_servers: int = None
+    handlers: HandlerOptions = HandlerOptions()
 
-        storage = Storage(
-            self,
-            "Storage",
-            network=network,
-        )
+    def __post_init__(self):
+        if self.profile not in PROFILES:
+            raise ValueError(
+                f"Unknown server profile {self.profile!r}, expected one of {sorted(PROFILES)}"
+            )
 
-        """
-        ******************************
-        *     MC Server Construct    *
-        ******************************
-        """
+        if self.world_storage not in ("efs", "s3"):
+            raise ValueError(
+                f"Unknown world storage {self.world_storage!r}, expected 'efs' or 's3'"
+            )
 
-        ecs_task_role = iam.Role(
-            self,
-            "TaskRole",
-            assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
-            description="Role for Minecraft ECS task",
-        )
+        if self.restart_on_interruption and not self.spot:
+            raise ValueError("restart_on_interruption only applies to spot sessions")
+
+        if self.profiler and self.world_storage != "efs":
+            raise ValueError("The profiler reads spark's output from the EFS world volume")
+
+        if self.right_sizing not in (None, "recommend", "apply"):
+            raise ValueError(
+                f"Unknown right sizing mode {self.right_sizing!r}, expected 'recommend' or 'apply'"
+            )
+
+        if self.right_sizing and not self.server_metrics:
+            # Without the tick lag metric every session would look lag-free.
+            raise ValueError("right_sizing reads tick lag from the server metrics")
+
+        if self.static_address and self.wake_on_connect:
+            raise ValueError("static_address and wake_on_connect both claim the server's name")
+
+        if self.servers:
+            if self.world_storage != "efs":
+                raise ValueError("Further servers keep their worlds on the EFS file system")
+
+            if self.direct_api_integrations:
+                raise ValueError("Direct API integrations only serve the primary server")
+
+            if self.right_sizing == "apply":
+                raise ValueError("Right-sizing is only applied with a single server")
+
+            server_ids = [spec.id for spec in self.servers]
+            if len(set(server_ids)) != len(server_ids):
+                raise ValueError(f"Server ids must be unique, got {server_ids}")
 
-        storage.efs_read_write_policy.attach_to_role(ecs_task_role)
+        if self.max_running_servers is not None and (
+            not self.servers or self.max_running_servers < 1
+        ):
+            raise ValueError("max_running_servers needs servers and must be at least 1")
 
-        cluster = ecs.Cluster(
-            self,
-            CLUSTER_NAME,
-            vpc=network.vpc,
-            container_insights=True,
+    @property
+    def server_profile(self) -> ServerProfile:
+        return PROFILES[self.profile]
+
+
+"""
+The deployment is built in four layers, from the one that changes least to
+the one that changes most:
+
+- foundation: VPC, DNS and the EFS world storage;
+- data: the DynamoDB state table;
+- compute: the ECS cluster, server images and the server log group;
+- runtime: task definitions, state machines, Lambdas, rules and the API.
+
+Each layer only refers to the ones before it. A single stack passes itself
+as every layer's scope; ``src.stacks`` gives each layer a stack of its own.
+"""
+
+
+@dataclass
+class Foundation:
+    network: Network
+    storage: Storage
+
+
+@dataclass
+class Compute:
+    cluster: ecs.Cluster
+    # The primary server's image and the plain one further servers run.
+    image: ecs.ContainerImage
+    stock_image: ecs.ContainerImage
+    registry: Registry = None
+    server_log_group: logs.LogGroup = None
+
+
+def build_foundation(
+    scope: Construct,
+    options: ServerOptions,
+    *,
+    removal_policy: RemovalPolicy = RemovalPolicy.DESTROY,
+) -> Foundation:
+    network = Network(
+        scope,
+        "Network",
+        static_address=options.static_address,
+    )
+
+    storage = Storage(
+        scope,
+        "Storage",
+        network=network,
+        removal_policy=removal_policy,
+    )
+
+    return Foundation(network=network, storage=storage)
+
+
+def build_data(scope: Construct) -> Database:
+    return Database(
+        scope,
+        "Database",
+        dynamodb_billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+    )
+
+
+def build_compute(scope: Construct, options: ServerOptions, foundation: Foundation) -> Compute:
+    cluster = ecs.Cluster(
+        scope,
+        CLUSTER_NAME,
+        vpc=foundation.network.vpc,
+        container_insights=True,
+        # Registers FARGATE_SPOT next to FARGATE for Spot sessions.
+        enable_fargate_capacity_providers=options.spot,
+    )
+
+    registry = None
+    if options.bake_image:
+        server_image = ServerImage(
+            scope,
+            "ServerImage",
+            base_image=JAVA_EDITION_DOCKER_IMAGE,
+            version=MINECRAFT_VERSION,
+            server_type=SERVER_TYPE,
+            fabric_loader_version=FABRIC_LOADER_VERSION,
+            modpack=MODPACK,
+        )
+        image = server_image.image
+    elif options.pull_through_cache:
+        registry = Registry(
+            scope,
+            "Registry",
         )
+        image = registry.java_image
+    else:
+        image = ecs.ContainerImage.from_registry(JAVA_EDITION_DOCKER_IMAGE)
 
-        # Create an ECS task definition
-        task_definition = ecs.TaskDefinition(
-            self,
-            "TaskDefinition",
-            runtime_platform=ecs.RuntimePlatform(
-                operating_system_family=ecs.OperatingSystemFamily.LINUX,
-                cpu_architecture=ecs.CpuArchitecture.ARM64,
-            ),
-            compatibility=ecs.Compatibility.FARGATE,
-            task_role=ecs_task_role,
-            memory_mib="6144",
-            cpu="2048",
+    # A baked image has the primary server's modpack in it.
+    stock_image = (
+        ecs.ContainerImage.from_registry(JAVA_EDITION_DOCKER_IMAGE)
+        if options.bake_image
+        else image
+    )
+
+    server_log_group = None
+    if options.server_metrics:
+        # An explicit log group, so the metric pipeline can subscribe to it.
+        server_log_group = logs.LogGroup(
+            scope,
+            "ServerLogGroup",
+            retention=logs.RetentionDays.THREE_DAYS,
+            removal_policy=RemovalPolicy.DESTROY,
         )
 
+    return Compute(
+        cluster=cluster,
+        image=image,
+        stock_image=stock_image,
+        registry=registry,
+        server_log_group=server_log_group,
+    )
+
+
+def build_runtime(
+    scope: Construct,
+    options: ServerOptions,
+    foundation: Foundation,
+    database: Database,
+    compute: Compute,
+) -> None:
+    # Task definitions live here rather than in the compute layer: every
+    # revision changes the ARN, and CloudFormation refuses to update an
+    # export that another stack still imports.
+    network = foundation.network
+    storage = foundation.storage
+    cluster = compute.cluster
+
+    common = Common(
+        scope,
+        "Common",
+    )
+
+    ecs_task_role = iam.Role(
+        scope,
+        "TaskRole",
+        assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
+        description="Role for Minecraft ECS task",
+    )
+
+    storage.grant_read_write(ecs_task_role)
+
+    # Create an ECS task definition
+    task_definition = ecs.TaskDefinition(
+        scope,
+        "TaskDefinition",
+        runtime_platform=ecs.RuntimePlatform(
+            operating_system_family=ecs.OperatingSystemFamily.LINUX,
+            cpu_architecture=ecs.CpuArchitecture.ARM64,
+        ),
+        compatibility=ecs.Compatibility.FARGATE,
+        task_role=ecs_task_role,
+        memory_mib=str(options.server_profile.memory_mib),
+        cpu=str(options.server_profile.cpu),
+        # In S3 mode the world lives on task storage, so size it for one.
+        ephemeral_storage_gib=EPHEMERAL_STORAGE_GIB if options.world_storage == "s3" else None,
+    )
+
+    if options.world_storage == "s3":
+        # No volume configuration: the volume is backed by task storage.
+        task_definition.add_volume(name=ECS_VOLUME_NAME)
+    else:
         task_definition.add_volume(
             name=ECS_VOLUME_NAME,
             efs_volume_configuration=ecs.EfsVolumeConfiguration(
@@ -90,68 +306,153 @@ class MinecraftOnDemandInfraCommonCdkStack(Stack):
             ),
         )
 
-        # Create an ECS container definition
-        container_definition = task_definition.add_container(
-            MC_SERVER_CONTAINER_NAME,
-            image=ecs.ContainerImage.from_registry(JAVA_EDITION_DOCKER_IMAGE),
-            port_mappings=[
-                ecs.PortMapping(
-                    container_port=25565,
-                    host_port=25565,
-                    protocol=ecs.Protocol.TCP,
-                ),
-            ],
-            environment={
-                "EULA": "TRUE",
-                "MAX_MEMORY": "4G",
-                "VERSION": "1.20.1",
-                "TYPE": "FABRIC",
-                "FABRIC_LOADER_VERSION": "0.16.0",
-                "WORLD": WORLD,
-                "MODPACK": MODPACK,
-                "MOTD": "A §nPZ§r server. Powered by §3Docker§r and §6AWS§r",
-                "OPS": "Viktor1778",
-                "ENABLE_AUTOSTOP": "TRUE",
-                "AUTOSTOP_TIMEOUT_INIT": "300",
-                "AUTOSTOP_TIMEOUT_EST": "180",
-                "ALLOW_FLIGHT": "TRUE",
-                "DIFFICULTY": "normal",
-                "LEVEL_TYPE": "minecraft:large_biomes",
-                "NETWORK_COMPRESSION_THRESHOLD": "512",
-                "VIEW_DISTANCE": "8",
-                "SIMULATION_DISTANCE": "4",
-                "SYNC_CHUNK_WRITES": "FALSE",
-            },
-            logging=ecs.AwsLogDriver(
-                log_retention=logs.RetentionDays.THREE_DAYS,
-                stream_prefix=MC_SERVER_CONTAINER_NAME,
+    environment = {
+        "EULA": "TRUE",
+        "VERSION": MINECRAFT_VERSION,
+        "TYPE": SERVER_TYPE,
+        "FABRIC_LOADER_VERSION": FABRIC_LOADER_VERSION,
+        "WORLD": WORLD,
+        "MODPACK": MODPACK,
+        "MOTD": "A §nPZ§r server. Powered by §3Docker§r and §6AWS§r",
+        "OPS": "Viktor1778",
+        "ENABLE_AUTOSTOP": "TRUE",
+        "AUTOSTOP_TIMEOUT_INIT": str(AUTOSTOP_TIMEOUT_INIT_SECONDS),
+        "AUTOSTOP_TIMEOUT_EST": "180",
+        "ALLOW_FLIGHT": "TRUE",
+        "DIFFICULTY": "normal",
+        "LEVEL_TYPE": "minecraft:large_biomes",
+        # The password is set per session by the server workflow.
+        "ENABLE_RCON": "TRUE",
+        **options.server_profile.environment(),
+    }
+
+    # Further servers start from the same settings; the profiler and a
+    # baked modpack are the primary server's own.
+    shared_environment = dict(environment)
+
+    if options.profiler:
+        environment["MODRINTH_PROJECTS"] = "spark"
+
+    if options.bake_image:
+        # The modpack is already installed in the image; leaving MODPACK
+        # set would make the container fetch it again on every start.
+        del environment["MODPACK"]
+    elif compute.registry:
+        compute.registry.grant_pull_through(task_definition.obtain_execution_role())
+        task_definition.node.add_dependency(compute.registry.rule)
+
+    if compute.server_log_group:
+        logging = ecs.AwsLogDriver(
+            log_group=compute.server_log_group,
+            stream_prefix=MC_SERVER_CONTAINER_NAME,
+        )
+    else:
+        logging = ecs.AwsLogDriver(
+            log_retention=logs.RetentionDays.THREE_DAYS,
+            stream_prefix=MC_SERVER_CONTAINER_NAME,
+        )
+
+    # Create an ECS container definition
+    container_definition = task_definition.add_container(
+        MC_SERVER_CONTAINER_NAME,
+        image=compute.image,
+        port_mappings=[
+            ecs.PortMapping(
+                container_port=25565,
+                host_port=25565,
+                protocol=ecs.Protocol.TCP,
             ),
+        ],
+        environment=environment,
+        # Room to flush the world if the task is stopped without the
+        # graceful stop (e.g. it timed out).
+        stop_timeout=Duration.seconds(120),
+        logging=logging,
+    )
+
+    container_definition.add_mount_points(
+        ecs.MountPoint(
+            container_path="/data",
+            source_volume=ECS_VOLUME_NAME,
+            read_only=False,
         )
+    )
 
-        container_definition.add_mount_points(
-            ecs.MountPoint(
-                container_path="/data",
-                source_volume=ECS_VOLUME_NAME,
-                read_only=False,
-            )
+    if options.world_storage == "s3":
+        WorldSync(
+            scope,
+            "WorldSync",
+            task_definition=task_definition,
+            server_container=container_definition,
+            volume_name=ECS_VOLUME_NAME,
         )
 
-        ecs_task_running_topic = sns.Topic(
-            self, "EcsTaskRunningTopic", display_name="ECS Task Running Topic"
+    server_tasks = {}
+    for spec in options.servers:
+        server_tasks[spec.id] = ServerTask(
+            scope,
+            f"Server-{spec.id}",
+            spec=spec,
+            storage=storage,
+            task_role=ecs_task_role,
+            image=compute.stock_image,
+            environment=shared_environment,
+            log_group=compute.server_log_group,
         )
 
-        ecs_task_running_rule = events.Rule(
-            self,
-            "ECSTaskRunningRule",
-            event_pattern=events.EventPattern(
-                source=["aws.ecs"],
-                detail_type=["ECS Task State Change"],
-                detail={
-                    "lastStatus": ["RUNNING"],
-                    "clusterArn": [cluster.cluster_arn],
-                    "taskDefinitionArn": [task_definition.task_definition_arn],
-                },
-            ),
+        if compute.registry and not options.bake_image:
+            compute.registry.grant_pull_through(
+                server_tasks[spec.id].task_definition.obtain_execution_role()
+            )
+            server_tasks[spec.id].task_definition.node.add_dependency(compute.registry.rule)
+
+    server_task_definitions = [
+        server_task.task_definition for server_task in server_tasks.values()
+    ]
+
+    ecs_task_running_rule = events.Rule(
+        scope,
+        "ECSTaskRunningRule",
+        event_pattern=events.EventPattern(
+            source=["aws.ecs"],
+            detail_type=["ECS Task State Change"],
+            detail={
+                "lastStatus": ["RUNNING"],
+                "clusterArn": [cluster.cluster_arn],
+                "taskDefinitionArn": [
+                    definition.task_definition_arn
+                    for definition in [task_definition, *server_task_definitions]
+                ],
+            },
+        ),
+    )
+
+    upsert_record_lambda = lambda_.Function(
+        scope,
+        "UpsertRecordLambda",
+        **options.handlers.function_props(),
+        handler="lambda_function.lambda_handler",
+        code=lambda_.Code.from_asset("src/network/runtime"),
+        layers=[common.runtime_layer],
+        timeout=Duration.seconds(30),
+        environment={
+            "DOMAIN_NAME": DOMAIN_NAME,
+            # With wake-on-connect the listener owns the public name and
+            # the server itself is reachable as origin.<domain>.
+            "RECORD_NAME": f"origin.{DOMAIN_NAME}" if options.wake_on_connect else DOMAIN_NAME,
+            "HOSTED_ZONE_ID": network.hosted_zone.hosted_zone_id,
+        },
+    )
+    upsert_record_entry = options.handlers.entry_point(upsert_record_lambda)
+
+    if options.direct_dns_events:
+        # EventBridge invokes the Lambda itself, saving the SNS hop.
+        ecs_task_running_rule.add_target(
+            targets.LambdaFunction(upsert_record_entry, retry_attempts=2)
+        )
+    else:
+        ecs_task_running_topic = sns.Topic(
+            scope, "EcsTaskRunningTopic", display_name="ECS Task Running Topic"
         )
 
         ecs_task_running_rule.add_target(targets.SnsTopic(ecs_task_running_topic))
@@ -165,75 +466,332 @@ class MinecraftOnDemandInfraCommonCdkStack(Stack):
             )
         )
 
-        upsert_record_lambda = lambda_.Function(
-            self,
-            "UpsertRecordLambda",
-            runtime=lambda_.Runtime.PYTHON_3_12,
-            handler="lambda_function.lambda_handler",
-            code=lambda_.Code.from_asset("src/network/runtime"),
-            environment={
-                "DOMAIN_NAME": DOMAIN_NAME,
-                "HOSTED_ZONE_ID": network.hosted_zone.hosted_zone_id,
-            },
-        )
-
-        upsert_record_lambda.add_event_source(
+        upsert_record_entry.add_event_source(
             lambda_event_sources.SnsEventSource(ecs_task_running_topic)
         )
 
         ecs_task_running_topic.grant_publish(upsert_record_lambda)
 
-        upsert_record_lambda.add_to_role_policy(
-            statement=iam.PolicyStatement(
-                actions=[
-                    "ecs:DescribeTasks",
-                    "ec2:DescribeNetworkInterfaces",
-                ],
-                resources=["*"],
-            )
+    upsert_record_lambda.add_to_role_policy(
+        statement=iam.PolicyStatement(
+            actions=[
+                "ecs:DescribeTasks",
+                "ec2:DescribeNetworkInterfaces",
+            ],
+            resources=["*"],
         )
+    )
 
-        upsert_record_lambda.add_to_role_policy(
-            statement=iam.PolicyStatement(
-                actions=[
-                    "route53:ChangeResourceRecordSets",
-                ],
-                resources=[
-                    f"arn:aws:route53:::hostedzone/{network.hosted_zone.hosted_zone_id}",
-                ],
-            )
+    upsert_record_lambda.add_to_role_policy(
+        statement=iam.PolicyStatement(
+            actions=[
+                "route53:ChangeResourceRecordSets",
+                "route53:ListResourceRecordSets",
+            ],
+            resources=[
+                f"arn:aws:route53:::hostedzone/{network.hosted_zone.hosted_zone_id}",
+            ],
         )
+    )
 
-        workflow = Workflow(
-            self,
-            "Workflow",
+    # Backups and maintenance jobs work on the EFS world. In S3 mode the
+    # world sync bucket is versioned and serves as the backup instead.
+    backup = None
+    maintenance = None
+    if options.world_storage == "efs":
+        backup = Backup(
+            scope,
+            "Backup",
+            network=network,
+            storage=storage,
+            runtime_layer=common.runtime_layer,
+            handlers=options.handlers,
+        )
+
+        maintenance = Maintenance(
+            scope,
+            "Maintenance",
+            network=network,
+            storage=storage,
+            runtime_layer=common.runtime_layer,
             cluster=cluster,
             task_definition=task_definition,
             container_definition=container_definition,
-            security_group=network.security_group,
+            pregen_schedule=options.pregen_schedule,
+            handlers=options.handlers,
         )
 
-        database = Database(
-            self,
-            "Database",
-            dynamodb_billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+    workflow = Workflow(
+        scope,
+        "Workflow",
+        cluster=cluster,
+        task_definition=task_definition,
+        container_definition=container_definition,
+        security_group=network.security_group,
+        runtime_layer=common.runtime_layer,
+        backup_lambda=backup.backup_lambda if backup else None,
+        spot=options.spot,
+        restart_on_interruption=options.restart_on_interruption,
+        # Start with the recommended task size rather than the profile's.
+        task_size_table=database.dynamodb_table if options.right_sizing == "apply" else None,
+        default_task_size={
+            "cpu": str(options.server_profile.cpu),
+            "memory": str(options.server_profile.memory_mib),
+            "heap": f"{options.server_profile.heap_mib}M",
+        },
+        task_definitions=server_task_definitions or None,
+        handlers=options.handlers,
+    )
+
+    if options.right_sizing:
+        RightSizing(
+            scope,
+            "RightSizing",
+            table=database.dynamodb_table,
+            cluster=cluster,
+            task_definition=task_definition,
+            profile=options.server_profile,
+            runtime_layer=common.runtime_layer,
+            handlers=options.handlers,
+        )
+
+    workflow.cleanup_lambda.add_environment(
+        "TABLE_NAME",
+        database.dynamodb_table.table_name,
+    )
+
+    workflow.readiness_lambda.add_environment(
+        "TABLE_NAME",
+        database.dynamodb_table.table_name,
+    )
+
+    upsert_record_lambda.add_environment(
+        "TABLE_NAME",
+        database.dynamodb_table.table_name,
+    )
+
+    if options.spot:
+        for function in (workflow.fallback_lambda, workflow.interruption_lambda):
+            function.add_environment(
+                "TABLE_NAME",
+                database.dynamodb_table.table_name,
+            )
+            database.dynamodb_table.grant_read_write_data(function)
+
+    if backup:
+        # Both hold the server in MAINTENANCE while they touch the world.
+        for function in (backup.backup_lambda, backup.restore_lambda):
+            function.add_environment(
+                "TABLE_NAME",
+                database.dynamodb_table.table_name,
+            )
+            database.dynamodb_table.grant_read_write_data(function)
+
+    if maintenance:
+        for function in (
+            maintenance.claim_lambda,
+            maintenance.release_lambda,
+            maintenance.pregen_lambda,
+        ):
+            function.add_environment(
+                "TABLE_NAME",
+                database.dynamodb_table.table_name,
+            )
+            database.dynamodb_table.grant_read_write_data(function)
+
+    graceful_stop = GracefulStop(
+        scope,
+        "GracefulStop",
+        network=network,
+        table=database.dynamodb_table,
+        server_state_machine=workflow.state_machine,
+        runtime_layer=common.runtime_layer,
+        handlers=options.handlers,
+    )
+
+    if options.server_metrics:
+        monitoring = Monitoring(
+            scope,
+            "Monitoring",
+            log_group=compute.server_log_group,
+            runtime_layer=common.runtime_layer,
+            handlers=options.handlers,
         )
 
-        workflow.cleanup_lambda.add_environment(
+        monitoring.log_metrics_lambda.add_environment(
             "TABLE_NAME",
             database.dynamodb_table.table_name,
         )
+        database.dynamodb_table.grant_read_write_data(monitoring.log_metrics_lambda)
+
+    profiling = None
+    if options.profiler:
+        profiling = Profiler(
+            scope,
+            "Profiler",
+            network=network,
+            storage=storage,
+            runtime_layer=common.runtime_layer,
+            lag_alarm=monitoring.lag_alarm if options.server_metrics else None,
+            handlers=options.handlers,
+        )
+
+        for function in (profiling.start_lambda, profiling.collect_lambda):
+            function.add_environment(
+                "TABLE_NAME",
+                database.dynamodb_table.table_name,
+            )
+        database.dynamodb_table.grant_read_data(profiling.start_lambda)
+        database.dynamodb_table.grant_read_write_data(profiling.collect_lambda)
+
+    if network.target_group:
+        for function in (
+            upsert_record_lambda,
+            workflow.cleanup_lambda,
+            graceful_stop.force_stop_lambda,
+        ):
+            function.add_environment(
+                "TARGET_GROUP_ARN",
+                network.target_group.target_group_arn,
+            )
+            network.grant_target_registration(function)
+
+    api = API(
+        scope,
+        "API",
+        dynamodb_table_name=database.dynamodb_table.table_name,
+        state_machine_arn=workflow.state_machine.state_machine_arn,
+        graceful_stop_state_machine=graceful_stop.state_machine,
+        certificate=network.certificate,
+        hosted_zone=network.hosted_zone,
+        runtime_layer=common.runtime_layer,
+        direct_integrations=options.direct_api_integrations,
+        maintenance_state_machine=maintenance.state_machine if maintenance else None,
+        profiler_state_machine=profiling.state_machine if profiling else None,
+        servers={
+            lifecycle.SERVER_ID: task_definition.task_definition_arn,
+            **{
+                server_id: server_task.task_definition.task_definition_arn
+                for server_id, server_task in server_tasks.items()
+            },
+        }
+        if options.servers
+        else None,
+        max_running_servers=options.max_running_servers,
+        handlers=options.handlers,
+    )
+
+    database.dynamodb_table.grant_read_write_data(api.launcher_lambda)
+    database.dynamodb_table.grant_read_write_data(api.stop_lambda)
+    database.dynamodb_table.grant_read_write_data(workflow.cleanup_lambda)
+    database.dynamodb_table.grant_read_write_data(upsert_record_lambda)
+    database.dynamodb_table.grant_read_write_data(workflow.readiness_lambda)
+    database.dynamodb_table.grant_read_data(api.status_lambda)
+    
+    workflow.state_machine.grant_start_execution(api.launcher_lambda)
+    workflow.state_machine.grant_execution(api.launcher_lambda, "states:StopExecution")
+
+    if options.prewarm_lead_minutes:
+        Prewarm(
+            scope,
+            "Prewarm",
+            table=database.dynamodb_table,
+            launcher_lambda=api.launcher_entry,
+            runtime_layer=common.runtime_layer,
+            lead_minutes=options.prewarm_lead_minutes,
+            handlers=options.handlers,
+        )
+
+    if options.wake_on_connect:
+        wake = Wake(
+            scope,
+            "Wake",
+            cluster=cluster,
+            security_group=network.security_group,
+            status_url=api.rest_api.url_for_path("/v1/server/status"),
+            start_url=api.rest_api.url_for_path("/v1/server/start"),
+        )
+
+        # Point the public name at the listener whenever its task (re)starts.
+        events.Rule(
+            scope,
+            "WakeTaskRunningRule",
+            event_pattern=events.EventPattern(
+                source=["aws.ecs"],
+                detail_type=["ECS Task State Change"],
+                detail={
+                    "lastStatus": ["RUNNING"],
+                    "clusterArn": [cluster.cluster_arn],
+                    "taskDefinitionArn": [wake.task_definition.task_definition_arn],
+                },
+            ),
+            targets=[
+                targets.LambdaFunction(
+                    upsert_record_entry,
+                    event=events.RuleTargetInput.from_object(
+                        {
+                            "detail-type": events.EventField.detail_type,
+                            "detail": events.EventField.from_path("$.detail"),
+                            "record_name": DOMAIN_NAME,
+                        }
+                    ),
+                )
+            ],
+        )
+
+
+class MinecraftOnDemandInfraCommonCdkStack(Stack):
+    """Every layer in one stack."""
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        direct_api_integrations: bool = False,
+        direct_dns_events: bool = False,
+        wake_on_connect: bool = False,
+        bake_image: bool = False,
+        pull_through_cache: bool = False,
+        profile: str = "standard",
+        world_storage: str = "efs",
+        pregen_schedule: events.Schedule = None,
+        spot: bool = False,
+        restart_on_interruption: bool = False,
+        static_address: bool = False,
+        server_metrics: bool = False,
+        profiler: bool = False,
+        prewarm_lead_minutes: int = None,
+        right_sizing: str = None,
+        servers: tuple = (),
+        max_running_servers: int = None,
+        handlers: HandlerOptions = HandlerOptions(),
+        **kwargs,
+    ) -> None:
+        super().__init__(scope, construct_id, **kwargs)
 
-        api = API(
-            self,
-            "API",
-            dynamodb_table_name=database.dynamodb_table.table_name,
-            state_machine_arn=workflow.state_machine.state_machine_arn,
+        options = ServerOptions(
+            direct_api_integrations=direct_api_integrations,
+            direct_dns_events=direct_dns_events,
+            wake_on_connect=wake_on_connect,
+            bake_image=bake_image,
+            pull_through_cache=pull_through_cache,
+            profile=profile,
+            world_storage=world_storage,
+            pregen_schedule=pregen_schedule,
+            spot=spot,
+            restart_on_interruption=restart_on_interruption,
+            static_address=static_address,
+            server_metrics=server_metrics,
+            profiler=profiler,
+            prewarm_lead_minutes=prewarm_lead_minutes,
+            right_sizing=right_sizing,
+            servers=servers,
+            max_running_servers=max_running_servers,
+            handlers=handlers,
         )
 
-        database.dynamodb_table.grant_read_write_data(api.launcher_lambda)
-        database.dynamodb_table.grant_read_write_data(api.stop_lambda)
-        database.dynamodb_table.grant_read_write_data(workflow.cleanup_lambda)
-        
-        workflow.state_machine.grant_start_execution(api.launcher_lambda)
-        workflow.state_machine.grant_execution(api.stop_lambda, "states:StopExecution")
+        foundation = build_foundation(self, options)
+        database = build_data(self)
+        compute = build_compute(self, options, foundation)
+        build_runtime(self, options, foundation, database, compute)
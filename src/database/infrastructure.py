@@ -2,6 +2,8 @@ from aws_cdk import RemovalPolicy
 from aws_cdk import aws_dynamodb as dynamodb
 from constructs import Construct
 
+from src.common.runtime.python import lifecycle, timeline
+
 
 class Database(Construct):
 
@@ -23,3 +25,31 @@ class Database(Construct):
             ),
             removal_policy=RemovalPolicy.DESTROY,
         )
+
+        # Session items (``kind = "session"``) by request time, so start
+        # history can be read without scanning the table.
+        self.dynamodb_table.add_global_secondary_index(
+            index_name=timeline.HISTORY_INDEX,
+            partition_key=dynamodb.Attribute(
+                name="kind",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            sort_key=dynamodb.Attribute(
+                name="requested_at_ms",
+                type=dynamodb.AttributeType.NUMBER,
+            ),
+        )
+
+        # Server items (``kind = "server"``), so the API can list every
+        # server's state in one query.
+        self.dynamodb_table.add_global_secondary_index(
+            index_name=lifecycle.STATUS_INDEX,
+            partition_key=dynamodb.Attribute(
+                name="kind",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            sort_key=dynamodb.Attribute(
+                name="id",
+                type=dynamodb.AttributeType.STRING,
+            ),
+        )
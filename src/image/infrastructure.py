@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+from aws_cdk import aws_ecr_assets as ecr_assets
+from aws_cdk import aws_ecs as ecs
+from constructs import Construct
+
+
+def inputs_hash(inputs: dict) -> str:
+    """Stable short hash of everything that goes into a baked image."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ServerImage(Construct):
+    """Server image with the server jar, loader and modpack installed at build time.
+
+    Cold starts then skip resolving and downloading the loader and modpack.
+    The image is tagged by a hash of its inputs, so it is only rebuilt and
+    pushed when one of them changes.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        base_image: str,
+        version: str,
+        server_type: str,
+        fabric_loader_version: str,
+        modpack: str,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        build_args = {
+            "BASE_IMAGE": base_image,
+            "VERSION": version,
+            "TYPE": server_type,
+            "FABRIC_LOADER_VERSION": fabric_loader_version,
+            "MODPACK": modpack,
+        }
+
+        self.inputs_hash = inputs_hash(build_args)
+
+        self.asset = ecr_assets.DockerImageAsset(
+            self,
+            "Asset",
+            directory="src/image/runtime",
+            build_args={**build_args, "INPUTS_HASH": self.inputs_hash},
+            platform=ecr_assets.Platform.LINUX_ARM64,
+            extra_hash=self.inputs_hash,
+        )
+
+        self.image = ecs.ContainerImage.from_docker_image_asset(self.asset)
@@ -0,0 +1,13 @@
+#!/bin/bash
+set -euo pipefail
+
+# Seed the persistent /data volume with the baked server jar, loader and mods
+# whenever the image changes. World data is never part of /image, so it is
+# left alone; mods are replaced wholesale so removed mods do not linger.
+if [ "$(cat /data/.image-hash 2>/dev/null || true)" != "$(cat /image/.image-hash)" ]; then
+  echo "Seeding /data from baked image $(cat /image/.image-hash)"
+  rm -rf /data/mods
+  cp -a /image/. /data/
+fi
+
+exec /start "$@"
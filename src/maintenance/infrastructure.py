@@ -0,0 +1,339 @@
+from aws_cdk import Duration
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_stepfunctions as sfn
+from aws_cdk import aws_stepfunctions_tasks as tasks
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.common.runtime.python import lifecycle
+from src.network.infrastructure import Network
+from src.storage.infrastructure import Storage
+
+MOUNT_PATH = "/mnt/data"
+
+# Region files are split across this many trim workers.
+TRIM_SHARDS = 16
+
+# Server settings for a pre-generation run: nobody may join, nothing stops
+# the server before the pregen mod is done, and RCON is on for the poller.
+PREGEN_ENVIRONMENT = {
+    "ENABLE_WHITELIST": "TRUE",
+    "ENFORCE_WHITELIST": "TRUE",
+    "ENABLE_AUTOSTOP": "FALSE",
+    "ENABLE_RCON": "TRUE",
+    "MODRINTH_PROJECTS": "chunky",
+}
+
+
+class Maintenance(Construct):
+    """Offline jobs that need the world to themselves.
+
+    The state machine takes ``{"task": "trim" | "pregen", "options": {...}}``.
+    It holds the server in MAINTENANCE for the duration, so starts are
+    refused. It fails straight away with ``ServerBusy`` unless the server is
+    stopped.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        network: Network,
+        storage: Storage,
+        runtime_layer: lambda_.ILayerVersion,
+        cluster: ecs.ICluster,
+        task_definition: ecs.TaskDefinition,
+        container_definition: ecs.ContainerDefinition,
+        pregen_schedule: events.Schedule = None,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.claim_lambda = lambda_.Function(
+            self,
+            "ClaimLambda",
+            **handlers.function_props(),
+            handler="claim_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/maintenance/runtime"),
+            layers=[runtime_layer],
+        )
+
+        self.release_lambda = lambda_.Function(
+            self,
+            "ReleaseLambda",
+            **handlers.function_props(),
+            handler="release_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/maintenance/runtime"),
+            layers=[runtime_layer],
+        )
+
+        self.trim_lambda = lambda_.Function(
+            self,
+            "TrimLambda",
+            # Two vCPUs for the decompression threads.
+            **handlers.function_props(memory_mib=3008),
+            handler="trim_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/maintenance/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.minutes(15),
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+            filesystem=lambda_.FileSystem.from_efs_access_point(storage.access_point, MOUNT_PATH),
+            environment={
+                "WORLD_DIR": f"{MOUNT_PATH}/world",
+            },
+        )
+
+        self.pregen_lambda = lambda_.Function(
+            self,
+            "PregenProgressLambda",
+            **handlers.function_props(),
+            handler="pregen_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/maintenance/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(30),
+            # RCON is only reachable from inside the VPC.
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+        )
+
+        # The jobs run the primary server's task definition on its world.
+        server_id = lifecycle.SERVER_ID
+
+        claim = tasks.LambdaInvoke(
+            self,
+            "ClaimMaintenance",
+            lambda_function=self.claim_lambda,
+            payload=sfn.TaskInput.from_object({"task.$": "$.task", "server_id": server_id}),
+            result_selector={"version.$": "$.Payload.version"},
+            result_path="$.claim",
+        )
+
+        claim.add_catch(
+            sfn.Fail(self, "ServerBusy", cause="The server is not stopped"),
+            errors=["ServerBusy"],
+        )
+
+        release_after_failure = tasks.LambdaInvoke(
+            self,
+            "ReleaseAfterFailure",
+            lambda_function=self.release_lambda,
+            payload=sfn.TaskInput.from_object(
+                {"version.$": "$.claim.version", "server_id": server_id}
+            ),
+            result_path=sfn.JsonPath.DISCARD,
+        ).next(sfn.Fail(self, "MaintenanceFailed"))
+
+        """
+        ******************************
+        *         Trim World         *
+        ******************************
+        """
+
+        trim_plan = sfn.Pass(
+            self,
+            "TrimPlan",
+            parameters={"shards": list(range(TRIM_SHARDS))},
+            result_path="$.trim",
+        )
+
+        trim_shards = sfn.Map(
+            self,
+            "TrimShards",
+            items_path="$.trim.shards",
+            item_selector={
+                "shard.$": "$$.Map.Item.Value",
+                "shards": TRIM_SHARDS,
+                "options.$": "$.options",
+            },
+            max_concurrency=TRIM_SHARDS,
+            result_path="$.trim.reports",
+        )
+        trim_shards.item_processor(
+            tasks.LambdaInvoke(
+                self,
+                "TrimShard",
+                lambda_function=self.trim_lambda,
+                payload_response_only=True,
+            )
+        )
+        trim_shards.add_catch(release_after_failure, errors=["States.ALL"], result_path="$.error")
+
+        release_after_trim = tasks.LambdaInvoke(
+            self,
+            "ReleaseAfterTrim",
+            lambda_function=self.release_lambda,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "version.$": "$.claim.version",
+                    "server_id": server_id,
+                    "report": {
+                        "task": "trim",
+                        "shards.$": "$.trim.reports",
+                    },
+                }
+            ),
+            payload_response_only=True,
+        )
+
+        trim = trim_plan.next(trim_shards).next(release_after_trim)
+
+        """
+        ******************************
+        *     Pre-generate Chunks    *
+        ******************************
+        """
+
+        # A fresh RCON password per run, handed to the server and the poller.
+        pregen_plan = sfn.Pass(
+            self,
+            "PregenPlan",
+            parameters={
+                "password.$": "States.UUID()",
+                "started": False,
+            },
+            result_path="$.pregen",
+        )
+
+        run_pregen = tasks.EcsRunTask(
+            self,
+            "RunPregen",
+            integration_pattern=sfn.IntegrationPattern.RUN_JOB,
+            cluster=cluster,
+            task_definition=task_definition,
+            assign_public_ip=True,
+            container_overrides=[
+                tasks.ContainerOverride(
+                    container_definition=container_definition,
+                    environment=[
+                        *[
+                            tasks.TaskEnvironmentVariable(name=name, value=value)
+                            for name, value in PREGEN_ENVIRONMENT.items()
+                        ],
+                        tasks.TaskEnvironmentVariable(
+                            name="RCON_PASSWORD",
+                            value=sfn.JsonPath.string_at("$.pregen.password"),
+                        ),
+                    ],
+                )
+            ],
+            launch_target=tasks.EcsFargateLaunchTarget(
+                platform_version=ecs.FargatePlatformVersion.LATEST
+            ),
+            security_groups=[network.security_group],
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        poll_pregen = tasks.LambdaInvoke(
+            self,
+            "PollPregen",
+            lambda_function=self.pregen_lambda,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "password.$": "$.pregen.password",
+                    "started.$": "$.pregen.started",
+                    "options.$": "$.options",
+                    "server_id": server_id,
+                }
+            ),
+            payload_response_only=True,
+            result_path="$.pregen",
+        )
+
+        # Covers the image pull, mod download and world load.
+        poll_pregen.add_retry(
+            errors=["ServerNotReady"],
+            interval=Duration.seconds(15),
+            backoff_rate=1.5,
+            max_delay=Duration.minutes(1),
+            max_attempts=30,
+        )
+
+        wait_for_pregen = sfn.Wait(
+            self,
+            "WaitForPregen",
+            time=sfn.WaitTime.duration(Duration.minutes(1)),
+        )
+
+        wait_for_pregen.next(poll_pregen).next(
+            sfn.Choice(self, "PregenDone")
+            .when(
+                sfn.Condition.boolean_equals("$.pregen.done", True),
+                sfn.Succeed(self, "PregenStopped"),
+            )
+            .otherwise(wait_for_pregen)
+        )
+
+        pregen_session = sfn.Parallel(
+            self,
+            "Pregen",
+            result_path=sfn.JsonPath.DISCARD,
+        )
+        pregen_session.branch(run_pregen)
+        pregen_session.branch(wait_for_pregen)
+        pregen_session.add_catch(release_after_failure, errors=["States.ALL"], result_path="$.error")
+
+        release_after_pregen = tasks.LambdaInvoke(
+            self,
+            "ReleaseAfterPregen",
+            lambda_function=self.release_lambda,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "version.$": "$.claim.version",
+                    "server_id": server_id,
+                    "report": {"task": "pregen"},
+                }
+            ),
+            payload_response_only=True,
+        )
+
+        pregen = pregen_plan.next(pregen_session).next(release_after_pregen)
+
+        task_choice = (
+            sfn.Choice(self, "Task")
+            .when(sfn.Condition.string_equals("$.task", "trim"), trim)
+            .when(sfn.Condition.string_equals("$.task", "pregen"), pregen)
+            .otherwise(release_after_failure)
+        )
+
+        # Options are optional; the workers fall back to their defaults.
+        with_options = (
+            sfn.Choice(self, "HasOptions")
+            .when(sfn.Condition.is_present("$.options"), task_choice)
+            .otherwise(
+                sfn.Pass(
+                    self,
+                    "DefaultOptions",
+                    result=sfn.Result.from_object({}),
+                    result_path="$.options",
+                ).next(task_choice)
+            )
+        )
+
+        self.state_machine = sfn.StateMachine(
+            self,
+            "MaintenanceStateMachine",
+            definition_body=sfn.DefinitionBody.from_chainable(claim.next(with_options)),
+            # Pre-generating a large radius takes hours.
+            timeout=Duration.hours(12),
+        )
+
+        if pregen_schedule:
+            events.Rule(
+                self,
+                "PregenSchedule",
+                schedule=pregen_schedule,
+                targets=[
+                    targets.SfnStateMachine(
+                        self.state_machine,
+                        input=events.RuleTargetInput.from_object({"task": "pregen"}),
+                    )
+                ],
+            )
@@ -0,0 +1,26 @@
+import os
+
+import clients
+import lifecycle
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+
+if not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+
+
+class ServerBusy(Exception):
+    """The server is not stopped, so the world is in use."""
+
+
+def lambda_handler(event, context):
+    try:
+        item = lifecycle.begin_maintenance(
+            table, event["task"], server_id=event.get("server_id", lifecycle.SERVER_ID)
+        )
+    except lifecycle.TransitionConflict as e:
+        raise ServerBusy("Maintenance needs a stopped server") from e
+
+    return {"version": item["version"]}
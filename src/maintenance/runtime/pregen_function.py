@@ -0,0 +1,116 @@
+import os
+import re
+import time
+from decimal import Decimal
+
+import clients
+import lifecycle
+import rcon
+from replies import log
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+RCON_PORT = int(os.environ.get("RCON_PORT", rcon.DEFAULT_PORT))
+RCON_TIMEOUT_SECONDS = float(os.environ.get("RCON_TIMEOUT_SECONDS", "5"))
+DEFAULT_RADIUS = int(os.environ.get("DEFAULT_RADIUS", "2000"))
+
+if not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+
+# e.g. "[Chunky] Task running for minecraft:overworld. Processed: 1234 chunks (12.34%), ..."
+PROGRESS = re.compile(r"Processed: (\d+) chunks \(([\d.]+)%\)")
+
+
+class ServerNotReady(Exception):
+    """The pre-generation server cannot be reached over RCON yet."""
+
+
+def start_commands(options):
+    if "x" in options and "z" in options:
+        center = f"chunky center {options['x']} {options['z']}"
+    else:
+        center = "chunky spawn"
+
+    return [
+        "chunky world minecraft:overworld",
+        center,
+        f"chunky radius {int(options.get('radius', DEFAULT_RADIUS))}",
+        "chunky start",
+        # Only needed when an unfinished task was saved; harmless otherwise.
+        "chunky confirm",
+    ]
+
+
+def parse_progress(output):
+    """Return ``(chunks, percent)``, or None when no task is running."""
+    match = PROGRESS.search(output)
+    if not match:
+        return None
+
+    return int(match.group(1)), float(match.group(2))
+
+
+def lambda_handler(event, context):
+    """Advance a pre-generation run by one poll.
+
+    Starts Chunky on the first call, records progress on the state item and
+    stops the server once Chunky is done, which ends the ECS task.
+    """
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+    item = lifecycle.read(table, server_id)
+
+    if item["state"] != lifecycle.MAINTENANCE or item.get("maintenance") != "pregen":
+        raise RuntimeError("Pre-generation no longer holds the server")
+
+    address = item.get("maintenance_address")
+    if not address:
+        raise ServerNotReady("The pre-generation task has no address yet")
+
+    started = event.get("started", False)
+
+    try:
+        with rcon.Client(
+            address, event["password"], port=RCON_PORT, timeout=RCON_TIMEOUT_SECONDS
+        ) as client:
+            if not started:
+                for command in start_commands(event.get("options", {})):
+                    client.command(command)
+
+            progress = parse_progress(client.command("chunky progress"))
+            done = started and (progress is None or progress[1] >= 100)
+
+            if done:
+                # The server saves the world on the way out and the task ends.
+                try:
+                    client.command("stop")
+                except (rcon.RconError, OSError) as e:
+                    # The server may close the connection before it answers.
+                    log("RCON stop got no answer", level="WARNING", error=e)
+
+    except OSError as e:
+        raise ServerNotReady(str(e)) from e
+
+    chunks, percent = progress or (None, 100.0 if done else 0.0)
+    try:
+        lifecycle.update(
+            table,
+            item["version"],
+            {
+                "maintenance_progress": {
+                    "percent": Decimal(str(percent)),
+                    "chunks": chunks or 0,
+                    "updated_at": int(time.time()),
+                }
+            },
+            server_id=server_id,
+        )
+    except lifecycle.TransitionConflict:
+        pass
+
+    return {
+        "password": event["password"],
+        "started": True,
+        "done": done,
+        "percent": percent,
+    }
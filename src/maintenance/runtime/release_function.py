@@ -0,0 +1,41 @@
+import json
+import os
+
+import clients
+import lifecycle
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+
+if not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+
+
+def summarize(report):
+    """Add up the numbers reported by each parallel worker."""
+    totals = {}
+
+    for shard in report.get("shards", []):
+        for key, value in shard.items():
+            if isinstance(value, (int, float)) and key != "shard":
+                totals[key] = totals.get(key, 0) + value
+
+    return {key: value for key, value in report.items() if key != "shards"} | totals
+
+
+def lambda_handler(event, context):
+    try:
+        lifecycle.end_maintenance(
+            table, event["version"], server_id=event.get("server_id", lifecycle.SERVER_ID)
+        )
+    except lifecycle.TransitionConflict:
+        # Already released, e.g. by a retried invocation.
+        pass
+
+    report = event.get("report")
+    if report is not None:
+        report = summarize(report)
+        print(json.dumps(report))
+
+    return report
@@ -0,0 +1,47 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import trimming
+
+WORLD_DIR = os.environ.get("WORLD_DIR", "/mnt/data/world")
+WORKERS = int(os.environ.get("WORKERS", "4"))
+
+
+def lambda_handler(event, context):
+    """Trim the region files of one shard of the world.
+
+    ``{"shard": 3, "shards": 16, "options": {...}}``; the options are
+    ``min_inhabited_ticks``, ``spawn_radius`` (blocks) and ``protected``, a
+    list of ``{"dimension", "x", "z", "radius"}`` areas in block coordinates.
+    """
+    shard, shards = event["shard"], event["shards"]
+    options = event.get("options", {})
+    areas = [
+        trimming.spawn_area(WORLD_DIR, options.get("spawn_radius", 512)),
+        *options.get("protected", []),
+    ]
+
+    regions = [
+        (dimension, path)
+        for dimension, path in trimming.region_files(WORLD_DIR)
+        if trimming.shard_of(dimension, path, shards) == shard
+    ]
+
+    def trim(region):
+        dimension, path = region
+        return trimming.trim_region(
+            WORLD_DIR,
+            dimension,
+            path,
+            min_inhabited_ticks=options.get("min_inhabited_ticks", 1200),
+            areas=areas,
+        )
+
+    # Decompression and file I/O release the GIL, so threads overlap well.
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        report = trimming.merge(executor.map(trim, regions))
+
+    print(json.dumps({"shard": shard, **report}))
+
+    return report
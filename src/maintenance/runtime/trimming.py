@@ -0,0 +1,170 @@
+"""Drop chunks that players never spent time in.
+
+Minecraft counts, per chunk, the ticks players spent nearby as
+``InhabitedTime``. Chunks below a threshold were only generated in passing
+and are regenerated identically from the seed if anyone returns. Protected
+areas are always kept, and so is any chunk this module cannot read.
+
+Region files are streamed one chunk at a time and rewritten compacted only
+when something was dropped. The entity and POI regions that belong to the
+same chunks are trimmed along with them.
+"""
+
+import gzip
+import math
+import os
+import zlib
+
+import anvil
+import nbt
+
+# Overworld, Nether, End.
+DIMENSIONS = ("", "DIM-1", "DIM1")
+# Per-chunk data that lives in region files of its own since 1.17.
+COMPANION_DIRECTORIES = ("entities", "poi")
+
+CHUNK_WIDTH = 16
+
+
+def region_files(world):
+    """Yield ``(dimension, path)`` for every terrain region file in a world."""
+    for dimension in DIMENSIONS:
+        directory = os.path.join(world, dimension, "region")
+        if not os.path.isdir(directory):
+            continue
+
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+            if entry.name.endswith(".mca") and entry.is_file():
+                yield dimension, entry.path
+
+
+def shard_of(dimension, path, shards):
+    """Stable shard for a region file, so parallel workers never overlap."""
+    return zlib.crc32(f"{dimension}/{os.path.basename(path)}".encode()) % shards
+
+
+def spawn_area(world, radius):
+    """Protected area around the world spawn, from ``level.dat``."""
+    try:
+        with open(os.path.join(world, "level.dat"), "rb") as f:
+            level = gzip.decompress(f.read())
+    except FileNotFoundError:
+        return {"dimension": "", "x": 0, "z": 0, "radius": radius}
+
+    return {
+        "dimension": "",
+        "x": nbt.find(level, "Data", "SpawnX", default=0),
+        "z": nbt.find(level, "Data", "SpawnZ", default=0),
+        "radius": radius,
+    }
+
+
+def is_protected(dimension, chunk_x, chunk_z, areas):
+    """True if any part of the chunk is within ``radius`` blocks of an area."""
+    left, top = chunk_x * CHUNK_WIDTH, chunk_z * CHUNK_WIDTH
+
+    for area in areas:
+        if area.get("dimension", "") != dimension:
+            continue
+
+        # Distance from the area centre to the nearest block of the chunk.
+        dx = max(left - area["x"], 0, area["x"] - (left + CHUNK_WIDTH - 1))
+        dz = max(top - area["z"], 0, area["z"] - (top + CHUNK_WIDTH - 1))
+        if math.hypot(dx, dz) <= area["radius"]:
+            return True
+
+    return False
+
+
+def inhabited_ticks(payload):
+    """Return the chunk's InhabitedTime, or None if it cannot be read."""
+    try:
+        data = anvil.decompress(payload)
+        ticks = nbt.find(data, "InhabitedTime")
+        if ticks is None:
+            # Chunks saved before 1.18 nest everything under Level.
+            ticks = nbt.find(data, "Level", "InhabitedTime")
+    except (anvil.RegionError, nbt.NbtError, zlib.error, OSError, EOFError):
+        return None
+
+    return ticks
+
+
+def rewrite(path, keep):
+    """Rewrite ``path`` with only the chunks for which ``keep`` is true.
+
+    Returns the dropped chunk indices and the bytes reclaimed. The file is
+    replaced atomically, deleted when nothing is left, and left untouched
+    when nothing was dropped.
+    """
+    dropped = set()
+    temporary = f"{path}.trim"
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as source, open(temporary, "wb") as target:
+        writer = anvil.RegionWriter(target)
+        for index, timestamp, payload in anvil.iter_chunks(source):
+            if keep(index, payload):
+                writer.add(index, timestamp, payload)
+            else:
+                dropped.add(index)
+        kept = writer.close()
+
+    if not dropped:
+        os.remove(temporary)
+        return dropped, 0
+
+    if kept:
+        os.replace(temporary, path)
+        return dropped, size - os.path.getsize(path)
+
+    os.remove(temporary)
+    os.remove(path)
+    return dropped, size
+
+
+def trim_region(world, dimension, path, *, min_inhabited_ticks, areas):
+    """Trim one terrain region file and its companions; returns a report."""
+    region_x, region_z = anvil.region_coordinates(os.path.basename(path))
+
+    def keep(index, payload):
+        chunk_x, chunk_z = anvil.chunk_coordinates(region_x, region_z, index)
+        if is_protected(dimension, chunk_x, chunk_z, areas):
+            return True
+
+        ticks = inhabited_ticks(payload)
+        return ticks is None or ticks >= min_inhabited_ticks
+
+    dropped, reclaimed = rewrite(path, keep)
+    deleted = not os.path.exists(path)
+
+    if dropped:
+        for directory in COMPANION_DIRECTORIES:
+            companion = os.path.join(world, dimension, directory, os.path.basename(path))
+            if os.path.exists(companion):
+                reclaimed += rewrite(companion, lambda index, _: index not in dropped)[1]
+
+    return {
+        "regions": 1,
+        "regions_rewritten": int(bool(dropped) and not deleted),
+        "regions_deleted": int(deleted),
+        "chunks_dropped": len(dropped),
+        "bytes_reclaimed": reclaimed,
+    }
+
+
+def merge(reports):
+    """Sum reports from ``trim_region`` (or from several workers)."""
+    total = {
+        "regions": 0,
+        "regions_rewritten": 0,
+        "regions_deleted": 0,
+        "chunks_dropped": 0,
+        "bytes_reclaimed": 0,
+    }
+
+    for report in reports:
+        for key in total:
+            total[key] += report.get(key, 0)
+
+    return total
@@ -0,0 +1,73 @@
+from aws_cdk import Duration
+from aws_cdk import aws_cloudwatch as cloudwatch
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_logs as logs
+from aws_cdk import aws_logs_destinations as destinations
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.monitoring.runtime.server_log import FILTER_TERMS
+
+NAMESPACE = "MinecraftOnDemand"
+
+# Lag is "sustained" when the server falls this far behind in each of three
+# out of five minutes; a single slow world load or save does not count.
+LAG_MS_PER_MINUTE = 5000
+
+
+class Monitoring(Construct):
+    """Game-level metrics parsed from the server's own log.
+
+    A subscription filter hands tick lag, join/leave, save and GC lines to a
+    Lambda that emits them as Embedded Metric Format records. Container
+    Insights covers CPU and memory; these tell whether the game keeps up.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        log_group: logs.ILogGroup,
+        runtime_layer: lambda_.ILayerVersion,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.log_metrics_lambda = lambda_.Function(
+            self,
+            "LogMetricsLambda",
+            **handlers.function_props(),
+            handler="log_metrics_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/monitoring/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(30),
+        )
+
+        logs.SubscriptionFilter(
+            self,
+            "ServerLogSubscription",
+            log_group=log_group,
+            destination=destinations.LambdaDestination(self.log_metrics_lambda),
+            filter_pattern=logs.FilterPattern.any_term(*FILTER_TERMS),
+        )
+
+        self.ms_behind = cloudwatch.Metric(
+            namespace=NAMESPACE,
+            metric_name="MsBehind",
+            statistic=cloudwatch.Stats.SUM,
+            period=Duration.minutes(1),
+        )
+
+        self.lag_alarm = cloudwatch.Alarm(
+            self,
+            "SustainedLagAlarm",
+            metric=self.ms_behind,
+            threshold=LAG_MS_PER_MINUTE,
+            comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+            evaluation_periods=5,
+            datapoints_to_alarm=3,
+            # No lines means no lag (or no server).
+            treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            alarm_description="The server has been running behind for several minutes",
+        )
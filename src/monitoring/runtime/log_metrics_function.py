@@ -0,0 +1,199 @@
+import base64
+import gzip
+import json
+import os
+
+import clients
+import lifecycle
+import server_log
+import timeline
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+
+table = clients.Table(TABLE_NAME)
+
+UNITS = {
+    "MsBehind": "Milliseconds",
+    "TicksBehind": "Count",
+    "PlayersOnline": "Count",
+    "PlayerSessionSeconds": "Seconds",
+    "ChunkSaveMs": "Milliseconds",
+    "GcPauseMs": "Milliseconds",
+    "OutOfMemoryErrors": "Count",
+}
+
+# "Saving the game" and "Saved the game" can arrive in different batches;
+# a warm container still pairs them up.
+_save_started_at_ms = {}
+
+
+def decode(event):
+    """Return the log batch carried by a CloudWatch Logs subscription event."""
+    return json.loads(gzip.decompress(base64.b64decode(event["awslogs"]["data"])))
+
+
+def stream_server_id(log_stream):
+    """The server writing ``log_stream``.
+
+    Streams are named ``<prefix>/<container>/<task id>``. The primary
+    server's prefix is its container name, a further server's its id.
+    """
+    prefix, container, _ = log_stream.split("/", 2)
+
+    return lifecycle.SERVER_ID if prefix == container else prefix
+
+
+def current_session(table, log_stream):
+    """Session of the task writing ``log_stream``, if it is the current one."""
+    item = lifecycle.read(table, stream_server_id(log_stream), consistent=False)
+    task_id = log_stream.rsplit("/", 1)[-1]
+
+    if "execution_arn" not in item or not item.get("task_arn", "").endswith(f"/{task_id}"):
+        return None
+
+    return timeline.session_id(item["execution_arn"])
+
+
+def emit(timestamp_ms, server_id, session, values):
+    print(
+        json.dumps(
+            {
+                "_aws": {
+                    "Timestamp": timestamp_ms,
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": timeline.NAMESPACE,
+                            "Dimensions": [[]],
+                            "Metrics": [{"Name": name, "Unit": UNITS[name]} for name in values],
+                        }
+                    ],
+                },
+                "ServerId": server_id,
+                "SessionId": session,
+                **values,
+            }
+        )
+    )
+
+
+def player_joined(table, session, player, at_ms):
+    """Count the player in; returns players online, or None for a duplicate."""
+    try:
+        item = table.update_item(
+            Key={"id": timeline.session_key(session)},
+            UpdateExpression="SET #joined = :at_ms ADD players_online :one",
+            # A redelivered join must not count a player who has since left.
+            ConditionExpression="attribute_not_exists(#joined) AND "
+            "(attribute_not_exists(#left) OR #left < :at_ms)",
+            ExpressionAttributeNames={
+                "#joined": f"joined_at_ms#{player}",
+                "#left": f"left_at_ms#{player}",
+            },
+            ExpressionAttributeValues={":at_ms": at_ms, ":one": 1},
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+
+    online = int(item["players_online"])
+
+    try:
+        table.update_item(
+            Key={"id": timeline.session_key(session)},
+            UpdateExpression="SET peak_players = :online",
+            ConditionExpression="attribute_not_exists(peak_players) OR peak_players < :online",
+            ExpressionAttributeValues={":online": online},
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+    return online
+
+
+def player_left(table, session, player, at_ms):
+    """Count the player out; returns ``(players online, joined at)``."""
+    try:
+        item = table.update_item(
+            Key={"id": timeline.session_key(session)},
+            UpdateExpression="SET #left = :at_ms REMOVE #joined ADD players_online :minus_one",
+            ConditionExpression="attribute_exists(#joined)",
+            ExpressionAttributeNames={
+                "#joined": f"joined_at_ms#{player}",
+                "#left": f"left_at_ms#{player}",
+            },
+            ExpressionAttributeValues={":at_ms": at_ms, ":minus_one": -1},
+            ReturnValues="ALL_OLD",
+        )["Attributes"]
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+
+    return int(item["players_online"]) - 1, int(item[f"joined_at_ms#{player}"])
+
+
+def lambda_handler(event, context):
+    batch = decode(event)
+    log_stream = batch["logStream"]
+    server_id = stream_server_id(log_stream)
+    session = current_session(table, log_stream)
+
+    emitted = 0
+    lag = {"ms": 0, "events": 0}
+
+    for log_event in batch["logEvents"]:
+        parsed = server_log.parse(log_event["message"])
+        if parsed is None:
+            continue
+
+        kind, fields = parsed
+        at_ms = log_event["timestamp"]
+        values = {}
+
+        if kind == server_log.LAG:
+            values = {"MsBehind": fields["ms"], "TicksBehind": fields["ticks"]}
+            lag["ms"] += fields["ms"]
+            lag["events"] += 1
+
+        elif kind == server_log.JOIN and session:
+            online = player_joined(table, session, fields["player"], at_ms)
+            if online is not None:
+                values = {"PlayersOnline": online}
+
+        elif kind == server_log.LEAVE and session:
+            left = player_left(table, session, fields["player"], at_ms)
+            if left is not None:
+                online, joined_at_ms = left
+                values = {
+                    "PlayersOnline": online,
+                    "PlayerSessionSeconds": (at_ms - joined_at_ms) / 1000,
+                }
+
+        elif kind == server_log.SAVE_STARTED:
+            _save_started_at_ms[log_stream] = at_ms
+
+        elif kind == server_log.SAVE_FINISHED and log_stream in _save_started_at_ms:
+            values = {"ChunkSaveMs": at_ms - _save_started_at_ms.pop(log_stream)}
+
+        elif kind == server_log.GC_PAUSE:
+            values = {"GcPauseMs": fields["ms"]}
+
+        elif kind == server_log.OUT_OF_MEMORY:
+            values = {"OutOfMemoryErrors": 1}
+
+        if values:
+            emit(at_ms, server_id, session, values)
+            emitted += 1
+
+    if session and lag["events"]:
+        # Per-session totals, e.g. to compare profiles after the fact.
+        table.update_item(
+            Key={"id": timeline.session_key(session)},
+            UpdateExpression="ADD ms_behind :ms, lag_events :events",
+            ExpressionAttributeValues={":ms": lag["ms"], ":events": lag["events"]},
+        )
+
+    return {
+        "log_stream": log_stream,
+        "server_id": server_id,
+        "session": session,
+        "metrics": emitted,
+    }
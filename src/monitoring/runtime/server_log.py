@@ -0,0 +1,61 @@
+"""Turn Minecraft server log lines into game-level measurements.
+
+Only the handful of lines that say something about tick health, players or
+saving are recognised; everything else parses to ``None``. The patterns
+match vanilla and Fabric output as written by the server container, e.g.::
+
+    [12:00:00] [Server thread/WARN]: Can't keep up! Is the server overloaded?
+        Running 2013ms or 40 ticks behind
+    [12:00:00] [Server thread/INFO]: Steve joined the game
+    [12:00:00] [Server thread/INFO]: Saving the game (this may take a moment!)
+    [12:00:00] [Server thread/INFO]: Saved the game
+    [0.123s][info][gc] GC(12) Pause Young (Normal) (G1 Evacuation Pause) 1M->1M(2M) 15.3ms
+"""
+
+import re
+
+LAG = "lag"
+JOIN = "join"
+LEAVE = "leave"
+SAVE_STARTED = "save_started"
+SAVE_FINISHED = "save_finished"
+GC_PAUSE = "gc_pause"
+OUT_OF_MEMORY = "out_of_memory"
+
+# Terms for the log subscription filter, so only these lines leave CloudWatch.
+FILTER_TERMS = (
+    "Can't keep up",
+    "joined the game",
+    "left the game",
+    "Saving the game",
+    "Saved the game",
+    "Pause",
+    "OutOfMemoryError",
+)
+
+_PATTERNS = (
+    (LAG, re.compile(r"Can't keep up!.*Running (?P<ms>\d+)ms or (?P<ticks>\d+) ticks behind")),
+    (JOIN, re.compile(r"\]: (?P<player>\w{3,16}) joined the game$")),
+    (LEAVE, re.compile(r"\]: (?P<player>\w{3,16}) left the game$")),
+    (SAVE_STARTED, re.compile(r"\]: Saving the game")),
+    (SAVE_FINISHED, re.compile(r"\]: Saved the game")),
+    # JVM unified logging; ZGC pauses are named "Pause Mark Start" and so on.
+    (GC_PAUSE, re.compile(r"\[gc\b.*\bPause\b.* (?P<ms>\d+(?:\.\d+)?)ms$")),
+    (OUT_OF_MEMORY, re.compile(r"java\.lang\.OutOfMemoryError")),
+)
+
+
+def parse(line):
+    """Return ``(kind, fields)`` for a recognised line, else ``None``."""
+    line = line.rstrip()
+
+    for kind, pattern in _PATTERNS:
+        match = pattern.search(line)
+        if match:
+            fields = match.groupdict()
+            for key in ("ms", "ticks"):
+                if key in fields:
+                    fields[key] = float(fields[key]) if "." in fields[key] else int(fields[key])
+            return kind, fields
+
+    return None
@@ -1,15 +1,36 @@
 from aws_cdk import Duration
 from aws_cdk import aws_certificatemanager as acm
 from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_elasticloadbalancingv2 as elbv2
+from aws_cdk import aws_iam as iam
 from aws_cdk import aws_route53 as route53
+from aws_cdk import aws_route53_targets as route53_targets
 from constructs import Construct
 
 from constants import DOMAIN_NAME
 
 
+SERVER_PORT = 25565
+
+
 class Network(Construct):
+    """VPC, DNS and security group of the server.
+
+    By default the server's A record is pointed at each new task's public IP
+    as it starts. With ``static_address`` the name is instead an alias of a
+    network load balancer, and each task is registered as its only target,
+    so the address players resolve never changes. The load balancer is billed
+    by the hour, also while the server is stopped.
+    """
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        static_address: bool = False,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         self.hosted_zone = route53.HostedZone.from_lookup(
@@ -25,20 +46,6 @@ class Network(Construct):
             validation=acm.CertificateValidation.from_dns(self.hosted_zone),
         )
 
-        route53.ARecord(
-            self,
-            "ARecord",
-            zone=self.hosted_zone,
-            record_name=DOMAIN_NAME,
-            target=route53.RecordTarget.from_ip_addresses("192.168.1.1"),
-            ttl=Duration.seconds(30),
-        )
-
-        route53.ARecord(self, "ApiAliasRecord",
-            zone=self.hosted_zone,
-            target=route53.RecordTarget.from_alias(targets.ApiGatewayDomain(custom_domain))
-        )
-
         self.vpc = ec2.Vpc(
             self,
             "VPC",
@@ -65,6 +72,12 @@ class Network(Construct):
             service=ec2.GatewayVpcEndpointAwsService.S3,
         )
 
+        # Lambdas in the VPC (e.g. backups on EFS) read the state table.
+        self.vpc.add_gateway_endpoint(
+            "dynamodb-gw-endpoint",
+            service=ec2.GatewayVpcEndpointAwsService.DYNAMODB,
+        )
+
         self.security_group = ec2.SecurityGroup(
             self,
             "ServiceSecurityGroup",
@@ -75,7 +88,7 @@ class Network(Construct):
 
         self.security_group.add_ingress_rule(
             peer=ec2.Peer.any_ipv4(),
-            connection=ec2.Port.tcp(25565),
+            connection=ec2.Port.tcp(SERVER_PORT),
         )
 
         self.security_group.add_ingress_rule(
@@ -83,3 +96,87 @@ class Network(Construct):
             connection=ec2.Port.tcp(2049),
             description="Allow NFS traffic",
         )
+
+        # RCON stays inside the security group, e.g. for maintenance jobs.
+        self.security_group.add_ingress_rule(
+            peer=self.security_group,
+            connection=ec2.Port.tcp(25575),
+            description="Allow RCON from within the security group",
+        )
+
+        self.load_balancer = None
+        self.target_group = None
+
+        if static_address:
+            self.load_balancer = elbv2.NetworkLoadBalancer(
+                self,
+                "LoadBalancer",
+                vpc=self.vpc,
+                internet_facing=True,
+                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
+                # The single target lives in one zone; without this, clients
+                # resolving a node in another zone get no answer.
+                cross_zone_enabled=True,
+            )
+
+            self.target_group = elbv2.NetworkTargetGroup(
+                self,
+                "ServerTargetGroup",
+                vpc=self.vpc,
+                port=SERVER_PORT,
+                protocol=elbv2.Protocol.TCP,
+                target_type=elbv2.TargetType.IP,
+                # Sessions end with the task, so there is nothing to drain.
+                deregistration_delay=Duration.seconds(10),
+                health_check=elbv2.HealthCheck(
+                    protocol=elbv2.Protocol.TCP,
+                    interval=Duration.seconds(10),
+                    healthy_threshold_count=2,
+                    unhealthy_threshold_count=2,
+                ),
+            )
+
+            self.load_balancer.add_listener(
+                "ServerListener",
+                port=SERVER_PORT,
+                protocol=elbv2.Protocol.TCP,
+                default_target_groups=[self.target_group],
+            )
+
+            route53.ARecord(
+                self,
+                "ARecord",
+                zone=self.hosted_zone,
+                record_name=DOMAIN_NAME,
+                target=route53.RecordTarget.from_alias(
+                    route53_targets.LoadBalancerTarget(self.load_balancer)
+                ),
+            )
+        else:
+            route53.ARecord(
+                self,
+                "ARecord",
+                zone=self.hosted_zone,
+                record_name=DOMAIN_NAME,
+                target=route53.RecordTarget.from_ip_addresses("192.168.1.1"),
+                ttl=Duration.seconds(30),
+            )
+
+    def grant_target_registration(self, grantee: iam.IGrantable) -> None:
+        """Let ``grantee`` swap the server task in and out of the target group."""
+        grantee.grant_principal.add_to_principal_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "elasticloadbalancing:RegisterTargets",
+                    "elasticloadbalancing:DeregisterTargets",
+                ],
+                resources=[self.target_group.target_group_arn],
+            )
+        )
+        # DescribeTargetHealth does not support resource-level permissions.
+        grantee.grant_principal.add_to_principal_policy(
+            iam.PolicyStatement(
+                actions=["elasticloadbalancing:DescribeTargetHealth"],
+                resources=["*"],
+            )
+        )
@@ -1,34 +1,117 @@
 import json
 import os
+import random
+import time
 
-import boto3
+import clients
+import lifecycle
+import targets
+import timeline
 
-ecs = boto3.client("ecs")
-ec2 = boto3.client("ec2")
-route53 = boto3.client("route53")
+# Most events carry everything but the public IP, so ECS and the load
+# balancer are rarely called; they are only built when they are.
+ecs = clients.LazyClient("ecs")
+ec2 = clients.LazyClient("ec2")
+elbv2 = clients.LazyClient("elbv2")
+route53 = clients.LazyClient("route53")
 
 HOSTED_ZONE_ID = os.environ.get("HOSTED_ZONE_ID")
 DOMAIN_NAME = os.environ.get("DOMAIN_NAME")
+RECORD_NAME = os.environ.get("RECORD_NAME", DOMAIN_NAME)
+TABLE_NAME = os.environ.get("TABLE_NAME")
+RECORD_TTL = int(os.environ.get("RECORD_TTL", "30"))
+# Set in static-address mode: the record never changes and the task is
+# registered behind the load balancer instead.
+TARGET_GROUP_ARN = os.environ.get("TARGET_GROUP_ARN")
 
+table = clients.Table(TABLE_NAME)
 
-def lambda_handler(event, context):
-    # Extract task ARN from SNS message
-    message = json.loads(event["Records"][0]["Sns"]["Message"])
-    task_arn = message["detail"]["taskArn"]
-    cluster_arn = message["detail"]["clusterArn"]
+# The public IP is associated with the task ENI shortly after RUNNING, so the
+# lookup is the one step that is worth retrying.
+ENI_LOOKUP_ATTEMPTS = int(os.environ.get("ENI_LOOKUP_ATTEMPTS", "6"))
+ENI_LOOKUP_BASE_DELAY = float(os.environ.get("ENI_LOOKUP_BASE_DELAY", "0.25"))
+
+
+def task_events(event):
+    """Yield ECS task state change events from an SNS batch or EventBridge."""
+    if "detail-type" in event:
+        yield event
+        return
+
+    for record in event.get("Records", []):
+        yield json.loads(record["Sns"]["Message"])
+
+
+def network_interface_id(detail):
+    for attachment in detail.get("attachments", []):
+        if attachment.get("type") != "eni":
+            continue
 
-    # Describe the task to get the public IP
-    response = ecs.describe_tasks(cluster=cluster_arn, tasks=[task_arn])
+        for item in attachment.get("details", []):
+            if item["name"] == "networkInterfaceId":
+                return item["value"]
+
+    # Older events may omit attachment details; ask ECS only in that case.
+    response = ecs.describe_tasks(cluster=detail["clusterArn"], tasks=[detail["taskArn"]])
     task = response["tasks"][0]
-    eni_id = next(
-        detail["value"]
-        for detail in task["attachments"][0]["details"]
-        if detail["name"] == "networkInterfaceId"
+
+    return next(
+        item["value"]
+        for item in task["attachments"][0]["details"]
+        if item["name"] == "networkInterfaceId"
     )
 
-    public_ip = ec2.describe_network_interfaces(NetworkInterfaceIds=[eni_id])[
-        "NetworkInterfaces"
-    ][0]["Association"]["PublicIp"]
+
+def private_ip(detail):
+    for attachment in detail.get("attachments", []):
+        for item in attachment.get("details", []):
+            if item["name"] == "privateIPv4Address":
+                return item["value"]
+
+    return None
+
+
+def public_ip(eni_id):
+    for attempt in range(ENI_LOOKUP_ATTEMPTS):
+        try:
+            interface = ec2.describe_network_interfaces(NetworkInterfaceIds=[eni_id])[
+                "NetworkInterfaces"
+            ][0]
+            address = interface.get("Association", {}).get("PublicIp")
+        except ec2.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] != "InvalidNetworkInterfaceID.NotFound":
+                raise
+            address = None
+
+        if address:
+            return address
+
+        if attempt < ENI_LOOKUP_ATTEMPTS - 1:
+            # Full jitter keeps concurrent invocations from retrying in step.
+            time.sleep(random.uniform(0, ENI_LOOKUP_BASE_DELAY * 2**attempt))
+
+    raise RuntimeError(f"No public IP associated with {eni_id}")
+
+
+def current_addresses(record_name):
+    response = route53.list_resource_record_sets(
+        HostedZoneId=HOSTED_ZONE_ID,
+        StartRecordName=record_name,
+        StartRecordType="A",
+        MaxItems="1",
+    )
+
+    for record_set in response["ResourceRecordSets"]:
+        if record_set["Name"].rstrip(".") == record_name.rstrip(".") and record_set["Type"] == "A":
+            return [record["Value"] for record in record_set.get("ResourceRecords", [])]
+
+    return []
+
+
+def upsert_record(record_name, address):
+    """Point the A record at ``address``; returns False if it already did."""
+    if current_addresses(record_name) == [address]:
+        return False
 
     route53.change_resource_record_sets(
         HostedZoneId=HOSTED_ZONE_ID,
@@ -37,17 +120,120 @@ def lambda_handler(event, context):
                 {
                     "Action": "UPSERT",
                     "ResourceRecordSet": {
-                        "Name": DOMAIN_NAME,
+                        "Name": record_name,
                         "Type": "A",
-                        "TTL": 30,
-                        "ResourceRecords": [{"Value": public_ip}],
+                        "TTL": RECORD_TTL,
+                        "ResourceRecords": [{"Value": address}],
                     },
                 }
             ]
         },
     )
 
+    return True
+
+
+# ECS task timestamps that map onto session timeline phases.
+TASK_PHASES = {
+    "createdAt": "task_created",
+    "pullStartedAt": "image_pull_started",
+    "pullStoppedAt": "image_pull_stopped",
+    "startedAt": "task_running",
+}
+
+
+def advance(table, to_state, execution_arn, server_id, attributes=None):
+    try:
+        lifecycle.transition(
+            table,
+            to_state,
+            execution_arn=execution_arn,
+            attributes=attributes,
+            server_id=server_id,
+        )
+    except lifecycle.TransitionConflict:
+        # A duplicate event, or the session was stopped in the meantime.
+        pass
+
+
+def lambda_handler(event, context):
+    results = []
+
+    for message in task_events(event):
+        detail = message["detail"]
+        server_id = lifecycle.task_server_id(detail)
+        # Further servers are reachable under their own subdomain.
+        default_record_name = (
+            RECORD_NAME if server_id == lifecycle.SERVER_ID else f"{server_id}.{DOMAIN_NAME}"
+        )
+        # Rules for tasks other than the server (e.g. the wake listener) name
+        # their own record and do not belong to a server session.
+        record_name = message.get("record_name", default_record_name)
+        item = None if "record_name" in message else lifecycle.read(table, server_id)
+
+        if item and item["state"] == lifecycle.MAINTENANCE:
+            # Maintenance runs (e.g. chunk pre-generation) are not for players,
+            # so leave DNS alone and only tell the job where the server is.
+            address = private_ip(detail)
+            try:
+                lifecycle.update(
+                    table,
+                    item["version"],
+                    {"maintenance_address": address},
+                    server_id=server_id,
+                )
+            except lifecycle.TransitionConflict:
+                pass
+
+            results.append({"task_arn": detail["taskArn"], "private_ip": address})
+            continue
+
+        execution_arn = item.get("execution_arn") if item else None
+        session = timeline.session_id(execution_arn) if execution_arn else None
+
+        if session:
+            timeline.record(
+                table,
+                session,
+                {
+                    phase: timeline.iso_to_ms(detail[key])
+                    for key, phase in TASK_PHASES.items()
+                    if key in detail
+                },
+            )
+            attributes = {"task_arn": detail["taskArn"]}
+            address = private_ip(detail)
+            if address:
+                # Where the stop path reaches the server over RCON.
+                attributes["private_ip"] = address
+            advance(table, lifecycle.RUNNING, execution_arn, server_id, attributes)
+
+        behind_load_balancer = server_id == lifecycle.SERVER_ID and "record_name" not in message
+
+        if TARGET_GROUP_ARN and behind_load_balancer:
+            updated = targets.register(elbv2, TARGET_GROUP_ARN, private_ip(detail))
+            # The readiness probe still pings the task directly.
+            address = public_ip(network_interface_id(detail))
+        else:
+            address = public_ip(network_interface_id(detail))
+            updated = upsert_record(record_name, address)
+
+        if session:
+            timeline.record(table, session, {"dns_ready": timeline.now_ms()})
+            advance(
+                table, lifecycle.DNS_READY, execution_arn, server_id, {"public_ip": address}
+            )
+
+        results.append(
+            {
+                "task_arn": detail["taskArn"],
+                "record_name": record_name,
+                "public_ip": address,
+                "updated": updated,
+            }
+        )
+
     return {
         "statusCode": 200,
-        "body": json.dumps(f"A record updated successfully. IP: {public_ip}"),
+        "body": json.dumps(results),
     }
@@ -0,0 +1,65 @@
+from aws_cdk import Duration
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_lambda as lambda_
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+
+
+class Prewarm(Construct):
+    """Start the server shortly before players usually show up.
+
+    Once an hour, ``lead_minutes`` before the hour, a Lambda forecasts from
+    the session history whether a session will start in the coming hour and,
+    if it is at least ``threshold`` likely, starts the server through the
+    launcher like any other request. Pre-warmed sessions wait longer for
+    their first player, then autostop reclaims them as usual.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        table: dynamodb.ITable,
+        launcher_lambda: lambda_.IFunction,
+        runtime_layer: lambda_.ILayerVersion,
+        lead_minutes: int = 10,
+        threshold: float = 0.5,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        if not 1 <= lead_minutes <= 59:
+            raise ValueError("lead_minutes must be between 1 and 59")
+
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be a probability above 0")
+
+        self.prewarm_lambda = lambda_.Function(
+            self,
+            "PrewarmLambda",
+            **handlers.function_props(),
+            handler="prewarm_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/prewarm/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(60),
+            environment={
+                "TABLE_NAME": table.table_name,
+                "LAUNCHER_FUNCTION_NAME": launcher_lambda.function_name,
+                "LEAD_MINUTES": str(lead_minutes),
+                "THRESHOLD": str(threshold),
+            },
+        )
+
+        table.grant_read_data(self.prewarm_lambda)
+        launcher_lambda.grant_invoke(self.prewarm_lambda)
+
+        events.Rule(
+            self,
+            "PrewarmSchedule",
+            schedule=events.Schedule.cron(minute=str(60 - lead_minutes)),
+            targets=[targets.LambdaFunction(self.prewarm_lambda)],
+        )
@@ -0,0 +1,149 @@
+"""Forecast when players will want the server, from its session history.
+
+Demand is bucketed by hour of the week in UTC. The probability that a
+session starts in a given hour is the share of the same hour in past weeks
+that saw one, with recent weeks weighted more so a changed routine is
+picked up within a few weeks. Everything here is plain arithmetic on
+millisecond timestamps, so forecasts can be backtested offline.
+"""
+
+HOUR_MS = 60 * 60 * 1000
+WEEK_MS = 7 * 24 * HOUR_MS
+
+# A session that outlived its idle allowance by this much had players.
+USE_SLACK_MS = 2 * 60 * 1000
+
+DEFAULT_WEEKS = 8
+DEFAULT_HALF_LIFE_WEEKS = 2.0
+# Hours seen fewer times than this are never forecast; one lucky evening
+# does not make a habit.
+DEFAULT_MIN_WEEKS = 2
+
+
+def hour_start(at_ms):
+    return at_ms - at_ms % HOUR_MS
+
+
+def was_used(item):
+    """True if anyone played during a (pre-warmed) session."""
+    if int(item.get("peak_players", 0)) > 0 or "demanded_at_ms" in item:
+        return True
+
+    # Without player metrics, a server that nobody joins stops once its
+    # idle allowance runs out; running for longer means someone did.
+    if "stopped_at_ms" not in item or "playable_at_ms" not in item:
+        return False
+
+    idle_ms = int(item.get("autostop_timeout_init", 0)) * 1000
+    return int(item["stopped_at_ms"]) - int(item["playable_at_ms"]) > idle_ms + USE_SLACK_MS
+
+
+def demand_times(sessions):
+    """Yield when players wanted the server, one timestamp per session item.
+
+    A pre-warmed session counts at the hour it was warmed for, and only if
+    someone used it, so the forecast never learns from its own guesses.
+    """
+    for item in sessions:
+        if item.get("prewarmed"):
+            if was_used(item):
+                yield int(item["prewarm_for_ms"])
+        elif "requested_at_ms" in item:
+            yield int(item["requested_at_ms"])
+
+
+def _probability(hours, first_hour, target_ms, now_ms, weeks, half_life_weeks, min_weeks):
+    target_hour = hour_start(target_ms)
+    hits = seen = 0.0
+    observations = 0
+
+    for week in range(1, weeks + 1):
+        hour = target_hour - week * WEEK_MS
+        if hour < first_hour:
+            break
+        if hour + HOUR_MS > now_ms:
+            # Not over yet, so it says nothing either way.
+            continue
+
+        weight = 0.5 ** ((week - 1) / half_life_weeks)
+        seen += weight
+        observations += 1
+        if hour in hours:
+            hits += weight
+
+    if observations < min_weeks:
+        return 0.0
+
+    return hits / seen
+
+
+def probability(
+    demand_ms,
+    target_ms,
+    now_ms,
+    *,
+    weeks=DEFAULT_WEEKS,
+    half_life_weeks=DEFAULT_HALF_LIFE_WEEKS,
+    min_weeks=DEFAULT_MIN_WEEKS,
+):
+    """Probability of a session starting in the hour of ``target_ms``.
+
+    Only demand known at ``now_ms`` is used, and only the weeks since the
+    first recorded session, so a new server is not judged by weeks in which
+    it did not exist yet.
+    """
+    hours = {hour_start(at_ms) for at_ms in demand_ms if at_ms < now_ms}
+    if not hours:
+        return 0.0
+
+    return _probability(
+        hours, min(hours), target_ms, now_ms, weeks, half_life_weeks, min_weeks
+    )
+
+
+def backtest(
+    demand_ms,
+    start_ms,
+    end_ms,
+    *,
+    threshold,
+    lead_ms,
+    weeks=DEFAULT_WEEKS,
+    half_life_weeks=DEFAULT_HALF_LIFE_WEEKS,
+    min_weeks=DEFAULT_MIN_WEEKS,
+):
+    """Replay the scheduler hour by hour over ``[start_ms, end_ms)``.
+
+    Each hour is forecast ``lead_ms`` before it begins from the demand seen
+    up to then, as the scheduler would, and compared with what happened.
+    """
+    demand = sorted(demand_ms)
+    hours = {hour_start(at_ms) for at_ms in demand}
+    first_hour = hour_start(demand[0]) if demand else None
+
+    report = {"hours": 0, "prewarms": 0, "hits": 0, "wasted": 0, "missed": 0}
+    hour = hour_start(start_ms)
+
+    while hour < end_ms:
+        decided_at_ms = hour - lead_ms
+        likely = first_hour is not None and first_hour < decided_at_ms and (
+            _probability(
+                hours, first_hour, hour, decided_at_ms, weeks, half_life_weeks, min_weeks
+            )
+            >= threshold
+        )
+        happened = hour in hours
+
+        report["hours"] += 1
+        report["prewarms"] += likely
+        report["hits"] += likely and happened
+        report["wasted"] += likely and not happened
+        report["missed"] += happened and not likely
+
+        hour += HOUR_MS
+
+    demanded = report["hits"] + report["missed"]
+    report["precision"] = report["hits"] / report["prewarms"] if report["prewarms"] else 0.0
+    report["recall"] = report["hits"] / demanded if demanded else 0.0
+
+    return report
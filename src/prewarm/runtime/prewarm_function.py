@@ -0,0 +1,61 @@
+import json
+import os
+
+import clients
+import forecast
+import timeline
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+LAUNCHER_FUNCTION_NAME = os.environ["LAUNCHER_FUNCTION_NAME"]
+LEAD_MINUTES = int(os.environ.get("LEAD_MINUTES", "10"))
+THRESHOLD = float(os.environ.get("THRESHOLD", "0.5"))
+HISTORY_WEEKS = int(os.environ.get("HISTORY_WEEKS", str(forecast.DEFAULT_WEEKS)))
+# How long into the forecast hour a pre-warmed server waits for players.
+GRACE_MINUTES = int(os.environ.get("GRACE_MINUTES", "20"))
+
+table = clients.Table(TABLE_NAME)
+lambda_client = clients.LazyClient("lambda")
+
+
+def lambda_handler(event, context):
+    """Start the server ahead of an hour in which players are likely to come.
+
+    Runs ``LEAD_MINUTES`` before every full hour and forecasts the hour that
+    is about to begin.
+    """
+    now_ms = timeline.now_ms()
+    # Half an hour of margin either way, so a late or early trigger still
+    # lands on the coming hour.
+    target_ms = forecast.hour_start(now_ms + LEAD_MINUTES * 60 * 1000 + forecast.HOUR_MS // 2)
+
+    # Only the primary server is pre-warmed.
+    sessions = timeline.history(
+        table,
+        now_ms - HISTORY_WEEKS * forecast.WEEK_MS,
+        server_id=timeline.PRIMARY_SERVER_ID,
+    )
+    probability = forecast.probability(
+        list(forecast.demand_times(sessions)), target_ms, now_ms, weeks=HISTORY_WEEKS
+    )
+
+    result = {"for_ms": target_ms, "probability": probability, "prewarmed": False}
+
+    if probability >= THRESHOLD:
+        response = lambda_client.invoke(
+            FunctionName=LAUNCHER_FUNCTION_NAME,
+            Payload=json.dumps(
+                {
+                    "prewarm": {
+                        "for_ms": target_ms,
+                        # The server stops itself if nobody has joined by then.
+                        "autostop_timeout_init": (LEAD_MINUTES + GRACE_MINUTES) * 60,
+                    }
+                }
+            ),
+        )
+        # 409 means the server was already up; nothing to warm.
+        result["prewarmed"] = json.loads(response["Payload"].read())["statusCode"] == 200
+
+    print(json.dumps(result))
+
+    return result
@@ -0,0 +1,148 @@
+from aws_cdk import Duration, RemovalPolicy
+from aws_cdk import aws_cloudwatch as cloudwatch
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_stepfunctions as sfn
+from aws_cdk import aws_stepfunctions_tasks as tasks
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.network.infrastructure import Network
+from src.storage.infrastructure import Storage
+
+MOUNT_PATH = "/mnt/data"
+
+
+class Profiler(Construct):
+    """spark profiler captures of a running server, kept in S3.
+
+    The state machine takes ``{"trigger": ..., "duration_seconds": ...,
+    "mode": "cpu" | "alloc"}``, all optional. It starts spark over RCON,
+    lets it run, then stops it and uploads the saved profile under the
+    session ID. The S3 URI is appended to ``profiles`` on the session item.
+    With ``lag_alarm``, a capture starts whenever the alarm fires.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        network: Network,
+        storage: Storage,
+        runtime_layer: lambda_.ILayerVersion,
+        lag_alarm: cloudwatch.IAlarm = None,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.bucket = s3.Bucket(
+            self,
+            "ProfileBucket",
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.RETAIN,
+            lifecycle_rules=[s3.LifecycleRule(expiration=Duration.days(90))],
+        )
+
+        self.start_lambda = lambda_.Function(
+            self,
+            "StartProfilerLambda",
+            **handlers.function_props(),
+            handler="start_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/profiler/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(30),
+            # RCON is only reachable from inside the VPC.
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+        )
+
+        self.collect_lambda = lambda_.Function(
+            self,
+            "CollectProfileLambda",
+            **handlers.function_props(),
+            handler="collect_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/profiler/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(60),
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+            # spark saves into the server's config directory on EFS.
+            filesystem=lambda_.FileSystem.from_efs_access_point(storage.access_point, MOUNT_PATH),
+            environment={
+                "BUCKET": self.bucket.bucket_name,
+                "PROFILE_DIR": f"{MOUNT_PATH}/config/spark",
+            },
+        )
+
+        self.bucket.grant_put(self.collect_lambda)
+
+        start = tasks.LambdaInvoke(
+            self,
+            "StartProfiler",
+            lambda_function=self.start_lambda,
+            payload_response_only=True,
+            result_path="$.profile",
+        )
+
+        start.add_catch(
+            sfn.Fail(self, "NothingToProfile", cause="The server is not running or already profiled"),
+            errors=["ServerNotRunning", "ProfilerBusy"],
+        )
+
+        collect = tasks.LambdaInvoke(
+            self,
+            "CollectProfile",
+            lambda_function=self.collect_lambda,
+            payload=sfn.TaskInput.from_json_path_at("$.profile"),
+            payload_response_only=True,
+            result_path="$.profile",
+        )
+
+        # spark writes the file in the background after "stop".
+        collect.add_retry(
+            errors=["ProfileNotReady"],
+            interval=Duration.seconds(5),
+            backoff_rate=1.5,
+            max_attempts=6,
+        )
+
+        self.state_machine = sfn.StateMachine(
+            self,
+            "ProfilerStateMachine",
+            definition_body=sfn.DefinitionBody.from_chainable(
+                start.next(
+                    sfn.Wait(
+                        self,
+                        "Profiling",
+                        time=sfn.WaitTime.seconds_path("$.profile.duration_seconds"),
+                    )
+                ).next(collect)
+            ),
+            timeout=Duration.minutes(20),
+        )
+
+        if lag_alarm:
+            events.Rule(
+                self,
+                "ProfileOnLag",
+                event_pattern=events.EventPattern(
+                    source=["aws.cloudwatch"],
+                    detail_type=["CloudWatch Alarm State Change"],
+                    resources=[lag_alarm.alarm_arn],
+                    detail={"state": {"value": ["ALARM"]}},
+                ),
+                targets=[
+                    targets.SfnStateMachine(
+                        self.state_machine,
+                        input=events.RuleTargetInput.from_object({"trigger": "lag-alarm"}),
+                    )
+                ],
+            )
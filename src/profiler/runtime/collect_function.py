@@ -0,0 +1,95 @@
+import os
+import time
+
+import clients
+import lifecycle
+import rcon
+import timeline
+from replies import log
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+BUCKET = os.environ.get("BUCKET")
+# Where spark writes profiles saved with --save-to-file on a Fabric server.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/mnt/data/config/spark")
+RCON_PORT = int(os.environ.get("RCON_PORT", rcon.DEFAULT_PORT))
+RCON_TIMEOUT_SECONDS = float(os.environ.get("RCON_TIMEOUT_SECONDS", "10"))
+
+if not TABLE_NAME or not BUCKET:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+s3 = clients.LazyClient("s3")
+
+
+class ProfileNotReady(Exception):
+    """spark has not finished writing the profile yet; the workflow retries."""
+
+
+def newest_profile(directory, since):
+    """Return the newest ``.sparkprofile`` written at or after ``since``."""
+    newest = None
+
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(".sparkprofile"):
+                continue
+
+            path = os.path.join(root, name)
+            modified = os.stat(path).st_mtime
+            if modified >= since and (newest is None or modified > newest[0]):
+                newest = (modified, path)
+
+    return newest and newest[1]
+
+
+def stop_profiler(item):
+    """Ask spark to stop and save to disk; fine if it already has."""
+    if item.get("private_ip") is None:
+        return
+
+    try:
+        with rcon.Client(
+            item["private_ip"], item["rcon_password"], port=RCON_PORT, timeout=RCON_TIMEOUT_SECONDS
+        ) as client:
+            client.command("spark profiler stop --save-to-file")
+    except (rcon.RconError, OSError) as e:
+        # The server may have stopped meanwhile; whatever spark saved is
+        # still on disk.
+        log("Could not stop the profiler", level="WARNING", error=e)
+
+
+def lambda_handler(event, context):
+    """Stop the profiler, upload its output and link it from the session.
+
+    ``event`` is the output of the start step.
+    """
+    session = event["session"]
+
+    # Retries send this again, which spark answers with "not running".
+    stop_profiler(lifecycle.read(table, event.get("server_id", lifecycle.SERVER_ID)))
+
+    path = newest_profile(PROFILE_DIR, event["started_at"])
+    if path is None:
+        raise ProfileNotReady(f"No profile in {PROFILE_DIR} since {event['started_at']}")
+
+    key = f"profiles/{session}/{event['started_at']}-{event['mode']}.sparkprofile"
+    s3.upload_file(path, BUCKET, key)
+
+    profile = {
+        "uri": f"s3://{BUCKET}/{key}",
+        "mode": event["mode"],
+        "trigger": event["trigger"],
+        "started_at": event["started_at"],
+        "collected_at": int(time.time()),
+    }
+
+    table.update_item(
+        Key={"id": timeline.session_key(session)},
+        UpdateExpression="SET profiles = list_append(if_not_exists(profiles, :none), :profile)",
+        ExpressionAttributeValues={":none": [], ":profile": [profile]},
+    )
+
+    # The copy in S3 is the one that is kept.
+    os.remove(path)
+
+    return profile
@@ -0,0 +1,74 @@
+import os
+import time
+
+import clients
+import lifecycle
+import rcon
+import timeline
+
+TABLE_NAME = os.environ.get("TABLE_NAME")
+RCON_PORT = int(os.environ.get("RCON_PORT", rcon.DEFAULT_PORT))
+RCON_TIMEOUT_SECONDS = float(os.environ.get("RCON_TIMEOUT_SECONDS", "10"))
+DEFAULT_DURATION_SECONDS = int(os.environ.get("DEFAULT_DURATION_SECONDS", "60"))
+MAX_DURATION_SECONDS = 600
+
+if not TABLE_NAME:
+    raise ValueError("Missing required environment variables")
+
+table = clients.Table(TABLE_NAME)
+
+
+class ServerNotRunning(Exception):
+    """There is no playable server to profile."""
+
+
+class ProfilerBusy(Exception):
+    """spark is already profiling, e.g. for an earlier request."""
+
+
+def start_command(mode):
+    if mode == "alloc":
+        # Samples allocations instead of CPU time.
+        return "spark profiler start --alloc"
+    if mode == "cpu":
+        return "spark profiler start"
+
+    raise ValueError(f"Unknown profiler mode {mode!r}, expected 'cpu' or 'alloc'")
+
+
+def lambda_handler(event, context):
+    """Start a spark profiler run on the current server over RCON.
+
+    Returns what the collect step needs: the server and session, when
+    profiling began and how long to let it run.
+    """
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+    if server_id != lifecycle.SERVER_ID:
+        # spark is only installed on, and collected from, the primary server.
+        raise ServerNotRunning(f"Server {server_id} cannot be profiled")
+
+    item = lifecycle.read(table, server_id)
+
+    if item["state"] != lifecycle.PLAYABLE or "private_ip" not in item:
+        raise ServerNotRunning(f"Server is {item['state']}")
+
+    mode = event.get("mode", "cpu")
+    duration = min(int(event.get("duration_seconds", DEFAULT_DURATION_SECONDS)), MAX_DURATION_SECONDS)
+    started_at = int(time.time())
+
+    with rcon.Client(
+        item["private_ip"], item["rcon_password"], port=RCON_PORT, timeout=RCON_TIMEOUT_SECONDS
+    ) as client:
+        output = client.command(start_command(mode))
+
+    if "already" in output.lower():
+        raise ProfilerBusy(output)
+
+    return {
+        "server_id": server_id,
+        "session": timeline.session_id(item["execution_arn"]),
+        "mode": mode,
+        "trigger": event.get("trigger", "api"),
+        "duration_seconds": duration,
+        "started_at": started_at,
+    }
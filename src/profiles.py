@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+
+# Memory sizes (MiB) Fargate accepts for each task CPU size.
+FARGATE_MEMORY_MIB = {
+    256: (512, 1024, 2048),
+    512: tuple(range(1024, 4096 + 1, 1024)),
+    1024: tuple(range(2048, 8192 + 1, 1024)),
+    2048: tuple(range(4096, 16384 + 1, 1024)),
+    4096: tuple(range(8192, 30720 + 1, 1024)),
+    8192: tuple(range(16384, 61440 + 1, 4096)),
+    16384: tuple(range(32768, 122880 + 1, 8192)),
+}
+
+G1 = "G1"
+ZGC = "ZGC"
+
+# Aikar's G1 flags, the usual baseline for Minecraft servers.
+G1_FLAGS = (
+    "-XX:+UseG1GC",
+    "-XX:+ParallelRefProcEnabled",
+    "-XX:MaxGCPauseMillis=200",
+    "-XX:+UnlockExperimentalVMOptions",
+    "-XX:+DisableExplicitGC",
+    "-XX:+AlwaysPreTouch",
+    "-XX:G1HeapWastePercent=5",
+    "-XX:G1MixedGCCountTarget=4",
+    "-XX:InitiatingHeapOccupancyPercent=15",
+    "-XX:G1MixedGCLiveThresholdPercent=90",
+    "-XX:G1RSetUpdatingPauseTimePercent=5",
+    "-XX:SurvivorRatio=32",
+    "-XX:+PerfDisableSharedMem",
+    "-XX:MaxTenuringThreshold=1",
+)
+
+# Aikar's young generation sizing depends on the heap size.
+G1_SMALL_HEAP_FLAGS = (
+    "-XX:G1NewSizePercent=30",
+    "-XX:G1MaxNewSizePercent=40",
+    "-XX:G1HeapRegionSize=8M",
+    "-XX:G1ReservePercent=20",
+)
+G1_LARGE_HEAP_FLAGS = (
+    "-XX:G1NewSizePercent=40",
+    "-XX:G1MaxNewSizePercent=50",
+    "-XX:G1HeapRegionSize=16M",
+    "-XX:G1ReservePercent=15",
+)
+G1_LARGE_HEAP_MIB = 12 * 1024
+
+# Heavy modpacks allocate fast enough that concurrent collection pays off.
+ZGC_FLAGS = (
+    "-XX:+UseZGC",
+    "-XX:+ZGenerational",
+    "-XX:+DisableExplicitGC",
+    "-XX:+AlwaysPreTouch",
+    "-XX:+PerfDisableSharedMem",
+)
+
+# GC pauses in the server log, in the unified logging format the server
+# metrics parse: "[0.123s][info][gc] GC(12) Pause Young (Normal) ... 15.3ms".
+GC_LOG_FLAGS = ("-Xlog:gc:stdout",)
+
+MIN_HEAP_MIB = 1024
+MIN_OFF_HEAP_MIB = 1024
+
+
+@dataclass(frozen=True)
+class ServerProfile:
+    """Task size and the server and JVM settings that have to match it.
+
+    The heap is whatever is left of the task memory after the off-heap
+    headroom (metaspace, thread stacks, direct buffers, the container's own
+    processes), so changing the task size moves the heap with it. Invalid
+    combinations raise ``ValueError`` when the profile is created, i.e. at
+    synth time.
+    """
+
+    name: str
+    cpu: int
+    memory_mib: int
+    gc: str = G1
+    view_distance: int = 8
+    simulation_distance: int = 4
+    network_compression_threshold: int = 512
+    sync_chunk_writes: bool = False
+    # Defaults to a quarter of the task memory, but never less than 1 GiB.
+    off_heap_mib: int = None
+
+    def __post_init__(self):
+        if self.off_heap_mib is None:
+            object.__setattr__(self, "off_heap_mib", max(MIN_OFF_HEAP_MIB, self.memory_mib // 4))
+
+        if self.memory_mib not in FARGATE_MEMORY_MIB.get(self.cpu, ()):
+            raise ValueError(
+                f"Profile {self.name!r}: Fargate does not support {self.cpu} CPU "
+                f"with {self.memory_mib} MiB"
+            )
+
+        if self.gc not in (G1, ZGC):
+            raise ValueError(f"Profile {self.name!r}: unknown garbage collector {self.gc!r}")
+
+        if self.off_heap_mib < MIN_OFF_HEAP_MIB:
+            raise ValueError(
+                f"Profile {self.name!r}: off-heap headroom must be at least {MIN_OFF_HEAP_MIB} MiB"
+            )
+
+        if self.heap_mib < MIN_HEAP_MIB:
+            raise ValueError(
+                f"Profile {self.name!r}: {self.memory_mib} MiB leaves only "
+                f"{self.heap_mib} MiB of heap"
+            )
+
+        if not 2 <= self.view_distance <= 32:
+            raise ValueError(f"Profile {self.name!r}: view distance must be between 2 and 32")
+
+        if not 2 <= self.simulation_distance <= self.view_distance:
+            raise ValueError(
+                f"Profile {self.name!r}: simulation distance must be between 2 and "
+                "the view distance"
+            )
+
+    @property
+    def heap_mib(self) -> int:
+        return self.memory_mib - self.off_heap_mib
+
+    @property
+    def jvm_flags(self) -> tuple:
+        if self.gc == ZGC:
+            return ZGC_FLAGS
+
+        if self.heap_mib >= G1_LARGE_HEAP_MIB:
+            return G1_FLAGS + G1_LARGE_HEAP_FLAGS
+
+        return G1_FLAGS + G1_SMALL_HEAP_FLAGS
+
+    def environment(self) -> dict:
+        """Container environment for the itzg/minecraft-server image."""
+        return {
+            # Equal initial and max heap, so the heap is committed up front.
+            "MEMORY": f"{self.heap_mib}M",
+            "JVM_XX_OPTS": " ".join(self.jvm_flags),
+            "JVM_OPTS": " ".join(GC_LOG_FLAGS),
+            "VIEW_DISTANCE": str(self.view_distance),
+            "SIMULATION_DISTANCE": str(self.simulation_distance),
+            "NETWORK_COMPRESSION_THRESHOLD": str(self.network_compression_threshold),
+            "SYNC_CHUNK_WRITES": str(self.sync_chunk_writes).upper(),
+        }
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        ServerProfile(
+            name="small",
+            cpu=1024,
+            memory_mib=4096,
+        ),
+        ServerProfile(
+            name="standard",
+            cpu=2048,
+            memory_mib=6144,
+        ),
+        ServerProfile(
+            name="heavy-modpack",
+            cpu=4096,
+            memory_mib=16384,
+            gc=ZGC,
+            view_distance=10,
+            simulation_distance=6,
+        ),
+    )
+}
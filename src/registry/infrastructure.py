@@ -0,0 +1,81 @@
+from aws_cdk import Stack
+from aws_cdk import aws_ecr as ecr
+from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_secretsmanager as secretsmanager
+from constructs import Construct
+
+from constants import (
+    BEDROCK_EDITION_DOCKER_IMAGE,
+    DOCKER_HUB_CREDENTIAL_SECRET_NAME,
+    JAVA_EDITION_DOCKER_IMAGE,
+)
+
+DOCKER_HUB_PREFIX = "docker-hub"
+
+
+class Registry(Construct):
+    """ECR pull-through cache in front of Docker Hub.
+
+    Tasks pull the server images from the in-region cache repositories
+    instead of from Docker Hub, so launches are neither rate limited nor
+    dependent on Docker Hub's download speed. ECR fetches and caches an
+    image from Docker Hub on its first pull and keeps it in sync afterwards.
+
+    Docker Hub requires authenticated upstream pulls; the credentials are
+    read from the ``DOCKER_HUB_CREDENTIAL_SECRET_NAME`` secret, which has to
+    exist before deploying.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str) -> None:
+        super().__init__(scope, construct_id)
+
+        credentials = secretsmanager.Secret.from_secret_name_v2(
+            self,
+            "DockerHubCredentials",
+            DOCKER_HUB_CREDENTIAL_SECRET_NAME,
+        )
+
+        self.rule = ecr.CfnPullThroughCacheRule(
+            self,
+            "DockerHubCacheRule",
+            ecr_repository_prefix=DOCKER_HUB_PREFIX,
+            upstream_registry="docker-hub",
+            upstream_registry_url="registry-1.docker.io",
+            credential_arn=credentials.secret_arn,
+        )
+
+        self.java_image = self.image(JAVA_EDITION_DOCKER_IMAGE)
+        self.bedrock_image = self.image(BEDROCK_EDITION_DOCKER_IMAGE)
+
+    def image(self, name: str, tag: str = "latest") -> ecs.ContainerImage:
+        """Container image for a Docker Hub image name, served from the cache."""
+        if "/" not in name:
+            # Official images live under library/ on Docker Hub.
+            name = f"library/{name}"
+
+        repository = ecr.Repository.from_repository_name(
+            self,
+            f"{name.replace('/', '-')}-repository",
+            f"{DOCKER_HUB_PREFIX}/{name}",
+        )
+
+        return ecs.ContainerImage.from_ecr_repository(repository, tag)
+
+    def grant_pull_through(self, grantee: iam.IGrantable) -> iam.Grant:
+        """Allow ``grantee`` to trigger the first, upstream-importing pull.
+
+        The repositories are created by ECR on that pull, so the regular
+        pull permissions granted by the container image are not enough.
+        """
+        return iam.Grant.add_to_principal(
+            grantee=grantee,
+            actions=["ecr:BatchImportUpstreamImage", "ecr:CreateRepository"],
+            resource_arns=[
+                Stack.of(self).format_arn(
+                    service="ecr",
+                    resource="repository",
+                    resource_name=f"{DOCKER_HUB_PREFIX}/*",
+                )
+            ],
+        )
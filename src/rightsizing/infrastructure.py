@@ -0,0 +1,97 @@
+import dataclasses
+import json
+
+from aws_cdk import Duration
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda as lambda_
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.monitoring.infrastructure import LAG_MS_PER_MINUTE, NAMESPACE
+from src.profiles import FARGATE_MEMORY_MIB, ServerProfile
+
+
+def candidate_sizes(profile: ServerProfile) -> list:
+    """``[cpu, memory, heap]`` of every Fargate size the profile can move to.
+
+    Only the task size and heap are overridden per session, so sizes that
+    would need different JVM flags are left out, as are those the profile
+    rejects.
+    """
+    sizes = []
+
+    for cpu, memory_options in FARGATE_MEMORY_MIB.items():
+        for memory_mib in memory_options:
+            try:
+                resized = dataclasses.replace(
+                    profile, cpu=cpu, memory_mib=memory_mib, off_heap_mib=None
+                )
+            except ValueError:
+                continue
+
+            if resized.jvm_flags == profile.jvm_flags:
+                sizes.append([cpu, memory_mib, resized.heap_mib])
+
+    return sizes
+
+
+class RightSizing(Construct):
+    """Recommend the smallest task size that keeps the server from lagging.
+
+    Once a day a Lambda summarizes the CPU, memory and tick lag of recent
+    sessions and stores the cheapest Fargate size that would have served
+    them all as the ``task-size`` state item. The server workflow applies it
+    on the next start when built with ``task_size_table``.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        table: dynamodb.ITable,
+        cluster: ecs.ICluster,
+        task_definition: ecs.TaskDefinition,
+        profile: ServerProfile,
+        runtime_layer: lambda_.ILayerVersion,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.recommend_lambda = lambda_.Function(
+            self,
+            "RecommendLambda",
+            **handlers.function_props(),
+            handler="recommend_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/rightsizing/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.minutes(5),
+            environment={
+                "TABLE_NAME": table.table_name,
+                "CLUSTER_NAME": cluster.cluster_name,
+                "TASK_DEFINITION_FAMILY": task_definition.family,
+                "CANDIDATE_SIZES": json.dumps(candidate_sizes(profile)),
+                # Same bar as the sustained-lag alarm.
+                "LAG_THRESHOLD": str(LAG_MS_PER_MINUTE),
+                "NAMESPACE": NAMESPACE,
+            },
+        )
+
+        table.grant_read_write_data(self.recommend_lambda)
+        self.recommend_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["cloudwatch:GetMetricData"],
+                resources=["*"],
+            )
+        )
+
+        events.Rule(
+            self,
+            "RecommendSchedule",
+            schedule=events.Schedule.rate(Duration.days(1)),
+            targets=[targets.LambdaFunction(self.recommend_lambda)],
+        )
@@ -0,0 +1,150 @@
+import json
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import clients
+import sizing
+import timeline
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+CLUSTER_NAME = os.environ["CLUSTER_NAME"]
+TASK_DEFINITION_FAMILY = os.environ["TASK_DEFINITION_FAMILY"]
+# ``[[cpu, memory, heap], ...]`` the server can run with unchanged otherwise.
+CANDIDATE_SIZES = [
+    {"cpu": cpu, "memory": memory, "heap": heap}
+    for cpu, memory, heap in json.loads(os.environ["CANDIDATE_SIZES"])
+]
+LAG_THRESHOLD = float(os.environ.get("LAG_THRESHOLD", "5000"))
+LOOKBACK_DAYS = int(os.environ.get("LOOKBACK_DAYS", "14"))
+NAMESPACE = os.environ.get("NAMESPACE", timeline.NAMESPACE)
+
+table = clients.Table(TABLE_NAME)
+cloudwatch = clients.LazyClient("cloudwatch")
+
+TASK_DIMENSIONS = [
+    {"Name": "ClusterName", "Value": CLUSTER_NAME},
+    {"Name": "TaskDefinitionFamily", "Value": TASK_DEFINITION_FAMILY},
+]
+
+# Query id -> (namespace, metric, dimensions, statistic). Only one server
+# task runs at a time, so the family's series are the session's.
+QUERIES = {
+    "cpu": ("ECS/ContainerInsights", "CpuUtilized", TASK_DIMENSIONS, "Average"),
+    "cpu_reserved": ("ECS/ContainerInsights", "CpuReserved", TASK_DIMENSIONS, "Maximum"),
+    "memory": ("ECS/ContainerInsights", "MemoryUtilized", TASK_DIMENSIONS, "Maximum"),
+    "memory_reserved": ("ECS/ContainerInsights", "MemoryReserved", TASK_DIMENSIONS, "Maximum"),
+    "lag": (NAMESPACE, "MsBehind", [], "Sum"),
+}
+
+
+def series(start_ms, end_ms):
+    """Return ``{query id: [per-minute values]}`` for a session's window."""
+    values = {query_id: [] for query_id in QUERIES}
+    kwargs = {
+        "MetricDataQueries": [
+            {
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": namespace,
+                        "MetricName": metric,
+                        "Dimensions": dimensions,
+                    },
+                    "Period": 60,
+                    "Stat": statistic,
+                },
+            }
+            for query_id, (namespace, metric, dimensions, statistic) in QUERIES.items()
+        ],
+        "StartTime": datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc),
+        "EndTime": datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc),
+    }
+
+    while True:
+        response = cloudwatch.get_metric_data(**kwargs)
+        for result in response["MetricDataResults"]:
+            values[result["Id"]].extend(result["Values"])
+
+        if "NextToken" not in response:
+            return values
+        kwargs["NextToken"] = response["NextToken"]
+
+
+def utilization(item):
+    """Summarize a finished session, or return None if there is no data."""
+    start_ms = item.get("playable_at_ms", item.get("task_running_at_ms"))
+    if start_ms is None or "stopped_at_ms" not in item:
+        return None
+
+    values = series(int(start_ms), int(item["stopped_at_ms"]))
+    if not values["cpu"] or not values["cpu_reserved"]:
+        return None
+
+    # Minutes without lag lines have no data point at all.
+    lag = values["lag"] + [0.0] * max(0, len(values["cpu"]) - len(values["lag"]))
+
+    return sizing.summarize(
+        values["cpu"],
+        values["memory"],
+        lag,
+        cpu=max(values["cpu_reserved"]),
+        memory=max(values["memory_reserved"]),
+    )
+
+
+def _to_item(summary):
+    return {
+        key: Decimal(str(round(value, 1))) if isinstance(value, float) else value
+        for key, value in summary.items()
+    }
+
+
+def _from_item(attribute):
+    return {
+        key: value if isinstance(value, bool) else float(value) for key, value in attribute.items()
+    }
+
+
+def lambda_handler(event, context):
+    since_ms = timeline.now_ms() - LOOKBACK_DAYS * 24 * 60 * 60 * 1000
+
+    summaries = []
+    # Further servers run their own task definitions and sizes.
+    for item in timeline.history(table, since_ms, server_id=timeline.PRIMARY_SERVER_ID):
+        if "utilization" in item:
+            summaries.append(_from_item(item["utilization"]))
+            continue
+
+        summary = utilization(item)
+        if summary is None:
+            continue
+
+        # Metrics of a finished session do not change, so summarize it once.
+        timeline.annotate(table, item["session_id"], {"utilization": _to_item(summary)})
+        summaries.append(summary)
+
+    recommendation = sizing.recommend(
+        summaries, CANDIDATE_SIZES, lag_threshold=LAG_THRESHOLD
+    )
+
+    print(json.dumps({"sessions": len(summaries), "recommendation": recommendation}))
+
+    if recommendation is None:
+        return {"recommendation": None}
+
+    # Strings, so the server workflow can pass them straight to RunTask.
+    table.put_item(
+        Item={
+            "id": sizing.TASK_SIZE_ID,
+            "cpu": str(recommendation["cpu"]),
+            "memory": str(recommendation["memory"]),
+            "heap": f"{recommendation['heap']}M",
+            "sessions": recommendation["sessions"],
+            "lagged_sessions": recommendation["lagged_sessions"],
+            "capped": recommendation["capped"],
+            "recommended_at_ms": timeline.now_ms(),
+        }
+    )
+
+    return {"recommendation": recommendation}
@@ -0,0 +1,126 @@
+"""Pick the cheapest Fargate size that served past sessions without lag.
+
+Each session is reduced to a summary of its per-minute series: CPU and
+memory in use (Container Insights), tick lag (``MsBehind`` from the server
+log) and the size the task ran with. A session that kept up needs its p95
+CPU plus headroom. A session that lagged is more telling:
+
+- lag with the CPU saturated means it needed more CPU than it had;
+- lag with memory full means it needed more memory (the heap is committed
+  up front, so memory reads close to full anyway and only counts as a
+  signal together with lag);
+- lag with neither means more resources would not have helped, so the
+  size it had is simply the floor.
+
+Memory is never shrunk below what a session was seen using, and never grown
+without lag, so the pre-touched heap cannot talk the recommender into
+growing forever.
+"""
+
+import math
+
+# The state table item holding the current recommendation.
+TASK_SIZE_ID = "task-size"
+
+# Fargate on-demand list prices (us-east-1, Linux/ARM) per hour; only the
+# ratio matters, to rank sizes by cost.
+VCPU_HOUR = 0.03238
+GB_HOUR = 0.00356
+
+# Share of the reservation at which a resource counts as saturated.
+SATURATED = 0.9
+
+
+def percentile(values, q):
+    """Nearest-rank percentile; 0 for an empty series."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return float(ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)])
+
+
+def summarize(cpu_units, memory_mib, ms_behind, *, cpu, memory):
+    """Reduce one session's per-minute series to what ``recommend`` needs.
+
+    ``cpu_units`` is in CPU units (1024 per vCPU), ``ms_behind`` the lag per
+    minute, and ``cpu`` / ``memory`` the size the task ran with.
+    """
+    return {
+        "cpu": int(cpu),
+        "memory": int(memory),
+        "minutes": len(cpu_units),
+        "cpu_p95": percentile(cpu_units, 95),
+        "memory_max": max(memory_mib, default=0.0),
+        "lag_p95": percentile(ms_behind, 95),
+    }
+
+
+def hourly_cost(size):
+    return size["cpu"] / 1024 * VCPU_HOUR + size["memory"] / 1024 * GB_HOUR
+
+
+def requirements(summary, *, lag_threshold, cpu_headroom, memory_headroom):
+    """Return the least ``(cpu, memory)`` this session could have run with."""
+    cpu, memory = summary["cpu"], summary["memory"]
+    cpu_needed = summary["cpu_p95"] * (1 + cpu_headroom)
+    # Memory only ever shrinks to what was in use, plus headroom.
+    memory_needed = min(summary["memory_max"] * (1 + memory_headroom), memory)
+
+    if summary["lag_p95"] > lag_threshold:
+        if summary["cpu_p95"] >= SATURATED * cpu:
+            cpu_needed = cpu + 1
+        elif summary["memory_max"] >= SATURATED * memory:
+            cpu_needed = max(cpu_needed, cpu)
+            memory_needed = memory + 1
+        else:
+            cpu_needed = max(cpu_needed, cpu)
+            memory_needed = memory
+
+    return cpu_needed, memory_needed
+
+
+def recommend(
+    summaries,
+    sizes,
+    *,
+    lag_threshold,
+    cpu_headroom=0.25,
+    memory_headroom=0.1,
+    min_sessions=3,
+):
+    """Return the cheapest of ``sizes`` that meets every session's needs.
+
+    ``sizes`` are ``{"cpu", "memory", ...}`` candidates; the chosen one is
+    returned as is, with ``sessions`` and ``lagged_sessions`` added. Returns
+    None until there are ``min_sessions`` sessions to go by. When nothing is
+    big enough the largest candidate is returned with ``capped`` set.
+    """
+    summaries = [summary for summary in summaries if summary["minutes"] > 0]
+    if len(summaries) < min_sessions:
+        return None
+
+    needs = [
+        requirements(
+            summary,
+            lag_threshold=lag_threshold,
+            cpu_headroom=cpu_headroom,
+            memory_headroom=memory_headroom,
+        )
+        for summary in summaries
+    ]
+    cpu_needed = max(cpu for cpu, _ in needs)
+    memory_needed = max(memory for _, memory in needs)
+
+    fitting = [
+        size for size in sizes if size["cpu"] >= cpu_needed and size["memory"] >= memory_needed
+    ]
+    capped = not fitting
+    chosen = min(fitting, key=hourly_cost) if fitting else max(sizes, key=hourly_cost)
+
+    return {
+        **chosen,
+        "sessions": len(summaries),
+        "lagged_sessions": sum(summary["lag_p95"] > lag_threshold for summary in summaries),
+        "capped": capped,
+    }
@@ -0,0 +1,137 @@
+import re
+from dataclasses import dataclass
+
+from aws_cdk import Duration
+from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_logs as logs
+from constructs import Construct
+
+from constants import ECS_VOLUME_NAME, MC_SERVER_CONTAINER_NAME
+from src.common.runtime.python import lifecycle
+from src.profiles import PROFILES
+from src.storage.infrastructure import Storage
+
+# Ids end up in execution names, DNS labels and construct ids.
+SERVER_ID_PATTERN = re.compile(r"^[a-z][a-z0-9-]{0,30}$")
+
+
+@dataclass(frozen=True)
+class ServerSpec:
+    """A further server next to the stack's primary one.
+
+    It gets its own world directory, task definition and DNS name
+    (``<id>.<domain>``) and is started and stopped through
+    ``/v1/servers/<id>/...``. ``world`` and ``modpack`` are passed to the
+    server image like the primary server's ``WORLD`` and ``MODPACK``.
+    """
+
+    id: str
+    world: str
+    modpack: str = None
+    profile: str = "standard"
+
+    def __post_init__(self):
+        if not SERVER_ID_PATTERN.match(self.id):
+            raise ValueError(
+                f"Server id {self.id!r} must be a lowercase DNS label starting with a letter"
+            )
+        if self.id in ("server", lifecycle.SERVER_ID):
+            raise ValueError(f"Server id {self.id!r} is reserved for the primary server")
+        if self.profile not in PROFILES:
+            raise ValueError(
+                f"Server {self.id!r}: unknown profile {self.profile!r}, "
+                f"expected one of {sorted(PROFILES)}"
+            )
+
+
+class ServerTask(Construct):
+    """Task definition of a further server, its world on its own access point.
+
+    The container is named like the primary server's, so the server workflow
+    can run either task definition with the same overrides.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        spec: ServerSpec,
+        storage: Storage,
+        task_role: iam.IRole,
+        image: ecs.ContainerImage,
+        environment: dict,
+        log_group: logs.ILogGroup = None,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        profile = PROFILES[spec.profile]
+        access_point = storage.add_access_point(spec.id)
+        storage.grant_read_write(task_role, access_point)
+
+        self.task_definition = ecs.TaskDefinition(
+            self,
+            "TaskDefinition",
+            runtime_platform=ecs.RuntimePlatform(
+                operating_system_family=ecs.OperatingSystemFamily.LINUX,
+                cpu_architecture=ecs.CpuArchitecture.ARM64,
+            ),
+            compatibility=ecs.Compatibility.FARGATE,
+            task_role=task_role,
+            memory_mib=str(profile.memory_mib),
+            cpu=str(profile.cpu),
+        )
+
+        self.task_definition.add_volume(
+            name=ECS_VOLUME_NAME,
+            efs_volume_configuration=ecs.EfsVolumeConfiguration(
+                file_system_id=storage.file_system.file_system_id,
+                transit_encryption="ENABLED",
+                authorization_config=ecs.AuthorizationConfig(
+                    access_point_id=access_point.access_point_id,
+                    iam="ENABLED",
+                ),
+            ),
+        )
+
+        container_environment = {
+            **environment,
+            **profile.environment(),
+            "WORLD": spec.world,
+        }
+        container_environment.pop("MODPACK", None)
+        if spec.modpack:
+            container_environment["MODPACK"] = spec.modpack
+
+        if log_group:
+            # The primary server's, so server metrics cover every server.
+            logging = ecs.AwsLogDriver(log_group=log_group, stream_prefix=spec.id)
+        else:
+            logging = ecs.AwsLogDriver(
+                log_retention=logs.RetentionDays.THREE_DAYS,
+                stream_prefix=spec.id,
+            )
+
+        container_definition = self.task_definition.add_container(
+            MC_SERVER_CONTAINER_NAME,
+            image=image,
+            port_mappings=[
+                ecs.PortMapping(
+                    container_port=25565,
+                    host_port=25565,
+                    protocol=ecs.Protocol.TCP,
+                ),
+            ],
+            environment=container_environment,
+            stop_timeout=Duration.seconds(120),
+            logging=logging,
+        )
+
+        container_definition.add_mount_points(
+            ecs.MountPoint(
+                container_path="/data",
+                source_volume=ECS_VOLUME_NAME,
+                read_only=False,
+            )
+        )
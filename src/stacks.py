@@ -0,0 +1,118 @@
+from aws_cdk import RemovalPolicy, Stack
+from constructs import Construct
+
+from src.component import (
+    ServerOptions,
+    build_compute,
+    build_data,
+    build_foundation,
+    build_runtime,
+)
+
+
+class FoundationStack(Stack):
+    """VPC, DNS and the EFS world storage.
+
+    Changes rarely, so it is protected from deletion and retains the file
+    system should it be deleted anyway. Nothing a Lambda change deploys is
+    in this stack.
+    """
+
+    def __init__(
+        self, scope: Construct, construct_id: str, *, options: ServerOptions, **kwargs
+    ) -> None:
+        super().__init__(scope, construct_id, termination_protection=True, **kwargs)
+
+        self.foundation = build_foundation(self, options, removal_policy=RemovalPolicy.RETAIN)
+
+
+class DataStack(Stack):
+    """The DynamoDB state table."""
+
+    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+        super().__init__(scope, construct_id, termination_protection=True, **kwargs)
+
+        self.database = build_data(self)
+
+
+class ComputeStack(Stack):
+    """ECS cluster, server images and the server log group."""
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        options: ServerOptions,
+        foundation_stack: FoundationStack,
+        **kwargs,
+    ) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.add_dependency(foundation_stack)
+        self.compute = build_compute(self, options, foundation_stack.foundation)
+
+
+class RuntimeStack(Stack):
+    """Task definitions, state machines, Lambdas, rules and the API.
+
+    Only refers to the other layers, so iterating on handlers deploys this
+    stack alone; Lambda code and state machine definitions can be updated
+    with ``cdk deploy --hotswap``.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        options: ServerOptions,
+        foundation_stack: FoundationStack,
+        data_stack: DataStack,
+        compute_stack: ComputeStack,
+        **kwargs,
+    ) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        for stack in (foundation_stack, data_stack, compute_stack):
+            self.add_dependency(stack)
+
+        build_runtime(
+            self,
+            options,
+            foundation_stack.foundation,
+            data_stack.database,
+            compute_stack.compute,
+        )
+
+
+def layered_stacks(
+    scope: Construct, prefix: str, *, options: ServerOptions, **kwargs
+) -> tuple:
+    """Create the four layers as ``<prefix>-Foundation`` ... ``<prefix>-Runtime``.
+
+    ``kwargs`` (e.g. ``env``) are passed to every stack. Returns the stacks
+    in dependency order.
+    """
+    foundation_stack = FoundationStack(
+        scope, f"{prefix}-Foundation", options=options, **kwargs
+    )
+    data_stack = DataStack(scope, f"{prefix}-Data", **kwargs)
+    compute_stack = ComputeStack(
+        scope,
+        f"{prefix}-Compute",
+        options=options,
+        foundation_stack=foundation_stack,
+        **kwargs,
+    )
+    runtime_stack = RuntimeStack(
+        scope,
+        f"{prefix}-Runtime",
+        options=options,
+        foundation_stack=foundation_stack,
+        data_stack=data_stack,
+        compute_stack=compute_stack,
+        **kwargs,
+    )
+
+    return foundation_stack, data_stack, compute_stack, runtime_stack
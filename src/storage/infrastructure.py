@@ -1,10 +1,13 @@
 import os
 
-from aws_cdk import RemovalPolicy
+from aws_cdk import Duration, RemovalPolicy
 from aws_cdk import aws_datasync as datasync
 from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_ecr_assets as ecr_assets
+from aws_cdk import aws_ecs as ecs
 from aws_cdk import aws_efs as efs
 from aws_cdk import aws_iam as iam
+from aws_cdk import aws_logs as logs
 from aws_cdk import aws_s3 as s3
 from constructs import Construct
 
@@ -13,7 +16,13 @@ from src.network.infrastructure import Network
 
 class Storage(Construct):
 
-    def __init__(self, scope: Construct, construct_id: str, network: Network) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        network: Network,
+        removal_policy: RemovalPolicy = RemovalPolicy.DESTROY,
+    ) -> None:
         super().__init__(scope, construct_id)
 
         self.file_system = efs.FileSystem(
@@ -21,7 +30,7 @@ class Storage(Construct):
             "FileSystem",
             vpc=network.vpc,
             security_group=network.security_group,
-            removal_policy=RemovalPolicy.DESTROY,
+            removal_policy=removal_policy,
             throughput_mode=efs.ThroughputMode.ELASTIC,
             enable_automatic_backups=True,
         )
@@ -42,26 +51,130 @@ class Storage(Construct):
             ),
         )
 
-        self.efs_read_write_policy = iam.Policy(
+    def grant_read_write(
+        self, grantee: iam.IGrantable, access_point: efs.IAccessPoint = None
+    ) -> None:
+        """Let ``grantee`` mount the file system read-write through an access point.
+
+        Defaults to the primary server's access point. The statement goes on
+        the grantee's own policy, so a role defined elsewhere (e.g. in another
+        stack) does not make the file system depend on it.
+        """
+        access_point = access_point or self.access_point
+
+        grantee.grant_principal.add_to_principal_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "elasticfilesystem:ClientMount",
+                    "elasticfilesystem:ClientWrite",
+                    "elasticfilesystem:DescribeFileSystems",
+                ],
+                resources=[
+                    self.file_system.file_system_arn,
+                ],
+                conditions={
+                    "StringEquals": {
+                        "elasticfilesystem:AccessPointArn": access_point.access_point_arn
+                    }
+                },
+            )
+        )
+
+    def add_access_point(self, server_id: str) -> efs.AccessPoint:
+        """Give another server its own world directory on the file system."""
+        return efs.AccessPoint(
+            self,
+            f"AccessPoint-{server_id}",
+            file_system=self.file_system,
+            path=f"/servers/{server_id}",
+            posix_user=efs.PosixUser(
+                uid="1000",
+                gid="1000",
+            ),
+            create_acl=efs.Acl(
+                owner_gid="1000",
+                owner_uid="1000",
+                permissions="0777",
+            ),
+        )
+
+
+class WorldSync(Construct):
+    """Sidecar that keeps a task-storage /data volume in sync with S3.
+
+    Chunk I/O then hits local disk instead of EFS over NFS. The sidecar
+    restores the bucket before the server container may start, pushes
+    changed files on a timer and flushes once more after the server stopped.
+    S3 traffic goes through the VPC's S3 gateway endpoint.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        task_definition: ecs.TaskDefinition,
+        server_container: ecs.ContainerDefinition,
+        volume_name: str,
+        sync_interval: Duration = Duration.minutes(1),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.bucket = s3.Bucket(
             self,
-            "EfsReadWritePolicy",
-            statements=[
-                iam.PolicyStatement(
-                    sid="AllowReadWriteOnEFS",
-                    effect=iam.Effect.ALLOW,
-                    actions=[
-                        "elasticfilesystem:ClientMount",
-                        "elasticfilesystem:ClientWrite",
-                        "elasticfilesystem:DescribeFileSystems",
-                    ],
-                    resources=[
-                        self.file_system.file_system_arn,
-                    ],
-                    conditions={
-                        "StringEquals": {
-                            "elasticfilesystem:AccessPointArn": self.access_point.access_point_arn
-                        }
-                    },
-                ),
+            "WorldBucket",
+            versioned=True,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.RETAIN,
+            lifecycle_rules=[
+                s3.LifecycleRule(noncurrent_version_expiration=Duration.days(7)),
             ],
         )
+
+        self.container = task_definition.add_container(
+            "world-sync",
+            image=ecs.ContainerImage.from_asset(
+                "src/storage/runtime",
+                platform=ecr_assets.Platform.LINUX_ARM64,
+            ),
+            # The server container is the one that decides when the task ends;
+            # the sidecar is stopped after it and flushes on the way out.
+            essential=False,
+            stop_timeout=Duration.seconds(120),
+            environment={
+                "BUCKET": self.bucket.bucket_name,
+                "DATA_DIR": "/data",
+                "SYNC_INTERVAL_SECONDS": str(int(sync_interval.to_seconds())),
+            },
+            health_check=ecs.HealthCheck(
+                command=["CMD", "test", "-f", "/tmp/restored"],
+                interval=Duration.seconds(5),
+                retries=10,
+                start_period=Duration.seconds(300),
+            ),
+            logging=ecs.AwsLogDriver(
+                log_retention=logs.RetentionDays.THREE_DAYS,
+                stream_prefix="world-sync",
+            ),
+        )
+
+        self.container.add_mount_points(
+            ecs.MountPoint(
+                container_path="/data",
+                source_volume=volume_name,
+                read_only=False,
+            )
+        )
+
+        server_container.add_container_dependencies(
+            ecs.ContainerDependency(
+                container=self.container,
+                condition=ecs.ContainerDependencyCondition.HEALTHY,
+            )
+        )
+
+        self.bucket.grant_read_write(task_definition.task_role)
+        self.bucket.grant_delete(task_definition.task_role)
@@ -0,0 +1,171 @@
+"""Keep the server's /data on task storage in sync with S3.
+
+Runs as a sidecar next to the server container. It restores the last synced
+copy from S3 before the server starts, uploads files that changed since the
+previous pass on a timer, and does a final pass when the task stops. The
+server only starts once the restore is done (see the ``READY_FILE`` health
+check), and ECS stops the sidecar after the server, so the final pass sees
+the world as the server saved it on shutdown.
+"""
+
+import os
+import signal
+import threading
+import time
+
+import boto3
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
+
+BUCKET = os.environ.get("BUCKET")
+PREFIX = os.environ.get("PREFIX", "data/")
+DATA_DIR = os.environ.get("DATA_DIR", "/data")
+READY_FILE = os.environ.get("READY_FILE", "/tmp/restored")
+SYNC_INTERVAL_SECONDS = int(os.environ.get("SYNC_INTERVAL_SECONDS", "60"))
+# The server image runs as this user and must own what is restored.
+DATA_UID = int(os.environ.get("DATA_UID", "1000"))
+DATA_GID = int(os.environ.get("DATA_GID", "1000"))
+
+# Rewritten all the time and meaningless after a restart.
+EXCLUDED_DIRECTORIES = ("logs/", "crash-reports/")
+EXCLUDED_NAMES = ("session.lock",)
+
+# What a pass can fail with that the next one may not: S3 errors and
+# throttling, connection problems and files changing under the scan.
+SYNC_ERRORS = (BotoCoreError, ClientError, S3UploadFailedError, OSError)
+FINAL_SYNC_ATTEMPTS = 3
+
+s3 = boto3.client("s3")
+
+
+def excluded(path):
+    return path.startswith(EXCLUDED_DIRECTORIES) or os.path.basename(path) in EXCLUDED_NAMES
+
+
+def scan(root):
+    """Return ``{relative path: (size, mtime_ns)}`` for every synced file."""
+    files = {}
+
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+
+            if excluded(relative):
+                continue
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Deleted between listing and stat.
+                continue
+
+            files[relative] = (stat.st_size, stat.st_mtime_ns)
+
+    return files
+
+
+def restore(client, bucket, prefix, root):
+    """Download everything under ``prefix``; returns the resulting scan."""
+    paginator = client.get_paginator("list_objects_v2")
+
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            relative = item["Key"][len(prefix):]
+            if not relative or excluded(relative):
+                continue
+
+            path = os.path.join(root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            client.download_file(bucket, item["Key"], path)
+
+    return scan(root)
+
+
+def push(client, bucket, prefix, root, synced):
+    """Upload files that changed since ``synced`` and delete removed ones.
+
+    Returns the new synced state and the number of uploads and deletions.
+    A file that changes while it is being uploaded stays dirty, so the next
+    pass picks up the complete version.
+    """
+    current = scan(root)
+    synced = dict(synced)
+    uploaded = deleted = 0
+
+    for relative, stat in current.items():
+        if synced.get(relative) == stat:
+            continue
+
+        path = os.path.join(root, relative)
+        try:
+            client.upload_file(path, bucket, prefix + relative)
+            after = os.stat(path)
+        except FileNotFoundError:
+            continue
+
+        uploaded += 1
+        if (after.st_size, after.st_mtime_ns) == stat:
+            synced[relative] = stat
+        else:
+            synced.pop(relative, None)
+
+    for relative in set(synced) - set(current):
+        client.delete_object(Bucket=bucket, Key=prefix + relative)
+        del synced[relative]
+        deleted += 1
+
+    return synced, uploaded, deleted
+
+
+def sync(client, bucket, prefix, root, synced, label):
+    """``push``, but a failed pass is logged and leaves ``synced`` as it was.
+
+    Whatever the failed pass did not record as synced is retried next time.
+    """
+    try:
+        synced, uploaded, deleted = push(client, bucket, prefix, root, synced)
+    except SYNC_ERRORS as e:
+        print(f"{label} failed, will retry: {e!r}")
+        return synced, False
+
+    print(f"{label}: {uploaded} changed and {deleted} deleted files")
+
+    return synced, True
+
+
+def chown_tree(root, uid, gid):
+    for directory, names, files in os.walk(root):
+        os.chown(directory, uid, gid)
+        for name in files:
+            os.chown(os.path.join(directory, name), uid, gid)
+
+
+def main():
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    started = time.monotonic()
+    synced = restore(s3, BUCKET, PREFIX, DATA_DIR)
+    chown_tree(DATA_DIR, DATA_UID, DATA_GID)
+    print(f"Restored {len(synced)} files in {time.monotonic() - started:.1f}s")
+
+    with open(READY_FILE, "w"):
+        pass
+
+    # The sidecar is not essential, so if it died the server would carry on
+    # without anyone saving its world; a failed pass must never end it.
+    try:
+        while not stopping.wait(SYNC_INTERVAL_SECONDS):
+            synced, _ = sync(s3, BUCKET, PREFIX, DATA_DIR, synced, "Sync")
+    finally:
+        # The server has exited by now, so this pass is consistent.
+        for _ in range(FINAL_SYNC_ATTEMPTS):
+            synced, done = sync(s3, BUCKET, PREFIX, DATA_DIR, synced, "Final sync")
+            if done:
+                break
+
+
+if __name__ == "__main__":
+    main()
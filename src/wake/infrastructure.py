@@ -0,0 +1,70 @@
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_ecr_assets as ecr_assets
+from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_logs as logs
+from constructs import Construct
+
+
+class Wake(Construct):
+    """Always-on listener that starts the server when a player connects."""
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        cluster: ecs.ICluster,
+        security_group: ec2.ISecurityGroup,
+        status_url: str,
+        start_url: str,
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        # The smallest Fargate size there is; the listener only parses
+        # handshakes and shuffles bytes.
+        self.task_definition = ecs.FargateTaskDefinition(
+            self,
+            "TaskDefinition",
+            runtime_platform=ecs.RuntimePlatform(
+                operating_system_family=ecs.OperatingSystemFamily.LINUX,
+                cpu_architecture=ecs.CpuArchitecture.ARM64,
+            ),
+            cpu=256,
+            memory_limit_mib=512,
+        )
+
+        self.task_definition.add_container(
+            "listener",
+            image=ecs.ContainerImage.from_asset(
+                "src",
+                file="wake/runtime/Dockerfile",
+                platform=ecr_assets.Platform.LINUX_ARM64,
+                exclude=["**", "!common/runtime/python/slp.py", "!wake/runtime/**"],
+            ),
+            port_mappings=[
+                ecs.PortMapping(
+                    container_port=25565,
+                    protocol=ecs.Protocol.TCP,
+                ),
+            ],
+            environment={
+                "STATUS_URL": status_url,
+                "START_URL": start_url,
+            },
+            logging=ecs.AwsLogDriver(
+                log_retention=logs.RetentionDays.THREE_DAYS,
+                stream_prefix="wake-listener",
+            ),
+        )
+
+        self.service = ecs.FargateService(
+            self,
+            "Service",
+            cluster=cluster,
+            task_definition=self.task_definition,
+            desired_count=1,
+            assign_public_ip=True,
+            security_groups=[security_group],
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
+            min_healthy_percent=0,
+        )
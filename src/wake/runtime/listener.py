@@ -0,0 +1,194 @@
+"""Wake-on-connect front door for the Minecraft server.
+
+Listens on the Minecraft port while the real server is asleep. Status pings
+are answered with a "starting in ~N s" MOTD, the first login attempt starts
+the server through the API, and once the server is PLAYABLE every connection
+is proxied to it, so players only ever need to reconnect once.
+"""
+
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import slp
+
+LISTEN_PORT = int(os.environ.get("LISTEN_PORT", "25565"))
+BACKEND_PORT = int(os.environ.get("BACKEND_PORT", "25565"))
+STATUS_URL = os.environ["STATUS_URL"]
+START_URL = os.environ["START_URL"]
+STATUS_TTL_SECONDS = float(os.environ.get("STATUS_TTL_SECONDS", "5"))
+HANDSHAKE_TIMEOUT_SECONDS = 10
+
+STATUS_STATE = 1
+LOGIN_STATE = 2
+
+_status = {"value": None, "expires_at": 0.0}
+
+
+def fetch_status():
+    with urllib.request.urlopen(STATUS_URL, timeout=5) as response:
+        return json.load(response)
+
+
+def request_start():
+    try:
+        with urllib.request.urlopen(START_URL, timeout=10):
+            pass
+    except urllib.error.HTTPError as e:
+        # 409: someone else already started it, which is just as good.
+        if e.code != 409:
+            raise
+
+
+async def server_status():
+    if _status["value"] is None or time.monotonic() >= _status["expires_at"]:
+        _status["value"] = await asyncio.to_thread(fetch_status)
+        _status["expires_at"] = time.monotonic() + STATUS_TTL_SECONDS
+
+    return _status["value"]
+
+
+def seconds_remaining(status):
+    expected = int(status.get("expected_start_seconds", 180))
+
+    if status["server_status"] in ("STOPPED", "STOPPING"):
+        return expected
+
+    elapsed = int(time.time()) - int(status.get("starting_at", 0))
+    return max(expected - elapsed, 5)
+
+
+def motd(status):
+    if status["server_status"] == "MAINTENANCE":
+        return "§6Server is under maintenance. §fTry again later."
+
+    if status["server_status"] in ("STOPPED", "STOPPING"):
+        return "§7Server is asleep. §fJoin to wake it up."
+
+    return f"§eServer is starting, ready in ~{seconds_remaining(status)} s"
+
+
+async def read_varint(reader):
+    value = 0
+
+    for position in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << (7 * position)
+        if not byte & 0x80:
+            return value
+
+    raise slp.ProtocolError("VarInt is too long")
+
+
+async def read_packet(reader):
+    """Return the raw packet bytes along with its id and payload."""
+    length = await read_varint(reader)
+    body = await reader.readexactly(length)
+    packet_id, offset = slp.read_varint(body)
+
+    return slp.encode_varint(length) + body, packet_id, body[offset:]
+
+
+def parse_handshake(payload):
+    protocol, offset = slp.read_varint(payload)
+    host_length, size = slp.read_varint(payload[offset:])
+    offset += size + host_length + 2  # host string, then the unsigned short port
+    next_state, _ = slp.read_varint(payload[offset:])
+
+    return protocol, next_state
+
+
+async def answer_status(reader, writer, protocol, status):
+    await read_packet(reader)  # status request
+
+    response = {
+        # Echo the client's protocol so it does not show the server as outdated.
+        "version": {"name": "Sleeping", "protocol": protocol},
+        "players": {"max": 0, "online": 0},
+        "description": {"text": motd(status)},
+    }
+    writer.write(slp.packet(0x00, slp.encode_string(json.dumps(response))))
+    await writer.drain()
+
+    _, packet_id, payload = await read_packet(reader)
+    if packet_id == 0x01:
+        writer.write(slp.packet(0x01, payload))
+        await writer.drain()
+
+
+async def answer_login(writer, status):
+    if status["server_status"] == "MAINTENANCE":
+        message = {"text": "Server is under maintenance, try again later"}
+        writer.write(slp.packet(0x00, slp.encode_string(json.dumps(message))))
+        await writer.drain()
+        return
+
+    if status["server_status"] == "STOPPED":
+        await asyncio.to_thread(request_start)
+        _status["value"] = None
+
+    message = {"text": f"Server is starting, reconnect in ~{seconds_remaining(status)} s"}
+    writer.write(slp.packet(0x00, slp.encode_string(json.dumps(message))))
+    await writer.drain()
+
+
+async def pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def proxy(reader, writer, handshake, address):
+    backend_reader, backend_writer = await asyncio.open_connection(address, BACKEND_PORT)
+    backend_writer.write(handshake)
+
+    await asyncio.gather(
+        pipe(reader, backend_writer),
+        pipe(backend_reader, writer),
+        return_exceptions=True,
+    )
+
+
+async def handle(reader, writer):
+    try:
+        handshake, packet_id, payload = await asyncio.wait_for(
+            read_packet(reader), HANDSHAKE_TIMEOUT_SECONDS
+        )
+        if packet_id != 0x00:
+            return
+
+        protocol, next_state = parse_handshake(payload)
+        status = await server_status()
+
+        if status["server_status"] == "PLAYABLE" and "address" in status:
+            await proxy(reader, writer, handshake, status["address"])
+        elif next_state == STATUS_STATE:
+            await answer_status(reader, writer, protocol, status)
+        elif next_state == LOGIN_STATE:
+            await answer_login(writer, status)
+
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, slp.ProtocolError):
+        pass
+
+    except Exception as e:
+        print(f"Failed to handle connection: {e!r}")
+
+    finally:
+        writer.close()
+
+
+async def main():
+    server = await asyncio.start_server(handle, "0.0.0.0", LISTEN_PORT)
+
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
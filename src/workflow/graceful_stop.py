@@ -0,0 +1,167 @@
+from aws_cdk import Duration
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_stepfunctions as sfn
+from aws_cdk import aws_stepfunctions_tasks as tasks
+from constructs import Construct
+
+from src.common.infrastructure import HandlerOptions
+from src.network.infrastructure import Network
+
+# How often, and how many times, to check whether the task has exited after
+# the server was told to stop. Saving a large world can take a few minutes.
+EXIT_POLL_SECONDS = 5
+EXIT_POLL_ATTEMPTS = 36
+
+
+class GracefulStop(Construct):
+    """Stop a server session without losing unsaved chunks.
+
+    The state machine takes ``{"execution_arn": ..., "server_id": ...}`` of
+    the server execution. It saves the world, kicks the players and stops the server
+    over RCON, then waits for the task to exit so the server workflow can
+    clean up as usual. The execution is only aborted, which kills the task,
+    when RCON fails or the server does not exit in time.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        network: Network,
+        table: dynamodb.ITable,
+        server_state_machine: sfn.IStateMachine,
+        runtime_layer: lambda_.ILayerVersion,
+        handlers: HandlerOptions = HandlerOptions(),
+    ) -> None:
+        super().__init__(scope, construct_id)
+
+        self.shutdown_lambda = lambda_.Function(
+            self,
+            "ShutdownLambda",
+            **handlers.function_props(),
+            handler="shutdown_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/workflow/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(60),
+            # RCON is only reachable from inside the VPC.
+            vpc=network.vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            security_groups=[network.security_group],
+            environment={
+                "TABLE_NAME": table.table_name,
+                "RCON_TIMEOUT_SECONDS": "30",
+            },
+        )
+
+        self.force_stop_lambda = lambda_.Function(
+            self,
+            "ForceStopLambda",
+            **handlers.function_props(),
+            handler="force_stop_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/workflow/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(30),
+            environment={
+                "TABLE_NAME": table.table_name,
+            },
+        )
+
+        table.grant_read_data(self.shutdown_lambda)
+        table.grant_read_write_data(self.force_stop_lambda)
+        server_state_machine.grant_execution(self.force_stop_lambda, "states:StopExecution")
+
+        force_stop = tasks.LambdaInvoke(
+            self,
+            "ForceStop",
+            lambda_function=self.force_stop_lambda,
+            payload=sfn.TaskInput.from_object(
+                {"execution_arn.$": "$.execution_arn", "server_id.$": "$.server_id"}
+            ),
+            result_path=sfn.JsonPath.DISCARD,
+        )
+
+        shutdown = tasks.LambdaInvoke(
+            self,
+            "Shutdown",
+            lambda_function=self.shutdown_lambda,
+            payload=sfn.TaskInput.from_object(
+                {"execution_arn.$": "$.execution_arn", "server_id.$": "$.server_id"}
+            ),
+            payload_response_only=True,
+            result_path="$.shutdown",
+        )
+
+        shutdown.add_catch(force_stop, errors=["States.ALL"], result_path="$.error")
+
+        wait_for_exit = sfn.Wait(
+            self,
+            "WaitForExit",
+            time=sfn.WaitTime.duration(Duration.seconds(EXIT_POLL_SECONDS)),
+        )
+
+        read = tasks.DynamoGetItem(
+            self,
+            "ReadState",
+            table=table,
+            key={
+                "id": tasks.DynamoAttributeValue.from_string(
+                    sfn.JsonPath.string_at("$.server_id")
+                )
+            },
+            consistent_read=True,
+            result_selector={"item.$": "$.Item"},
+            result_path="$.read",
+        )
+
+        count_attempt = sfn.Pass(
+            self,
+            "CountAttempt",
+            parameters={"attempts.$": "States.MathAdd($.wait.attempts, 1)"},
+            result_path="$.wait",
+        )
+
+        # The server workflow marks the server STOPPED, dropping its
+        # execution, once the task has exited and been cleaned up. Choice
+        # rules are checked in order, so the comparison only sees an ARN.
+        stopped = sfn.Succeed(self, "Stopped")
+
+        wait_for_exit.next(read).next(
+            sfn.Choice(self, "Exited")
+            .when(sfn.Condition.is_not_present("$.read.item.execution_arn"), stopped)
+            .when(
+                sfn.Condition.not_(
+                    sfn.Condition.string_equals_json_path(
+                        "$.read.item.execution_arn.S", "$.execution_arn"
+                    )
+                ),
+                stopped,
+            )
+            .when(
+                sfn.Condition.number_greater_than_equals("$.wait.attempts", EXIT_POLL_ATTEMPTS),
+                force_stop,
+            )
+            .otherwise(count_attempt.next(wait_for_exit))
+        )
+
+        start_waiting = sfn.Pass(
+            self,
+            "StartWaiting",
+            parameters={"attempts": 0},
+            result_path="$.wait",
+        ).next(wait_for_exit)
+
+        self.state_machine = sfn.StateMachine(
+            self,
+            "GracefulStopStateMachine",
+            definition_body=sfn.DefinitionBody.from_chainable(
+                shutdown.next(
+                    sfn.Choice(self, "ShutdownRequested")
+                    .when(sfn.Condition.boolean_equals("$.shutdown.requested", True), start_waiting)
+                    .otherwise(force_stop)
+                )
+            ),
+            timeout=Duration.minutes(10),
+        )
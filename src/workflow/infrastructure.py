@@ -1,10 +1,20 @@
+import jsii
+from aws_cdk import Duration
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as lambda_
 from aws_cdk import aws_stepfunctions as sfn
 from aws_cdk import aws_stepfunctions_tasks as tasks
 from constructs import Construct
 
+from src.common.infrastructure import HandlerOptions
+from src.common.runtime.python import lifecycle
+from src.rightsizing.runtime.sizing import TASK_SIZE_ID
+
 
 class Workflow(Construct):
 
@@ -16,7 +26,15 @@ class Workflow(Construct):
         cluster,
         task_definition,
         container_definition,
-        security_group
+        security_group,
+        runtime_layer: lambda_.ILayerVersion,
+        backup_lambda: lambda_.IFunction = None,
+        spot: bool = False,
+        restart_on_interruption: bool = False,
+        task_size_table: dynamodb.ITable = None,
+        default_task_size: dict = None,
+        task_definitions: list = None,
+        handlers: HandlerOptions = HandlerOptions(),
     ) -> None:
         super().__init__(scope, construct_id)
 
@@ -44,15 +62,295 @@ class Workflow(Construct):
         self.cleanup_lambda = lambda_.Function(
             self,
             "CleanupWorkflowLambda",
-            runtime=lambda_.Runtime.PYTHON_3_12,
+            **handlers.function_props(),
             handler="lambda_function.lambda_handler",
             code=lambda_.Code.from_asset("src/workflow/runtime"),
+            layers=[runtime_layer],
+        )
+
+        self.readiness_lambda = lambda_.Function(
+            self,
+            "ReadinessProbeLambda",
+            **handlers.function_props(),
+            handler="readiness_function.lambda_handler",
+            code=lambda_.Code.from_asset("src/workflow/runtime"),
+            layers=[runtime_layer],
+            timeout=Duration.seconds(10),
+            environment={
+                "PROBE_TIMEOUT_SECONDS": "3",
+            },
+        )
+        # So the probe gives up once the server task stops.
+        self.readiness_lambda.add_to_role_policy(
+            iam.PolicyStatement(actions=["ecs:DescribeTasks"], resources=["*"])
+        )
+
+        cleanup_task = tasks.LambdaInvoke(
+            self,
+            "InvokeCleanup",
+            lambda_function=handlers.entry_point(self.cleanup_lambda),
+            payload=sfn.TaskInput.from_object(
+                {
+                    "execution_arn": sfn.JsonPath.execution_id,
+                    "server_id": sfn.JsonPath.string_at("$.server_id"),
+                }
+            ),
+            # Keeps the input, which the backup choice reads the server from.
+            result_path="$.cleanup",
+        )
+
+        # With several servers the input names the task definition to run;
+        # each one is listed so the interruption rule can match its tasks.
+        task_definition_arns = [
+            definition.task_definition_arn
+            for definition in [task_definition, *(task_definitions or [])]
+        ]
+        task_definition_path = "$.task_definition" if task_definitions else None
+
+        on_demand = tasks.EcsFargateLaunchTarget(
+            platform_version=ecs.FargatePlatformVersion.LATEST
+        )
+
+        sized = task_size_table is not None
+
+        session = self._session(
+            "",
+            launch_target=FargateSpotLaunchTarget() if spot else on_demand,
+            cluster=cluster,
+            task_definition=task_definition,
+            container_definition=container_definition,
+            security_group=security_group,
+            sized=sized,
+            task_definition_path=task_definition_path,
+        )
+
+        if spot:
+            self.fallback_lambda = lambda_.Function(
+                self,
+                "FallbackLambda",
+                **handlers.function_props(),
+                handler="fallback_function.lambda_handler",
+                code=lambda_.Code.from_asset("src/workflow/runtime"),
+                layers=[runtime_layer],
+                environment={
+                    "RESTART_ON_INTERRUPTION": "TRUE" if restart_on_interruption else "FALSE",
+                },
+            )
+
+            self.interruption_lambda = lambda_.Function(
+                self,
+                "InterruptionLambda",
+                **handlers.function_props(),
+                handler="interruption_function.lambda_handler",
+                code=lambda_.Code.from_asset("src/workflow/runtime"),
+                layers=[runtime_layer],
+                timeout=Duration.seconds(90),
+                # RCON is only reachable from inside the VPC.
+                vpc=cluster.vpc,
+                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+                security_groups=[security_group],
+            )
+
+            # ECS announces the interruption two minutes before the task is
+            # killed, which is plenty of time to flush the world to disk.
+            events.Rule(
+                self,
+                "SpotInterruptionRule",
+                event_pattern=events.EventPattern(
+                    source=["aws.ecs"],
+                    detail_type=["ECS Task State Change"],
+                    detail={
+                        "stopCode": ["SpotInterruption"],
+                        "desiredStatus": ["STOPPED"],
+                        "clusterArn": [cluster.cluster_arn],
+                        "taskDefinitionArn": task_definition_arns,
+                    },
+                ),
+                targets=[targets.LambdaFunction(self.interruption_lambda, retry_attempts=2)],
+            )
+
+            fallback_task = tasks.LambdaInvoke(
+                self,
+                "CheckFallback",
+                lambda_function=self.fallback_lambda,
+                payload=sfn.TaskInput.from_object(
+                    {
+                        "execution_arn": sfn.JsonPath.execution_id,
+                        "server_id": sfn.JsonPath.string_at("$.server_id"),
+                    }
+                ),
+                payload_response_only=True,
+                result_path="$.fallback",
+            )
+            # Failures are kept next to the input, which cleanup still needs
+            # for the server id.
+            fallback_task.add_catch(cleanup_task, errors=["States.ALL"], result_path="$.error")
+
+            on_demand_session = self._session(
+                "OnDemand",
+                launch_target=on_demand,
+                cluster=cluster,
+                task_definition=task_definition,
+                container_definition=container_definition,
+                security_group=security_group,
+                sized=sized,
+                task_definition_path=task_definition_path,
+            )
+            on_demand_session.add_catch(cleanup_task, errors=["States.ALL"], result_path="$.error")
+
+            # The failure is kept next to the input, which the on-demand run
+            # still needs for its RCON password.
+            session.add_catch(fallback_task, errors=["States.ALL"], result_path="$.error")
+            session.next(fallback_task).next(
+                sfn.Choice(self, "UseOnDemand")
+                .when(
+                    sfn.Condition.boolean_equals("$.fallback.on_demand", True),
+                    on_demand_session.next(cleanup_task),
+                )
+                .otherwise(cleanup_task)
+            )
+        else:
+            # Add Catch to handle failure and transition to Choice state
+            session.add_catch(
+                cleanup_task,
+                errors=["States.ALL"],  # Catch all errors
+                result_path="$.error",
+            )
+            session.next(cleanup_task)
+
+        # Define the state machine
+        event_chain = session
+
+        if sized:
+            # Size the task as last recommended, or as defined until there is
+            # a recommendation.
+            read_task_size = tasks.DynamoGetItem(
+                self,
+                "ReadTaskSize",
+                table=task_size_table,
+                key={"id": tasks.DynamoAttributeValue.from_string(TASK_SIZE_ID)},
+                result_path="$.sizing",
+            )
+
+            event_chain = read_task_size.next(
+                sfn.Choice(self, "HasTaskSize")
+                .when(
+                    sfn.Condition.is_present("$.sizing.Item"),
+                    sfn.Pass(
+                        self,
+                        "RecommendedTaskSize",
+                        parameters={
+                            "cpu.$": "$.sizing.Item.cpu.S",
+                            "memory.$": "$.sizing.Item.memory.S",
+                            "heap.$": "$.sizing.Item.heap.S",
+                        },
+                        result_path="$.task_size",
+                    ).next(session),
+                )
+                .otherwise(
+                    sfn.Pass(
+                        self,
+                        "DefaultTaskSize",
+                        result=sfn.Result.from_object(default_task_size),
+                        result_path="$.task_size",
+                    ).next(session)
+                )
+            )
+
+        if backup_lambda:
+            # The task has stopped by now, so the world on disk is final.
+            # The backup holds the server in MAINTENANCE while it reads it,
+            # and skips the snapshot if a new session has already started.
+            backup_task = tasks.LambdaInvoke(
+                self,
+                "InvokeBackup",
+                lambda_function=backup_lambda,
+                payload=sfn.TaskInput.from_object(
+                    {
+                        "execution_arn": sfn.JsonPath.execution_id,
+                        "server_id": sfn.JsonPath.string_at("$.server_id"),
+                    }
+                ),
+                result_selector={"backup.$": "$.Payload"},
+            )
+
+            if task_definitions:
+                # Backups cover the primary server's world only.
+                cleanup_task.next(
+                    sfn.Choice(self, "IsPrimaryServer")
+                    .when(
+                        sfn.Condition.string_equals("$.server_id", lifecycle.SERVER_ID),
+                        backup_task,
+                    )
+                    .otherwise(sfn.Succeed(self, "SkipBackup"))
+                )
+            else:
+                cleanup_task.next(backup_task)
+
+        self.state_machine = sfn.StateMachine(
+            self,
+            "EcsStateMachine",
+            definition_body=sfn.DefinitionBody.from_chainable(event_chain),
         )
 
-        # Workflow Tasks
-        run_server_task = tasks.EcsRunTask(
+        # RunTask is only granted for the fixed task definition.
+        for definition in task_definitions or []:
+            definition.grant_run(self.state_machine)
+
+    def _session(
+        self,
+        suffix,
+        *,
+        launch_target,
+        cluster,
+        task_definition,
+        container_definition,
+        security_group,
+        sized=False,
+        task_definition_path=None,
+    ) -> sfn.Parallel:
+        """Run the server task next to the readiness probe."""
+        environment = [
+            # Lets the DNS and interruption handlers tell the servers' tasks
+            # apart.
+            tasks.TaskEnvironmentVariable(
+                name="SERVER_ID",
+                value=sfn.JsonPath.string_at("$.server_id"),
+            ),
+            # Per session, so the stop path can shut the server down over
+            # RCON.
+            tasks.TaskEnvironmentVariable(
+                name="RCON_PASSWORD",
+                value=sfn.JsonPath.string_at("$.rcon_password"),
+            ),
+            # Longer for pre-warmed sessions, which start before anyone is
+            # expected to join.
+            tasks.TaskEnvironmentVariable(
+                name="AUTOSTOP_TIMEOUT_INIT",
+                value=sfn.JsonPath.string_at("$.autostop_timeout_init"),
+            ),
+        ]
+
+        paths = {}
+
+        if sized:
+            # The heap has to follow the task memory.
+            environment.append(
+                tasks.TaskEnvironmentVariable(
+                    name="MEMORY",
+                    value=sfn.JsonPath.string_at("$.task_size.heap"),
+                )
+            )
+            paths["Overrides.Cpu"] = "$.task_size.cpu"
+            paths["Overrides.Memory"] = "$.task_size.memory"
+
+        if task_definition_path:
+            paths["TaskDefinition"] = task_definition_path
+
+        run_server_task = EcsRunTaskWithPaths(
             self,
-            "RunFargate",
+            f"RunFargate{suffix}",
+            paths=paths,
             integration_pattern=sfn.IntegrationPattern.RUN_JOB,
             cluster=cluster,
             task_definition=task_definition,
@@ -60,34 +358,103 @@ class Workflow(Construct):
             container_overrides=[
                 tasks.ContainerOverride(
                     container_definition=container_definition,
+                    environment=environment,
                 )
             ],
-            launch_target=tasks.EcsFargateLaunchTarget(
-                platform_version=ecs.FargatePlatformVersion.LATEST
-            ),
+            launch_target=launch_target,
             security_groups=[
                 security_group,
             ],
         )
 
-        cleanup_task = tasks.LambdaInvoke(
+        # The JVM and mods take a while to load after ECS reports RUNNING, so
+        # only call the server PLAYABLE once it answers a status ping.
+        probe_task = tasks.LambdaInvoke(
             self,
-            "InvokeCleanup",
-            lambda_function=self.cleanup_lambda,
+            f"ProbeReadiness{suffix}",
+            lambda_function=self.readiness_lambda,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "execution_arn": sfn.JsonPath.execution_id,
+                    "server_id": sfn.JsonPath.string_at("$.server_id"),
+                }
+            ),
+            result_selector={"probe.$": "$.Payload"},
         )
 
-
-        # Add Catch to handle failure and transition to Choice state
-        run_server_task.add_catch(
-            cleanup_task,
-            errors=["States.ALL"]  # Catch all errors
+        probe_task.add_retry(
+            errors=["ServerNotReady"],
+            interval=Duration.seconds(5),
+            backoff_rate=2,
+            max_delay=Duration.seconds(20),
+            jitter_strategy=sfn.JitterType.FULL,
+            max_attempts=20,
         )
 
-        # Define the state machine
-        event_chain = run_server_task.next(cleanup_task)
+        # A server that never becomes ready is still stopped by autostop or the
+        # stop endpoint; the probe branch just gives up.
+        probe_task.add_catch(
+            sfn.Pass(self, f"ReadinessUnknown{suffix}"),
+            errors=["States.ALL"],
+        )
 
-        self.state_machine = sfn.StateMachine(
+        session = sfn.Parallel(
             self,
-            "EcsStateMachine",
-            definition_body=sfn.DefinitionBody.from_chainable(event_chain),
+            f"Session{suffix}",
+            result_path=sfn.JsonPath.DISCARD,
+        )
+        session.branch(run_server_task)
+        session.branch(
+            sfn.Wait(
+                self,
+                f"WaitForBoot{suffix}",
+                time=sfn.WaitTime.duration(Duration.seconds(30)),
+            ).next(probe_task)
         )
+
+        return session
+
+
+@jsii.implements(tasks.IEcsLaunchTarget)
+class FargateSpotLaunchTarget:
+    """Run on Fargate Spot, through the cluster's capacity providers.
+
+    ``EcsFargateLaunchTarget`` can only ask for on-demand Fargate.
+    """
+
+    def bind(self, _task, _launch_target_options):
+        return tasks.EcsLaunchTargetConfig(
+            parameters={
+                "CapacityProviderStrategy": [
+                    {"CapacityProvider": "FARGATE_SPOT", "Weight": 1},
+                ],
+                "PlatformVersion": ecs.FargatePlatformVersion.LATEST.value,
+            }
+        )
+
+
+class EcsRunTaskWithPaths(tasks.EcsRunTask):
+    """``EcsRunTask`` with further RunTask parameters taken from the input.
+
+    The construct renders a fixed task definition and only container
+    overrides. ``paths`` maps dotted parameter names to JSONPaths, e.g.
+    ``{"Overrides.Cpu": "$.task_size.cpu"}``; a path replaces any fixed
+    value of the same parameter.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, *, paths: dict, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+        self._paths = dict(paths)
+
+    def to_state_json(self):
+        state = super().to_state_json()
+
+        for name, path in self._paths.items():
+            *parents, leaf = name.split(".")
+            parameters = state["Parameters"]
+            for parent in parents:
+                parameters = parameters.setdefault(parent, {})
+            parameters.pop(leaf, None)
+            parameters[f"{leaf}.$"] = path
+
+        return state
@@ -0,0 +1,44 @@
+import os
+
+import clients
+import lifecycle
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+RESTART_ON_INTERRUPTION = os.environ.get("RESTART_ON_INTERRUPTION", "FALSE") == "TRUE"
+
+table = clients.Table(TABLE_NAME)
+
+
+def lambda_handler(event, context):
+    """Decide whether a Spot session should go on on on-demand capacity.
+
+    That is the case when the Spot task never got to run (e.g. there was no
+    Spot capacity) or, if enabled, when it was interrupted. Sessions that
+    ended any other way, or were stopped meanwhile, are left to clean up.
+    """
+    execution_arn = event["execution_arn"]
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+    item = lifecycle.read(table, server_id)
+
+    if item.get("execution_arn") != execution_arn:
+        return {"on_demand": False, "reason": "Session is over"}
+
+    if item["state"] == lifecycle.STARTING:
+        return {"on_demand": True, "reason": "Spot task did not start"}
+
+    interrupted = (
+        "interrupted_task_arn" in item and item["interrupted_task_arn"] == item.get("task_arn")
+    )
+
+    if not interrupted:
+        return {"on_demand": False, "reason": "Spot task exited"}
+
+    if not RESTART_ON_INTERRUPTION:
+        return {"on_demand": False, "reason": "Spot task was interrupted"}
+
+    try:
+        lifecycle.restart(table, execution_arn, server_id=server_id)
+    except lifecycle.TransitionConflict:
+        return {"on_demand": False, "reason": "Session was stopped"}
+
+    return {"on_demand": True, "reason": "Spot task was interrupted"}
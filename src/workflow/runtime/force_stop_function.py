@@ -0,0 +1,39 @@
+import os
+
+import clients
+import lifecycle
+import targets
+import timeline
+
+sfn = clients.LazyClient("stepfunctions")
+elbv2 = clients.LazyClient("elbv2")
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+TARGET_GROUP_ARN = os.environ.get("TARGET_GROUP_ARN")
+
+table = clients.Table(TABLE_NAME)
+
+
+def lambda_handler(event, context):
+    """Abort the server execution (and with it the task) and mark it stopped."""
+    execution_arn = event["execution_arn"]
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+
+    try:
+        sfn.stop_execution(executionArn=execution_arn)
+    except sfn.exceptions.ExecutionDoesNotExist:
+        pass
+
+    timeline.annotate(
+        table, timeline.session_id(execution_arn), {"stopped_at_ms": timeline.now_ms()}
+    )
+
+    try:
+        lifecycle.mark_stopped(table, execution_arn=execution_arn, server_id=server_id)
+    except lifecycle.TransitionConflict:
+        # Cleanup got there first.
+        return
+
+    # Only the primary server sits behind the load balancer.
+    if TARGET_GROUP_ARN and server_id == lifecycle.SERVER_ID:
+        targets.deregister_all(elbv2, TARGET_GROUP_ARN)
@@ -0,0 +1,56 @@
+import os
+
+import clients
+import lifecycle
+import rcon
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+RCON_PORT = int(os.environ.get("RCON_PORT", rcon.DEFAULT_PORT))
+# The task is killed two minutes after the interruption notice at the latest.
+RCON_TIMEOUT_SECONDS = float(os.environ.get("RCON_TIMEOUT_SECONDS", "60"))
+WARNING = os.environ.get(
+    "INTERRUPTION_WARNING", "The server host is being reclaimed. Saving the world now..."
+)
+
+table = clients.Table(TABLE_NAME)
+
+
+def lambda_handler(event, context):
+    """Save the world as soon as ECS announces a Spot interruption.
+
+    The interrupted task is noted on the state item so the server workflow
+    can tell an interruption from a normal exit once the task has stopped.
+    """
+    task_arn = event["detail"]["taskArn"]
+    server_id = lifecycle.task_server_id(event["detail"])
+    item = lifecycle.read(table, server_id)
+
+    if item.get("task_arn") != task_arn:
+        return {"task_arn": task_arn, "saved": False, "reason": "Not the current server task"}
+
+    try:
+        lifecycle.update(
+            table, item["version"], {"interrupted_task_arn": task_arn}, server_id=server_id
+        )
+    except lifecycle.TransitionConflict:
+        # Another write landed first; the notice is only worth one retry.
+        item = lifecycle.read(table, server_id)
+        if item.get("task_arn") == task_arn:
+            lifecycle.update(
+                table, item["version"], {"interrupted_task_arn": task_arn}, server_id=server_id
+            )
+
+    if "private_ip" not in item or "rcon_password" not in item:
+        return {"task_arn": task_arn, "saved": False, "reason": "Server is not reachable"}
+
+    try:
+        with rcon.Client(
+            item["private_ip"], item["rcon_password"], port=RCON_PORT, timeout=RCON_TIMEOUT_SECONDS
+        ) as client:
+            client.command(f"say {WARNING}")
+            output = client.command("save-all flush")
+    except (rcon.RconError, OSError) as e:
+        # The server also saves on SIGTERM; this is only a head start.
+        return {"task_arn": task_arn, "saved": False, "reason": str(e)}
+
+    return {"task_arn": task_arn, "saved": True, "output": output}
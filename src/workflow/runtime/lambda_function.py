@@ -1,25 +1,45 @@
 import os
 
-import boto3
+import clients
+import lifecycle
+import targets
+import timeline
+from replies import log
 
-sfn = boto3.client("stepfunctions")
-dynamodb = boto3.resource("dynamodb")
+elbv2 = clients.LazyClient("elbv2")
 
 TABLE_NAME = os.environ["TABLE_NAME"]
+TARGET_GROUP_ARN = os.environ.get("TARGET_GROUP_ARN")
 
 if TABLE_NAME is None:
     raise ValueError("Missing environment variable")
 
+table = clients.Table(TABLE_NAME)
+
 
 def lambda_handler(event, context):
-    table = dynamodb.Table(TABLE_NAME)
-
-    table.update_item(
-        Key={
-            "id": "0",
-        },
-        UpdateExpression="SET in_progress = :val1",
-        ExpressionAttributeValues={
-            ":val1": False,
-        },
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+
+    # Kept as session history, whoever ends up marking the server stopped.
+    timeline.annotate(
+        table,
+        timeline.session_id(event["execution_arn"]),
+        {"stopped_at_ms": timeline.now_ms()},
     )
+
+    try:
+        # Only the execution that owns the server may mark it stopped, so a
+        # late cleanup from an old session cannot clobber a fresh start.
+        lifecycle.mark_stopped(table, execution_arn=event["execution_arn"], server_id=server_id)
+    except lifecycle.TransitionConflict:
+        log(
+            "Session no longer owns the server",
+            server_id=server_id,
+            execution_arn=event["execution_arn"],
+        )
+        return
+
+    # Only the primary server sits behind the load balancer.
+    if TARGET_GROUP_ARN and server_id == lifecycle.SERVER_ID:
+        # The task is gone; drop it so the load balancer stops probing it.
+        targets.deregister_all(elbv2, TARGET_GROUP_ARN)
@@ -0,0 +1,89 @@
+import os
+import time
+
+import clients
+import lifecycle
+import slp
+import timeline
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "25565"))
+PROBE_TIMEOUT_SECONDS = float(os.environ.get("PROBE_TIMEOUT_SECONDS", "3"))
+# How many recent start durations to keep for start-time estimates.
+RECENT_STARTS = 5
+
+table = clients.Table(TABLE_NAME)
+ecs = clients.LazyClient("ecs")
+
+
+class ServerNotReady(Exception):
+    """The server is not answering status pings yet; the workflow retries."""
+
+
+class SessionEnded(Exception):
+    """The session being probed is no longer the current one, or its task
+    stopped; the workflow does not retry, so the session can be cleaned up."""
+
+
+def task_stopped(task_arn):
+    """Whether ECS has stopped, or is stopping, the server task."""
+    # Task ARNs name their cluster: ``...:task/<cluster>/<task id>``.
+    cluster = task_arn.split("/")[1]
+    tasks = ecs.describe_tasks(cluster=cluster, tasks=[task_arn])["tasks"]
+
+    return not tasks or "STOPPED" in (tasks[0]["desiredStatus"], tasks[0]["lastStatus"])
+
+
+def lambda_handler(event, context):
+    execution_arn = event["execution_arn"]
+    server_id = event.get("server_id", lifecycle.SERVER_ID)
+    item = lifecycle.read(table, server_id)
+
+    if item.get("execution_arn") != execution_arn:
+        raise SessionEnded(f"{execution_arn} no longer owns the server")
+
+    if item["state"] not in lifecycle.ACTIVE_STATES:
+        raise SessionEnded(f"Server {server_id} is {item['state']}")
+
+    if "task_arn" in item and task_stopped(item["task_arn"]):
+        raise SessionEnded(f"{item['task_arn']} has stopped")
+
+    if "public_ip" not in item:
+        raise ServerNotReady("Server has no address yet")
+
+    try:
+        status = slp.ping(item["public_ip"], SERVER_PORT, timeout=PROBE_TIMEOUT_SECONDS)
+    except (OSError, slp.ProtocolError) as e:
+        raise ServerNotReady(str(e)) from e
+
+    probe = {
+        "version": status["version"],
+        "players_online": status["players_online"],
+        "players_max": status["players_max"],
+        "latency_ms": status["latency_ms"],
+        "probed_at": int(time.time()),
+    }
+
+    session = timeline.record(
+        table, timeline.session_id(execution_arn), {"playable": timeline.now_ms()}
+    )
+    phases = timeline.timestamps(session)
+    start_seconds = (phases["playable"] - min(phases.values())) // 1000
+    recent_start_seconds = [*item.get("recent_start_seconds", []), start_seconds]
+
+    try:
+        lifecycle.transition(
+            table,
+            lifecycle.PLAYABLE,
+            execution_arn=execution_arn,
+            attributes={
+                "probe": probe,
+                "recent_start_seconds": recent_start_seconds[-RECENT_STARTS:],
+            },
+            server_id=server_id,
+        )
+    except lifecycle.TransitionConflict:
+        # Already PLAYABLE (a retried invocation) or stopping; nothing to do.
+        pass
+
+    return probe
@@ -0,0 +1,50 @@
+import os
+
+import clients
+import lifecycle
+import rcon
+from replies import log
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+RCON_PORT = int(os.environ.get("RCON_PORT", rcon.DEFAULT_PORT))
+# Bounds each command, including the flush of every dirty chunk to disk.
+RCON_TIMEOUT_SECONDS = float(os.environ.get("RCON_TIMEOUT_SECONDS", "30"))
+KICK_MESSAGE = os.environ.get("KICK_MESSAGE", "The server is shutting down. See you next time!")
+
+table = clients.Table(TABLE_NAME)
+
+# Flushing first means the world is safe on disk even if ``stop`` is cut short.
+SAVE_COMMANDS = (
+    "save-all flush",
+    f"kick @a {KICK_MESSAGE}",
+)
+
+
+def lambda_handler(event, context):
+    """Ask the server of ``execution_arn`` to save and stop over RCON.
+
+    Returns ``{"requested": False}`` when there is no server to talk to
+    (e.g. it is still starting), so the caller can stop the task directly.
+    Connection errors are raised; the caller treats them the same way.
+    """
+    item = lifecycle.read(table, event.get("server_id", lifecycle.SERVER_ID))
+
+    if item.get("execution_arn") != event["execution_arn"]:
+        return {"requested": False, "reason": "Session is over"}
+
+    if "private_ip" not in item or "rcon_password" not in item:
+        return {"requested": False, "reason": "Server is not reachable yet"}
+
+    with rcon.Client(
+        item["private_ip"], item["rcon_password"], port=RCON_PORT, timeout=RCON_TIMEOUT_SECONDS
+    ) as client:
+        for command in SAVE_COMMANDS:
+            log("RCON command", command=command, response=client.command(command))
+
+        try:
+            log("RCON command", command="stop", response=client.command("stop"))
+        except (rcon.RconError, OSError) as e:
+            # The server may close the connection before it answers.
+            log("RCON stop got no answer", level="WARNING", error=e)
+
+    return {"requested": True}
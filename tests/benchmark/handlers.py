@@ -0,0 +1,326 @@
+"""Cold-start and per-invoke benchmark of the request-path Lambda handlers.
+
+Every handler runs in a fresh interpreter, as in a new execution
+environment, and reports:
+
+- ``import_ms``: importing the handler module, boto3 included, i.e. what
+  Lambda's init phase spends on it;
+- ``first_invoke_ms``: the first invocation, which also builds the clients
+  that invocation needs;
+- ``invoke_ms`` and ``invoke_p90_ms``: the median and 90th percentile of the
+  invocations after it.
+
+AWS is stood in for by moto, so invoke times include moto's own overhead and
+are only comparable between runs on the same machine. Save a run and compare
+later ones against it to catch regressions:
+
+    python tests/benchmark/handlers.py --save baseline.json
+    python tests/benchmark/handlers.py --baseline baseline.json
+
+The second exits with status 1 if any handler got slower than the baseline
+by more than ``--tolerance``.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+
+# moto derives ARNs from names, so they are known before anything exists.
+SERVER_STATE_MACHINE_ARN = f"arn:aws:states:{REGION}:{ACCOUNT}:stateMachine:server"
+GRACEFUL_STOP_ARN = f"arn:aws:states:{REGION}:{ACCOUNT}:stateMachine:graceful-stop"
+
+# Fake credentials, so nothing can reach a real account.
+ENVIRONMENT = {
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": REGION,
+    "TABLE_NAME": "state",
+}
+
+HANDLERS = {
+    "start": {
+        "asset": "api/runtime",
+        "module": "start_function",
+        "environment": {"STATE_MACHINE_ARN": SERVER_STATE_MACHINE_ARN},
+    },
+    "stop": {
+        "asset": "api/runtime",
+        "module": "stop_function",
+        "environment": {"GRACEFUL_STOP_ARN": GRACEFUL_STOP_ARN},
+    },
+    "status": {
+        "asset": "api/runtime",
+        "module": "status_function",
+        "environment": {},
+    },
+    "upsert": {
+        "asset": "network/runtime",
+        "module": "lambda_function",
+        "environment": {"DOMAIN_NAME": "pz-craft.online"},
+    },
+    "cleanup": {
+        "asset": "workflow/runtime",
+        "module": "lambda_function",
+        "environment": {},
+    },
+}
+
+METRICS = ("import_ms", "first_invoke_ms", "invoke_ms", "invoke_p90_ms")
+
+# Differences below this are noise, whatever the relative change.
+MIN_REGRESSION_MS = 1.0
+
+
+def execution_arn(iteration):
+    return f"arn:aws:states:{REGION}:{ACCOUNT}:execution:server:server-{iteration}"
+
+
+def create_stand_ins(name, module):
+    """Create what ``name`` talks to; returns ``iteration -> event``.
+
+    The returned function also resets the state item, outside the timing,
+    so every invocation takes the same path.
+    """
+    import boto3
+
+    table = boto3.resource("dynamodb").create_table(
+        TableName=ENVIRONMENT["TABLE_NAME"],
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "kind", "AttributeType": "S"},
+            {"AttributeName": "requested_at_ms", "AttributeType": "N"},
+        ],
+        # As in the Database construct.
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "session-history",
+                "KeySchema": [
+                    {"AttributeName": "kind", "KeyType": "HASH"},
+                    {"AttributeName": "requested_at_ms", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "server-status",
+                "KeySchema": [
+                    {"AttributeName": "kind", "KeyType": "HASH"},
+                    {"AttributeName": "id", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    sfn = boto3.client("stepfunctions")
+    for state_machine_arn in (SERVER_STATE_MACHINE_ARN, GRACEFUL_STOP_ARN):
+        sfn.create_state_machine(
+            name=state_machine_arn.rsplit(":", 1)[-1],
+            definition='{"StartAt": "Run", "States": {"Run": {"Type": "Succeed"}}}',
+            roleArn=f"arn:aws:iam::{ACCOUNT}:role/server",
+        )
+
+    def running(iteration, state):
+        table.put_item(
+            Item={
+                "id": "0",
+                "state": state,
+                "version": 1,
+                "execution_arn": execution_arn(iteration),
+            }
+        )
+
+    if name == "start":
+
+        def prepare(iteration):
+            # Every claim bumps the version, and with it the execution name.
+            table.put_item(Item={"id": "0", "state": "STOPPED", "version": iteration * 10})
+            return {}
+
+    elif name == "stop":
+
+        def prepare(iteration):
+            running(iteration, "PLAYABLE")
+            return {}
+
+    elif name == "status":
+
+        def prepare(iteration):
+            return {"headers": {}}
+
+    elif name == "upsert":
+        ec2 = boto3.client("ec2")
+        vpc_id = ec2.create_vpc(CidrBlock="10.0.0.0/16")["Vpc"]["VpcId"]
+        subnet_id = ec2.create_subnet(VpcId=vpc_id, CidrBlock="10.0.0.0/24")["Subnet"]["SubnetId"]
+        eni_id = ec2.create_network_interface(SubnetId=subnet_id)["NetworkInterface"][
+            "NetworkInterfaceId"
+        ]
+        ec2.associate_address(
+            AllocationId=ec2.allocate_address(Domain="vpc")["AllocationId"],
+            NetworkInterfaceId=eni_id,
+        )
+        hosted_zone = boto3.client("route53").create_hosted_zone(
+            Name="pz-craft.online", CallerReference="benchmark"
+        )["HostedZone"]["Id"]
+        module.HOSTED_ZONE_ID = hosted_zone.rsplit("/", 1)[-1]
+
+        def prepare(iteration):
+            running(iteration, "STARTING")
+            return {
+                "detail-type": "ECS Task State Change",
+                "detail": {
+                    "taskArn": f"arn:task/{iteration}",
+                    "clusterArn": "arn:cluster",
+                    "lastStatus": "RUNNING",
+                    "createdAt": "2024-06-01T12:00:00.000Z",
+                    "startedAt": "2024-06-01T12:01:00.000Z",
+                    "attachments": [
+                        {
+                            "type": "eni",
+                            "details": [
+                                {"name": "networkInterfaceId", "value": eni_id},
+                                {"name": "privateIPv4Address", "value": "10.0.0.7"},
+                            ],
+                        }
+                    ],
+                },
+            }
+
+    else:
+
+        def prepare(iteration):
+            running(iteration, "PLAYABLE")
+            return {"execution_arn": execution_arn(iteration), "server_id": "0"}
+
+    return prepare
+
+
+def measure(name, iterations):
+    """Run in the worker interpreter; see the module docstring."""
+    handler = HANDLERS[name]
+    os.environ.update({**ENVIRONMENT, **handler["environment"]})
+    sys.path[:0] = [str(SRC / "common" / "runtime" / "python"), str(SRC / handler["asset"])]
+
+    started = time.perf_counter()
+    module = importlib.import_module(handler["module"])
+    import_ms = (time.perf_counter() - started) * 1000
+
+    # Only now, so that its own imports are not counted as the handler's.
+    from moto import mock_aws
+
+    with mock_aws():
+        prepare = create_stand_ins(name, module)
+        timings = []
+
+        for iteration in range(iterations + 1):
+            event = prepare(iteration)
+
+            started = time.perf_counter()
+            response = module.lambda_handler(event, None)
+            timings.append((time.perf_counter() - started) * 1000)
+
+            if response and response.get("statusCode", 200) != 200:
+                raise RuntimeError(f"{name} answered {response}")
+
+    warm = sorted(timings[1:])
+
+    return {
+        "import_ms": import_ms,
+        "first_invoke_ms": timings[0],
+        "invoke_ms": statistics.median(warm),
+        "invoke_p90_ms": warm[int(len(warm) * 0.9) - 1] if len(warm) >= 10 else max(warm),
+    }
+
+
+def run(names=tuple(HANDLERS), *, runs=5, iterations=50):
+    """Benchmark each handler in ``runs`` fresh interpreters; medians per metric."""
+    results = {}
+
+    for name in names:
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", name, "--iterations", str(iterations)],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            # The handlers log to stdout too; the measurement is the last line.
+            samples.append(json.loads(output.splitlines()[-1]))
+
+        results[name] = {
+            metric: round(statistics.median(sample[metric] for sample in samples), 2)
+            for metric in METRICS
+        }
+
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """``(handler, metric, baseline, current)`` for everything that got slower."""
+    found = []
+
+    for name, metrics in results.items():
+        for metric, current in metrics.items():
+            previous = baseline.get(name, {}).get(metric)
+            if previous is None:
+                continue
+
+            if current > previous * (1 + tolerance) and current - previous >= MIN_REGRESSION_MS:
+                found.append((name, metric, previous, current))
+
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("handlers", nargs="*", help=f"any of {', '.join(HANDLERS)}; all by default")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per handler")
+    parser.add_argument("--iterations", type=int, default=50, help="warm invokes per run")
+    parser.add_argument("--save", type=Path, help="write the results here as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against saved results")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.iterations)))
+        return 0
+
+    unknown = set(args.handlers) - set(HANDLERS)
+    if unknown:
+        parser.error(f"unknown handlers: {', '.join(sorted(unknown))}")
+
+    results = run(args.handlers or tuple(HANDLERS), runs=args.runs, iterations=args.iterations)
+
+    print(f"{'handler':<10}" + "".join(f"{metric:>18}" for metric in METRICS))
+    for name, metrics in results.items():
+        print(f"{name:<10}" + "".join(f"{metrics[metric]:>18.2f}" for metric in METRICS))
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        found = regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for name, metric, previous, current in found:
+            print(f"REGRESSION {name} {metric}: {previous:.2f} -> {current:.2f} ms")
+
+        return 1 if found else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import importlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+from moto.dynamodb.models import DynamoDBBackend
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+# constants.py reads these at import time; app.py normally loads them from .env.
+os.environ.setdefault("WORLD", "https://example.com/world.zip")
+os.environ.setdefault("MODPACK", "https://example.com/modpack.zip")
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def atomic_dynamodb(monkeypatch):
+    # DynamoDB evaluates a condition and applies the write atomically per item;
+    # moto does not, so serialise writes to get the same guarantee.
+    lock = threading.Lock()
+
+    for name in ("put_item", "update_item", "delete_item", "transact_write_items"):
+        original = getattr(DynamoDBBackend, name)
+
+        def locked(self, *args, __original=original, **kwargs):
+            with lock:
+                return __original(self, *args, **kwargs)
+
+        monkeypatch.setattr(DynamoDBBackend, name, locked)
+
+
+@pytest.fixture
+def state_table(aws):
+    table = boto3.resource("dynamodb").create_table(
+        TableName="state",
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "kind", "AttributeType": "S"},
+            {"AttributeName": "requested_at_ms", "AttributeType": "N"},
+        ],
+        # As in the Database construct.
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "session-history",
+                "KeySchema": [
+                    {"AttributeName": "kind", "KeyType": "HASH"},
+                    {"AttributeName": "requested_at_ms", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "server-status",
+                "KeySchema": [
+                    {"AttributeName": "kind", "KeyType": "HASH"},
+                    {"AttributeName": "id", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    return table
+
+
+@pytest.fixture
+def state_machine_arn(aws):
+    response = boto3.client("stepfunctions").create_state_machine(
+        name="server",
+        definition='{"StartAt": "Run", "States": {"Run": {"Type": "Succeed"}}}',
+        roleArn="arn:aws:iam::123456789012:role/server",
+    )
+
+    return response["stateMachineArn"]
+
+
+@pytest.fixture
+def load_runtime(monkeypatch):
+    """Import a Lambda module fresh from its asset directory.
+
+    The shared runtime layer is put on the path too, as Lambda would.
+    """
+    monkeypatch.syspath_prepend(str(SRC / "common" / "runtime" / "python"))
+
+    def load(asset, module, **environment):
+        for key, value in environment.items():
+            monkeypatch.setenv(key, value)
+
+        monkeypatch.syspath_prepend(str(SRC / asset))
+        sys.modules.pop(module, None)
+
+        return importlib.import_module(module)
+
+    return load
@@ -0,0 +1,41 @@
+import struct
+
+import pytest
+
+
+@pytest.fixture
+def anvil(load_runtime):
+    return load_runtime("common/runtime/python", "anvil")
+
+
+def region(anvil, *chunks):
+    return anvil.write_region(chunks)
+
+
+def test_round_trip_keeps_chunks(anvil):
+    chunks = [(0, 100, b"\x02" + b"a" * 10), (31, 200, b"\x02" + b"b" * 5000), (1023, 300, b"\x02c")]
+
+    data = region(anvil, *chunks)
+
+    assert len(data) % anvil.SECTOR_BYTES == 0
+    assert anvil.read_chunks(data) == chunks
+
+
+def test_large_chunk_spans_sectors(anvil):
+    data = region(anvil, (5, 1, b"\x02" + b"x" * 9000))
+    location = struct.unpack_from(">I", data, 5 * 4)[0]
+
+    assert location & 0xFF == 3
+    assert anvil.read_chunks(data) == [(5, 1, b"\x02" + b"x" * 9000)]
+
+
+def test_empty_region(anvil):
+    assert anvil.read_chunks(b"") == []
+    assert anvil.write_region([]) == b""
+
+
+def test_truncated_region_is_rejected(anvil):
+    data = region(anvil, (0, 1, b"\x02" + b"a" * 100))
+
+    with pytest.raises(anvil.RegionError):
+        anvil.read_chunks(data[: anvil.HEADER_BYTES + 10])
@@ -0,0 +1,162 @@
+import boto3
+import pytest
+
+BUCKET = "backups"
+
+
+@pytest.fixture
+def backup(load_runtime, aws):
+    boto3.client("s3").create_bucket(Bucket=BUCKET)
+
+    return load_runtime("backup/runtime", "snapshots")
+
+
+def write_region(backup, path, chunks):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(backup.anvil.write_region(chunks))
+
+
+def test_unchanged_chunks_are_uploaded_once(backup, tmp_path):
+    s3 = boto3.client("s3")
+    world = tmp_path / "world"
+    region = world / "region" / "r.0.0.mca"
+    chunks = [(index, 1, b"\x02" + bytes([index]) * 100) for index in range(3)]
+
+    write_region(backup, region, chunks)
+    (world / "level.dat").write_bytes(b"level")
+    (world / "session.lock").write_bytes(b"lock")
+
+    first = backup.snapshot(s3, BUCKET, str(world), "first")
+
+    assert first["stats"]["uploaded_objects"] == 4
+    assert "session.lock" not in first["files"]
+
+    # One chunk re-saved; the other two and level.dat are unchanged.
+    write_region(backup, region, [*chunks[:2], (2, 2, b"\x02changed")])
+
+    second = backup.snapshot(s3, BUCKET, str(world), "second", previous=first)
+
+    assert second["stats"]["changed_files"] == 1
+    assert second["stats"]["uploaded_objects"] == 1
+    assert second["files"]["level.dat"] == first["files"]["level.dat"]
+    assert backup.latest_manifest(s3, BUCKET)["snapshot"] == "second"
+
+
+def test_any_snapshot_restores(backup, tmp_path):
+    s3 = boto3.client("s3")
+    world = tmp_path / "world"
+    region = world / "region" / "r.0.0.mca"
+    original = [(0, 1, b"\x02first"), (7, 1, b"\x02second")]
+
+    write_region(backup, region, original)
+    backup.snapshot(s3, BUCKET, str(world), "first")
+    write_region(backup, region, [(0, 2, b"\x02replaced")])
+    backup.snapshot(s3, BUCKET, str(world), "second", previous=backup.latest_manifest(s3, BUCKET))
+
+    target = tmp_path / "restored"
+    files = backup.restore(s3, BUCKET, backup.load_manifest(s3, BUCKET, "first"), str(target))
+
+    assert files == 1
+    assert backup.anvil.read_chunks((target / "region" / "r.0.0.mca").read_bytes()) == original
+
+
+@pytest.fixture
+def world(tmp_path):
+    world = tmp_path / "world"
+    world.mkdir()
+    (world / "level.dat").write_bytes(b"level")
+
+    return world
+
+
+@pytest.fixture
+def backup_function(load_runtime, state_table, world):
+    boto3.client("s3").create_bucket(Bucket=BUCKET)
+
+    return load_runtime(
+        "backup/runtime",
+        "backup_function",
+        BUCKET=BUCKET,
+        TABLE_NAME=state_table.name,
+        WORLD_DIR=str(world),
+    )
+
+
+@pytest.fixture
+def restore_function(load_runtime, state_table, world):
+    boto3.client("s3").create_bucket(Bucket=BUCKET)
+
+    return load_runtime(
+        "backup/runtime",
+        "restore_function",
+        BUCKET=BUCKET,
+        TABLE_NAME=state_table.name,
+        WORLD_DIR=str(world),
+    )
+
+
+def holding_state(module, name, state_table, monkeypatch):
+    """Wrap ``module.snapshots.<name>`` to note the server state it ran in."""
+    seen = []
+    original = getattr(module.snapshots, name)
+
+    def wrapped(*args, **kwargs):
+        seen.append(state_table.get_item(Key={"id": "0"})["Item"]["state"])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(module.snapshots, name, wrapped)
+
+    return seen
+
+
+def test_backup_holds_the_server_while_it_reads_the_world(
+    backup_function, state_table, monkeypatch
+):
+    seen = holding_state(backup_function, "snapshot", state_table, monkeypatch)
+
+    result = backup_function.lambda_handler({"execution_arn": "arn:server-1"}, None)
+
+    assert result["files"] == 1
+    assert seen == ["MAINTENANCE"]
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STOPPED"
+
+
+def test_backup_is_skipped_once_the_server_started_again(backup_function, state_table):
+    state_table.put_item(Item={"id": "0", "state": "STARTING", "version": 4})
+
+    result = backup_function.lambda_handler({"execution_arn": "arn:server-1"}, None)
+
+    assert result == {"snapshot": None, "skipped": "STARTING"}
+    assert state_table.get_item(Key={"id": "0"})["Item"]["version"] == 4
+
+
+def test_only_the_primary_server_is_backed_up(backup_function, state_table):
+    result = backup_function.lambda_handler({"server_id": "creative"}, None)
+
+    assert result == {"snapshot": None, "skipped": "Server creative is not backed up"}
+    assert "Item" not in state_table.get_item(Key={"id": "creative"})
+
+
+def test_restore_holds_the_server_until_the_world_is_swapped(
+    backup_function, restore_function, state_table, world, monkeypatch
+):
+    backup_function.lambda_handler({}, None)
+    (world / "level.dat").write_bytes(b"changed")
+    seen = holding_state(restore_function, "restore", state_table, monkeypatch)
+
+    response = restore_function.lambda_handler({}, None)
+
+    assert response["statusCode"] == 200
+    assert seen == ["MAINTENANCE"]
+    assert (world / "level.dat").read_bytes() == b"level"
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STOPPED"
+
+
+def test_restore_conflicts_with_a_running_server(restore_function, state_table, world):
+    state_table.put_item(Item={"id": "0", "state": "PLAYABLE", "version": 4})
+
+    response = restore_function.lambda_handler({}, None)
+
+    assert response["statusCode"] == 409
+    assert (world / "level.dat").read_bytes() == b"level"
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "PLAYABLE"
@@ -0,0 +1,23 @@
+from tests.benchmark import handlers
+
+
+def test_every_handler_runs_against_the_stand_ins():
+    results = handlers.run(runs=1, iterations=2)
+
+    assert set(results) == set(handlers.HANDLERS)
+    assert all(metrics["import_ms"] > 0 for metrics in results.values())
+    assert all(metrics["first_invoke_ms"] > 0 for metrics in results.values())
+
+
+def test_only_clear_slowdowns_are_regressions():
+    baseline = {"start": {"import_ms": 100.0, "invoke_ms": 2.0}}
+
+    found = handlers.regressions(
+        {"start": {"import_ms": 140.0, "invoke_ms": 2.9}, "stop": {"import_ms": 500.0}},
+        baseline,
+        tolerance=0.25,
+    )
+
+    # 2.0 -> 2.9 ms is beyond the tolerance but below the noise floor, and
+    # there is nothing to compare stop against.
+    assert found == [("start", "import_ms", 100.0, 140.0)]
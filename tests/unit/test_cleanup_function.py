@@ -0,0 +1,49 @@
+import boto3
+import pytest
+
+
+@pytest.fixture
+def cleanup_function(load_runtime, state_table):
+    return load_runtime("workflow/runtime", "lambda_function", TABLE_NAME=state_table.name)
+
+
+def test_cleanup_stops_its_own_execution(cleanup_function, state_table):
+    state_table.put_item(
+        Item={"id": "0", "state": "PLAYABLE", "version": 3, "execution_arn": "arn:current"}
+    )
+
+    cleanup_function.lambda_handler({"execution_arn": "arn:current"}, None)
+
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STOPPED"
+    assert "stopped_at_ms" in state_table.get_item(Key={"id": "session#current"})["Item"]
+
+
+def test_cleanup_ignores_stale_execution(cleanup_function, state_table):
+    state_table.put_item(
+        Item={"id": "0", "state": "STARTING", "version": 3, "execution_arn": "arn:current"}
+    )
+
+    cleanup_function.lambda_handler({"execution_arn": "arn:previous"}, None)
+
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STARTING"
+
+
+def test_cleanup_deregisters_static_address_target(cleanup_function, state_table, monkeypatch):
+    elbv2 = boto3.client("elbv2")
+    ec2 = boto3.client("ec2")
+    vpc_id = ec2.create_vpc(CidrBlock="10.0.0.0/16")["Vpc"]["VpcId"]
+    target_group_arn = elbv2.create_target_group(
+        Name="server", Protocol="TCP", Port=25565, VpcId=vpc_id, TargetType="ip"
+    )["TargetGroups"][0]["TargetGroupArn"]
+    elbv2.register_targets(
+        TargetGroupArn=target_group_arn, Targets=[{"Id": "10.0.0.7", "Port": 25565}]
+    )
+    monkeypatch.setattr(cleanup_function, "TARGET_GROUP_ARN", target_group_arn)
+    state_table.put_item(
+        Item={"id": "0", "state": "PLAYABLE", "version": 3, "execution_arn": "arn:current"}
+    )
+
+    cleanup_function.lambda_handler({"execution_arn": "arn:current"}, None)
+
+    targets = elbv2.describe_target_health(TargetGroupArn=target_group_arn)
+    assert targets["TargetHealthDescriptions"] == []
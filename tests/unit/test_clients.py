@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def clients(load_runtime):
+    return load_runtime("common/runtime/python", "clients")
+
+
+@pytest.fixture
+def lifecycle(load_runtime):
+    return load_runtime("common/runtime/python", "lifecycle")
+
+
+@pytest.fixture
+def replies(load_runtime):
+    return load_runtime("common/runtime/python", "replies")
+
+
+def test_client_is_built_on_first_use(clients, aws):
+    sfn = clients.LazyClient("stepfunctions")
+
+    assert sfn._client is None
+    assert sfn.list_state_machines()["stateMachines"] == []
+    assert sfn._client.meta.config.retries["mode"] == "standard"
+
+
+def test_table_reads_and_writes_plain_values(clients, state_table):
+    table = clients.Table(state_table.name)
+
+    table.put_item(Item={"id": "0", "state": "STOPPED", "version": 1, "tags": ["a"]})
+    item = table.update_item(
+        Key={"id": "0"},
+        UpdateExpression="SET version = version + :one",
+        ExpressionAttributeValues={":one": 1},
+        ReturnValues="ALL_NEW",
+    )["Attributes"]
+
+    assert item == {"id": "0", "state": "STOPPED", "version": 2, "tags": ["a"]}
+    assert table.get_item(Key={"id": "0"})["Item"] == item
+    # Written through the client, read back through the resource.
+    assert state_table.get_item(Key={"id": "0"})["Item"] == item
+
+
+def test_table_serves_lifecycle(clients, lifecycle, state_table):
+    table = clients.Table(state_table.name)
+
+    claim = lifecycle.claim_start(table, 90)
+    lifecycle.record_execution(table, claim["version"], "arn:execution:server-1")
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.claim_start(table, 90)
+    assert lifecycle.servers(table)["0"]["state"] == lifecycle.STARTING
+
+
+def test_replies_keep_the_api_shape(replies):
+    response = replies.respond(200, True, headers={"ETag": '"3"'}, server_status="STOPPED")
+
+    assert response["headers"] == {"Content-Type": "application/json", "ETag": '"3"'}
+    assert json.loads(response["body"]) == {"success": "true", "server_status": "STOPPED"}
+    assert json.loads(replies.error(404, "Unknown server x")["body"]) == {
+        "success": "false",
+        "error": "Unknown server x",
+    }
+
+
+def test_log_writes_one_json_record(replies, capsys):
+    replies.log("Failed", level="ERROR", server_id="0", error=ValueError("boom"))
+
+    (record,) = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert record["level"] == "ERROR"
+    assert (record["message"], record["server_id"], record["error"]) == ("Failed", "0", "boom")
@@ -0,0 +1,299 @@
+import json
+from types import SimpleNamespace
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import boto3
+import pytest
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_stepfunctions as sfn
+
+from src.api.express import ExpressWorkflows
+
+ACCOUNT = "123456789012"
+EXECUTION_ARN = f"arn:aws:states:us-east-1:{ACCOUNT}:execution:server:server-1"
+NOW = 1000
+
+
+@pytest.fixture(scope="module")
+def states():
+    """Every state of both express machines, by name."""
+    stack = core.Stack(core.App(), "express")
+    ExpressWorkflows(
+        stack,
+        "ExpressWorkflows",
+        table=dynamodb.Table.from_table_name(stack, "StateTable", "state"),
+        state_machine=sfn.StateMachine.from_state_machine_arn(
+            stack, "Server", f"arn:aws:states:us-east-1:{ACCOUNT}:stateMachine:server"
+        ),
+        graceful_stop_state_machine=sfn.StateMachine.from_state_machine_arn(
+            stack, "GracefulStop", f"arn:aws:states:us-east-1:{ACCOUNT}:stateMachine:stop"
+        ),
+        lease_seconds=90,
+    )
+
+    found = {}
+    for resource in assertions.Template.from_stack(stack).find_resources(
+        "AWS::StepFunctions::StateMachine"
+    ).values():
+        definition = resource["Properties"]["DefinitionString"]
+        if isinstance(definition, dict):
+            # Only ARNs are left to CloudFormation; none of them matter here.
+            definition = "".join(
+                part if isinstance(part, str) else "aws" for part in definition["Fn::Join"][1]
+            )
+        found.update(json.loads(definition)["States"])
+
+    return found
+
+
+@pytest.fixture
+def runtime(load_runtime, monkeypatch):
+    """The shared runtime modules the Lambda handlers write through."""
+    lifecycle = load_runtime("common/runtime/python", "lifecycle")
+    monkeypatch.setattr(lifecycle, "time", SimpleNamespace(time=lambda: NOW))
+
+    return SimpleNamespace(
+        lifecycle=lifecycle, timeline=load_runtime("common/runtime/python", "timeline")
+    )
+
+
+INTRINSICS = {
+    "States.Format": lambda template, *arguments: template.format(*arguments),
+    "States.StringSplit": lambda value, separator: value.split(separator),
+    "States.ArrayGetItem": lambda values, index: values[index],
+    "States.StringToJson": json.loads,
+    "States.MathAdd": lambda left, right: left + right,
+}
+
+
+def split_arguments(text):
+    arguments, current, depth, quoted = [], "", 0, False
+
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        elif not quoted and not depth and char == ",":
+            arguments.append(current)
+            current = ""
+            continue
+        current += char
+
+    return [*arguments, current]
+
+
+def evaluate(expression, state_input):
+    """Evaluate a path or the intrinsic functions these machines use."""
+    expression = expression.strip()
+
+    if expression.startswith("$."):
+        found = state_input
+        for part in expression.removeprefix("$.").split("."):
+            found = found[part]
+        return found
+    if expression.startswith("'"):
+        return expression[1:-1]
+    if expression.isdigit():
+        return int(expression)
+
+    name, arguments = expression.removesuffix(")").split("(", 1)
+    arguments = [evaluate(argument, state_input) for argument in split_arguments(arguments)]
+
+    return INTRINSICS[name](*arguments)
+
+
+def resolve(value, state_input):
+    """Fill in the ``"<field>.$": ...`` parameters of a state."""
+    if not isinstance(value, dict):
+        return value
+
+    return {
+        name.removesuffix(".$"): (
+            evaluate(field, state_input) if name.endswith(".$") else resolve(field, state_input)
+        )
+        for name, field in value.items()
+    }
+
+
+def choose(state, state_input):
+    """The state a Choice state moves on to."""
+
+    def matches(rule):
+        if "Or" in rule:
+            return any(matches(option) for option in rule["Or"])
+        try:
+            value = evaluate(rule["Variable"], state_input)
+        except KeyError:
+            return rule.get("IsPresent") is False
+        if "IsPresent" in rule:
+            return rule["IsPresent"]
+        return value == rule["StringEquals"]
+
+    return next(
+        (rule["Next"] for rule in state["Choices"] if matches(rule)), state["Default"]
+    )
+
+
+def answer_conflict(states, current):
+    """Walk the conflict states from ``CurrentState`` to the answer's body."""
+    state_input = {"current": current}
+    name = "CurrentState"
+
+    while not name.endswith("Body"):
+        state = states[name]
+        if state["Type"] == "Choice":
+            name = choose(state, state_input)
+        else:
+            state_input["conflict"] = resolve(state["Parameters"], state_input)
+            name = state["Next"]
+
+    return name.removesuffix("Body"), resolve(states[name]["Parameters"], state_input)
+
+
+def run_task(state, state_input):
+    """Send a DynamoDB task's request as Step Functions would."""
+    parameters = resolve(state["Parameters"], state_input)
+    parameters["ReturnValues"] = "NONE"
+    boto3.client("dynamodb").update_item(**parameters)
+
+
+STARTING = {"id": "0", "state": "STARTING", "version": 1, "lease_expires_at": NOW + 30}
+SESSION = {"id": "session#server-1", "kind": "session", "requested_at_ms": 500}
+PLAYABLE = {"id": "0", "state": "PLAYABLE", "version": 3, "execution_arn": EXECUTION_ARN}
+
+CASES = {
+    "claim": (
+        {"id": "0", "state": "STOPPED", "version": 2, "in_progress": False},
+        lambda runtime, table: runtime.lifecycle.claim_start(table, 90, now=NOW),
+        "Claim",
+        {"now": str(NOW), "lease": {"expires_at": str(NOW + 90)}},
+    ),
+    "legacy claim": (
+        {"id": "0", "in_progress": False},
+        lambda runtime, table: runtime.lifecycle.claim_start(table, 90, now=NOW),
+        "Claim",
+        {"now": str(NOW), "lease": {"expires_at": str(NOW + 90)}},
+    ),
+    "record execution": (
+        STARTING,
+        lambda runtime, table: runtime.lifecycle.record_execution(
+            table, 1, EXECUTION_ARN, attributes={"rcon_password": "secret"}
+        ),
+        "RecordExecution",
+        {
+            "claim": {"version": "1"},
+            "execution": {"execution_arn": EXECUTION_ARN},
+            "session": {"rcon_password": "secret"},
+        },
+    ),
+    "release": (
+        STARTING,
+        lambda runtime, table: runtime.lifecycle.release(table, 1),
+        "Release",
+        {"now": str(NOW), "claim": {"version": "1"}},
+    ),
+    "begin stop": (
+        PLAYABLE,
+        lambda runtime, table: runtime.lifecycle.begin_stop(table, {**PLAYABLE}),
+        "BeginStop",
+        {"now": str(NOW), "read": {"Item": {"version": {"N": "3"}}}},
+    ),
+    "record session": (
+        {"id": "session#server-1"},
+        lambda runtime, table: runtime.timeline.record(table, "server-1", {"requested": 1234}),
+        "RecordSession",
+        {"now_ms": "1234", "claim": {"version": "1"}},
+    ),
+    "record demand": (
+        SESSION,
+        lambda runtime, table: runtime.timeline.annotate(
+            table, "server-1", {"demanded_at_ms": 1234}
+        ),
+        "RecordDemand",
+        {"now_ms": "1234", "current": {"Item": {"execution_arn": {"S": EXECUTION_ARN}}}},
+    ),
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_express_writes_match_the_lambda_path(case, states, runtime, state_table):
+    item, lambda_path, state_name, state_input = CASES[case]
+    key = {"id": item["id"]}
+
+    def reset():
+        state_table.delete_item(Key=key)
+        if len(item) > 1:
+            state_table.put_item(Item=item)
+
+    reset()
+    lambda_path(runtime, state_table)
+    written_by_lambda = state_table.get_item(Key=key)["Item"]
+
+    reset()
+    run_task(states[state_name], state_input)
+    written_by_express = state_table.get_item(Key=key)["Item"]
+
+    assert written_by_express == written_by_lambda
+
+
+def test_start_records_its_session_and_conflicts_record_demand(states):
+    assert states["RecordExecution"]["Next"] == "RecordSession"
+    assert states["Claim"]["Catch"][0]["Next"] == "ReadCurrent"
+    assert states["HasSession"]["Choices"][0]["Next"] == "RecordDemand"
+
+
+def test_lease_is_worked_out_as_in_start_function(states):
+    lease = resolve(states["Lease"]["Parameters"], {"now": str(NOW)})
+
+    assert lease == {"expires_at": str(NOW + 90)}
+
+
+def test_express_conflicts_match_the_lambda_path(states, runtime, state_table):
+    state_table.put_item(Item=PLAYABLE)
+
+    with pytest.raises(runtime.lifecycle.TransitionConflict):
+        runtime.lifecycle.claim_start(state_table, 90, now=NOW)
+    with pytest.raises(state_table.meta.client.exceptions.ConditionalCheckFailedException):
+        run_task(states["Claim"], {"now": str(NOW), "lease": {"expires_at": str(NOW + 90)}})
+
+
+def test_express_answers_in_the_lambda_body_shape(states, load_runtime):
+    replies = load_runtime("common/runtime/python", "replies")
+    response = replies.respond(200, True, server_status="STARTING")
+
+    assert states["StartedBody"]["ResultPath"] == "$.body"
+    assert states["StartedBody"]["Parameters"] == json.loads(response["body"])
+    assert states["Started"]["Parameters"] == {
+        "statusCode": 200,
+        "body.$": "States.JsonToString($.body)",
+    }
+
+
+@pytest.mark.parametrize(
+    "item",
+    [
+        {"id": "0", "state": "PLAYABLE", "version": 3},
+        {"id": "0", "state": "STARTING", "version": 1},
+        {"id": "0", "state": "MAINTENANCE", "version": 5},
+        {"id": "0", "state": "STOPPING", "version": 4},
+        {"id": "0", "in_progress": True},
+    ],
+)
+def test_express_conflicts_answer_with_the_current_state(item, states, runtime, load_runtime):
+    replies = load_runtime("common/runtime/python", "replies")
+    table = SimpleNamespace(get_item=lambda **kwargs: {"Item": item})
+    state = runtime.lifecycle.read(table)["state"]
+    current = {"Item": {name: {"S": str(value)} for name, value in item.items()}}
+
+    name, body = answer_conflict(states, current)
+    expected = replies.respond(409, state in runtime.lifecycle.ACTIVE_STATES, server_status=state)
+
+    assert body == json.loads(expected["body"])
+    assert states[name]["Parameters"]["statusCode"] == 409
+
+
+def test_superseded_starts_answer_with_the_winning_state(states):
+    assert states["AbandonExecution"]["Next"] == "ReadWinner"
+    assert states["ReadWinner"]["Next"] == "CurrentState"
@@ -0,0 +1,74 @@
+import pytest
+
+EXECUTION_ARN = "arn:aws:states:us-east-1:123456789012:execution:server:server-2"
+
+
+@pytest.fixture
+def fallback_function(load_runtime, state_table):
+    return load_runtime(
+        "workflow/runtime",
+        "fallback_function",
+        TABLE_NAME=state_table.name,
+        RESTART_ON_INTERRUPTION="TRUE",
+    )
+
+
+def put_server(state_table, state, **attributes):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": state,
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "task_arn": "arn:task/spot",
+            **attributes,
+        }
+    )
+
+
+def test_spot_task_that_never_ran_falls_back(fallback_function, state_table):
+    put_server(state_table, "STARTING")
+
+    result = fallback_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert result["on_demand"] is True
+    assert state_table.get_item(Key={"id": "0"})["Item"]["version"] == 4
+
+
+def test_interrupted_session_restarts_on_demand(fallback_function, state_table):
+    put_server(state_table, "PLAYABLE", interrupted_task_arn="arn:task/spot", private_ip="10.0.0.7")
+
+    result = fallback_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+
+    assert result["on_demand"] is True
+    assert item["state"] == "STARTING"
+    assert "private_ip" not in item
+
+
+def test_restart_can_be_turned_off(fallback_function, state_table, monkeypatch):
+    put_server(state_table, "PLAYABLE", interrupted_task_arn="arn:task/spot")
+    monkeypatch.setattr(fallback_function, "RESTART_ON_INTERRUPTION", False)
+
+    result = fallback_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert result["on_demand"] is False
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "PLAYABLE"
+
+
+@pytest.mark.parametrize(
+    "state, attributes",
+    [
+        # Autostop or a crash, not an interruption.
+        ("PLAYABLE", {}),
+        # The player asked for a stop while the task was being reclaimed.
+        ("STOPPING", {"interrupted_task_arn": "arn:task/spot"}),
+    ],
+)
+def test_other_endings_are_cleaned_up(fallback_function, state_table, state, attributes):
+    put_server(state_table, state, **attributes)
+
+    result = fallback_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert result["on_demand"] is False
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == state
@@ -0,0 +1,41 @@
+import boto3
+import pytest
+
+
+@pytest.fixture
+def force_stop_function(load_runtime, state_table):
+    return load_runtime("workflow/runtime", "force_stop_function", TABLE_NAME=state_table.name)
+
+
+def test_force_stop_aborts_execution_and_stops_server(force_stop_function, state_table, state_machine_arn):
+    execution_arn = boto3.client("stepfunctions").start_execution(
+        stateMachineArn=state_machine_arn, name="server-1"
+    )["executionArn"]
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "STOPPING",
+            "version": 5,
+            "execution_arn": execution_arn,
+            "rcon_password": "secret",
+        }
+    )
+
+    force_stop_function.lambda_handler({"execution_arn": execution_arn}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+    execution = boto3.client("stepfunctions").describe_execution(executionArn=execution_arn)
+
+    assert execution["status"] == "ABORTED"
+    assert item["state"] == "STOPPED"
+    assert "rcon_password" not in item
+
+
+def test_force_stop_after_cleanup_is_a_no_op(force_stop_function, state_table, state_machine_arn):
+    execution_arn = boto3.client("stepfunctions").start_execution(
+        stateMachineArn=state_machine_arn, name="server-1"
+    )["executionArn"]
+    state_table.put_item(Item={"id": "0", "state": "STOPPED", "version": 6})
+
+    force_stop_function.lambda_handler({"execution_arn": execution_arn}, None)
+
+    assert state_table.get_item(Key={"id": "0"})["Item"]["version"] == 6
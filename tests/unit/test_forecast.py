@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+# Monday, 2024-01-01 00:00 UTC.
+MONDAY_MS = 1704067200000
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+WEEK_MS = 7 * DAY_MS
+
+
+@pytest.fixture
+def forecast(load_runtime):
+    return load_runtime("prewarm/runtime", "forecast")
+
+
+def synthetic_history(weeks, seed=7):
+    """Weekday evenings at 19:00 and weekend afternoons at 14:00, plus noise."""
+    rng = random.Random(seed)
+    demand = []
+
+    for day in range(weeks * 7):
+        habit = 14 if day % 7 >= 5 else 19
+        for hour in range(24):
+            chance = 0.9 if hour == habit else 0.01
+            if rng.random() < chance:
+                demand.append(MONDAY_MS + day * DAY_MS + hour * HOUR_MS + rng.randrange(HOUR_MS))
+
+    return demand
+
+
+def test_backtest_finds_the_habits(forecast):
+    demand = synthetic_history(weeks=10)
+
+    report = forecast.backtest(
+        demand,
+        MONDAY_MS + 4 * WEEK_MS,
+        MONDAY_MS + 10 * WEEK_MS,
+        threshold=0.5,
+        lead_ms=10 * 60 * 1000,
+    )
+
+    assert report["hours"] == 6 * 7 * 24
+    # One pre-warm a day; the odd noise hour is not mistaken for a habit.
+    assert report["prewarms"] == 6 * 7
+    assert report["precision"] >= 0.85
+    # What is left over is the noise, which nothing can predict.
+    assert report["recall"] >= 0.7
+
+
+def test_new_server_is_not_prewarmed_after_one_evening(forecast):
+    demand = [MONDAY_MS + 19 * HOUR_MS]
+    target_ms = demand[0] + WEEK_MS
+
+    assert forecast.probability(demand, target_ms, target_ms - 600000) == 0.0
+    assert forecast.probability(demand, target_ms, target_ms - 600000, min_weeks=1) == 1.0
+
+
+def test_recent_weeks_weigh_more(forecast):
+    target_ms = MONDAY_MS + 4 * WEEK_MS + 19 * HOUR_MS
+    # Played the last two weeks, but not the two before.
+    demand = [MONDAY_MS, target_ms - 2 * WEEK_MS, target_ms - WEEK_MS]
+
+    probability = forecast.probability(demand, target_ms, target_ms - 600000)
+
+    assert 0.5 < probability < 1.0
+
+
+def test_unused_prewarms_are_not_demand(forecast):
+    sessions = [
+        {"requested_at_ms": 1000},
+        # Nobody came; autostop took it down once its allowance ran out.
+        {
+            "requested_at_ms": 2000,
+            "prewarmed": True,
+            "prewarm_for_ms": 3600000,
+            "autostop_timeout_init": 1800,
+            "playable_at_ms": 100000,
+            "stopped_at_ms": 1900000,
+        },
+        # Played well past the allowance.
+        {
+            "requested_at_ms": 5000,
+            "prewarmed": True,
+            "prewarm_for_ms": 7200000,
+            "autostop_timeout_init": 1800,
+            "playable_at_ms": 100000,
+            "stopped_at_ms": 9000000,
+        },
+        {"requested_at_ms": 9000, "prewarmed": True, "prewarm_for_ms": 10800000, "peak_players": 2},
+    ]
+
+    assert list(forecast.demand_times(sessions)) == [1000, 7200000, 10800000]
@@ -0,0 +1,84 @@
+import socketserver
+import threading
+
+import pytest
+
+PASSWORD = "secret"
+TASK_ARN = "arn:aws:ecs:us-east-1:123456789012:task/cluster/spot"
+
+
+class FakeRconHandler(socketserver.BaseRequestHandler):
+    """Accepts any command and records it."""
+
+    def handle(self):
+        rcon = self.server.rcon
+
+        request_id, _, body = rcon.read(self.request)
+        authenticated = body == PASSWORD
+        self.request.sendall(rcon.encode(request_id if authenticated else -1, rcon.AUTH_RESPONSE, ""))
+        if not authenticated:
+            return
+
+        while True:
+            try:
+                request_id, _, command = rcon.read(self.request)
+            except rcon.RconError:
+                return
+
+            self.server.commands.append(command)
+            self.request.sendall(rcon.encode(request_id, rcon.RESPONSE_VALUE, "Saved the game"))
+
+
+@pytest.fixture
+def interruption_function(load_runtime, state_table):
+    return load_runtime("workflow/runtime", "interruption_function", TABLE_NAME=state_table.name)
+
+
+@pytest.fixture
+def rcon_server(interruption_function, monkeypatch):
+    server = socketserver.TCPServer(("127.0.0.1", 0), FakeRconHandler)
+    server.rcon = interruption_function.rcon
+    server.commands = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(interruption_function, "RCON_PORT", server.server_address[1])
+
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def interruption(task_arn=TASK_ARN):
+    return {
+        "detail-type": "ECS Task State Change",
+        "detail": {"taskArn": task_arn, "stopCode": "SpotInterruption", "desiredStatus": "STOPPED"},
+    }
+
+
+def test_interruption_saves_world_and_marks_task(interruption_function, rcon_server, state_table):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "PLAYABLE",
+            "version": 6,
+            "task_arn": TASK_ARN,
+            "private_ip": "127.0.0.1",
+            "rcon_password": PASSWORD,
+        }
+    )
+
+    result = interruption_function.lambda_handler(interruption(), None)
+
+    assert result["saved"] is True
+    assert rcon_server.commands[-1] == "save-all flush"
+    assert state_table.get_item(Key={"id": "0"})["Item"]["interrupted_task_arn"] == TASK_ARN
+
+
+def test_interruption_of_other_task_is_ignored(interruption_function, rcon_server, state_table):
+    state_table.put_item(Item={"id": "0", "state": "PLAYABLE", "version": 6, "task_arn": TASK_ARN})
+
+    result = interruption_function.lambda_handler(interruption("arn:other"), None)
+
+    assert result["saved"] is False
+    assert rcon_server.commands == []
+    assert "interrupted_task_arn" not in state_table.get_item(Key={"id": "0"})["Item"]
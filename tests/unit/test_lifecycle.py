@@ -0,0 +1,138 @@
+import pytest
+
+
+@pytest.fixture
+def lifecycle(load_runtime):
+    return load_runtime("common/runtime/python", "lifecycle")
+
+
+def test_read_defaults_to_stopped(lifecycle, state_table):
+    item = lifecycle.read(state_table)
+
+    assert item["state"] == lifecycle.STOPPED
+    assert item["version"] == 0
+
+
+def test_transition_bumps_version_and_stamps_time(lifecycle, state_table):
+    claim = lifecycle.claim_start(state_table, 60, now=100)
+    running = lifecycle.transition(state_table, lifecycle.RUNNING, now=130)
+
+    assert claim["version"] == 1
+    assert running["version"] == 2
+    assert running["state"] == lifecycle.RUNNING
+    assert running["starting_at"] == 100
+    assert running["running_at"] == 130
+    assert running["state_changed_at"] == 130
+
+
+def test_transition_rejects_invalid_source_state(lifecycle, state_table):
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.transition(state_table, lifecycle.PLAYABLE)
+
+
+def test_stale_version_is_rejected(lifecycle, state_table):
+    claim = lifecycle.claim_start(state_table, 60)
+    lifecycle.record_execution(state_table, claim["version"], "arn:execution")
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.release(state_table, claim["version"])
+
+
+def test_mark_stopped_only_for_owning_execution(lifecycle, state_table):
+    claim = lifecycle.claim_start(state_table, 60)
+    lifecycle.record_execution(state_table, claim["version"], "arn:new")
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.mark_stopped(state_table, execution_arn="arn:old")
+
+    stopped = lifecycle.mark_stopped(state_table, execution_arn="arn:new")
+
+    assert stopped["state"] == lifecycle.STOPPED
+    assert "execution_arn" not in stopped
+
+
+def test_legacy_item_is_understood(lifecycle, state_table):
+    state_table.put_item(Item={"id": "0", "in_progress": True, "execution_arn": "arn:old"})
+
+    assert lifecycle.read(state_table)["state"] == lifecycle.STARTING
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.claim_start(state_table, 60)
+
+    stopped = lifecycle.mark_stopped(state_table, execution_arn="arn:old")
+
+    assert stopped["state"] == lifecycle.STOPPED
+    assert "in_progress" not in stopped
+
+
+def test_maintenance_blocks_starts(lifecycle, state_table):
+    held = lifecycle.begin_maintenance(state_table, "trim")
+
+    assert held["state"] == lifecycle.MAINTENANCE
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.claim_start(state_table, 60)
+
+    released = lifecycle.end_maintenance(state_table, held["version"])
+
+    assert released["state"] == lifecycle.STOPPED
+    assert "maintenance" not in released
+    assert lifecycle.claim_start(state_table, 60)["state"] == lifecycle.STARTING
+
+
+def test_maintenance_needs_a_stopped_server(lifecycle, state_table):
+    lifecycle.claim_start(state_table, 60)
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.begin_maintenance(state_table, "trim")
+
+
+def test_restart_moves_session_back_to_starting(lifecycle, state_table):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": lifecycle.PLAYABLE,
+            "version": 5,
+            "execution_arn": "arn:current",
+            "public_ip": "203.0.113.7",
+            "private_ip": "10.0.0.7",
+            "interrupted_task_arn": "arn:task",
+        }
+    )
+
+    with pytest.raises(lifecycle.TransitionConflict):
+        lifecycle.restart(state_table, "arn:previous")
+
+    item = lifecycle.restart(state_table, "arn:current")
+
+    assert item["state"] == lifecycle.STARTING
+    assert item["execution_arn"] == "arn:current"
+    assert not {"public_ip", "private_ip", "interrupted_task_arn"} & set(item)
+
+
+def test_servers_are_tracked_apart(lifecycle, state_table):
+    lifecycle.claim_start(state_table, 60, server_id="creative")
+    lifecycle.claim_start(state_table, 60)
+
+    servers = lifecycle.servers(state_table)
+
+    assert sorted(servers) == ["0", "creative"]
+    assert servers["creative"]["state"] == lifecycle.STARTING
+    assert lifecycle.read(state_table, "other")["state"] == lifecycle.STOPPED
+
+
+def test_execution_names_stay_unique_across_servers(lifecycle):
+    assert lifecycle.execution_name("0", 3) == "server-3"
+    assert lifecycle.execution_name("creative", 3) == "creative-3"
+
+
+def test_task_server_id_comes_from_the_overrides(lifecycle):
+    detail = {
+        "overrides": {
+            "containerOverrides": [
+                {"name": "server", "environment": [{"name": "SERVER_ID", "value": "creative"}]}
+            ]
+        }
+    }
+
+    assert lifecycle.task_server_id(detail) == "creative"
+    assert lifecycle.task_server_id({"overrides": {"containerOverrides": [{}]}}) == "0"
@@ -0,0 +1,160 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+TASK_ID = "0123456789abcdef"
+EXECUTION_ARN = "arn:aws:states:us-east-1:123456789012:execution:server:server-4"
+LAG_LINE = (
+    "[12:00:00] [Server thread/WARN]: Can't keep up! Is the server overloaded? "
+    "Running {}ms or {} ticks behind"
+)
+
+
+@pytest.fixture
+def log_metrics_function(load_runtime, state_table):
+    module = load_runtime("monitoring/runtime", "log_metrics_function", TABLE_NAME=state_table.name)
+    module._save_started_at_ms.clear()
+    return module
+
+
+@pytest.fixture
+def running_server(state_table):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "PLAYABLE",
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "task_arn": f"arn:aws:ecs:us-east-1:123456789012:task/cluster/{TASK_ID}",
+        }
+    )
+
+
+def subscription_event(*lines, stream=f"minecraft/minecraft/{TASK_ID}"):
+    batch = {
+        "logGroup": "server",
+        "logStream": stream,
+        "logEvents": [
+            {"id": str(index), "timestamp": at_ms, "message": message}
+            for index, (at_ms, message) in enumerate(lines)
+        ],
+    }
+    data = base64.b64encode(gzip.compress(json.dumps(batch).encode())).decode()
+    return {"awslogs": {"data": data}}
+
+
+def metrics(capsys):
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return [
+        {name: record[name] for name in record if name not in ("_aws", "SessionId", "ServerId")}
+        for record in records
+    ]
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        (LAG_LINE.format(2013, 40), ("lag", {"ms": 2013, "ticks": 40})),
+        ("[12:00:00] [Server thread/INFO]: Steve_1 joined the game", ("join", {"player": "Steve_1"})),
+        ("[12:00:00] [Server thread/INFO]: Steve_1 left the game", ("leave", {"player": "Steve_1"})),
+        (
+            "[1.234s][info][gc] GC(12) Pause Young (Normal) (G1 Evacuation Pause) 1M->1M(2M) 15.3ms",
+            ("gc_pause", {"ms": 15.3}),
+        ),
+        # Chat can quote anything; only the server's own lines count.
+        ("[12:00:00] [Server thread/INFO]: <Alex> Steve joined the game", None),
+    ],
+)
+def test_parse(log_metrics_function, line, expected):
+    assert log_metrics_function.server_log.parse(line) == expected
+
+
+def test_lag_lines_become_metrics_and_session_totals(
+    log_metrics_function, running_server, state_table, capsys
+):
+    event = subscription_event(
+        (1000, LAG_LINE.format(2000, 40)),
+        (2000, LAG_LINE.format(3000, 60)),
+    )
+
+    result = log_metrics_function.lambda_handler(event, None)
+    session = state_table.get_item(Key={"id": "session#server-4"})["Item"]
+
+    assert result["session"] == "server-4"
+    assert metrics(capsys) == [
+        {"MsBehind": 2000, "TicksBehind": 40},
+        {"MsBehind": 3000, "TicksBehind": 60},
+    ]
+    assert session["ms_behind"] == 5000
+    assert session["lag_events"] == 2
+
+
+def test_players_are_counted_once(log_metrics_function, running_server, state_table, capsys):
+    event = subscription_event(
+        (1000, "[12:00:00] [Server thread/INFO]: Steve joined the game"),
+        (2000, "[12:00:01] [Server thread/INFO]: Alex joined the game"),
+        (61000, "[12:01:00] [Server thread/INFO]: Steve left the game"),
+    )
+
+    log_metrics_function.lambda_handler(event, None)
+    # Subscriptions deliver at least once.
+    log_metrics_function.lambda_handler(event, None)
+    session = state_table.get_item(Key={"id": "session#server-4"})["Item"]
+
+    assert metrics(capsys) == [
+        {"PlayersOnline": 1},
+        {"PlayersOnline": 2},
+        {"PlayersOnline": 1, "PlayerSessionSeconds": 60.0},
+    ]
+    assert session["players_online"] == 1
+    assert session["peak_players"] == 2
+
+
+def test_save_duration_spans_batches(log_metrics_function, running_server, capsys):
+    log_metrics_function.lambda_handler(
+        subscription_event(
+            (1000, "[12:00:00] [Server thread/INFO]: Saving the game (this may take a moment!)")
+        ),
+        None,
+    )
+    log_metrics_function.lambda_handler(
+        subscription_event((3500, "[12:00:02] [Server thread/INFO]: Saved the game")),
+        None,
+    )
+
+    assert metrics(capsys) == [{"ChunkSaveMs": 2500}]
+
+
+def test_old_task_is_not_tracked_as_the_session(log_metrics_function, running_server, capsys):
+    event = subscription_event(
+        (1000, "[12:00:00] [Server thread/INFO]: Steve joined the game"),
+        stream="minecraft/minecraft/previous",
+    )
+
+    assert log_metrics_function.lambda_handler(event, None)["session"] is None
+    assert metrics(capsys) == []
+
+
+def test_further_servers_are_tracked_against_their_own_session(
+    log_metrics_function, running_server, state_table, capsys
+):
+    state_table.put_item(
+        Item={
+            "id": "creative",
+            "state": "PLAYABLE",
+            "version": 2,
+            "execution_arn": f"{EXECUTION_ARN}-creative",
+            "task_arn": f"arn:aws:ecs:us-east-1:123456789012:task/cluster/{TASK_ID}",
+        }
+    )
+    event = subscription_event(
+        (1000, LAG_LINE.format(2013, 40)), stream=f"creative/minecraft/{TASK_ID}"
+    )
+
+    result = log_metrics_function.lambda_handler(event, None)
+
+    assert result["server_id"] == "creative"
+    assert result["session"] == "server-4-creative"
+    assert json.loads(capsys.readouterr().out)["ServerId"] == "creative"
@@ -1,15 +1,449 @@
+import json
+
 import aws_cdk as core
 import aws_cdk.assertions as assertions
+import aws_cdk.aws_events as events
+import pytest
 
+from constants import MC_SERVER_CONTAINER_NAME
+from src.common.infrastructure import HandlerOptions
 from src.component import MinecraftOnDemandInfraCommonCdkStack
+from src.servers.infrastructure import ServerSpec
+
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in minecraft_on_demand_infra_common_cdk/minecraft_on_demand_infra_common_cdk_stack.py
-def test_sqs_queue_created():
+def synth(**kwargs):
     app = core.App()
-    stack = MinecraftOnDemandInfraCommonCdkStack(app, "minecraft-on-demand-infra-common-cdk")
-    template = assertions.Template.from_stack(stack)
+    stack = MinecraftOnDemandInfraCommonCdkStack(
+        app,
+        "minecraft-on-demand-infra-common-cdk",
+        env=core.Environment(account="533267195973", region="us-east-1"),
+        **kwargs,
+    )
+    return assertions.Template.from_stack(stack)
+
+
+def test_stack_synthesizes():
+    template = synth()
+
+    # The server workflow, the graceful stop and the maintenance jobs.
+    template.resource_count_is("AWS::StepFunctions::StateMachine", 3)
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "status"})
+
+
+def test_direct_api_integrations_use_express_workflows():
+    template = synth(direct_api_integrations=True)
+
+    template.resource_properties_count_is(
+        "AWS::StepFunctions::StateMachine", {"StateMachineType": "EXPRESS"}, 2
+    )
+    template.has_resource_properties(
+        "AWS::ApiGateway::Method",
+        {
+            "HttpMethod": "GET",
+            "Integration": {
+                "Type": "AWS",
+                "Uri": {
+                    "Fn::Join": [
+                        "",
+                        assertions.Match.array_with(
+                            [assertions.Match.string_like_regexp("states:action/StartSyncExecution")]
+                        ),
+                    ]
+                },
+            },
+        },
+    )
+
+
+def test_direct_dns_events_skip_sns():
+    template = synth(direct_dns_events=True)
+
+    template.resource_count_is("AWS::SNS::Topic", 0)
+    template.has_resource_properties(
+        "AWS::Events::Rule",
+        {
+            "Targets": [
+                assertions.Match.object_like(
+                    {"Arn": {"Fn::GetAtt": [assertions.Match.string_like_regexp("UpsertRecordLambda"), "Arn"]}}
+                )
+            ]
+        },
+    )
+
+
+def test_wake_on_connect_runs_listener_service():
+    template = synth(wake_on_connect=True)
+
+    template.has_resource_properties("AWS::ECS::Service", {"DesiredCount": 1})
+    template.has_resource_properties(
+        "AWS::ECS::TaskDefinition", {"Cpu": "256", "Memory": "512"}
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Environment": {
+                "Variables": assertions.Match.object_like({"RECORD_NAME": "origin.pz-craft.online"})
+            }
+        },
+    )
+
+
+def test_baked_image_replaces_modpack_download():
+    template = synth(bake_image=True)
+
+    server = next(
+        definition
+        for resource in template.find_resources("AWS::ECS::TaskDefinition").values()
+        for definition in resource["Properties"]["ContainerDefinitions"]
+        if definition["Name"] == MC_SERVER_CONTAINER_NAME
+    )
+
+    assert "MODPACK" not in {variable["Name"] for variable in server["Environment"]}
+    assert "itzg/minecraft-server" not in json.dumps(server["Image"])
+
+
+def test_pull_through_cache_serves_server_image_from_ecr():
+    template = synth(pull_through_cache=True)
+
+    template.has_resource_properties(
+        "AWS::ECR::PullThroughCacheRule",
+        {"EcrRepositoryPrefix": "docker-hub", "UpstreamRegistryUrl": "registry-1.docker.io"},
+    )
+
+    server = next(
+        definition
+        for resource in template.find_resources("AWS::ECS::TaskDefinition").values()
+        for definition in resource["Properties"]["ContainerDefinitions"]
+        if definition["Name"] == MC_SERVER_CONTAINER_NAME
+    )
+
+    assert "docker-hub/itzg/minecraft-server:latest" in json.dumps(server["Image"])
+
+
+def test_profile_sizes_task_and_heap():
+    template = synth(profile="heavy-modpack")
+
+    template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "Cpu": "4096",
+            "Memory": "16384",
+            "ContainerDefinitions": [
+                assertions.Match.object_like(
+                    {
+                        "Environment": assertions.Match.array_with(
+                            [{"Name": "MEMORY", "Value": "12288M"}]
+                        )
+                    }
+                )
+            ],
+        },
+    )
+
+
+def test_unknown_profile_fails_synth():
+    with pytest.raises(ValueError):
+        synth(profile="huge")
+
+
+def test_s3_world_storage_uses_task_storage_and_sync_sidecar():
+    template = synth(world_storage="s3")
+
+    template.resource_count_is("AWS::S3::Bucket", 1)
+    template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "EphemeralStorage": {"SizeInGiB": 50},
+            "Volumes": [{"Name": "data"}],
+            "ContainerDefinitions": assertions.Match.array_with(
+                [
+                    assertions.Match.object_like(
+                        {
+                            "Name": MC_SERVER_CONTAINER_NAME,
+                            "DependsOn": [{"Condition": "HEALTHY", "ContainerName": "world-sync"}],
+                        }
+                    ),
+                    assertions.Match.object_like({"Name": "world-sync", "Essential": False}),
+                ]
+            ),
+        },
+    )
+
+
+def test_backup_runs_after_cleanup():
+    template = synth()
+
+    definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+
+    assert '\\"InvokeCleanup\\":{\\"Next\\":\\"InvokeBackup\\"' in definition
+
+
+def test_pregen_runs_server_task_without_players():
+    template = synth(pregen_schedule=events.Schedule.cron(hour="4", minute="0"))
+
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "pregen"})
+    template.has_resource_properties(
+        "AWS::Events::Rule",
+        {"ScheduleExpression": "cron(0 4 * * ? *)"},
+    )
+
+    definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+
+    assert "RunPregen" in definition
+    assert "ENFORCE_WHITELIST" in definition
+
+
+def test_stop_shuts_server_down_over_rcon_first():
+    template = synth(direct_api_integrations=True)
+
+    template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "ContainerDefinitions": assertions.Match.array_with(
+                [
+                    assertions.Match.object_like(
+                        {
+                            "Name": MC_SERVER_CONTAINER_NAME,
+                            "Environment": assertions.Match.array_with(
+                                [{"Name": "ENABLE_RCON", "Value": "TRUE"}]
+                            ),
+                            "StopTimeout": 120,
+                        }
+                    )
+                ]
+            ),
+        },
+    )
+
+    definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+
+    assert "StartGracefulStop" in definition
+    assert '\\"Shutdown\\":{\\"Next\\":\\"ShutdownRequested\\"' in definition
+    assert "RCON_PASSWORD" in definition
+
+
+def test_spot_sessions_fall_back_to_on_demand():
+    template = synth(spot=True, restart_on_interruption=True)
+
+    template.has_resource_properties(
+        "AWS::ECS::ClusterCapacityProviderAssociations",
+        {"CapacityProviders": assertions.Match.array_with(["FARGATE_SPOT"])},
+    )
+    template.has_resource_properties(
+        "AWS::Events::Rule",
+        {
+            "EventPattern": assertions.Match.object_like(
+                {"detail": assertions.Match.object_like({"stopCode": ["SpotInterruption"]})}
+            )
+        },
+    )
+
+    definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+
+    assert "FARGATE_SPOT" in definition
+    assert "RunFargateOnDemand" in definition
+
+
+def test_restart_on_interruption_needs_spot():
+    with pytest.raises(ValueError):
+        synth(restart_on_interruption=True)
+
+
+def test_static_address_fronts_server_with_load_balancer():
+    template = synth(static_address=True)
+
+    template.has_resource_properties(
+        "AWS::ElasticLoadBalancingV2::TargetGroup",
+        {"TargetType": "ip", "Port": 25565, "Protocol": "TCP"},
+    )
+    template.has_resource_properties(
+        "AWS::Route53::RecordSet",
+        {"Type": "A", "AliasTarget": assertions.Match.any_value()},
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "lambda_function.lambda_handler",
+            "Environment": {
+                "Variables": assertions.Match.object_like(
+                    {"TARGET_GROUP_ARN": assertions.Match.any_value()}
+                )
+            },
+        },
+    )
+
+
+def test_static_address_excludes_wake_on_connect():
+    with pytest.raises(ValueError):
+        synth(static_address=True, wake_on_connect=True)
+
+
+def test_server_metrics_subscribe_to_server_log():
+    template = synth(server_metrics=True)
+
+    template.resource_count_is("AWS::Logs::SubscriptionFilter", 1)
+    template.has_resource_properties(
+        "AWS::CloudWatch::Alarm",
+        {"MetricName": "MsBehind", "Namespace": "MinecraftOnDemand", "DatapointsToAlarm": 3},
+    )
+
+
+def test_profiler_captures_on_request_and_on_lag():
+    template = synth(server_metrics=True, profiler=True)
+
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "profile"})
+    template.has_resource_properties(
+        "AWS::Events::Rule",
+        {
+            "EventPattern": assertions.Match.object_like(
+                {"detail-type": ["CloudWatch Alarm State Change"]}
+            )
+        },
+    )
+
+
+def test_profiler_needs_efs_world():
+    with pytest.raises(ValueError):
+        synth(profiler=True, world_storage="s3")
+
+
+def test_prewarm_runs_lead_minutes_before_the_hour():
+    template = synth(prewarm_lead_minutes=15)
+
+    template.has_resource_properties(
+        "AWS::Events::Rule", {"ScheduleExpression": "cron(45 * * * ? *)"}
+    )
+    template.has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "GlobalSecondaryIndexes": assertions.Match.array_with(
+                [assertions.Match.object_like({"IndexName": "session-history"})]
+            )
+        },
+    )
+
+
+def test_right_sizing_applies_recommended_task_size():
+    template = synth(server_metrics=True, right_sizing="apply")
+
+    definition = json.dumps(
+        template.find_resources("AWS::StepFunctions::StateMachine")
+    )
+    assert "ReadTaskSize" in definition
+    assert "Cpu.$" in definition
+    template.has_resource_properties(
+        "AWS::Lambda::Function", {"Handler": "recommend_function.lambda_handler"}
+    )
+
+
+def test_right_sizing_recommends_without_overriding():
+    template = synth(server_metrics=True, right_sizing="recommend")
+
+    assert "ReadTaskSize" not in json.dumps(
+        template.find_resources("AWS::StepFunctions::StateMachine")
+    )
+
+
+def test_unknown_right_sizing_mode():
+    with pytest.raises(ValueError):
+        synth(server_metrics=True, right_sizing="always")
+
+
+def test_right_sizing_needs_server_metrics():
+    with pytest.raises(ValueError):
+        synth(right_sizing="recommend")
+
+
+def test_further_servers_share_the_workflow():
+    template = synth(
+        servers=(ServerSpec("creative", world="creative"), ServerSpec("skyblock", world="sky")),
+        max_running_servers=2,
+    )
+
+    # The primary server's task definition and one per further server.
+    template.resource_count_is("AWS::ECS::TaskDefinition", 3)
+    template.has_resource_properties(
+        "AWS::EFS::AccessPoint",
+        {"RootDirectory": assertions.Match.object_like({"Path": "/servers/creative"})},
+    )
+    template.has_resource_properties("AWS::ApiGateway::Resource", {"PathPart": "{id}"})
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "start_function.lambda_handler",
+            "Environment": {
+                "Variables": assertions.Match.object_like({"MAX_RUNNING_SERVERS": "2"})
+            },
+        },
+    )
+
+    definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+    assert "TaskDefinition.$" in definition
+    assert "IsPrimaryServer" in definition
+
+
+def test_server_ids_are_validated():
+    with pytest.raises(ValueError):
+        ServerSpec("0", world="creative")
+    with pytest.raises(ValueError):
+        ServerSpec("Creative", world="creative")
+    with pytest.raises(ValueError):
+        synth(servers=(ServerSpec("creative", world="creative"),), world_storage="s3")
+
+
+def test_handlers_run_on_arm64_with_more_memory():
+    template = synth(handlers=HandlerOptions(arm64=True, memory_mib=512))
+
+    for handler in (
+        "start_function.lambda_handler",
+        "stop_function.lambda_handler",
+        "status_function.lambda_handler",
+    ):
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {"Handler": handler, "Architectures": ["arm64"], "MemorySize": 512},
+        )
+    handlers = [
+        function["Properties"]
+        for function in template.find_resources("AWS::Lambda::Function").values()
+        if function["Properties"].get("Handler", "").endswith(".lambda_handler")
+    ]
+    assert len(handlers) > 5
+    assert all(props["Architectures"] == ["arm64"] for props in handlers)
+    # Sized for their own work.
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {"Handler": "backup_function.lambda_handler", "Architectures": ["arm64"], "MemorySize": 1769},
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::LayerVersion", {"CompatibleArchitectures": ["x86_64", "arm64"]}
+    )
+
+
+def test_snap_start_handlers_are_invoked_through_their_alias():
+    template = synth(handlers=HandlerOptions(snap_start=True))
+
+    template.resource_properties_count_is(
+        "AWS::Lambda::Function", {"SnapStart": {"ApplyOn": "PublishedVersions"}}, 5
+    )
+    template.resource_count_is("AWS::Lambda::Alias", 5)
+    template.has_resource_properties(
+        "AWS::ApiGateway::Method",
+        {
+            "Integration": {
+                "Uri": {
+                    "Fn::Join": [
+                        "",
+                        assertions.Match.array_with(
+                            [{"Ref": assertions.Match.string_like_regexp("launcherlambdaAliaslive")}]
+                        ),
+                    ]
+                }
+            }
+        },
+    )
+
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+def test_handler_memory_is_validated():
+    with pytest.raises(ValueError):
+        HandlerOptions(memory_mib=64)
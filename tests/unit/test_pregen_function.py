@@ -0,0 +1,118 @@
+import socketserver
+import threading
+
+import pytest
+
+PASSWORD = "secret"
+
+
+class FakeRconHandler(socketserver.BaseRequestHandler):
+    """Answers Chunky commands with canned output and records them."""
+
+    def handle(self):
+        rcon = self.server.rcon
+
+        request_id, packet_type, body = rcon.read(self.request)
+        assert packet_type == rcon.AUTH
+        authenticated = body == PASSWORD
+        self.request.sendall(rcon.encode(request_id if authenticated else -1, rcon.AUTH_RESPONSE, ""))
+        if not authenticated:
+            return
+
+        while True:
+            try:
+                request_id, _, command = rcon.read(self.request)
+            except rcon.RconError:
+                return
+
+            self.server.commands.append(command)
+            if command == "stop" and self.server.hang_up_on_stop:
+                # As a real server does while it shuts down.
+                return
+
+            output = self.server.progress if command == "chunky progress" else ""
+            self.request.sendall(rcon.encode(request_id, rcon.RESPONSE_VALUE, output))
+
+
+@pytest.fixture
+def pregen_function(load_runtime, state_table):
+    return load_runtime("maintenance/runtime", "pregen_function", TABLE_NAME=state_table.name)
+
+
+@pytest.fixture
+def rcon_server(pregen_function, state_table, monkeypatch):
+    server = socketserver.TCPServer(("127.0.0.1", 0), FakeRconHandler)
+    server.rcon = pregen_function.rcon
+    server.commands = []
+    server.progress = ""
+    server.hang_up_on_stop = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "MAINTENANCE",
+            "version": 4,
+            "maintenance": "pregen",
+            "maintenance_address": "127.0.0.1",
+        }
+    )
+    monkeypatch.setattr(pregen_function, "RCON_PORT", server.server_address[1])
+
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_first_poll_starts_chunky(pregen_function, rcon_server, state_table):
+    rcon_server.progress = "[Chunky] Task running for minecraft:overworld. Processed: 10 chunks (0.50%), ETA: 1:00:00"
+
+    result = pregen_function.lambda_handler(
+        {"password": PASSWORD, "started": False, "options": {"radius": 1500}}, None
+    )
+
+    assert result == {"password": PASSWORD, "started": True, "done": False, "percent": 0.5}
+    assert "chunky radius 1500" in rcon_server.commands
+    assert "chunky start" in rcon_server.commands
+    assert "stop" not in rcon_server.commands
+
+    progress = state_table.get_item(Key={"id": "0"})["Item"]["maintenance_progress"]
+    assert progress["chunks"] == 10
+
+
+def test_finished_run_stops_the_server(pregen_function, rcon_server):
+    rcon_server.progress = "[Chunky] No tasks running."
+
+    result = pregen_function.lambda_handler({"password": PASSWORD, "started": True}, None)
+
+    assert result["done"] is True
+    assert rcon_server.commands == ["chunky progress", "stop"]
+
+
+def test_connection_closed_by_stop_still_finishes_the_run(pregen_function, rcon_server):
+    rcon_server.progress = "[Chunky] No tasks running."
+    rcon_server.hang_up_on_stop = True
+
+    result = pregen_function.lambda_handler({"password": PASSWORD, "started": True}, None)
+
+    assert result["done"] is True
+    assert rcon_server.commands == ["chunky progress", "stop"]
+
+
+def test_unknown_address_is_not_ready(pregen_function, state_table):
+    state_table.put_item(Item={"id": "0", "state": "MAINTENANCE", "version": 1, "maintenance": "pregen"})
+
+    with pytest.raises(pregen_function.ServerNotReady):
+        pregen_function.lambda_handler({"password": PASSWORD}, None)
+
+
+def test_wrong_password_is_rejected(pregen_function, rcon_server):
+    with pytest.raises(pregen_function.rcon.RconError):
+        pregen_function.lambda_handler({"password": "wrong", "started": True}, None)
+
+
+def test_refuses_when_not_holding_the_server(pregen_function, state_table):
+    state_table.put_item(Item={"id": "0", "state": "PLAYABLE", "version": 1})
+
+    with pytest.raises(RuntimeError):
+        pregen_function.lambda_handler({"password": PASSWORD}, None)
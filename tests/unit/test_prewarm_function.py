@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+HOUR_MS = 3600 * 1000
+WEEK_MS = 7 * 24 * HOUR_MS
+# Monday, 2024-01-29 18:50 UTC.
+NOW_MS = 1706554200000
+
+
+class FakeLambda:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.payloads = []
+
+    def invoke(self, FunctionName, Payload):
+        self.payloads.append(json.loads(Payload))
+        return {"Payload": io.BytesIO(json.dumps({"statusCode": self.status_code}).encode())}
+
+
+@pytest.fixture
+def prewarm_function(load_runtime, state_table, monkeypatch):
+    module = load_runtime(
+        "prewarm/runtime",
+        "prewarm_function",
+        TABLE_NAME=state_table.name,
+        LAUNCHER_FUNCTION_NAME="launcher",
+    )
+    monkeypatch.setattr(module.timeline, "now_ms", lambda: NOW_MS)
+    monkeypatch.setattr(module, "lambda_client", FakeLambda())
+
+    return module
+
+
+def played_mondays_at_seven(timeline, table, weeks):
+    for week in range(1, weeks + 1):
+        # 19:05 on each of the previous Mondays.
+        requested = NOW_MS + 15 * 60 * 1000 - week * WEEK_MS
+        timeline.record(table, f"server-{week}", {"requested": requested})
+
+
+def test_likely_hour_is_prewarmed(prewarm_function, state_table):
+    played_mondays_at_seven(prewarm_function.timeline, state_table, weeks=3)
+
+    result = prewarm_function.lambda_handler({}, None)
+
+    (payload,) = prewarm_function.lambda_client.payloads
+    assert result["prewarmed"] is True
+    assert payload["prewarm"]["for_ms"] == NOW_MS + 10 * 60 * 1000
+    # Ten minutes of lead plus twenty of grace.
+    assert payload["prewarm"]["autostop_timeout_init"] == 1800
+
+
+def test_unlikely_hour_is_left_alone(prewarm_function, state_table):
+    result = prewarm_function.lambda_handler({}, None)
+
+    assert result == {"for_ms": NOW_MS + 10 * 60 * 1000, "probability": 0.0, "prewarmed": False}
+    assert prewarm_function.lambda_client.payloads == []
+
+
+def test_running_server_is_not_reported_as_prewarmed(prewarm_function, state_table, monkeypatch):
+    played_mondays_at_seven(prewarm_function.timeline, state_table, weeks=3)
+    monkeypatch.setattr(prewarm_function, "lambda_client", FakeLambda(status_code=409))
+
+    assert prewarm_function.lambda_handler({}, None)["prewarmed"] is False
@@ -0,0 +1,146 @@
+import os
+import socketserver
+import threading
+
+import boto3
+import pytest
+
+PASSWORD = "secret"
+EXECUTION_ARN = "arn:aws:states:us-east-1:123456789012:execution:server:server-9"
+
+
+class FakeRconHandler(socketserver.BaseRequestHandler):
+    """Answers spark commands and, on stop, saves a profile like spark does."""
+
+    def handle(self):
+        rcon = self.server.rcon
+
+        request_id, _, body = rcon.read(self.request)
+        authenticated = body == PASSWORD
+        self.request.sendall(rcon.encode(request_id if authenticated else -1, rcon.AUTH_RESPONSE, ""))
+        if not authenticated:
+            return
+
+        while True:
+            try:
+                request_id, _, command = rcon.read(self.request)
+            except rcon.RconError:
+                return
+
+            self.server.commands.append(command)
+            output = self.server.outputs.get(command, "")
+            if command.startswith("spark profiler stop") and self.server.profile_dir:
+                with open(os.path.join(self.server.profile_dir, "profile.sparkprofile"), "wb") as f:
+                    f.write(b"profile")
+            self.request.sendall(rcon.encode(request_id, rcon.RESPONSE_VALUE, output))
+
+
+@pytest.fixture
+def rcon_server(load_runtime, state_table):
+    rcon = load_runtime("common/runtime/python", "rcon")
+    server = socketserver.TCPServer(("127.0.0.1", 0), FakeRconHandler)
+    server.rcon = rcon
+    server.commands = []
+    server.outputs = {}
+    server.profile_dir = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "PLAYABLE",
+            "version": 8,
+            "execution_arn": EXECUTION_ARN,
+            "private_ip": "127.0.0.1",
+            "rcon_password": PASSWORD,
+        }
+    )
+
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def start_function(load_runtime, state_table, rcon_server):
+    return load_runtime(
+        "profiler/runtime",
+        "start_function",
+        TABLE_NAME=state_table.name,
+        RCON_PORT=str(rcon_server.server_address[1]),
+    )
+
+
+@pytest.fixture
+def bucket(aws):
+    boto3.client("s3").create_bucket(Bucket="profiles")
+    return "profiles"
+
+
+@pytest.fixture
+def collect_function(load_runtime, state_table, rcon_server, bucket, tmp_path):
+    rcon_server.profile_dir = str(tmp_path)
+    return load_runtime(
+        "profiler/runtime",
+        "collect_function",
+        TABLE_NAME=state_table.name,
+        BUCKET=bucket,
+        PROFILE_DIR=str(tmp_path),
+        RCON_PORT=str(rcon_server.server_address[1]),
+    )
+
+
+def test_start_profiles_the_current_session(start_function, rcon_server):
+    result = start_function.lambda_handler({"mode": "alloc", "duration_seconds": 3600}, None)
+
+    assert rcon_server.commands == ["spark profiler start --alloc"]
+    assert result["session"] == "server-9"
+    assert result["duration_seconds"] == start_function.MAX_DURATION_SECONDS
+    assert result["trigger"] == "api"
+
+
+def test_start_refuses_a_second_capture(start_function, rcon_server):
+    rcon_server.outputs["spark profiler start"] = "The profiler is already active!"
+
+    with pytest.raises(start_function.ProfilerBusy):
+        start_function.lambda_handler({}, None)
+
+
+def test_start_needs_a_playable_server(start_function, state_table):
+    state_table.update_item(
+        Key={"id": "0"},
+        UpdateExpression="SET #state = :stopped",
+        ExpressionAttributeNames={"#state": "state"},
+        ExpressionAttributeValues={":stopped": "STOPPED"},
+    )
+
+    with pytest.raises(start_function.ServerNotRunning):
+        start_function.lambda_handler({}, None)
+
+
+def test_collect_uploads_profile_and_links_it(collect_function, rcon_server, state_table, bucket):
+    profile = {
+        "session": "server-9",
+        "mode": "cpu",
+        "trigger": "lag-alarm",
+        "duration_seconds": 60,
+        "started_at": 0,
+    }
+
+    result = collect_function.lambda_handler(profile, None)
+    session = state_table.get_item(Key={"id": "session#server-9"})["Item"]
+    key = result["uri"].removeprefix(f"s3://{bucket}/")
+
+    assert rcon_server.commands == ["spark profiler stop --save-to-file"]
+    assert key == "profiles/server-9/0-cpu.sparkprofile"
+    assert boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read() == b"profile"
+    assert [linked["uri"] for linked in session["profiles"]] == [result["uri"]]
+    assert session["profiles"][0]["trigger"] == "lag-alarm"
+
+
+def test_collect_waits_for_spark_to_write(collect_function, rcon_server):
+    rcon_server.profile_dir = None
+    profile = {"session": "server-9", "mode": "cpu", "trigger": "api", "started_at": 0}
+
+    with pytest.raises(collect_function.ProfileNotReady):
+        collect_function.lambda_handler(profile, None)
@@ -0,0 +1,59 @@
+import pytest
+
+from src.profiles import PROFILES, ZGC, ServerProfile
+
+
+def test_heap_leaves_off_heap_headroom():
+    profile = PROFILES["standard"]
+
+    assert (profile.cpu, profile.memory_mib) == (2048, 6144)
+    assert profile.off_heap_mib == 1536
+    assert profile.environment()["MEMORY"] == "4608M"
+
+
+def test_heap_follows_task_memory():
+    profile = ServerProfile(name="custom", cpu=2048, memory_mib=8192)
+
+    assert profile.environment()["MEMORY"] == "6144M"
+
+
+def test_off_heap_never_below_minimum():
+    profile = ServerProfile(name="custom", cpu=1024, memory_mib=2048)
+
+    assert profile.off_heap_mib == 1024
+    assert profile.heap_mib == 1024
+
+
+def test_gc_flags():
+    assert "-XX:+UseG1GC" in PROFILES["small"].environment()["JVM_XX_OPTS"]
+    assert "-XX:+UseZGC" in PROFILES["heavy-modpack"].environment()["JVM_XX_OPTS"]
+
+    large = ServerProfile(name="large", cpu=4096, memory_mib=20480)
+    assert "-XX:G1HeapRegionSize=16M" in large.jvm_flags
+
+
+def test_gc_pauses_are_logged_for_the_server_metrics():
+    for profile in PROFILES.values():
+        assert "-Xlog:gc:stdout" in profile.environment()["JVM_OPTS"]
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"cpu": 2048, "memory_mib": 3072},
+        {"cpu": 1536, "memory_mib": 4096},
+        {"cpu": 512, "memory_mib": 1024},
+        {"off_heap_mib": 512},
+        {"gc": "Shenandoah"},
+        {"view_distance": 40},
+        {"simulation_distance": 12},
+    ],
+)
+def test_invalid_combinations_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        ServerProfile(**{"name": "invalid", "cpu": 2048, "memory_mib": 6144, **overrides})
+
+
+def test_profiles_are_valid():
+    assert PROFILES["heavy-modpack"].gc == ZGC
+    assert all(profile.heap_mib < profile.memory_mib for profile in PROFILES.values())
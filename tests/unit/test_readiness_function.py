@@ -0,0 +1,165 @@
+import io
+import json
+import socketserver
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+EXECUTION_ARN = "arn:aws:states:us-east-1:1:execution:server:server-1"
+TASK_ARN = "arn:aws:ecs:us-east-1:1:task/cluster/0123456789abcdef"
+
+
+class FakeSlpHandler(socketserver.StreamRequestHandler):
+    status = {
+        "version": {"name": "1.20.1", "protocol": 763},
+        "players": {"online": 2, "max": 20},
+        "description": {"text": "A PZ server"},
+    }
+
+    def handle(self):
+        slp = self.server.slp
+
+        packet_id, payload = slp.read_packet(self.rfile)
+        assert packet_id == 0x00 and payload[-1] == slp.STATUS_STATE
+        assert slp.read_packet(self.rfile) == (0x00, b"")
+
+        body = getattr(self.server, "status_body", None) or json.dumps(self.status)
+        self.wfile.write(slp.packet(0x00, slp.encode_string(body)))
+
+        packet_id, payload = slp.read_packet(self.rfile)
+        self.wfile.write(slp.packet(packet_id, payload))
+
+
+@pytest.fixture
+def readiness_function(load_runtime, state_table):
+    return load_runtime("workflow/runtime", "readiness_function", TABLE_NAME=state_table.name)
+
+
+@pytest.fixture
+def slp_server(readiness_function):
+    server = socketserver.TCPServer(("127.0.0.1", 0), FakeSlpHandler)
+    server.slp = readiness_function.slp
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_varint_round_trip(readiness_function):
+    slp = readiness_function.slp
+
+    for value in (0, 1, 127, 128, 25565, 2**31 - 1, -1):
+        encoded = slp.encode_varint(value)
+        assert slp.read_stream_varint(io.BytesIO(encoded)) == value
+        assert slp.read_varint(encoded + b"\x00") == (value, len(encoded))
+
+
+def test_ping_reads_status(readiness_function, slp_server):
+    status = readiness_function.slp.ping("127.0.0.1", slp_server.server_address[1])
+
+    assert status["version"] == "1.20.1"
+    assert status["players_online"] == 2
+    assert status["motd"] == "A PZ server"
+    assert status["latency_ms"] >= 0
+
+
+def test_ready_server_becomes_playable(readiness_function, slp_server, state_table, monkeypatch):
+    monkeypatch.setattr(readiness_function, "SERVER_PORT", slp_server.server_address[1])
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "DNS_READY",
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "public_ip": "127.0.0.1",
+        }
+    )
+
+    probe = readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+    session = state_table.get_item(Key={"id": "session#server-1"})["Item"]
+
+    assert probe["players_online"] == 2
+    assert item["state"] == "PLAYABLE"
+    assert item["probe"]["version"] == "1.20.1"
+    assert "playable_at_ms" in session
+
+
+def test_unreachable_server_is_not_ready(readiness_function, state_table, monkeypatch):
+    monkeypatch.setattr(readiness_function, "PROBE_TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(readiness_function, "SERVER_PORT", 1)
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "DNS_READY",
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "public_ip": "127.0.0.1",
+        }
+    )
+
+    with pytest.raises(readiness_function.ServerNotReady):
+        readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "DNS_READY"
+
+
+def test_garbled_status_is_not_ready(readiness_function, slp_server, state_table, monkeypatch):
+    slp_server.status_body = '{"version": {"name": "1.20'
+    monkeypatch.setattr(readiness_function, "SERVER_PORT", slp_server.server_address[1])
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "DNS_READY",
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "public_ip": "127.0.0.1",
+        }
+    )
+
+    with pytest.raises(readiness_function.ServerNotReady):
+        readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+
+def test_probe_stops_for_ended_session(readiness_function, state_table):
+    with pytest.raises(readiness_function.SessionEnded):
+        readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+
+def test_probe_stops_once_the_server_stops(readiness_function, state_table):
+    state_table.put_item(
+        Item={"id": "0", "state": "STOPPING", "version": 5, "execution_arn": EXECUTION_ARN}
+    )
+
+    with pytest.raises(readiness_function.SessionEnded):
+        readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+
+@pytest.mark.parametrize("tasks", [[], [{"desiredStatus": "STOPPED", "lastStatus": "RUNNING"}]])
+def test_probe_stops_once_the_task_stops(readiness_function, state_table, monkeypatch, tasks):
+    asked = []
+
+    def describe_tasks(**kwargs):
+        asked.append(kwargs)
+        return {"tasks": tasks}
+
+    monkeypatch.setattr(readiness_function, "ecs", SimpleNamespace(describe_tasks=describe_tasks))
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "DNS_READY",
+            "version": 4,
+            "execution_arn": EXECUTION_ARN,
+            "task_arn": TASK_ARN,
+            "public_ip": "127.0.0.1",
+        }
+    )
+
+    with pytest.raises(readiness_function.SessionEnded):
+        readiness_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert asked == [{"cluster": "cluster", "tasks": [TASK_ARN]}]
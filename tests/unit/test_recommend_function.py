@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+SIZES = [[1024, 6144, 4608], [2048, 6144, 4608], [4096, 8192, 6144]]
+
+
+class FakeCloudWatch:
+    """Serves the same per-minute series for every session."""
+
+    def __init__(self, values):
+        self.values = values
+        self.calls = 0
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, **kwargs):
+        self.calls += 1
+        return {
+            "MetricDataResults": [
+                {"Id": query["Id"], "Values": self.values.get(query["Id"], [])}
+                for query in MetricDataQueries
+            ]
+        }
+
+
+@pytest.fixture
+def recommend_function(load_runtime, state_table, monkeypatch):
+    module = load_runtime(
+        "rightsizing/runtime",
+        "recommend_function",
+        TABLE_NAME=state_table.name,
+        CLUSTER_NAME="minecraft",
+        TASK_DEFINITION_FAMILY="server",
+        CANDIDATE_SIZES=json.dumps(SIZES),
+    )
+    monkeypatch.setattr(
+        module,
+        "cloudwatch",
+        FakeCloudWatch(
+            {
+                "cpu": [300.0] * 30,
+                "cpu_reserved": [2048.0],
+                "memory": [5500.0] * 30,
+                "memory_reserved": [6144.0],
+                # Lag in two minutes only; the rest have no data points.
+                "lag": [200.0, 100.0],
+            }
+        ),
+    )
+
+    return module
+
+
+def finished_sessions(timeline, table, count):
+    now_ms = timeline.now_ms()
+    for index in range(count):
+        requested = now_ms - (index + 1) * 86400000
+        timeline.record(
+            table,
+            f"server-{index}",
+            {"requested": requested, "playable": requested + 60000},
+        )
+        timeline.annotate(table, f"server-{index}", {"stopped_at_ms": requested + 3600000})
+
+
+def test_recommendation_is_stored_for_the_next_start(recommend_function, state_table):
+    finished_sessions(recommend_function.timeline, state_table, 3)
+
+    result = recommend_function.lambda_handler({}, None)
+
+    item = state_table.get_item(Key={"id": "task-size"})["Item"]
+    assert result["recommendation"]["sessions"] == 3
+    assert (item["cpu"], item["memory"], item["heap"]) == ("1024", "6144", "4608M")
+
+
+def test_sessions_are_summarized_once(recommend_function, state_table):
+    finished_sessions(recommend_function.timeline, state_table, 3)
+
+    recommend_function.lambda_handler({}, None)
+    recommend_function.lambda_handler({}, None)
+
+    session = state_table.get_item(Key={"id": "session#server-0"})["Item"]
+    assert recommend_function.cloudwatch.calls == 3
+    assert session["utilization"]["cpu"] == 2048
+
+
+def test_nothing_is_stored_without_enough_sessions(recommend_function, state_table):
+    finished_sessions(recommend_function.timeline, state_table, 2)
+
+    assert recommend_function.lambda_handler({}, None) == {"recommendation": None}
+    assert "Item" not in state_table.get_item(Key={"id": "task-size"})
@@ -0,0 +1,114 @@
+import json
+import socketserver
+import threading
+
+import pytest
+
+PASSWORD = "secret"
+EXECUTION_ARN = "arn:aws:states:us-east-1:123456789012:execution:server:server-3"
+
+
+class FakeRconHandler(socketserver.BaseRequestHandler):
+    """Records commands and, like Minecraft, hangs up after ``stop``."""
+
+    def handle(self):
+        rcon = self.server.rcon
+
+        request_id, packet_type, body = rcon.read(self.request)
+        assert packet_type == rcon.AUTH
+        authenticated = body == PASSWORD
+        self.request.sendall(rcon.encode(request_id if authenticated else -1, rcon.AUTH_RESPONSE, ""))
+        if not authenticated:
+            return
+
+        while True:
+            try:
+                request_id, _, command = rcon.read(self.request)
+            except rcon.RconError:
+                return
+
+            self.server.commands.append(command)
+            if command == "stop":
+                if self.server.answer_stop:
+                    output = "Stopping the server"
+                    self.request.sendall(rcon.encode(request_id, rcon.RESPONSE_VALUE, output))
+                return
+
+            self.request.sendall(rcon.encode(request_id, rcon.RESPONSE_VALUE, ""))
+
+
+@pytest.fixture
+def shutdown_function(load_runtime, state_table):
+    return load_runtime("workflow/runtime", "shutdown_function", TABLE_NAME=state_table.name)
+
+
+@pytest.fixture
+def rcon_server(shutdown_function, monkeypatch):
+    server = socketserver.TCPServer(("127.0.0.1", 0), FakeRconHandler)
+    server.rcon = shutdown_function.rcon
+    server.commands = []
+    server.answer_stop = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(shutdown_function, "RCON_PORT", server.server_address[1])
+
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def put_server(state_table, **attributes):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "STOPPING",
+            "version": 7,
+            "execution_arn": EXECUTION_ARN,
+            **attributes,
+        }
+    )
+
+
+def test_shutdown_saves_before_stopping(shutdown_function, rcon_server, state_table):
+    put_server(state_table, private_ip="127.0.0.1", rcon_password=PASSWORD)
+
+    result = shutdown_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert result == {"requested": True}
+    assert rcon_server.commands == [
+        "save-all flush",
+        f"kick @a {shutdown_function.KICK_MESSAGE}",
+        "stop",
+    ]
+
+
+def test_shutdown_tolerates_server_hanging_up_on_stop(
+    shutdown_function, rcon_server, state_table, capsys
+):
+    put_server(state_table, private_ip="127.0.0.1", rcon_password=PASSWORD)
+    rcon_server.answer_stop = False
+
+    result = shutdown_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert result == {"requested": True}
+    assert rcon_server.commands[-1] == "stop"
+    assert records[-1]["level"] == "WARNING"
+
+
+def test_shutdown_skips_server_that_is_not_up_yet(shutdown_function, rcon_server, state_table):
+    put_server(state_table, rcon_password=PASSWORD)
+
+    result = shutdown_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert result["requested"] is False
+    assert rcon_server.commands == []
+
+
+def test_shutdown_raises_on_wrong_password(shutdown_function, rcon_server, state_table):
+    put_server(state_table, private_ip="127.0.0.1", rcon_password="stale")
+
+    with pytest.raises(shutdown_function.rcon.RconError):
+        shutdown_function.lambda_handler({"execution_arn": EXECUTION_ARN}, None)
+
+    assert rcon_server.commands == []
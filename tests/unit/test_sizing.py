@@ -0,0 +1,84 @@
+import pytest
+
+from src.profiles import PROFILES
+from src.rightsizing.infrastructure import candidate_sizes
+
+SIZES = [
+    {"cpu": 1024, "memory": 4096, "heap": 3072},
+    {"cpu": 1024, "memory": 6144, "heap": 4608},
+    {"cpu": 2048, "memory": 6144, "heap": 4608},
+    {"cpu": 2048, "memory": 8192, "heap": 6144},
+    {"cpu": 4096, "memory": 8192, "heap": 6144},
+]
+
+
+@pytest.fixture
+def sizing(load_runtime):
+    return load_runtime("rightsizing/runtime", "sizing")
+
+
+def session(sizing, cpu_used, lag, *, cpu=2048, memory=6144, memory_used=5600, minutes=60):
+    return sizing.summarize(
+        [cpu_used] * minutes, [memory_used] * minutes, [lag] * minutes, cpu=cpu, memory=memory
+    )
+
+
+def test_idle_sessions_shrink_cpu_but_keep_memory(sizing):
+    sessions = [session(sizing, 400, 0) for _ in range(3)]
+
+    recommendation = sizing.recommend(sessions, SIZES, lag_threshold=5000)
+
+    assert (recommendation["cpu"], recommendation["memory"]) == (1024, 6144)
+    assert recommendation["capped"] is False
+
+
+def test_lag_at_full_cpu_grows_cpu(sizing):
+    sessions = [session(sizing, 400, 0), session(sizing, 400, 0), session(sizing, 2000, 9000)]
+
+    recommendation = sizing.recommend(sessions, SIZES, lag_threshold=5000)
+
+    assert (recommendation["cpu"], recommendation["memory"]) == (4096, 8192)
+    assert recommendation["lagged_sessions"] == 1
+
+
+def test_lag_with_spare_cpu_holds_the_size(sizing):
+    sessions = [
+        session(sizing, 400, 0),
+        session(sizing, 400, 0),
+        session(sizing, 900, 9000, memory_used=5000),
+    ]
+
+    recommendation = sizing.recommend(sessions, SIZES, lag_threshold=5000)
+
+    assert (recommendation["cpu"], recommendation["memory"]) == (2048, 6144)
+
+
+def test_lag_with_full_memory_grows_memory(sizing):
+    sessions = [session(sizing, 400, 0), session(sizing, 400, 0), session(sizing, 900, 9000)]
+
+    recommendation = sizing.recommend(sessions, SIZES, lag_threshold=5000)
+
+    assert (recommendation["cpu"], recommendation["memory"]) == (2048, 8192)
+
+
+def test_largest_size_is_capped(sizing):
+    sessions = [session(sizing, 4096, 9000, cpu=4096, memory=8192) for _ in range(3)]
+
+    recommendation = sizing.recommend(sessions, SIZES, lag_threshold=5000)
+
+    assert recommendation["cpu"] == 4096
+    assert recommendation["capped"] is True
+
+
+def test_no_recommendation_without_enough_sessions(sizing):
+    assert sizing.recommend([session(sizing, 400, 0)], SIZES, lag_threshold=5000) is None
+
+
+def test_candidates_keep_the_profiles_jvm_flags():
+    sizes = candidate_sizes(PROFILES["standard"])
+
+    assert [2048, 6144, 4608] in sizes
+    # A heap of 12 GiB or more would need the large-heap G1 flags.
+    assert all(heap < 12 * 1024 for _, _, heap in sizes)
+    # The profile's minimum heap rules out the smallest sizes.
+    assert all(memory >= 2048 for _, memory, _ in sizes)
@@ -0,0 +1,119 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from src.component import ServerOptions
+from src.servers.infrastructure import ServerSpec
+from src.stacks import DataStack, FoundationStack, layered_stacks
+
+ENV = core.Environment(account="533267195973", region="us-east-1")
+
+
+def layers(**options):
+    return layered_stacks(core.App(), "minecraft", options=ServerOptions(**options), env=ENV)
+
+
+def imports(template):
+    """Names of the exports a template imports."""
+    found = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "Fn::ImportValue":
+                    found.append(item)
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(template.to_json())
+    return found
+
+
+def test_foundation_and_data_synthesize_on_their_own():
+    app = core.App()
+    foundation = FoundationStack(app, "foundation", options=ServerOptions(), env=ENV)
+    data = DataStack(app, "data", env=ENV)
+
+    foundation_template = assertions.Template.from_stack(foundation)
+    data_template = assertions.Template.from_stack(data)
+
+    foundation_template.resource_count_is("AWS::EFS::FileSystem", 1)
+    foundation_template.resource_count_is("AWS::Lambda::Function", 0)
+    data_template.resource_count_is("AWS::DynamoDB::Table", 1)
+    assert foundation.termination_protection and data.termination_protection
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"world_storage": "s3", "bake_image": True},
+        {
+            "direct_api_integrations": True,
+            "wake_on_connect": True,
+            "server_metrics": True,
+            "right_sizing": "apply",
+        },
+        {
+            "spot": True,
+            "static_address": True,
+            "server_metrics": True,
+            "profiler": True,
+            "pull_through_cache": True,
+            "prewarm_lead_minutes": 10,
+            "servers": (ServerSpec("creative", world="creative"),),
+        },
+    ],
+)
+def test_each_layer_synthesizes(options):
+    foundation, data, compute, runtime = layers(**options)
+
+    templates = [assertions.Template.from_stack(stack) for stack in (foundation, data, compute)]
+    runtime_template = assertions.Template.from_stack(runtime)
+
+    # Lower layers never refer to the ones above them.
+    assert not any(imports(template) for template in templates)
+    templates[2].resource_count_is("AWS::ECS::Cluster", 1)
+    runtime_template.resource_count_is("AWS::EFS::FileSystem", 0)
+    runtime_template.resource_count_is("AWS::DynamoDB::Table", 0)
+    assert {dependency.stack_name for dependency in runtime.dependencies} == {
+        foundation.stack_name,
+        data.stack_name,
+        compute.stack_name,
+    }
+
+
+def test_world_storage_outlives_the_foundation_stack():
+    foundation = layers()[0]
+
+    assertions.Template.from_stack(foundation).has_resource(
+        "AWS::EFS::FileSystem", {"DeletionPolicy": "Retain", "UpdateReplacePolicy": "Retain"}
+    )
+
+
+def test_runtime_does_not_import_task_definitions():
+    runtime = layers(servers=(ServerSpec("creative", world="creative"),))[3]
+    template = assertions.Template.from_stack(runtime)
+
+    template.resource_count_is("AWS::ECS::TaskDefinition", 2)
+    assert not any("TaskDefinition" in str(name) for name in imports(template))
+
+
+def test_refused_background_starts_are_not_reported_as_started():
+    runtime = layers(profiler=True)[3]
+    template = assertions.Template.from_stack(runtime)
+
+    methods = template.find_resources(
+        "AWS::ApiGateway::Method",
+        {"Properties": {"Integration": {"Uri": assertions.Match.any_value(), "Type": "AWS"}}},
+    )
+
+    assert methods
+    for method in methods.values():
+        responses = method["Properties"]["Integration"]["IntegrationResponses"]
+        assert {
+            response.get("SelectionPattern"): response["StatusCode"] for response in responses
+        } == {None: "202", "4\\d{2}": "400", "5\\d{2}": "500"}
+        assert "$.message" in responses[1]["ResponseTemplates"]["application/json"]
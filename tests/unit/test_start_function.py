@@ -0,0 +1,190 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+
+
+@pytest.fixture
+def start_function(load_runtime, state_table, state_machine_arn, atomic_dynamodb):
+    return load_runtime(
+        "api/runtime",
+        "start_function",
+        TABLE_NAME=state_table.name,
+        STATE_MACHINE_ARN=state_machine_arn,
+    )
+
+
+def test_concurrent_starts_launch_one_execution(start_function, state_machine_arn):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        responses = list(pool.map(lambda _: start_function.lambda_handler({}, None), range(32)))
+
+    status_codes = sorted(response["statusCode"] for response in responses)
+    executions = boto3.client("stepfunctions").list_executions(
+        stateMachineArn=state_machine_arn
+    )["executions"]
+
+    assert status_codes == [200] + [409] * 31
+    assert [execution["name"] for execution in executions] == ["server-1"]
+
+
+def test_start_records_execution(start_function, state_table):
+    response = start_function.lambda_handler({}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["server_status"] == "STARTING"
+    assert item["state"] == "STARTING"
+    assert item["execution_arn"].endswith(":server-1")
+    assert "lease_expires_at" not in item
+
+    execution = boto3.client("stepfunctions").describe_execution(executionArn=item["execution_arn"])
+
+    # The server gets the same RCON password the stop path will use.
+    assert json.loads(execution["input"]) == {
+        "server_id": "0",
+        "rcon_password": item["rcon_password"],
+        "autostop_timeout_init": "300",
+    }
+
+    session = state_table.get_item(Key={"id": "session#server-1"})["Item"]
+
+    assert session["requested_at_ms"] <= session["claimed_at_ms"] <= session["execution_started_at_ms"]
+
+
+def test_failed_start_releases_claim(start_function, state_table, monkeypatch):
+    def fail(**kwargs):
+        raise RuntimeError("throttled")
+
+    start_execution = start_function.sfn.start_execution
+    monkeypatch.setattr(start_function.sfn, "start_execution", fail)
+    failed = start_function.lambda_handler({}, None)
+    monkeypatch.setattr(start_function.sfn, "start_execution", start_execution)
+
+    assert failed["statusCode"] == 500
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STOPPED"
+
+    assert start_function.lambda_handler({}, None)["statusCode"] == 200
+
+
+def test_superseded_start_answers_conflict_even_if_its_execution_wont_stop(
+    start_function, monkeypatch, capsys
+):
+    def superseded(*args, **kwargs):
+        raise start_function.lifecycle.TransitionConflict("Lease expired")
+
+    def fail(**kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(start_function.lifecycle, "record_execution", superseded)
+    monkeypatch.setattr(start_function.sfn, "stop_execution", fail)
+
+    response = start_function.lambda_handler({}, None)
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert response["statusCode"] == 409
+    assert any(
+        record["message"] == "Failed to stop the superseded execution"
+        and record["execution_arn"].endswith(":server-1")
+        for record in records
+    )
+
+
+@pytest.mark.parametrize(
+    "state, success", [("PLAYABLE", "true"), ("STOPPING", "false"), ("MAINTENANCE", "false")]
+)
+def test_conflict_answers_with_the_current_state(start_function, state_table, state, success):
+    state_table.put_item(Item={"id": "0", "state": state, "version": 4})
+
+    response = start_function.lambda_handler({}, None)
+
+    assert response["statusCode"] == 409
+    assert json.loads(response["body"]) == {"success": success, "server_status": state}
+
+
+def test_superseded_start_answers_with_the_winning_state(start_function, state_table, monkeypatch):
+    def superseded(*args, **kwargs):
+        state_table.put_item(Item={"id": "0", "state": "DNS_READY", "version": 2})
+        raise start_function.lifecycle.TransitionConflict("Lease expired")
+
+    monkeypatch.setattr(start_function.lifecycle, "record_execution", superseded)
+
+    response = start_function.lambda_handler({}, None)
+
+    assert response["statusCode"] == 409
+    assert json.loads(response["body"]) == {"success": "true", "server_status": "DNS_READY"}
+
+
+def test_expired_lease_without_execution_is_reclaimed(start_function, state_table):
+    state_table.put_item(
+        Item={"id": "0", "state": "STARTING", "version": 4, "lease_expires_at": 0}
+    )
+
+    response = start_function.lambda_handler({}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+
+    assert response["statusCode"] == 200
+    assert item["execution_arn"].endswith(":server-5")
+
+
+def test_prewarm_start_is_marked_and_waits_longer(start_function, state_table):
+    response = start_function.lambda_handler(
+        {"prewarm": {"for_ms": 7200000, "autostop_timeout_init": 1800}}, None
+    )
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+    execution = boto3.client("stepfunctions").describe_execution(executionArn=item["execution_arn"])
+    session = state_table.get_item(Key={"id": "session#server-1"})["Item"]
+
+    assert response["statusCode"] == 200
+    assert json.loads(execution["input"])["autostop_timeout_init"] == "1800"
+    assert session["prewarmed"] is True
+    assert session["prewarm_for_ms"] == 7200000
+
+
+def test_request_during_session_is_recorded_as_demand(start_function, state_table):
+    start_function.lambda_handler({"prewarm": {"for_ms": 0, "autostop_timeout_init": 1800}}, None)
+
+    assert start_function.lambda_handler({}, None)["statusCode"] == 409
+
+    session = state_table.get_item(Key={"id": "session#server-1"})["Item"]
+    assert "demanded_at_ms" in session
+
+
+@pytest.fixture
+def multi_server_start(load_runtime, state_table, state_machine_arn):
+    return load_runtime(
+        "api/runtime",
+        "start_function",
+        TABLE_NAME=state_table.name,
+        STATE_MACHINE_ARN=state_machine_arn,
+        SERVERS=json.dumps(
+            {"0": "arn:task-definition/server", "creative": "arn:task-definition/creative"}
+        ),
+        MAX_RUNNING_SERVERS="1",
+    )
+
+
+def test_further_server_gets_its_own_execution(multi_server_start, state_table):
+    response = multi_server_start.lambda_handler({"pathParameters": {"id": "creative"}}, None)
+    item = state_table.get_item(Key={"id": "creative"})["Item"]
+    execution = boto3.client("stepfunctions").describe_execution(executionArn=item["execution_arn"])
+    session = state_table.get_item(Key={"id": "session#creative-1"})["Item"]
+
+    assert response["statusCode"] == 200
+    assert item["execution_arn"].endswith(":creative-1")
+    assert json.loads(execution["input"])["task_definition"] == "arn:task-definition/creative"
+    assert session["server_id"] == "creative"
+
+
+def test_unknown_server_is_not_found(multi_server_start):
+    response = multi_server_start.lambda_handler({"pathParameters": {"id": "nope"}}, None)
+
+    assert response["statusCode"] == 404
+
+
+def test_running_server_limit_is_enforced(multi_server_start):
+    assert multi_server_start.lambda_handler({}, None)["statusCode"] == 200
+
+    response = multi_server_start.lambda_handler({"pathParameters": {"id": "creative"}}, None)
+
+    assert response["statusCode"] == 429
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def status_function(load_runtime, state_table):
+    return load_runtime(
+        "api/runtime",
+        "status_function",
+        TABLE_NAME=state_table.name,
+        CACHE_TTL_SECONDS="5",
+    )
+
+
+@pytest.fixture
+def clock(status_function, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(status_function.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def reads(status_function, monkeypatch):
+    calls = []
+    read = status_function.lifecycle.read
+
+    def counting_read(*args, **kwargs):
+        calls.append(args)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(status_function.lifecycle, "read", counting_read)
+    return calls
+
+
+def test_polling_costs_one_read_per_ttl(status_function, clock, reads):
+    for _ in range(200):
+        status_function.lambda_handler({}, None)
+
+    clock[0] += 5
+    status_function.lambda_handler({}, None)
+
+    assert len(reads) == 2
+
+
+def test_status_reports_state_with_cache_headers(status_function, state_table, clock):
+    state_table.put_item(
+        Item={"id": "0", "state": "PLAYABLE", "version": 7, "state_changed_at": 1234}
+    )
+
+    response = status_function.lambda_handler({}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] == '"7"'
+    assert response["headers"]["Cache-Control"] == "public, max-age=5"
+    assert body["server_status"] == "PLAYABLE"
+    assert body["state_changed_at"] == 1234
+
+
+def test_matching_etag_is_not_modified(status_function, clock):
+    response = status_function.lambda_handler({"headers": {"if-none-match": '"0"'}}, None)
+
+    assert response["statusCode"] == 304
+    assert response["body"] == ""
+
+
+def test_playable_status_includes_address_and_estimate(status_function, state_table, clock):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "PLAYABLE",
+            "version": 9,
+            "public_ip": "1.2.3.4",
+            "recent_start_seconds": [150, 90, 120],
+        }
+    )
+
+    body = json.loads(status_function.lambda_handler({}, None)["body"])
+
+    assert body["address"] == "1.2.3.4"
+    assert body["expected_start_seconds"] == 120
+
+
+def test_servers_are_listed_in_one_response(load_runtime, state_table):
+    status_function = load_runtime(
+        "api/runtime",
+        "status_function",
+        TABLE_NAME=state_table.name,
+        SERVERS=json.dumps({"0": "arn:server", "creative": "arn:creative"}),
+    )
+    status_function.lifecycle.claim_start(state_table, 60, server_id="creative")
+
+    response = status_function.lambda_handler({"resource": "/v1/servers"}, None)
+    servers = json.loads(response["body"])["servers"]
+
+    assert response["statusCode"] == 200
+    assert servers["0"]["server_status"] == "STOPPED"
+    assert servers["creative"]["server_status"] == "STARTING"
+    assert status_function.lambda_handler({"pathParameters": {"id": "nope"}}, None)[
+        "statusCode"
+    ] == 404
@@ -0,0 +1,88 @@
+import json
+
+import boto3
+import pytest
+
+
+@pytest.fixture
+def graceful_stop_arn(aws):
+    response = boto3.client("stepfunctions").create_state_machine(
+        name="graceful-stop",
+        definition='{"StartAt": "Stop", "States": {"Stop": {"Type": "Succeed"}}}',
+        roleArn="arn:aws:iam::123456789012:role/graceful-stop",
+    )
+
+    return response["stateMachineArn"]
+
+
+@pytest.fixture
+def start_function(load_runtime, state_table, state_machine_arn):
+    return load_runtime(
+        "api/runtime",
+        "start_function",
+        TABLE_NAME=state_table.name,
+        STATE_MACHINE_ARN=state_machine_arn,
+    )
+
+
+@pytest.fixture
+def stop_function(load_runtime, state_table, graceful_stop_arn):
+    return load_runtime(
+        "api/runtime",
+        "stop_function",
+        TABLE_NAME=state_table.name,
+        GRACEFUL_STOP_ARN=graceful_stop_arn,
+    )
+
+
+def test_stop_starts_graceful_stop(start_function, stop_function, state_table, graceful_stop_arn):
+    start_function.lambda_handler({}, None)
+    execution_arn = state_table.get_item(Key={"id": "0"})["Item"]["execution_arn"]
+
+    response = stop_function.lambda_handler({}, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+    stepfunctions = boto3.client("stepfunctions")
+    executions = stepfunctions.list_executions(stateMachineArn=graceful_stop_arn)["executions"]
+
+    assert response["statusCode"] == 200
+    # The server workflow marks it STOPPED once the task has exited.
+    assert item["state"] == "STOPPING"
+    assert [execution["name"] for execution in executions] == ["stop-server-1"]
+    assert json.loads(
+        stepfunctions.describe_execution(executionArn=executions[0]["executionArn"])["input"]
+    ) == {"execution_arn": execution_arn, "server_id": "0"}
+    assert stepfunctions.describe_execution(executionArn=execution_arn)["status"] == "RUNNING"
+
+
+def test_retried_stop_starts_one_graceful_stop(
+    start_function, stop_function, state_table, graceful_stop_arn
+):
+    start_function.lambda_handler({}, None)
+
+    responses = [stop_function.lambda_handler({}, None) for _ in range(2)]
+    executions = boto3.client("stepfunctions").list_executions(stateMachineArn=graceful_stop_arn)[
+        "executions"
+    ]
+
+    assert [response["statusCode"] for response in responses] == [200, 200]
+    assert len(executions) == 1
+
+
+def test_stop_without_server_conflicts(stop_function):
+    assert stop_function.lambda_handler({}, None)["statusCode"] == 409
+
+
+def test_stop_loses_race_to_newer_write(start_function, stop_function, state_table, monkeypatch):
+    start_function.lambda_handler({}, None)
+    read = stop_function.lifecycle.read
+
+    def read_then_race(table, server_id):
+        item = read(table, server_id)
+        # The workflow moves the server on between our read and our write.
+        stop_function.lifecycle.transition(table, "RUNNING")
+        return item
+
+    monkeypatch.setattr(stop_function.lifecycle, "read", read_then_race)
+
+    assert stop_function.lambda_handler({}, None)["statusCode"] == 409
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "RUNNING"
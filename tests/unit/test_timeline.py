@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def timeline(load_runtime):
+    return load_runtime("common/runtime/python", "timeline")
+
+
+def test_durations_follow_phase_order(timeline):
+    item = {
+        "requested_at_ms": 1000,
+        "execution_started_at_ms": 1250,
+        "task_running_at_ms": 61250,
+        "playable_at_ms": 121250,
+    }
+
+    assert timeline.durations(item) == {
+        "execution_started": 0.25,
+        "task_running": 60.0,
+        "playable": 60.0,
+    }
+
+
+def test_first_write_of_a_phase_wins(timeline, state_table):
+    timeline.record(state_table, "server-1", {"requested": 1000})
+    item = timeline.record(state_table, "server-1", {"requested": 5000, "claimed": 1100})
+
+    assert item["requested_at_ms"] == 1000
+    assert item["claimed_at_ms"] == 1100
+    assert item["kind"] == "session"
+
+
+def test_recorded_phases_are_emitted_as_emf(timeline, state_table, capsys):
+    timeline.record(state_table, "server-1", {"requested": 1000})
+    timeline.record(state_table, "server-1", {"task_running": 4000})
+
+    (record,) = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert record["Phase"] == "task_running"
+    assert record["PhaseSeconds"] == 3.0
+    assert record["ElapsedSeconds"] == 3.0
+    assert record["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "MinecraftOnDemand"
+
+
+def test_unknown_phase_is_rejected(timeline, state_table):
+    with pytest.raises(ValueError):
+        timeline.record(state_table, "server-1", {"warmed_up": 1})
+
+
+def test_history_returns_sessions_since(timeline, state_table):
+    for session, requested in (("server-1", 1000), ("server-2", 5000), ("server-3", 9000)):
+        timeline.record(state_table, session, {"requested": requested})
+    timeline.annotate(state_table, "server-2", {"stopped_at_ms": 6000})
+    timeline.annotate(state_table, "server-2", {"stopped_at_ms": 7000})
+
+    sessions = list(timeline.history(state_table, 5000))
+
+    assert [item["session_id"] for item in sessions] == ["server-2", "server-3"]
+    assert sessions[0]["stopped_at_ms"] == 6000
@@ -0,0 +1,126 @@
+import gzip
+import struct
+import zlib
+
+import pytest
+
+
+@pytest.fixture
+def trimming(load_runtime):
+    return load_runtime("maintenance/runtime", "trimming")
+
+
+def name(value):
+    encoded = value.encode()
+    return struct.pack(">H", len(encoded)) + encoded
+
+
+def compound(*tags):
+    return b"".join(tags) + b"\x00"
+
+
+def tag(tag_type, tag_name, payload):
+    return bytes([tag_type]) + name(tag_name) + payload
+
+
+def chunk(inhabited_ticks):
+    """Chunk NBT with enough other tags around InhabitedTime to be skipped."""
+    root = tag(
+        10,
+        "",
+        compound(
+            tag(3, "DataVersion", struct.pack(">i", 3465)),
+            tag(8, "Status", name("minecraft:full")),
+            tag(9, "sections", bytes([10]) + struct.pack(">i", 1) + compound(tag(1, "Y", b"\x04"))),
+            tag(12, "Heightmaps", struct.pack(">i", 2) + b"\x00" * 16),
+            tag(4, "InhabitedTime", struct.pack(">q", inhabited_ticks)),
+        ),
+    )
+
+    return b"\x02" + zlib.compress(root)
+
+
+def write_region(trimming, path, chunks):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(trimming.anvil.write_region(chunks))
+
+
+def test_nbt_find_skips_other_tags(trimming):
+    data = zlib.decompress(chunk(4242)[1:])
+
+    assert trimming.nbt.find(data, "InhabitedTime") == 4242
+    assert trimming.nbt.find(data, "Status") == "minecraft:full"
+    assert trimming.nbt.find(data, "Missing", default=-1) == -1
+
+
+def test_trim_drops_uninhabited_chunks_outside_protected_areas(trimming, tmp_path):
+    world = tmp_path / "world"
+    region = world / "region" / "r.1.0.mca"
+    # Region 1,0 starts at chunk 32,0, i.e. block 512,0.
+    write_region(
+        trimming,
+        region,
+        [
+            (0, 1, chunk(0)),  # chunk 32,0: protected by the area below
+            (5, 1, chunk(10)),  # chunk 37,0: dropped
+            (6, 1, chunk(5000)),  # chunk 38,0: inhabited
+            (40, 1, b"\x02not zlib"),  # unreadable: kept
+        ],
+    )
+    write_region(trimming, world / "entities" / "r.1.0.mca", [(5, 1, b"\x02e"), (6, 1, b"\x02e")])
+    size = region.stat().st_size
+
+    report = trimming.trim_region(
+        str(world),
+        "",
+        str(region),
+        min_inhabited_ticks=1200,
+        areas=[{"x": 500, "z": 0, "radius": 20}],
+    )
+
+    remaining = [index for index, _, _ in trimming.anvil.read_chunks(region.read_bytes())]
+    entities = trimming.anvil.read_chunks((world / "entities" / "r.1.0.mca").read_bytes())
+
+    assert remaining == [0, 6, 40]
+    assert [index for index, _, _ in entities] == [6]
+    assert report["chunks_dropped"] == 1
+    assert report["regions_rewritten"] == 1
+    assert report["bytes_reclaimed"] >= size - region.stat().st_size > 0
+
+
+def test_region_without_survivors_is_deleted(trimming, tmp_path):
+    world = tmp_path / "world"
+    region = world / "DIM-1" / "region" / "r.5.5.mca"
+    write_region(trimming, region, [(0, 1, chunk(0))])
+
+    report = trimming.trim_region(str(world), "DIM-1", str(region), min_inhabited_ticks=1, areas=[])
+
+    assert not region.exists()
+    assert report["regions_deleted"] == 1
+
+
+def test_spawn_is_read_from_level_dat(trimming, tmp_path):
+    spawn = compound(
+        tag(3, "SpawnX", struct.pack(">i", -100)),
+        tag(3, "SpawnZ", struct.pack(">i", 250)),
+    )
+    level = tag(10, "", compound(tag(10, "Data", spawn)))
+    (tmp_path / "level.dat").write_bytes(gzip.compress(level))
+
+    area = trimming.spawn_area(str(tmp_path), 64)
+
+    assert (area["x"], area["z"], area["radius"]) == (-100, 250, 64)
+
+
+def test_shards_cover_every_region_once(trimming, tmp_path):
+    for x in range(-3, 3):
+        for z in range(-3, 3):
+            write_region(trimming, tmp_path / "region" / f"r.{x}.{z}.mca", [])
+
+    regions = list(trimming.region_files(str(tmp_path)))
+    shards = [
+        [path for dimension, path in regions if trimming.shard_of(dimension, path, 4) == shard]
+        for shard in range(4)
+    ]
+
+    assert sorted(path for shard in shards for path in shard) == sorted(path for _, path in regions)
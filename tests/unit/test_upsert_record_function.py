@@ -0,0 +1,263 @@
+import json
+
+import pytest
+
+
+class FakeEc2:
+    """Associates a public IP with the ENI after a few lookups."""
+
+    def __init__(self, address, lookups_until_associated=0):
+        self.address = address
+        self.remaining = lookups_until_associated
+        self.calls = 0
+
+    def describe_network_interfaces(self, NetworkInterfaceIds):
+        self.calls += 1
+        if self.remaining:
+            self.remaining -= 1
+            return {"NetworkInterfaces": [{"NetworkInterfaceId": NetworkInterfaceIds[0]}]}
+
+        return {
+            "NetworkInterfaces": [
+                {
+                    "NetworkInterfaceId": NetworkInterfaceIds[0],
+                    "Association": {"PublicIp": self.address},
+                }
+            ]
+        }
+
+
+class FakeRoute53:
+    def __init__(self, addresses=()):
+        self.addresses = list(addresses)
+        self.changes = []
+
+    def list_resource_record_sets(self, **kwargs):
+        record_sets = [
+            {
+                "Name": "pz-craft.online.",
+                "Type": "A",
+                "ResourceRecords": [{"Value": value} for value in self.addresses],
+            }
+        ] if self.addresses else []
+        return {"ResourceRecordSets": record_sets}
+
+    def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+        self.changes.append(ChangeBatch)
+        record_set = ChangeBatch["Changes"][0]["ResourceRecordSet"]
+        self.addresses = [record["Value"] for record in record_set["ResourceRecords"]]
+
+
+def task_event(task_arn="arn:task/1", eni_id="eni-1"):
+    return {
+        "detail-type": "ECS Task State Change",
+        "detail": {
+            "taskArn": task_arn,
+            "clusterArn": "arn:cluster",
+            "lastStatus": "RUNNING",
+            "createdAt": "2024-06-01T12:00:00.000Z",
+            "pullStartedAt": "2024-06-01T12:00:20.000Z",
+            "pullStoppedAt": "2024-06-01T12:00:50.500Z",
+            "startedAt": "2024-06-01T12:01:00.000Z",
+            "attachments": [
+                {
+                    "type": "eni",
+                    "details": [
+                        {"name": "subnetId", "value": "subnet-1"},
+                        {"name": "networkInterfaceId", "value": eni_id},
+                    ],
+                }
+            ],
+        },
+    }
+
+
+@pytest.fixture
+def upsert_function(load_runtime, state_table, monkeypatch):
+    module = load_runtime(
+        "network/runtime",
+        "lambda_function",
+        DOMAIN_NAME="pz-craft.online",
+        HOSTED_ZONE_ID="Z1",
+        TABLE_NAME=state_table.name,
+    )
+    monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(module, "ecs", None)
+    return module
+
+
+def test_eventbridge_event_upserts_without_describing_task(upsert_function, monkeypatch):
+    route53 = FakeRoute53()
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+
+    response = upsert_function.lambda_handler(task_event(), None)
+
+    assert json.loads(response["body"]) == [
+        {
+            "task_arn": "arn:task/1",
+            "record_name": "pz-craft.online",
+            "public_ip": "1.2.3.4",
+            "updated": True,
+        }
+    ]
+    assert route53.addresses == ["1.2.3.4"]
+
+
+def test_eni_lookup_retries_until_associated(upsert_function, monkeypatch):
+    ec2 = FakeEc2("1.2.3.4", lookups_until_associated=3)
+    monkeypatch.setattr(upsert_function, "ec2", ec2)
+    monkeypatch.setattr(upsert_function, "route53", FakeRoute53())
+
+    upsert_function.lambda_handler(task_event(), None)
+
+    assert ec2.calls == 4
+
+
+def test_eni_lookup_gives_up(upsert_function, monkeypatch):
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4", lookups_until_associated=99))
+    monkeypatch.setattr(upsert_function, "route53", FakeRoute53())
+
+    with pytest.raises(RuntimeError):
+        upsert_function.lambda_handler(task_event(), None)
+
+
+def test_unchanged_record_is_not_rewritten(upsert_function, monkeypatch):
+    route53 = FakeRoute53(["1.2.3.4"])
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+
+    upsert_function.lambda_handler(task_event(), None)
+
+    assert route53.changes == []
+
+
+def test_every_sns_record_is_processed(upsert_function, monkeypatch):
+    route53 = FakeRoute53()
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+
+    event = {
+        "Records": [
+            {"Sns": {"Message": json.dumps(task_event(f"arn:task/{index}"))}}
+            for index in range(3)
+        ]
+    }
+    response = upsert_function.lambda_handler(event, None)
+
+    assert [result["task_arn"] for result in json.loads(response["body"])] == [
+        "arn:task/0",
+        "arn:task/1",
+        "arn:task/2",
+    ]
+    assert len(route53.changes) == 1
+
+
+def test_session_timeline_and_state_are_advanced(upsert_function, state_table, monkeypatch, capsys):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "STARTING",
+            "version": 2,
+            "execution_arn": "arn:aws:states:us-east-1:1:execution:server:server-1",
+        }
+    )
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", FakeRoute53())
+
+    upsert_function.lambda_handler(task_event(), None)
+
+    server = state_table.get_item(Key={"id": "0"})["Item"]
+    session = state_table.get_item(Key={"id": "session#server-1"})["Item"]
+    metrics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert server["state"] == "DNS_READY"
+    assert server["public_ip"] == "1.2.3.4"
+    assert server["task_arn"] == "arn:task/1"
+    assert session["image_pull_stopped_at_ms"] - session["image_pull_started_at_ms"] == 30500
+    assert "dns_ready_at_ms" in session
+    assert [metric["Phase"] for metric in metrics] == [
+        "image_pull_started",
+        "image_pull_stopped",
+        "task_running",
+        "dns_ready",
+    ]
+
+
+def test_named_record_skips_session_tracking(upsert_function, state_table, monkeypatch):
+    state_table.put_item(
+        Item={
+            "id": "0",
+            "state": "STARTING",
+            "version": 2,
+            "execution_arn": "arn:aws:states:us-east-1:1:execution:server:server-1",
+        }
+    )
+    route53 = FakeRoute53()
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("5.6.7.8"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+
+    upsert_function.lambda_handler({**task_event(), "record_name": "wake.pz-craft.online"}, None)
+
+    assert route53.changes[0]["Changes"][0]["ResourceRecordSet"]["Name"] == "wake.pz-craft.online"
+    assert state_table.get_item(Key={"id": "0"})["Item"]["state"] == "STARTING"
+    assert "Item" not in state_table.get_item(Key={"id": "session#server-1"})
+
+
+def test_maintenance_task_records_private_address_only(upsert_function, state_table, monkeypatch):
+    state_table.put_item(Item={"id": "0", "state": "MAINTENANCE", "version": 3, "maintenance": "pregen"})
+    route53 = FakeRoute53()
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+
+    event = task_event()
+    event["detail"]["attachments"][0]["details"].append({"name": "privateIPv4Address", "value": "10.0.0.7"})
+    upsert_function.lambda_handler(event, None)
+
+    server = state_table.get_item(Key={"id": "0"})["Item"]
+
+    assert route53.changes == []
+    assert server["state"] == "MAINTENANCE"
+    assert server["maintenance_address"] == "10.0.0.7"
+
+
+class FakeElbv2:
+    def __init__(self, addresses=()):
+        self.addresses = list(addresses)
+
+    def describe_target_health(self, TargetGroupArn):
+        return {
+            "TargetHealthDescriptions": [
+                {"Target": {"Id": address, "Port": 25565}} for address in self.addresses
+            ]
+        }
+
+    def register_targets(self, TargetGroupArn, Targets):
+        self.addresses += [target["Id"] for target in Targets]
+
+    def deregister_targets(self, TargetGroupArn, Targets):
+        removed = {target["Id"] for target in Targets}
+        self.addresses = [address for address in self.addresses if address not in removed]
+
+
+def test_static_address_registers_task_instead_of_dns(upsert_function, state_table, monkeypatch):
+    route53 = FakeRoute53(["192.168.1.1"])
+    elbv2 = FakeElbv2(["10.0.0.3"])
+    monkeypatch.setattr(upsert_function, "ec2", FakeEc2("1.2.3.4"))
+    monkeypatch.setattr(upsert_function, "route53", route53)
+    monkeypatch.setattr(upsert_function, "elbv2", elbv2)
+    monkeypatch.setattr(upsert_function, "TARGET_GROUP_ARN", "arn:target-group")
+    state_table.put_item(
+        Item={"id": "0", "state": "STARTING", "version": 1, "execution_arn": "arn:exec:server-1"}
+    )
+    event = task_event()
+    event["detail"]["attachments"][0]["details"].append({"name": "privateIPv4Address", "value": "10.0.0.7"})
+
+    upsert_function.lambda_handler(event, None)
+    item = state_table.get_item(Key={"id": "0"})["Item"]
+
+    # The task from an earlier session is swapped out for the new one.
+    assert elbv2.addresses == ["10.0.0.7"]
+    assert route53.changes == []
+    assert item["state"] == "DNS_READY"
+    assert item["private_ip"] == "10.0.0.7"
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import socket
+import socketserver
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def listener(load_runtime, monkeypatch):
+    module = load_runtime(
+        "wake/runtime",
+        "listener",
+        STATUS_URL="https://api.example.com/v1/server/status",
+        START_URL="https://api.example.com/v1/server/start",
+    )
+    module._status.update(value=None, expires_at=0.0)
+    return module
+
+
+@pytest.fixture
+def api(listener, monkeypatch):
+    state = {"status": {"server_status": "STOPPED", "expected_start_seconds": 90}, "starts": 0}
+
+    def request_start():
+        state["starts"] += 1
+        state["status"] = {**state["status"], "server_status": "STARTING"}
+
+    monkeypatch.setattr(listener, "fetch_status", lambda: state["status"])
+    monkeypatch.setattr(listener, "request_start", request_start)
+    return state
+
+
+def connect(listener, client):
+    """Run the listener on an ephemeral port and a blocking client against it."""
+
+    async def scenario():
+        server = await asyncio.start_server(listener.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async with server:
+            return await asyncio.to_thread(client, port)
+
+    return asyncio.run(scenario())
+
+
+def login(slp, port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+        stream = connection.makefile("rb")
+        connection.sendall(
+            slp.packet(
+                0x00,
+                slp.encode_varint(763)
+                + slp.encode_string("pz-craft.online")
+                + (25565).to_bytes(2, "big")
+                + slp.encode_varint(2),
+            )
+        )
+        connection.sendall(slp.packet(0x00, slp.encode_string("Viktor1778")))
+
+        packet_id, payload = slp.read_packet(stream)
+        length, offset = slp.read_varint(payload)
+
+        return packet_id, json.loads(payload[offset : offset + length])
+
+
+def test_status_ping_reports_sleeping_server(listener, api):
+    status = connect(listener, lambda port: listener.slp.ping("127.0.0.1", port))
+
+    assert "asleep" in status["motd"]
+    assert api["starts"] == 0
+
+
+def test_login_wakes_server_once(listener, api):
+    packet_id, message = connect(listener, lambda port: login(listener.slp, port))
+    connect(listener, lambda port: login(listener.slp, port))
+
+    assert packet_id == 0x00
+    assert "reconnect in ~90 s" in message["text"]
+    assert api["starts"] == 1
+
+
+def test_starting_server_reports_estimate(listener, api, monkeypatch):
+    api["status"] = {
+        "server_status": "RUNNING",
+        "expected_start_seconds": 90,
+        "starting_at": 1000,
+    }
+    monkeypatch.setattr(listener.time, "time", lambda: 1030)
+
+    status = connect(listener, lambda port: listener.slp.ping("127.0.0.1", port))
+
+    assert status["motd"].endswith("ready in ~60 s")
+
+
+def test_playable_server_is_proxied(listener, api, monkeypatch):
+    slp = listener.slp
+
+    class Backend(socketserver.StreamRequestHandler):
+        def handle(self):
+            slp.read_packet(self.rfile)
+            slp.read_packet(self.rfile)
+            status = {"version": {"name": "1.20.1", "protocol": 763}, "players": {"online": 3, "max": 20}}
+            self.wfile.write(slp.packet(0x00, slp.encode_string(json.dumps(status))))
+            packet_id, payload = slp.read_packet(self.rfile)
+            self.wfile.write(slp.packet(packet_id, payload))
+
+    backend = socketserver.TCPServer(("127.0.0.1", 0), Backend)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    monkeypatch.setattr(listener, "BACKEND_PORT", backend.server_address[1])
+    api["status"] = {"server_status": "PLAYABLE", "address": "127.0.0.1"}
+
+    try:
+        status = connect(listener, lambda port: slp.ping("127.0.0.1", port))
+    finally:
+        backend.shutdown()
+        backend.server_close()
+
+    assert status["players_online"] == 3
@@ -0,0 +1,103 @@
+import os
+
+import boto3
+import pytest
+
+BUCKET = "world"
+PREFIX = "data/"
+
+
+@pytest.fixture
+def world_sync(load_runtime, aws):
+    boto3.client("s3").create_bucket(Bucket=BUCKET)
+
+    return load_runtime("storage/runtime", "world_sync", BUCKET=BUCKET)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def keys():
+    response = boto3.client("s3").list_objects_v2(Bucket=BUCKET)
+    return sorted(item["Key"] for item in response.get("Contents", []))
+
+
+def test_push_uploads_only_changed_files(world_sync, tmp_path):
+    write(tmp_path / "world" / "region" / "r.0.0.mca", b"chunk")
+    write(tmp_path / "world" / "level.dat", b"level")
+    write(tmp_path / "world" / "session.lock", b"lock")
+    write(tmp_path / "logs" / "latest.log", b"log")
+
+    synced, uploaded, _ = world_sync.push(world_sync.s3, BUCKET, PREFIX, str(tmp_path), {})
+
+    assert uploaded == 2
+    assert keys() == ["data/world/level.dat", "data/world/region/r.0.0.mca"]
+
+    region = tmp_path / "world" / "region" / "r.0.0.mca"
+    write(region, b"chunk, saved again")
+    os.utime(region, ns=(1, 1))
+
+    synced, uploaded, deleted = world_sync.push(world_sync.s3, BUCKET, PREFIX, str(tmp_path), synced)
+
+    assert (uploaded, deleted) == (1, 0)
+    body = boto3.client("s3").get_object(Bucket=BUCKET, Key="data/world/region/r.0.0.mca")["Body"]
+    assert body.read() == b"chunk, saved again"
+
+
+def test_push_deletes_removed_files(world_sync, tmp_path):
+    write(tmp_path / "mods" / "old.jar", b"jar")
+    synced, _, _ = world_sync.push(world_sync.s3, BUCKET, PREFIX, str(tmp_path), {})
+
+    (tmp_path / "mods" / "old.jar").unlink()
+    synced, uploaded, deleted = world_sync.push(world_sync.s3, BUCKET, PREFIX, str(tmp_path), synced)
+
+    assert (uploaded, deleted) == (0, 1)
+    assert synced == {}
+    assert keys() == []
+
+
+def test_restore_is_the_baseline_for_the_next_push(world_sync, tmp_path):
+    source = tmp_path / "source"
+    write(source / "world" / "region" / "r.0.0.mca", b"chunk")
+    world_sync.push(world_sync.s3, BUCKET, PREFIX, str(source), {})
+
+    target = tmp_path / "target"
+    synced = world_sync.restore(world_sync.s3, BUCKET, PREFIX, str(target))
+
+    assert (target / "world" / "region" / "r.0.0.mca").read_bytes() == b"chunk"
+    assert world_sync.push(world_sync.s3, BUCKET, PREFIX, str(target), synced)[1:] == (0, 0)
+
+
+class FlakyS3:
+    """Fails the first ``failures`` uploads, then hands over to S3."""
+
+    def __init__(self, failures):
+        self.client = boto3.client("s3")
+        self.failures = failures
+
+    def upload_file(self, *args):
+        if self.failures:
+            self.failures -= 1
+            raise boto3.exceptions.S3UploadFailedError("SlowDown")
+
+        return self.client.upload_file(*args)
+
+    def delete_object(self, **kwargs):
+        return self.client.delete_object(**kwargs)
+
+
+def test_failed_sync_is_retried_on_the_next_pass(world_sync, tmp_path, capsys):
+    write(tmp_path / "world" / "level.dat", b"level")
+    client = FlakyS3(failures=1)
+
+    synced, done = world_sync.sync(client, BUCKET, PREFIX, str(tmp_path), {}, "Sync")
+
+    assert (synced, done) == ({}, False)
+    assert "Sync failed" in capsys.readouterr().out
+
+    synced, done = world_sync.sync(client, BUCKET, PREFIX, str(tmp_path), synced, "Sync")
+
+    assert done
+    assert keys() == ["data/world/level.dat"]